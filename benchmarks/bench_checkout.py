@@ -0,0 +1,164 @@
+"""
+قياس زمن إتمام البيع (process_sale) لفواتير كبيرة: الخوارزمية القديمة (استعلام + 3 عمليات لكل تشغيلة)
+مقابل التوزيع المجمّع الحالي، مع فحص عدم البيع الزائد عند التزامن.
+
+التشغيل من جذر المشروع:
+    python -m benchmarks.bench_checkout --lines 50 --invoices 200
+"""
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from database import db_profiles, migrations
+from database.db_manager import DatabaseManager
+from models.sales_dao import SalesDAO
+
+
+def build_stock(path, medicines, batches_per_medicine):
+    conn = sqlite3.connect(path)
+    migrations.migrate(conn)
+    conn.execute("BEGIN")
+    conn.executemany("INSERT INTO medicines (barcode, name, buy_price, sell_price, quantity) VALUES (?, ?, 1, 2, ?)",
+                     ((f"62{i:011d}", f"Medicine {i}", batches_per_medicine * 1000000) for i in range(medicines)))
+    conn.executemany("""INSERT INTO batches (medicine_id, batch_number, expiry_date, buy_price, sell_price, quantity)
+                        VALUES (?, ?, ?, 1, 2, 1000000)""",
+                     ((m, f"B{b}", f"{2027 + b}-01-01") for m in range(1, medicines + 1)
+                      for b in range(batches_per_medicine)))
+    conn.commit()
+    conn.close()
+
+
+def legacy_process_sale(conn, user_id, cart_items, total_amount):
+    """نسخة من الخوارزمية السابقة للمقارنة فقط (3N+1 استعلام)"""
+    cursor = conn.cursor()
+    cursor.execute("INSERT INTO sales (user_id, total_amount, sale_date) VALUES (?, ?, ?)",
+                   (user_id, total_amount, datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+    sale_id = cursor.lastrowid
+    for item in cart_items:
+        cursor.execute("SELECT id, quantity FROM batches WHERE medicine_id = ? AND quantity > 0 ORDER BY expiry_date ASC",
+                       (item['id'],))
+        remaining = item['qty']
+        for batch_id, batch_qty in cursor.fetchall():
+            if remaining <= 0:
+                break
+            take = min(remaining, batch_qty)
+            cursor.execute("""INSERT INTO sale_items (sale_id, medicine_id, batch_id, quantity, price_at_sale, total_item_price)
+                              VALUES (?, ?, ?, ?, ?, ?)""", (sale_id, item['id'], batch_id, take, item['price'],
+                                                            take * item['price']))
+            cursor.execute("UPDATE batches SET quantity = quantity - ? WHERE id = ?", (take, batch_id))
+            cursor.execute("UPDATE medicines SET quantity = quantity - ? WHERE id = ?", (take, item['id']))
+            remaining -= take
+    conn.commit()
+
+
+def make_carts(count, lines, medicines, batches_per_medicine, seed):
+    rnd = random.Random(seed)
+    stock = dict.fromkeys(range(1, medicines + 1), batches_per_medicine * 1000000)
+    carts = []
+    for _ in range(count):
+        cart = []
+        for m in rnd.sample(range(1, medicines + 1), lines):
+            # كمية أكبر من التشغيلة الواحدة أحياناً حتى يتوزع السطر على عدة تشغيلات (دون تجاوز المخزون)
+            qty = rnd.choice([1, 2, 3, 1000001])
+            if qty > stock[m] - 3:
+                qty = 1
+            stock[m] -= qty
+            cart.append({'id': m, 'qty': qty, 'price': 2.0})
+        carts.append(cart)
+    return carts
+
+
+def summarize(label, timings):
+    timings = sorted(timings)
+    p50 = statistics.median(timings) * 1000
+    p95 = timings[int(len(timings) * 0.95) - 1] * 1000
+    print(f"{label:<28}{p50:>10.2f}{p95:>10.2f}")
+
+
+def concurrency_check(path, threads, sales_per_thread):
+    """عدة خيوط تبيع نفس الدواء بمخزون محدود: يجب ألا تصبح أي تشغيلة سالبة"""
+    conn = sqlite3.connect(path)
+    conn.execute("UPDATE batches SET quantity = 10 WHERE medicine_id = 1")
+    conn.execute("UPDATE medicines SET quantity = (SELECT SUM(quantity) FROM batches WHERE medicine_id = 1) WHERE id = 1")
+    conn.commit()
+    stock = conn.execute("SELECT SUM(quantity) FROM batches WHERE medicine_id = 1").fetchone()[0]
+
+    sold = []
+
+    def worker():
+        dao = SalesDAO()
+        for _ in range(sales_per_thread):
+            ok, _ = dao.process_sale(1, [{'id': 1, 'qty': 3, 'price': 2.0}], 6.0)
+            if ok:
+                sold.append(3)
+
+    pool = [threading.Thread(target=worker) for _ in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+
+    left = conn.execute("SELECT SUM(quantity), MIN(quantity) FROM batches WHERE medicine_id = 1").fetchone()
+    conn.close()
+    ok = left[1] >= 0 and stock - sum(sold) == left[0]
+    print(f"\nConcurrency: {threads} threads, stock {stock}, sold {sum(sold)}, left {left[0]}, "
+          f"min batch {left[1]} -> {'OK' if ok else 'OVERSOLD'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="قياس زمن process_sale لفواتير كبيرة")
+    parser.add_argument("--medicines", type=int, default=5000)
+    parser.add_argument("--batches", type=int, default=6)
+    parser.add_argument("--lines", type=int, default=50)
+    parser.add_argument("--invoices", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=11)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    base = os.path.join(workdir, "base.db")
+    build_stock(base, args.medicines, args.batches)
+    carts = make_carts(args.invoices, args.lines, args.medicines, args.batches, args.seed)
+
+    # القديم: على نسخة مستقلة بنفس ملف تعريف الأداء
+    legacy_path = os.path.join(workdir, "legacy.db")
+    current_path = os.path.join(workdir, "current.db")
+    shutil.copy(base, legacy_path)
+    shutil.copy(base, current_path)
+    db = DatabaseManager(current_path)
+    legacy_conn = sqlite3.connect(legacy_path)
+    db_profiles.apply_profile(legacy_conn, db.profile)
+
+    legacy = []
+    for cart in carts:
+        start = time.perf_counter()
+        legacy_process_sale(legacy_conn, 1, cart, 0.0)
+        legacy.append(time.perf_counter() - start)
+
+    dao = SalesDAO()
+    current = []
+    for cart in carts:
+        start = time.perf_counter()
+        ok, result = dao.process_sale(1, cart, 0.0)
+        current.append(time.perf_counter() - start)
+        assert ok, result
+
+    print(f"{args.lines}-line invoices x {args.invoices}")
+    print(f"{'process_sale':<28}{'p50 ms':>10}{'p95 ms':>10}")
+    summarize("legacy per-row (3N+1)", legacy)
+    summarize("set-based + executemany", current)
+
+    concurrency_check(db.db_name, threads=8, sales_per_thread=10)
+    legacy_conn.close()
+    db.close()
+    shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+    main()
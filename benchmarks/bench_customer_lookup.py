@@ -0,0 +1,125 @@
+"""
+قياس اختيار العميل في نقطة البيع:
+- المسار القديم: تحميل كل العملاء في QComboBox (الزمن والذاكرة عند فتح الصفحة).
+- الجديد: بناء فهرس البادئات في الذاكرة (models/customer_index.py) وزمن lookup لكل ضغطة،
+  مقارنةً بالاستعلام بفهارس SQLite بنفس المطابقة (CustomersDAO.lookup_customers) وبـ LIKE '%...%' القديم.
+
+التشغيل من جذر المشروع:
+    python -m benchmarks.bench_customer_lookup --customers 50000
+"""
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+from database import migrations
+from database.db_manager import DatabaseManager
+from models.customer_index import customer_index
+from models.customers_dao import CustomersDAO
+from models.text_match import normalize_name
+
+FIRST_NAMES = ["محمد", "أحمد", "علي", "عمر", "خالد", "فاطمة", "آمنة", "زينب", "مريم", "يوسف",
+               "إبراهيم", "حسن", "سارة", "هدى", "عثمان", "مصطفى", "نور", "ليلى", "سلمى", "طارق"]
+LAST_NAMES = ["الصديق", "إدريس", "بابكر", "صالح", "عثمان", "الطيب", "النور", "حامد", "الأمين", "موسى"]
+
+OLD_SQL = "SELECT id, name, phone FROM customers WHERE name LIKE ? OR phone LIKE ? ORDER BY id DESC"
+
+
+def build_customers(path, count, rnd):
+    conn = sqlite3.connect(path)
+    migrations.migrate(conn)
+    conn.execute("BEGIN")
+    names = [f"{rnd.choice(FIRST_NAMES)} {rnd.choice(FIRST_NAMES)} {rnd.choice(LAST_NAMES)}" for _ in range(count)]
+    phones = [f"09{rnd.randrange(10 ** 8):08d}" for _ in names]
+    conn.executemany("INSERT INTO customers (name, phone, name_norm, phone_norm) VALUES (?, ?, ?, ?)",
+                     ((name, phone, normalize_name(name), phone) for name, phone in zip(names, phones)))
+    conn.commit()
+    return conn
+
+
+def typed_prefixes(rows, count, rnd):
+    """بادئات كما يكتبها الكاشير: جزء من كلمة في الاسم أو أول أرقام الهاتف"""
+    prefixes = []
+    for _ in range(count):
+        _, name, phone = rnd.choice(rows)
+        word = rnd.choice(name.split())
+        prefixes.append(word[:rnd.randint(1, len(word))] if rnd.random() < 0.7 else phone[:rnd.randint(3, 10)])
+    return prefixes
+
+
+def report(label, timings):
+    timings = sorted(timings)
+    p50 = statistics.median(timings)
+    p99 = timings[int(len(timings) * 0.99) - 1]
+    print(f"{label:<34}{p50 * 1e3:>10.3f}{p99 * 1e3:>10.3f}")
+
+
+def timed(fn, prefixes):
+    timings = []
+    for text in prefixes:
+        start = time.perf_counter()
+        fn(text)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="قياس اختيار العميل في نقطة البيع")
+    parser.add_argument("--customers", type=int, default=50000)
+    parser.add_argument("--lookups", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=5)
+    args = parser.parse_args()
+
+    rnd = random.Random(args.seed)
+    path = os.path.join(tempfile.mkdtemp(), "bench_customers.db")
+    conn = build_customers(path, args.customers, rnd)
+    DatabaseManager(path)
+    dao = CustomersDAO()
+    rows = conn.execute("SELECT id, name, phone FROM customers").fetchall()
+    prefixes = typed_prefixes(rows, args.lookups, rnd)
+
+    start = time.perf_counter()
+    customer_index.load()
+    load_ms = (time.perf_counter() - start) * 1000
+    # الذاكرة ببناء ثانٍ تحت tracemalloc (يبطئ البناء فلا يُقاس الزمن معه)
+    customer_index.__init__()
+    tracemalloc.start()
+    customer_index.load()
+    index_kb = tracemalloc.get_traced_memory()[0] / 1024
+    tracemalloc.stop()
+    print(f"index build: {load_ms:.0f} ms, {index_kb:,.0f} KB for {len(rows):,} customers")
+
+    print(f"{'lookup (top 20)':<34}{'p50 ms':>10}{'p99 ms':>10}")
+    report("old LIKE '%text%' (all rows)", timed(lambda text: conn.execute(OLD_SQL, (f"%{text}%",) * 2).fetchall(),
+                                                  prefixes[:200]))
+    report("SQLite prefix indexes", timed(dao.lookup_customers, prefixes))
+    report("in-memory prefix index", timed(customer_index.lookup, prefixes))
+
+    try:
+        from PyQt5.QtWidgets import QApplication, QComboBox
+    except ImportError:
+        print("PyQt5 غير مثبت: تم تخطي قياس القائمة المنسدلة")
+        return
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    app = QApplication([])
+    tracemalloc.start()
+    start = time.perf_counter()
+    combo = QComboBox()
+    combo.addItem("عميل نقدي (Walk-in)", None)
+    for customer in dao.get_all_customers():
+        combo.addItem(f"{customer[1]} - {customer[2]}", customer[0])
+    combo_ms = (time.perf_counter() - start) * 1000
+    combo_kb = tracemalloc.get_traced_memory()[0] / 1024
+    tracemalloc.stop()
+    print(f"old QComboBox fill: {combo_ms:.0f} ms, {combo_kb:,.0f} KB Python heap (plus Qt items)")
+    app.quit()
+    conn.close()
+    os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,316 @@
+"""
+مجموعة قياس أداء طبقة الـ DAO على بيانات اصطناعية بعدة أحجام، مع خط أساس (Baseline) محفوظ.
+
+- تقيس كل الدوال العامة في models/ (قراءة وكتابة) وتعرض p50/p95/p99 والصفوف/ثانية وأقصى ذاكرة (RSS).
+- كل حجم بيانات يعمل في عملية مستقلة (DatabaseManager نمط Singleton، والذاكرة تقاس لكل حجم على حدة).
+- لا تستورد PyQt: تعمل على أي جهاز لينكس بدون واجهة رسومية.
+
+التشغيل من جذر المشروع:
+    python -m benchmarks.bench_dao --presets small,medium --save benchmarks/baseline.json
+    python -m benchmarks.bench_dao --presets small,medium --compare benchmarks/baseline.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from benchmarks.generate_dataset import PRESETS, generate
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# الدوال التي تعيد الجداول كاملة أبطأ بكثير: تكرارات أقل
+HEAVY_REPEAT = 5
+
+# فرق أقل من هذا يعتبر ضجيجاً وليس تراجعاً (لكل مقياس)
+NOISE_FLOOR = {"p50_ms": 0.05, "p95_ms": 0.2, "p99_ms": 0.5, "peak_rss_mb": 5}
+
+
+def percentile(sorted_values, pct):
+    """نسبة مئوية بطريقة الرتبة الأقرب (تعمل حتى مع عينة صغيرة)"""
+    index = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+
+def peak_rss_mb():
+    # ru_maxrss بالكيلوبايت على لينكس
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def row_count(result):
+    if isinstance(result, (list, tuple)) and result and isinstance(result[0], (list, tuple)):
+        return len(result)
+    if isinstance(result, list):
+        return len(result)
+    return 1
+
+
+class DAOCases:
+    """
+    حالات القياس: لكل دالة عامة (اسم، تجهيز غير مقاس، استدعاء مقاس، ثقيلة؟).
+    التجهيز يعيد معاملات الاستدعاء، فيقاس زمن الدالة نفسها فقط.
+    """
+
+    def __init__(self, counts, seed):
+        from database.db_manager import DatabaseManager
+        from models.customers_dao import CustomersDAO
+        from models.dashboard_dao import DashboardDAO
+        from models.medicine_dao import MedicineDAO
+        from models.profit_engine import ProfitEngine
+        from models.purchases_dao import PurchasesDAO
+        from models.reports_dao import ReportsDAO
+        from models.sales_dao import SalesDAO
+        from models.suppliers_dao import SuppliersDAO
+        from models.users_dao import UsersDAO
+
+        self.db = DatabaseManager()
+        self.counts = counts
+        self.rnd = random.Random(seed)
+        self.serial = 0
+        self.medicines = MedicineDAO()
+        self.sales = SalesDAO()
+        self.purchases = PurchasesDAO()
+        self.reports = ReportsDAO()
+        self.dashboard = DashboardDAO()
+        self.customers = CustomersDAO()
+        self.suppliers = SuppliersDAO()
+        self.users = UsersDAO()
+        self.profit = ProfitEngine()
+        with self.db.connection() as conn:
+            self.names = [row[0] for row in conn.execute("SELECT name FROM medicines ORDER BY random() LIMIT 200")]
+            self.stocked = [row[0] for row in conn.execute("SELECT id FROM medicines WHERE quantity > 50")]
+
+    def _next(self):
+        self.serial += 1
+        return self.serial
+
+    def _last_id(self, table):
+        with self.db.connection() as conn:
+            return conn.execute(f"SELECT MAX(id) FROM {table}").fetchone()[0]
+
+    def _random_id(self, key):
+        return self.rnd.randint(1, self.counts[key])
+
+    def _random_stamp(self):
+        """مفتاح keyset في منتصف التاريخ تقريباً (صفحة عميقة)"""
+        return f"{self.rnd.randint(2023, 2025)}-{self.rnd.randint(1, 12):02d}-15 12:00:00"
+
+    def _prefix(self):
+        return self.rnd.choice(self.names)[:4]
+
+    def _cart(self, lines=3):
+        return [{'id': m, 'qty': 1, 'price': 10.0} for m in self.rnd.sample(self.stocked, lines)]
+
+    def _add_then(self, add, table):
+        add()
+        return (self._last_id(table),)
+
+    def cases(self):
+        n = self._next
+        return [
+            # --- قراءة ---
+            ("medicines.get_all_medicines", None, self.medicines.get_all_medicines, True),
+            ("medicines.search_medicine", lambda: (self._prefix(),), self.medicines.search_medicine, False),
+            ("sales.get_medicine_by_barcode", lambda: (f"62{self._random_id('medicines') - 1:011d}",),
+             self.sales.get_medicine_by_barcode, False),
+            ("sales.search_medicine_by_name", lambda: (self._prefix(),), self.sales.search_medicine_by_name, False),
+            ("reports.get_all_sales", None, self.reports.get_all_sales, True),
+            ("reports.get_sales_page", lambda: (None,), self.reports.get_sales_page, False),
+            ("reports.get_sales_page[deep]", lambda: ((self._random_stamp(), 0),), self.reports.get_sales_page, False),
+            ("reports.get_purchases_page", lambda: (None,), self.reports.get_purchases_page, False),
+            ("reports.get_sale_details", lambda: (self._random_id("sales"),), self.reports.get_sale_details, False),
+            ("reports.get_all_purchases", None, self.reports.get_all_purchases, True),
+            ("reports.get_purchase_details", lambda: (self._random_id("purchases"),),
+             self.reports.get_purchase_details, False),
+            ("reports.get_low_stock_items", None, self.reports.get_low_stock_items, True),
+            ("reports.get_financial_summary", None, self.reports.get_financial_summary, True),
+            ("dashboard.get_statistics", None, self.dashboard.get_statistics, True),
+            ("profit_engine.compute", None, lambda: self.profit.compute()["by_medicine"], True),
+            ("customers.get_all_customers", None, self.customers.get_all_customers, True),
+            ("customers.search_customer", lambda: (self.rnd.choice(["محمد", "09", "سارة"]),),
+             self.customers.search_customer, False),
+            ("suppliers.get_all_suppliers", None, self.suppliers.get_all_suppliers, False),
+            ("suppliers.search_supplier", lambda: (self.rnd.choice(["Pharma", "09", "علي"]),),
+             self.suppliers.search_supplier, False),
+            ("users.get_all_users", None, self.users.get_all_users, False),
+            # --- كتابة ---
+            ("sales.process_sale", lambda: (1, self._cart(), 30.0), self.sales.process_sale, False),
+            ("purchases.add_purchase_invoice",
+             lambda: (1, f"BENCH-{n()}", "2026-01-01", 500.0,
+                      [{'id': m, 'qty': 10, 'cost': 5.0} for m in self.rnd.sample(self.stocked, 5)]),
+             self.purchases.add_purchase_invoice, False),
+            ("medicines.add_medicine",
+             lambda: (f"BENCH{n():08d}", f"Bench Medicine {self.serial}", "bench", 5.0, 7.5, 100, "2028-01-01"),
+             self.medicines.add_medicine, False),
+            ("medicines.clear_medicine_stock", lambda: (self._random_id("medicines"),),
+             self.medicines.clear_medicine_stock, False),
+            ("medicines.delete_medicine",
+             lambda: self._add_then(lambda: self.medicines.add_medicine(f"BENCHDEL{n():08d}", "Bench", "", 1, 2, 0,
+                                                                        "2028-01-01"), "medicines"),
+             self.medicines.delete_medicine, False),
+            ("customers.add_customer", lambda: (f"Bench Customer {n()}", "0900000000", "", ""),
+             self.customers.add_customer, False),
+            ("customers.delete_customer",
+             lambda: self._add_then(lambda: self.customers.add_customer("Bench", "", "", ""), "customers"),
+             self.customers.delete_customer, False),
+            ("suppliers.add_supplier", lambda: (f"Bench Supplier {n()}", "0900000000", "Bench Co"),
+             self.suppliers.add_supplier, False),
+            ("suppliers.delete_supplier",
+             lambda: self._add_then(lambda: self.suppliers.add_supplier("Bench", "", ""), "suppliers"),
+             self.suppliers.delete_supplier, False),
+            ("users.add_user", lambda: (f"bench{n()}", "secret", "pharmacist"), self.users.add_user, False),
+            ("users.delete_user",
+             lambda: self._add_then(lambda: self.users.add_user(f"benchdel{n()}", "x", "pharmacist"), "users"),
+             self.users.delete_user, False),
+        ]
+
+
+def run_worker(db_path, counts, repeat, seed):
+    """تنفيذ كل الحالات على قاعدة واحدة (داخل العملية الفرعية)"""
+    from database.db_manager import DatabaseManager
+    DatabaseManager(db_path)
+
+    results = {}
+    suite = DAOCases(counts, seed)
+    for name, setup, call, heavy in suite.cases():
+        timings, rows, failures = [], 0, 0
+        for _ in range(HEAVY_REPEAT if heavy else repeat):
+            args = setup() if setup else ()
+            start = time.perf_counter()
+            result = call(*args)
+            timings.append(time.perf_counter() - start)
+            rows += row_count(result)
+            # دوال الكتابة تعيد (False, رسالة) عند الفشل: قياس عملية فاشلة مضلل
+            if isinstance(result, tuple) and len(result) == 2 and result[0] is False:
+                failures += 1
+        timings.sort()
+        results[name] = {
+            "calls": len(timings),
+            "failures": failures,
+            "p50_ms": percentile(timings, 50) * 1000,
+            "p95_ms": percentile(timings, 95) * 1000,
+            "p99_ms": percentile(timings, 99) * 1000,
+            "rows_per_sec": rows / sum(timings) if sum(timings) else 0.0,
+            "peak_rss_mb": peak_rss_mb(),   # أعلى قيمة حتى نهاية هذه الحالة
+        }
+    return results
+
+
+def dataset_path(data_dir, preset, seed):
+    """القواعد المولدة تُحفظ وتُعاد استخدامها بين التشغيلات (التوليد أبطأ من القياس)"""
+    path = os.path.join(data_dir, f"{preset}-seed{seed}.db")
+    counts_path = path + ".json"
+    if not os.path.exists(counts_path):
+        print(f"Generating {preset} dataset -> {path}")
+        if os.path.exists(path):
+            os.remove(path)
+        counts = generate(path, PRESETS[preset], seed=seed, log=lambda _: None)
+        with open(counts_path, "w") as f:
+            json.dump({k: v for k, v in counts.items() if isinstance(v, int)}, f)
+    with open(counts_path) as f:
+        return path, json.load(f)
+
+
+def run_preset(preset, args):
+    source, counts = dataset_path(args.data_dir, preset, args.seed)
+    # عمليات الكتابة تعدل القاعدة: نعمل على نسخة حتى تبقى النتائج قابلة للمقارنة
+    work_dir = tempfile.mkdtemp()
+    work = os.path.join(work_dir, "bench_dao.db")
+    shutil.copyfile(source, work)
+    try:
+        out = subprocess.run([sys.executable, "-m", "benchmarks.bench_dao", "--worker", work,
+                              "--counts", json.dumps(counts), "--repeat", str(args.repeat), "--seed", str(args.seed)],
+                             cwd=ROOT, capture_output=True, text=True, check=True)
+    except subprocess.CalledProcessError as e:
+        print(e.stderr, file=sys.stderr)
+        raise
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def print_results(preset, results):
+    print(f"\n[{preset}]")
+    print(f"{'method':<34}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'rows/s':>12}{'RSS MB':>9}")
+    for name, r in results.items():
+        print(f"{name:<34}{r['p50_ms']:>10.3f}{r['p95_ms']:>10.3f}{r['p99_ms']:>10.3f}"
+              f"{r['rows_per_sec']:>12.0f}{r['peak_rss_mb']:>9.0f}"
+              + (f"  ⚠️ {r['failures']} failed" if r.get("failures") else ""))
+
+
+def compare(report, baseline, threshold, metrics):
+    """مقارنة المقاييس المختارة مع خط الأساس؛ يعيد قائمة التراجعات"""
+    regressions = []
+    for preset, results in report["results"].items():
+        for name, r in results.items():
+            base = baseline.get("results", {}).get(preset, {}).get(name)
+            if not base:
+                continue
+            for metric in metrics:
+                old, new = base[metric], r[metric]
+                if new > old * (1 + threshold) and new - old > NOISE_FLOOR[metric]:
+                    regressions.append((preset, name, metric, old, new))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="قياس أداء دوال الـ DAO مع خط أساس محفوظ")
+    parser.add_argument("--presets", default="small,medium", help="أحجام البيانات مفصولة بفاصلة")
+    parser.add_argument("--repeat", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "pharma_bench"))
+    parser.add_argument("--save", help="حفظ النتائج كخط أساس JSON")
+    parser.add_argument("--compare", help="مقارنة مع خط أساس JSON سابق")
+    parser.add_argument("--threshold", type=float, default=0.25, help="نسبة التباطؤ المعتبرة تراجعاً")
+    parser.add_argument("--metrics", default="p50_ms,peak_rss_mb",
+                        help="المقاييس المقارنة (p95/p99 تحتاج تكرارات أكثر لتكون مستقرة)")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--counts", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(args.worker, json.loads(args.counts), args.repeat, args.seed)))
+        return
+
+    os.makedirs(args.data_dir, exist_ok=True)
+    report = {
+        "meta": {
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "machine": platform.platform(),
+            "seed": args.seed,
+            "repeat": args.repeat,
+        },
+        "results": {},
+    }
+    for preset in args.presets.split(","):
+        report["results"][preset] = run_preset(preset, args)
+        print_results(preset, report["results"][preset])
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"\nBaseline saved to {args.save}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(report, json.load(f), args.threshold, args.metrics.split(","))
+        if regressions:
+            print(f"\n❌ {len(regressions)} regression(s) (> {args.threshold:.0%} slower than baseline):")
+            for preset, name, metric, old, new in regressions:
+                print(f"  [{preset}] {name} {metric}: {old:.3f} -> {new:.3f}")
+            sys.exit(1)
+        print("\n✅ No regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+قياس أثر فهارس المسارات الساخنة (الترحيل 2) على بيانات اصطناعية كبيرة.
+
+التشغيل من جذر المشروع:
+    python -m benchmarks.bench_indexes --preset medium
+"""
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+from datetime import timedelta
+
+from benchmarks.generate_dataset import PRESETS, generate
+from database import migrations
+
+# الاستعلامات الساخنة كما تنفذها طبقة الـ DAO
+HOT_QUERIES = {
+    "sale_details": ("""SELECT m.name, si.quantity, si.price_at_sale, si.total_item_price
+                        FROM sale_items si JOIN medicines m ON si.medicine_id = m.id
+                        WHERE si.sale_id = ?""", "sale_id"),
+    "purchase_details": ("""SELECT m.name, pi.quantity, pi.unit_cost, pi.total_cost
+                            FROM purchase_items pi JOIN medicines m ON pi.medicine_id = m.id
+                            WHERE pi.purchase_id = ?""", "purchase_id"),
+    "fifo_batches": ("""SELECT id, quantity FROM batches
+                        WHERE medicine_id = ? AND quantity > 0 ORDER BY expiry_date ASC""", "medicine_id"),
+    "today_sales": ("SELECT SUM(total_amount) FROM sales WHERE sale_date >= ? AND sale_date < ?", "day"),
+    "customer_sales": ("SELECT COUNT(*), SUM(total_amount) FROM sales WHERE customer_id = ?", "customer_id"),
+    "supplier_medicines": ("SELECT COUNT(*) FROM medicines WHERE supplier_id = ?", "supplier_id"),
+}
+
+
+def sample_params(name, sizes, rnd):
+    kind = HOT_QUERIES[name][1]
+    if kind == "day":
+        day = sizes["start"] + timedelta(days=rnd.randrange(sizes["days"]))
+        return (day.strftime("%Y-%m-%d"), (day + timedelta(days=1)).strftime("%Y-%m-%d"))
+    return (rnd.randrange(1, sizes[kind] + 1),)
+
+
+def time_queries(conn, sizes, repeat, seed):
+    """زمن كل استعلام (الوسيط بالميلي ثانية) مع خطة التنفيذ"""
+    results = {}
+    for name, (sql, _) in HOT_QUERIES.items():
+        rnd = random.Random(seed)
+        timings = []
+        for _ in range(repeat):
+            params = sample_params(name, sizes, rnd)
+            start = time.perf_counter()
+            conn.execute(sql, params).fetchall()
+            timings.append((time.perf_counter() - start) * 1000)
+        plan = " | ".join(row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, sample_params(name, sizes, rnd)))
+        results[name] = (statistics.median(timings), plan)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="قياس زمن الاستعلامات الساخنة قبل/بعد فهارس الترحيل 2")
+    parser.add_argument("--preset", choices=PRESETS, default="medium")
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "bench_indexes.db")
+    start = time.perf_counter()
+    # القاعدة تبقى على إصدار الهيكلية 1 (بدون فهارس) لقياس "قبل"
+    counts = generate(path, PRESETS[args.preset], seed=args.seed, finalize=False, log=lambda _: None)
+    sizes = {"sale_id": counts["sales"], "purchase_id": counts["purchases"], "medicine_id": counts["medicines"],
+             "customer_id": counts["customers"], "supplier_id": counts["suppliers"],
+             "days": counts["days"], "start": counts["start"]}
+    print(f"Dataset ({args.preset}): {counts['medicines']} medicines, {counts['sales']} sales "
+          f"({os.path.getsize(path) / 1e6:.1f} MB) built in {time.perf_counter() - start:.1f}s")
+    conn = sqlite3.connect(path)
+
+    before = time_queries(conn, sizes, args.repeat, args.seed)
+    applied = migrations.migrate(conn)
+    for version, description, duration_ms in applied:
+        print(f"Migration {version} applied in {duration_ms:.0f} ms")
+    after = time_queries(conn, sizes, args.repeat, args.seed)
+
+    print(f"\n{'query':<20}{'before ms':>12}{'after ms':>12}{'speedup':>10}")
+    for name in HOT_QUERIES:
+        b, a = before[name][0], after[name][0]
+        print(f"{name:<20}{b:>12.3f}{a:>12.3f}{(b / a if a else float('inf')):>9.1f}x")
+    print("\nPlans after migration:")
+    for name in HOT_QUERIES:
+        print(f"  {name}: {after[name][1]}")
+
+    conn.close()
+    os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+قياس توليد فاتورة PDF واحدة: المسار القديم (مستند FPDF يُبنى بـ cell لكل خلية) مقابل InvoiceTemplate.
+
+لكل طريقة: زمن الفاتورة (p50/p95) إلى ملف وإلى الذاكرة، وذروة الذاكرة المخصصة (tracemalloc)
+لرسم الصفحة وحده وللفاتورة كاملة (output يضيف حالة ضغط zlib ثابتة تقارب 256 KB لكل مستند).
+لا يحتاج قاعدة بيانات ولا PyQt؛ الملفات تُكتب في مجلد مؤقت.
+
+التشغيل من جذر المشروع:
+    python -m benchmarks.bench_invoice_pdf --invoices 500 --lines 8
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fpdf import FPDF  # noqa: E402
+
+from utils.pdf_generator import InvoiceTemplate  # noqa: E402
+
+
+def make_items(count):
+    return [(f"Medicine {i} {'x' * (i * 7 % 25)}", i % 4 + 1, 3.5 + i, (i % 4 + 1) * (3.5 + i)) for i in range(count)]
+
+
+def legacy_document(items, total_amount, invoice_id, cashier_name, date):
+    """المسار القديم كما كان في create_invoice_pdf (بدون فحص المجلد والحفظ)"""
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.set_font("helvetica", "B", 20)
+    pdf.cell(0, 15, "PHARMACY INVOICE", align="C", new_x="LMARGIN", new_y="NEXT")
+    pdf.set_font("helvetica", "", 12)
+    pdf.cell(0, 8, f"Invoice #: {invoice_id}", new_x="LMARGIN", new_y="NEXT")
+    pdf.cell(0, 8, f"Date: {date}", new_x="LMARGIN", new_y="NEXT")
+    pdf.cell(0, 8, f"Cashier: {cashier_name}", new_x="LMARGIN", new_y="NEXT")
+    pdf.ln(10)
+    col_widths = [80, 30, 40, 40]
+    pdf.set_font("helvetica", "B", 12)
+    pdf.set_fill_color(220, 220, 220)
+    for i, header in enumerate(["Item Name", "Qty", "Price", "Total"]):
+        pdf.cell(col_widths[i], 10, header, border=1, align="C", fill=True)
+    pdf.ln()
+    pdf.set_font("helvetica", "", 11)
+    for item in items:
+        data = [str(item[0]), str(item[1]), f"{item[2]:.2f}", f"{item[3]:.2f}"]
+        for i, datum in enumerate(data):
+            cell_text = datum if len(datum) <= 30 else datum[:27] + "..."
+            pdf.cell(col_widths[i], 10, cell_text, border=1, align="C")
+        pdf.ln()
+    pdf.ln(5)
+    pdf.set_font("helvetica", "B", 14)
+    pdf.cell(150, 10, "GRAND TOTAL:", align="R")
+    pdf.cell(40, 10, f"{total_amount:.2f}", border=1, align="C")
+    pdf.set_y(-30)
+    pdf.set_font("helvetica", "I", 10)
+    pdf.cell(0, 10, "Thank you for dealing with Pharma Pro System.", align="C")
+    return pdf
+
+
+def template_document(template, items, total_amount, invoice_id, cashier_name, date):
+    pdf = template.new_document()
+    template.draw(pdf, items, f"{total_amount:.2f}", invoice_id, cashier_name, date)
+    return pdf
+
+
+def peak_kb(fn, count):
+    """متوسط ذروة الذاكرة المخصصة أثناء fn(i) بالكيلوبايت"""
+    peaks = []
+    tracemalloc.start()
+    for i in range(count):
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        fn(i)
+        peaks.append((tracemalloc.get_traced_memory()[1] - before) / 1024)
+    tracemalloc.stop()
+    return statistics.mean(peaks)
+
+
+def measure(render, draw, count):
+    """(أزمنة الفواتير بالميلي ثانية، ذروة ذاكرة الرسم KB، ذروة الفاتورة كاملة KB)"""
+    render(0)  # تسخين
+    times = []
+    for i in range(count):
+        start = time.perf_counter()
+        render(i)
+        times.append((time.perf_counter() - start) * 1000)
+    samples = min(count, 50)
+    return times, peak_kb(draw, samples), peak_kb(render, samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="قياس توليد فاتورة PDF: المسار القديم مقابل القالب")
+    parser.add_argument("--invoices", type=int, default=500)
+    parser.add_argument("--lines", type=int, default=8, help="عدد الأصناف في الفاتورة")
+    args = parser.parse_args()
+
+    items = make_items(args.lines)
+    total = sum(item[3] for item in items)
+    date = "2025-01-01 12:00:00"
+    out_dir = tempfile.mkdtemp(prefix="bench_invoice_")
+    template = InvoiceTemplate(out_dir)
+
+    def legacy(i):
+        return legacy_document(items, total, i, "Admin", date)
+
+    def stamped(i):
+        return template_document(template, items, total, i, "Admin", date)
+
+    variants = [
+        ("legacy -> file", lambda i: legacy(i).output(os.path.join(out_dir, f"legacy_{i}.pdf")), legacy),
+        ("legacy -> bytes", lambda i: legacy(i).output(), legacy),
+        ("template -> file", lambda i: template.save(items, total, i, "Admin", date), stamped),
+        ("template -> bytes", lambda i: template.to_bytes(items, total, i, "Admin", date), stamped),
+    ]
+
+    print(f"{args.invoices:,} invoices x {args.lines} lines")
+    print(f"{'variant':<20}{'p50 ms':>9}{'p95 ms':>9}{'invoices/s':>12}{'draw KB':>10}{'peak KB':>10}")
+    for label, render, draw in variants:
+        times, draw_kb, peak = measure(render, draw, args.invoices)
+        times.sort()
+        p95 = times[int(len(times) * 0.95) - 1]
+        print(f"{label:<20}{statistics.median(times):>9.2f}{p95:>9.2f}{1000 / statistics.mean(times):>12,.0f}"
+              f"{draw_kb:>10.1f}{peak:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+قياس زمن مسح الباركود حتى سطر السلة في نقطة البيع.
+يقارن الاستعلام القديم (barcode = ? OR name LIKE ?) بالمسار الجديد (فهرس فريد + ذاكرة مؤقتة)،
+ثم يقيس POSPage.add_to_cart كاملة إذا كانت PyQt5 مثبتة (بدون شاشة عبر offscreen).
+
+التشغيل من جذر المشروع:
+    python -m benchmarks.bench_pos_scan --medicines 100000
+"""
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+
+from database import migrations
+from database.db_manager import DatabaseManager
+from models.barcode_cache import barcode_cache
+from models.sales_dao import SalesDAO
+
+OLD_SQL = """SELECT id, name, sell_price, quantity, barcode 
+             FROM medicines 
+             WHERE (barcode = ? OR name LIKE ?) AND quantity > 0 LIMIT 1"""
+
+
+def build_catalog(path, count):
+    conn = sqlite3.connect(path)
+    migrations.migrate(conn)
+    conn.execute("BEGIN")
+    conn.executemany("""INSERT INTO medicines (barcode, name, active_ingredient, buy_price, sell_price, quantity)
+                        VALUES (?, ?, ?, 1, 2, 1000000)""",
+                     ((f"62{i:011d}", f"Medicine {i}", "X") for i in range(count)))
+    conn.commit()
+    return conn
+
+
+def percentiles(timings):
+    timings = sorted(timings)
+    return statistics.median(timings), timings[int(len(timings) * 0.95) - 1]
+
+
+def report(label, timings):
+    p50, p95 = percentiles(timings)
+    print(f"{label:<34}{p50 * 1e6:>10.1f}{p95 * 1e6:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="قياس زمن المسح حتى سطر السلة")
+    parser.add_argument("--medicines", type=int, default=100000)
+    parser.add_argument("--scans", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=3)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "bench_pos.db")
+    conn = build_catalog(path, args.medicines)
+    DatabaseManager(path)
+    dao = SalesDAO()
+
+    rnd = random.Random(args.seed)
+    # توزيع واقعي: نسبة صغيرة من الأصناف تتكرر كثيراً على الكاشير
+    popular = [f"62{rnd.randrange(args.medicines):011d}" for _ in range(200)]
+    scans = [rnd.choice(popular) for _ in range(args.scans)]
+
+    def timed(fn):
+        timings = []
+        for code in scans:
+            start = time.perf_counter()
+            fn(code)
+            timings.append(time.perf_counter() - start)
+        return timings
+
+    print(f"{'path':<34}{'p50 µs':>10}{'p95 µs':>10}")
+    report("old OR query", timed(lambda code: conn.execute(OLD_SQL, (code, f"%{code}%")).fetchone()))
+    barcode_cache.clear()
+    report("exact barcode, no cache", timed(lambda code: (barcode_cache.clear(), dao.get_medicine_by_barcode(code))))
+    barcode_cache.clear()
+    barcode_cache.hits = barcode_cache.misses = 0
+    report("exact barcode + cache", timed(dao.get_medicine_by_barcode))
+    print(f"cache hits={barcode_cache.hits} misses={barcode_cache.misses}")
+
+    try:
+        from PyQt5.QtWidgets import QApplication
+    except ImportError:
+        print("PyQt5 غير مثبت: تم تخطي قياس POSPage.add_to_cart")
+        return
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    app = QApplication([])
+    from ui.pos_page import POSPage
+    page = POSPage()
+
+    def scan(code):
+        page.search_input.setText(code)
+        page.add_to_cart()
+        if len(page.cart) > 50:
+            page.cart.clear()
+
+    report("POSPage.add_to_cart (scan->line)", timed(scan))
+    app.quit()
+    conn.close()
+    os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
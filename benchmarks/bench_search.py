@@ -0,0 +1,198 @@
+"""
+قياس زمن البحث عن الأدوية: LIKE '%x%' القديم مقابل فهرس FTS5 (الترحيل 4)،
+ثم محاكاة الكتابة في حقل بحث صفحة المخزون (إذا كانت PyQt5 مثبتة، بدون شاشة عبر offscreen):
+استعلام مع كل حرف مقابل SearchController (تأخير + إلغاء + تصفية محلية + ذاكرة).
+
+التشغيل من جذر المشروع:
+    python -m benchmarks.bench_search --medicines 100000
+"""
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+
+from database import migrations
+from database.db_manager import DatabaseManager
+from models.medicine_dao import MedicineDAO
+
+SYLLABLES = ["pa", "ra", "ce", "ta", "mol", "ibu", "pro", "fen", "amo", "xi", "cil", "lin", "met", "for",
+             "min", "az", "ith", "ro", "my", "cin", "dol", "zol", "pan", "tra", "ma", "dex", "ola"]
+FORMS = ["Tablets", "Syrup", "Capsules", "Cream", "Drops", "Injection", "Extra", "Forte", "Plus"]
+
+# نصوص بحث نموذجية (بادئة قصيرة، كلمة كاملة، كلمتان، باركود)
+QUERIES = ["pa", "para", "amoxi", "ibupro fen", "cin tab", "dol extra", "620000001234", "zzz"]
+
+LIKE_SQL = """SELECT id, barcode, name, active_ingredient, buy_price, sell_price, quantity, expiry_date
+              FROM medicines WHERE name LIKE ? OR barcode LIKE ? OR active_ingredient LIKE ?"""
+
+
+def word(rnd):
+    return "".join(rnd.choice(SYLLABLES) for _ in range(rnd.randint(2, 4)))
+
+
+def build_catalog(path, count, seed):
+    rnd = random.Random(seed)
+    conn = sqlite3.connect(path)
+    migrations.migrate(conn)
+    conn.execute("BEGIN")
+    conn.executemany("""INSERT INTO medicines (barcode, name, active_ingredient, description, buy_price, sell_price, quantity)
+                        VALUES (?, ?, ?, ?, 1, 2, 10)""",
+                     ((f"62{i:011d}", f"{word(rnd).title()} {rnd.choice(FORMS)} {rnd.choice([100, 250, 500])}mg",
+                       word(rnd), f"{word(rnd)} {word(rnd)}") for i in range(count)))
+    conn.commit()
+    return conn
+
+
+# نصوص تُكتب حرفاً حرفاً، ثم توقف، حذف 3 أحرف، توقف، وإعادة كتابتها (كما يصحح المستخدم كتابته)
+TYPED = ["paracetamol tab", "amoxi", "ibupro fen 500"]
+KEYSTROKE_MS = 80
+PAUSE_MS = 500
+
+
+def typing_script(phrases):
+    """[(ms من البداية، النص)] وأزمنة نهاية كل توقف (لقياس زمن ظهور النتيجة بعد آخر حرف)"""
+    events, checkpoints, at = [], [], 0
+    for phrase in phrases:
+        bursts = [[phrase[:i] for i in range(1, len(phrase) + 1)],
+                  [phrase[:i] for i in range(len(phrase) - 1, len(phrase) - 4, -1)],
+                  [phrase[:i] for i in range(len(phrase) - 2, len(phrase) + 1)]]
+        for burst in bursts:
+            for text in burst:
+                events.append((at, text))
+                at += KEYSTROKE_MS
+            at += PAUSE_MS
+            checkpoints.append(at - 1)
+    return events, checkpoints
+
+
+def typing_session(page, phrases):
+    """
+    تنفيذ typing_script على حقل البحث مع نبض كل 5ms لقياس أطول توقف لحلقة الأحداث.
+    يعيد (أطول توقف ms، متوسط الزمن من آخر حرف حتى ظهور النتيجة ms، عدد الأحرف)
+    """
+    from PyQt5.QtCore import QElapsedTimer, QEventLoop, QTimer
+
+    events, checkpoints = typing_script(phrases)
+    clock = QElapsedTimer()
+    clock.start()
+    state = {"last": 0, "max_gap": 0, "typed_at": 0, "shown_at": 0, "settle": []}
+
+    def beat():
+        now = clock.elapsed()
+        state["max_gap"] = max(state["max_gap"], now - state["last"])
+        state["last"] = now
+
+    def type_text(text):
+        page.search_input.setText(text)
+        state["typed_at"] = clock.elapsed()
+
+    def checkpoint():
+        # نتيجة لم تظهر قبل نهاية التوقف تُحسب بطول التوقف كاملاً
+        shown = state["shown_at"] if state["shown_at"] >= state["typed_at"] else clock.elapsed()
+        state["settle"].append(shown - state["typed_at"])
+
+    heartbeat = QTimer()
+    heartbeat.timeout.connect(beat)
+    heartbeat.start(5)
+    fill = page.fill_table
+
+    def filled(rows):
+        fill(rows)
+        state["shown_at"] = clock.elapsed()
+
+    page.search._on_result = filled
+    loop = QEventLoop()
+    for at, text in events:
+        QTimer.singleShot(at, lambda text=text: type_text(text))
+    for at in checkpoints:
+        QTimer.singleShot(at, checkpoint)
+    QTimer.singleShot(checkpoints[-1] + 50, loop.quit)
+    state["last"] = clock.elapsed()
+    loop.exec_()
+    heartbeat.stop()
+    page.search._on_result = fill
+    return state["max_gap"], statistics.mean(state["settle"]), len(events)
+
+
+def bench_typing():
+    try:
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+        from PyQt5.QtWidgets import QApplication
+    except ImportError:
+        print("\nPyQt5 غير مثبتة: تم تخطي محاكاة الكتابة")
+        return
+    from ui.inventory_page import InventoryPage
+    from ui.search_controller import SearchController
+
+    app = QApplication.instance() or QApplication([])
+    page = InventoryPage()
+    page.runner.wait()
+    controller = page.search
+
+    # السلوك القديم: استعلام فوري مع كل حرف، بدون تصفية محلية أو ذاكرة
+    page.search_input.textChanged.disconnect()
+    page.search = SearchController(page.search_input, page.runner, page.dao.search_medicine,
+                                   page.dao.get_all_medicines, page.fill_table,
+                                   limit=MedicineDAO.SEARCH_LIMIT, debounce_ms=0, cache_size=0)
+    per_key = typing_session(page, TYPED) + (page.search.stats,)
+
+    page.search_input.textChanged.disconnect()
+    page.search_input.clear()
+    page.search = controller
+    page.search_input.textChanged.connect(controller._on_text_changed)
+    controller.refresh()
+    page.runner.wait()
+    controller.stats.update(queries=0, cache_hits=0, refined=0)
+    debounced = typing_session(page, TYPED) + (controller.stats,)
+
+    print(f"\nTyping {per_key[2]} keystrokes into InventoryPage search ({KEYSTROKE_MS} ms apart, {PAUSE_MS} ms pauses)")
+    print(f"{'variant':<22}{'SQL':>6}{'local':>7}{'cached':>8}{'max stall ms':>14}{'settle ms':>11}")
+    for label, (gap, settle, _, stats) in (("query per keystroke", per_key), ("SearchController", debounced)):
+        print(f"{label:<22}{stats['queries']:>6}{stats['refined']:>7}{stats['cache_hits']:>8}{gap:>14}{settle:>11.0f}")
+    app.processEvents()
+
+
+def median_ms(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rows = fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), len(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="قياس البحث عن الأدوية: LIKE مقابل FTS5")
+    parser.add_argument("--medicines", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "bench_search.db")
+    start = time.perf_counter()
+    conn = build_catalog(path, args.medicines, args.seed)
+    print(f"Catalog: {args.medicines} SKUs built in {time.perf_counter() - start:.1f}s")
+
+    DatabaseManager(path)
+    dao = MedicineDAO()
+
+    print(f"\n{'query':<14}{'LIKE ms':>10}{'rows':>8}{'FTS5 ms':>10}{'rows':>8}{'speedup':>10}")
+    for text in QUERIES:
+        term = f"%{text}%"
+        like_ms, like_rows = median_ms(lambda: conn.execute(LIKE_SQL, (term, term, term)).fetchall(), args.repeat)
+        fts_ms, fts_rows = median_ms(lambda: dao.search_medicine(text), args.repeat)
+        print(f"{text:<14}{like_ms:>10.2f}{like_rows:>8}{fts_ms:>10.2f}{fts_rows:>8}{like_ms / fts_ms:>9.1f}x")
+    print("\nNote: LIKE matches substrings anywhere; FTS5 matches word prefixes (ranked, capped at 500 rows).")
+
+    bench_typing()
+
+    conn.close()
+    DatabaseManager().close()
+    os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+قياس زمن البدء البارد (Cold Start) حتى ظهور نافذة تسجيل الدخول، ثم من تسجيل الدخول حتى ظهور
+النافذة الرئيسية (الصفحات تُبنى عند أول فتح) مع زمن فتح نقطة البيع وزمن بناء كل الصفحات
+(ما كان يُدفع عند الدخول حين كانت كل الصفحات تُبنى مقدماً).
+كل قياس يعمل في عملية Python جديدة حتى لا تؤثر ذاكرة الاستيراد المؤقتة على النتيجة.
+
+في النهاية يُفحص الوسيط مقابل ميزانية البدء البارد (BUDGET_MS)، ويُتأكد أن الوحدات الثقيلة
+(fpdf، numpy...) لم تُستورد قبل ظهور النافذة الرئيسية؛ أي مخالفة تنهي السكربت برمز خروج 1.
+
+التشغيل من جذر المشروع:
+    python -m benchmarks.bench_startup --runs 5
+    python -m benchmarks.bench_startup --seed-db big.db --login-budget-ms 800
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# تهيئة قاعدة البيانات فقط (بدون واجهة)
+DB_ONLY = """
+import json, time
+t0 = time.perf_counter()
+from database.db_manager import DatabaseManager
+db = DatabaseManager()
+print(json.dumps({"db_init_ms": (time.perf_counter() - t0) * 1000, "migrations": len(db.schema_upgraded)}))
+"""
+
+# من بداية main.py حتى رسم نافذة تسجيل الدخول (يتطلب PyQt5؛ يعمل بدون شاشة عبر offscreen)
+LOGIN = """
+import json, sys, time
+t0 = time.perf_counter()
+import main
+import_ms = (time.perf_counter() - t0) * 1000
+app = main.QApplication(sys.argv)
+from database.db_manager import DatabaseManager
+t_db = time.perf_counter()
+db = DatabaseManager()
+db_ms = (time.perf_counter() - t_db) * 1000
+controller = main.AppController()
+controller.show_login()
+app.processEvents()
+from utils.startup_profile import HEAVY_MODULES
+print(json.dumps({"login_window_ms": (time.perf_counter() - t0) * 1000, "import_main_ms": import_ms,
+                  "db_init_ms": db_ms, "migrations": len(db.schema_upgraded),
+                  "heavy_modules": [m for m in HEAVY_MODULES if m in sys.modules]}))
+"""
+
+# من تسجيل الدخول حتى ظهور النافذة الرئيسية (بدون تحميء الخلفية)، ثم فتح نقطة البيع، ثم بقية الصفحات
+MAIN = """
+import json, os, sys, time
+os.environ["PHARMA_PAGE_WARMUP_MS"] = "-1"
+from PyQt5.QtWidgets import QApplication
+app = QApplication(sys.argv)
+from database.db_manager import DatabaseManager
+db = DatabaseManager()
+from main import MainWindow
+t0 = time.perf_counter()
+window = MainWindow("admin")
+window.show()
+app.processEvents()
+main_ms = (time.perf_counter() - t0) * 1000
+from utils.startup_profile import HEAVY_MODULES
+heavy = [m for m in HEAVY_MODULES if m in sys.modules]
+t0 = time.perf_counter()
+window.btn_pos.click()
+app.processEvents()
+pos_ms = (time.perf_counter() - t0) * 1000
+for index in range(len(window.page_factories)):
+    window.page(index)
+app.processEvents()
+print(json.dumps({"main_window_ms": main_ms, "open_pos_ms": pos_ms,
+                  "all_pages_ms": sum(window.page_build_ms.values()),
+                  "migrations": len(db.schema_upgraded), "heavy_modules": heavy}), flush=True)
+from utils.invoice_queue import render_queue
+render_queue.shutdown()  # عمليات توليد الفواتير التي شغلتها نقطة البيع ترث مخرجات العملية
+"""
+
+# ميزانية البدء البارد (وسيط التشغيلات على قاعدة محدثة): تجاوزها يعني تراجعاً في زمن الإقلاع.
+# استيراد fpdf عند بدء التطبيق وحده كان يضيف ~450ms
+BUDGET_MS = {"login_window_ms": 600, "main_window_ms": 250}
+
+
+def run_child(code, workdir):
+    env = dict(os.environ, PYTHONPATH=ROOT, QT_QPA_PLATFORM=os.environ.get("QT_QPA_PLATFORM", "offscreen"))
+    start = time.perf_counter()
+    out = subprocess.run([sys.executable, "-c", code], cwd=workdir, env=env,
+                         capture_output=True, text=True, check=True).stdout
+    wall_ms = (time.perf_counter() - start) * 1000
+    result = json.loads(out.strip().splitlines()[-1])
+    result["process_wall_ms"] = wall_ms
+    return result
+
+
+def measure(code, runs, seed_db):
+    """
+    أول تشغيل على قاعدة جديدة (يطبق الترحيلات) ثم تشغيلات متكررة على قاعدة محدثة (المسار السريع).
+    seed_db: نسخة من قاعدة موجودة للبدء منها بدلاً من قاعدة فارغة.
+    """
+    workdir = tempfile.mkdtemp()
+    if seed_db:
+        shutil.copy(seed_db, os.path.join(workdir, "pharma_system.db"))
+    first = run_child(code, workdir)
+    warm = [run_child(code, workdir) for _ in range(runs)]
+    shutil.rmtree(workdir)
+    return first, warm
+
+
+def summarize(label, first, warm):
+    print(f"\n{label}")
+    keys = [k for k in first if k.endswith("_ms")]
+    print(f"  {'metric':<20}{'first launch':>14}{'median (current schema)':>26}")
+    for key in keys:
+        print(f"  {key:<20}{first[key]:>14.1f}{statistics.median(r[key] for r in warm):>26.1f}")
+    print(f"  migrations applied: first={first['migrations']}, later={warm[0]['migrations'] if warm else '-'}")
+
+
+def check_budget(results, budget):
+    """results: {اسم القياس: (first, warm)} ← قائمة المخالفات (زمن فوق الميزانية أو وحدة ثقيلة مستوردة مبكراً)"""
+    failures = []
+    for label, (first, warm) in results.items():
+        for key, limit in budget.items():
+            if key in first:
+                median = statistics.median(r[key] for r in warm or [first])
+                if median > limit:
+                    failures.append(f"{label}: {key} = {median:.0f} ms > {limit} ms")
+        heavy = sorted({m for r in [first, *warm] for m in r.get("heavy_modules", [])})
+        if heavy:
+            failures.append(f"{label}: heavy modules imported before first use: {', '.join(heavy)}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="قياس زمن البدء البارد حتى نافذة تسجيل الدخول والنافذة الرئيسية")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--seed-db", help="قاعدة بيانات موجودة لنسخها قبل القياس (افتراضياً قاعدة جديدة)")
+    parser.add_argument("--login-budget-ms", type=float, default=BUDGET_MS["login_window_ms"])
+    parser.add_argument("--main-budget-ms", type=float, default=BUDGET_MS["main_window_ms"])
+    parser.add_argument("--no-budget", action="store_true", help="القياس فقط بدون فحص الميزانية")
+    args = parser.parse_args()
+
+    summarize("DatabaseManager()", *measure(DB_ONLY, args.runs, args.seed_db))
+    try:
+        import PyQt5  # noqa: F401
+    except ImportError:
+        print("\nPyQt5 غير مثبت: تم تخطي قياس نافذة تسجيل الدخول")
+        return
+    results = {"LoginWindow shown": measure(LOGIN, args.runs, args.seed_db),
+               "MainWindow shown (pages built on first open)": measure(MAIN, args.runs, args.seed_db)}
+    for label, (first, warm) in results.items():
+        summarize(label, first, warm)
+    if args.no_budget:
+        return
+
+    failures = check_budget(results, {"login_window_ms": args.login_budget_ms,
+                                      "main_window_ms": args.main_budget_ms})
+    if failures:
+        print("\n❌ تجاوز ميزانية البدء البارد:")
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
+    print(f"\n✅ ضمن ميزانية البدء البارد (login {args.login_budget_ms:.0f} ms، main {args.main_budget_ms:.0f} ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+قياس تعبئة جداول القوائم: QTableWidget (عنصر لكل خلية + strptime لكل صف) مقابل ColumnarTableModel.
+
+لكل طريقة: زمن التعبئة، زمن أول رسم للصفوف الظاهرة، وزيادة الذاكرة (RSS) بعد التعبئة.
+كل طريقة تعمل في عملية مستقلة حتى لا تختلط الذاكرة، وبدون شاشة (offscreen).
+
+التشغيل من جذر المشروع:
+    python -m benchmarks.bench_tables --rows 100000
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEADERS = ["ID", "الباركود", "اسم الدواء", "المادة الفعالة", "شراء", "بيع", "الكمية", "انتهاء الصلاحية"]
+
+
+def make_rows(count, seed=1):
+    """صفوف بنفس شكل MedicineDAO.get_all_medicines (ربعها تقريباً منتهٍ أو وشيك الانتهاء)"""
+    rnd = random.Random(seed)
+    today = date.today()
+    rows = []
+    for i in range(count):
+        buy = round(rnd.uniform(1, 200), 2)
+        expiry = (today + timedelta(days=rnd.randint(-120, 900))).isoformat()
+        rows.append((i + 1, f"62{i:011d}", f"Medicine {i}", f"Ingredient {i % 3000}", buy, round(buy * 1.25, 2),
+                     rnd.randint(0, 500), expiry))
+    return rows
+
+
+def current_rss_mb():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+
+
+def fill_widget(table, rows):
+    """المسار القديم كما كان في InventoryPage.fill_table"""
+    from PyQt5.QtCore import Qt
+    from PyQt5.QtGui import QColor
+    from PyQt5.QtWidgets import QTableWidgetItem
+
+    table.setRowCount(0)
+    today = datetime.now().date()
+    warning_date = today + timedelta(days=90)
+    for row_idx, row_data in enumerate(rows):
+        table.insertRow(row_idx)
+        bg_color = None
+        expiry_date = datetime.strptime(row_data[7], "%Y-%m-%d").date()
+        if expiry_date < today:
+            bg_color = QColor("#FFCDD2")
+        elif expiry_date <= warning_date:
+            bg_color = QColor("#FFE0B2")
+        for col_idx, col_data in enumerate(row_data):
+            item = QTableWidgetItem(str(col_data))
+            item.setTextAlignment(Qt.AlignCenter)
+            if bg_color:
+                item.setBackground(bg_color)
+            table.setItem(row_idx, col_idx, item)
+
+
+def worker(variant, count):
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    sys.path.insert(0, ROOT)
+    from PyQt5.QtWidgets import QApplication, QTableView, QTableWidget
+    from ui.table_models import ColumnarTableModel, expiry_background
+
+    app = QApplication([])
+    if variant == "widget":
+        view = QTableWidget()
+        view.setColumnCount(len(HEADERS))
+        view.setHorizontalHeaderLabels(HEADERS)
+    else:
+        model = ColumnarTableModel(HEADERS)
+        view = QTableView()
+        view.setModel(model)
+    view.resize(1200, 800)
+    view.show()
+    app.processEvents()
+
+    rows = make_rows(count)
+    base_rss = current_rss_mb()
+    start = time.perf_counter()
+    if variant == "widget":
+        fill_widget(view, rows)
+    else:
+        model.set_rows(rows, background=expiry_background(7))
+    fill = time.perf_counter() - start
+    del rows
+
+    start = time.perf_counter()
+    view.viewport().grab()  # رسم فعلي للصفوف الظاهرة
+    paint = time.perf_counter() - start
+
+    # التمرير لنهاية الجدول: تكلفة رسم صفحة جديدة
+    start = time.perf_counter()
+    view.scrollToBottom()
+    view.viewport().grab()
+    scroll = time.perf_counter() - start
+
+    print(json.dumps({"fill_s": fill, "paint_ms": paint * 1000, "scroll_ms": scroll * 1000,
+                      "rss_mb": current_rss_mb() - base_rss}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="قياس تعبئة الجداول: QTableWidget مقابل النموذج العمودي")
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--worker", choices=["widget", "model"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(args.worker, args.rows)
+        return
+
+    print(f"{args.rows:,} rows x {len(HEADERS)} columns")
+    print(f"{'variant':<22}{'fill s':>9}{'paint ms':>10}{'scroll ms':>11}{'+RSS MB':>9}")
+    for variant, label in (("widget", "QTableWidget"), ("model", "ColumnarTableModel")):
+        out = subprocess.run([sys.executable, "-m", "benchmarks.bench_tables", "--worker", variant,
+                              "--rows", str(args.rows)], cwd=ROOT, capture_output=True, text=True, check=True)
+        result = json.loads(out.stdout.strip().splitlines()[-1])
+        print(f"{label:<22}{result['fill_s']:>9.3f}{result['paint_ms']:>10.1f}{result['scroll_ms']:>11.1f}"
+              f"{result['rss_mb']:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+"""
+مولد بيانات اصطناعية لصيدلية كبيرة (لاختبار الأداء على حجم الإنتاج).
+
+- حتمي: نفس البذرة (seed) تعطي نفس قاعدة البيانات.
+- توزيعات واقعية: شعبية الأصناف حسب Zipf، موسمية المبيعات (ذروة شتوية + نهاية الأسبوع)،
+  تواريخ انتهاء موزعة بين 6 أشهر و3 سنوات من الاستلام (وبعضها منتهٍ).
+- سريع: إدخال مجمّع (executemany) في معاملة واحدة بدون سجل تراجع، والفهارس تُبنى بعد التحميل.
+
+التشغيل من جذر المشروع:
+    python -m benchmarks.generate_dataset --out big.db --preset large
+    python -m benchmarks.generate_dataset --out my.db --medicines 5000 --sale-items 200000
+"""
+import argparse
+import bisect
+import hashlib
+import itertools
+import math
+import os
+import random
+import sqlite3
+import time
+from datetime import datetime, timedelta
+
+from database import migrations
+
+PRESETS = {
+    "small": {"medicines": 1000, "batches": 5000, "sale_items": 50000, "suppliers": 50,
+              "customers": 500, "users": 5, "years": 1},
+    "medium": {"medicines": 20000, "batches": 100000, "sale_items": 1000000, "suppliers": 500,
+               "customers": 10000, "users": 10, "years": 3},
+    "large": {"medicines": 100000, "batches": 500000, "sale_items": 5000000, "suppliers": 2000,
+              "customers": 50000, "users": 20, "years": 5},
+}
+
+CHUNK = 50000
+
+SYLLABLES = ["pa", "ra", "ce", "ta", "mol", "ibu", "pro", "fen", "amo", "xi", "cil", "lin", "met", "for",
+             "min", "az", "ith", "ro", "my", "cin", "dol", "zol", "pan", "tra", "ma", "dex", "ola", "vit"]
+FORMS = ["Tablets", "Syrup", "Capsules", "Cream", "Drops", "Injection", "Suspension", "Gel", "Spray"]
+FIRST_NAMES = ["محمد", "أحمد", "علي", "عمر", "خالد", "فاطمة", "مريم", "سارة", "هدى", "يوسف", "آمنة", "إبراهيم"]
+LAST_NAMES = ["الحسن", "عثمان", "إدريس", "الطيب", "عبدالله", "النور", "الصديق", "بابكر", "الأمين", "صالح"]
+
+
+class Sampler:
+    """سحب عشوائي سريع حسب أوزان ثابتة (جدول تراكمي + بحث ثنائي)"""
+
+    def __init__(self, weights, rnd):
+        self._cum = list(itertools.accumulate(weights))
+        self._total = self._cum[-1]
+        self._rnd = rnd
+
+    def __call__(self):
+        return bisect.bisect_left(self._cum, self._rnd.random() * self._total)
+
+
+def zipf_weights(n, s=1.07):
+    """شعبية الأصناف: قلة من الأدوية تمثل أغلب المبيعات"""
+    return [1.0 / (rank ** s) for rank in range(1, n + 1)]
+
+
+def seasonal_weights(start, days):
+    """وزن كل يوم: ذروة في الشتاء (نزلات البرد) وزيادة في نهاية الأسبوع"""
+    weights = []
+    for d in range(days):
+        day = start + timedelta(days=d)
+        season = 1.0 + 0.35 * math.cos(2 * math.pi * (day.timetuple().tm_yday - 15) / 365.25)
+        weekday = 1.25 if day.weekday() in (3, 4) else 1.0  # الخميس والجمعة
+        growth = 1.0 + 0.3 * d / days                        # نمو تدريجي للنشاط
+        weights.append(season * weekday * growth)
+    return weights
+
+
+def word(rnd):
+    return "".join(rnd.choice(SYLLABLES) for _ in range(rnd.randint(2, 4)))
+
+
+def generate(path, sizes, seed=1, finalize=True, today=None, log=print):
+    """
+    إنشاء قاعدة بيانات جديدة في path وتعبئتها.
+    finalize=False يترك القاعدة على إصدار الهيكلية 1 (بدون فهارس) لقياسات "قبل/بعد".
+    يعيد قاموس الأعداد الفعلية ونطاق التواريخ.
+    """
+    if os.path.exists(path):
+        raise FileExistsError(path)
+    try:
+        return _generate(path, sizes, seed, finalize, today, log)
+    except BaseException:
+        # ملف نصف مكتمل بدون سجل تراجع لا فائدة منه
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+
+
+def _generate(path, sizes, seed, finalize, today, log):
+    rnd = random.Random(seed)
+    today = today or datetime(2026, 1, 1)
+    days = 365 * sizes["years"]
+    start = today - timedelta(days=days)
+    day_str = [(start + timedelta(days=d)).strftime("%Y-%m-%d") for d in range(days + 1)]
+
+    conn = sqlite3.connect(path, isolation_level=None)
+    # التحميل الأولي فقط: لا حاجة لسجل تراجع أو مزامنة (الملف يُحذف إذا فشل التوليد)
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.execute("PRAGMA cache_size = -200000")
+    migrations.migrate(conn, target=1)
+    conn.execute("BEGIN")
+    t0 = time.perf_counter()
+
+    # --- المستخدمون والموردون والعملاء ---
+    password = hashlib.sha256("123".encode()).hexdigest()
+    conn.executemany("INSERT INTO users (username, password, role, created_at) VALUES (?, ?, ?, ?)",
+                     [("admin", password, "admin", day_str[0])] +
+                     [(f"pharmacist{i}", password, "pharmacist", day_str[0]) for i in range(1, sizes["users"])])
+    conn.executemany("INSERT INTO suppliers (name, phone, company_name, balance) VALUES (?, ?, ?, ?)",
+                     ((f"{rnd.choice(FIRST_NAMES)} {rnd.choice(LAST_NAMES)}", f"09{rnd.randrange(10 ** 8):08d}",
+                       f"{word(rnd).title()} Pharma", round(rnd.uniform(0, 50000), 2))
+                      for _ in range(sizes["suppliers"])))
+    conn.executemany("INSERT INTO customers (name, phone, email, notes, created_at) VALUES (?, ?, ?, ?, ?)",
+                     ((f"{rnd.choice(FIRST_NAMES)} {rnd.choice(FIRST_NAMES)} {rnd.choice(LAST_NAMES)}",
+                       f"09{rnd.randrange(10 ** 8):08d}", "", "", day_str[rnd.randrange(days)])
+                      for _ in range(sizes["customers"])))
+
+    # --- الأدوية (الترتيب = ترتيب الشعبية بعد الخلط) ---
+    medicines = sizes["medicines"]
+    sell_prices = []
+    med_rows = []
+    for i in range(medicines):
+        buy = round(math.exp(rnd.gauss(2.3, 0.9)), 2)          # توزيع لوغاريتمي للأسعار
+        sell = round(buy * rnd.uniform(1.15, 1.45), 2)
+        sell_prices.append(sell)
+        med_rows.append((f"62{i:011d}", f"{word(rnd).title()} {rnd.choice(FORMS)} {rnd.choice([5, 10, 100, 250, 500])}mg",
+                         word(rnd), f"{word(rnd)} {word(rnd)}", buy, sell, rnd.choice([5, 10, 20, 50]),
+                         rnd.randrange(1, sizes["suppliers"] + 1)))
+    conn.executemany("""INSERT INTO medicines (barcode, name, active_ingredient, description, buy_price, sell_price,
+                                               min_stock_alert, supplier_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                     med_rows)
+    buy_prices = [row[4] for row in med_rows]
+    del med_rows
+    popularity = list(range(1, medicines + 1))
+    rnd.shuffle(popularity)                                   # الأكثر مبيعاً ليس بالضرورة أول المعرفات
+    pick_medicine = Sampler(zipf_weights(medicines), rnd)
+
+    # --- التشغيلات: الأصناف الأكثر شعبية تحصل على تشغيلات أكثر ---
+    batch_owner = [popularity[pick_medicine()] for _ in range(sizes["batches"] - medicines)]
+    batch_owner.extend(range(1, medicines + 1))              # تشغيلة واحدة على الأقل لكل دواء
+    batch_owner.sort()
+    batches_of = {}
+    stock = [0] * (medicines + 1)
+    first_expiry = [None] * (medicines + 1)
+    batch_rows = []
+    for batch_id, med_id in enumerate(batch_owner, start=1):
+        batches_of.setdefault(med_id, []).append(batch_id)
+        received = rnd.randrange(days)
+        expiry = received + rnd.randint(180, 1080)
+        # التشغيلات القديمة غالباً نفدت؛ الحديثة لديها رصيد
+        qty = 0 if received < days - 365 and rnd.random() < 0.8 else rnd.randint(0, 200)
+        stock[med_id] += qty
+        expiry_date = (start + timedelta(days=expiry)).strftime("%Y-%m-%d")
+        if first_expiry[med_id] is None or expiry_date < first_expiry[med_id]:
+            first_expiry[med_id] = expiry_date
+        batch_rows.append((med_id, f"LOT-{batch_id:07d}", expiry_date, buy_prices[med_id - 1],
+                           sell_prices[med_id - 1], qty, day_str[received]))
+        if len(batch_rows) >= CHUNK:
+            conn.executemany("""INSERT INTO batches (medicine_id, batch_number, expiry_date, buy_price, sell_price,
+                                                     quantity, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)""", batch_rows)
+            batch_rows = []
+    conn.executemany("""INSERT INTO batches (medicine_id, batch_number, expiry_date, buy_price, sell_price,
+                                             quantity, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)""", batch_rows)
+    conn.executemany("UPDATE medicines SET quantity = ?, expiry_date = ? WHERE id = ?",
+                     ((stock[m], first_expiry[m], m) for m in range(1, medicines + 1)))
+    log(f"  catalog: {medicines} medicines, {len(batch_owner)} batches ({time.perf_counter() - t0:.1f}s)")
+
+    # --- المبيعات: الأيام حسب الموسمية، الأصناف حسب Zipf، 1-6 أصناف لكل فاتورة ---
+    pick_day = Sampler(seasonal_weights(start, days), rnd)
+    sale_id = 0
+    items_total = 0
+    pending_sales, pending_items = [], []
+    while items_total < sizes["sale_items"]:
+        sale_id += 1
+        day = pick_day()
+        # ساعات العمل 8 صباحاً - 11 مساءً
+        stamp = f"{day_str[day]} {rnd.randint(8, 22):02d}:{rnd.randrange(60):02d}:{rnd.randrange(60):02d}"
+        lines = min(1 + int(rnd.expovariate(0.7)), 6, sizes["sale_items"] - items_total)
+        total = 0.0
+        for _ in range(lines):
+            med_id = popularity[pick_medicine()]
+            qty = 1 if rnd.random() < 0.7 else rnd.randint(2, 5)
+            price = sell_prices[med_id - 1]
+            total += qty * price
+            pending_items.append((sale_id, med_id, rnd.choice(batches_of[med_id]), qty, price, round(qty * price, 2)))
+        items_total += lines
+        customer = rnd.randrange(1, sizes["customers"] + 1) if rnd.random() < 0.35 else None
+        doctor = f"د. {rnd.choice(FIRST_NAMES)}" if rnd.random() < 0.2 else ""
+        pending_sales.append((rnd.randrange(1, sizes["users"] + 1), customer, doctor, round(total, 2), stamp))
+        if len(pending_items) >= CHUNK:
+            _flush_sales(conn, pending_sales, pending_items)
+            pending_sales, pending_items = [], []
+    _flush_sales(conn, pending_sales, pending_items)
+    log(f"  sales: {sale_id} invoices, {items_total} lines ({time.perf_counter() - t0:.1f}s)")
+
+    # --- فواتير الشراء: كل مورد يورد بانتظام طوال الفترة ---
+    invoices = max(sizes["suppliers"] * sizes["years"] * 12, 1)
+    purchase_id = 0
+    pending_invoices, pending_items = [], []
+    for _ in range(invoices):
+        purchase_id += 1
+        day = rnd.randrange(days)
+        total = 0.0
+        for _ in range(rnd.randint(5, 30)):
+            med_id = popularity[pick_medicine()]
+            qty = rnd.choice([10, 20, 50, 100])
+            cost = buy_prices[med_id - 1]
+            total += qty * cost
+            pending_items.append((purchase_id, med_id, qty, cost, round(qty * cost, 2)))
+        pending_invoices.append((rnd.randrange(1, sizes["suppliers"] + 1), f"PINV-{purchase_id:07d}", day_str[day],
+                                 round(total, 2), "", f"{day_str[day]} 10:00:00"))
+        if len(pending_items) >= CHUNK:
+            _flush_purchases(conn, pending_invoices, pending_items)
+            pending_invoices, pending_items = [], []
+    _flush_purchases(conn, pending_invoices, pending_items)
+    conn.execute("COMMIT")
+    log(f"  purchases: {purchase_id} invoices ({time.perf_counter() - t0:.1f}s)")
+
+    if finalize:
+        # الفهارس والجداول المشتقة تُبنى مرة واحدة بعد التحميل (أسرع من تحديثها مع كل صف)
+        for version, description, duration_ms in migrations.migrate(conn):
+            log(f"  migration {version}: {description} ({duration_ms / 1000:.1f}s)")
+        conn.execute("PRAGMA journal_mode = WAL")
+    conn.close()
+
+    return {"medicines": medicines, "batches": len(batch_owner), "sales": sale_id, "sale_items": items_total,
+            "purchases": purchase_id, "suppliers": sizes["suppliers"], "customers": sizes["customers"],
+            "users": sizes["users"], "start": start, "days": days}
+
+
+def _flush_sales(conn, sales, items):
+    conn.executemany("INSERT INTO sales (user_id, customer_id, doctor_name, total_amount, sale_date) "
+                     "VALUES (?, ?, ?, ?, ?)", sales)
+    conn.executemany("INSERT INTO sale_items (sale_id, medicine_id, batch_id, quantity, price_at_sale, "
+                     "total_item_price) VALUES (?, ?, ?, ?, ?, ?)", items)
+
+
+def _flush_purchases(conn, invoices, items):
+    conn.executemany("INSERT INTO purchase_invoices (supplier_id, invoice_number, invoice_date, total_amount, notes, "
+                     "created_at) VALUES (?, ?, ?, ?, ?, ?)", invoices)
+    conn.executemany("INSERT INTO purchase_items (purchase_id, medicine_id, quantity, unit_cost, total_cost) "
+                     "VALUES (?, ?, ?, ?, ?)", items)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="توليد قاعدة بيانات صيدلية اصطناعية كبيرة")
+    parser.add_argument("--out", required=True, help="مسار ملف قاعدة البيانات الجديد")
+    parser.add_argument("--preset", choices=PRESETS, default="medium")
+    parser.add_argument("--seed", type=int, default=1)
+    for key in PRESETS["small"]:
+        parser.add_argument(f"--{key.replace('_', '-')}", type=int, help="تجاوز قيمة الإعداد المسبق")
+    args = parser.parse_args()
+
+    sizes = dict(PRESETS[args.preset])
+    for key in sizes:
+        if getattr(args, key) is not None:
+            sizes[key] = getattr(args, key)
+
+    start = time.perf_counter()
+    print(f"Generating {args.out} ({sizes})")
+    counts = generate(args.out, sizes, seed=args.seed)
+    print(f"Done in {time.perf_counter() - start:.1f}s: {os.path.getsize(args.out) / 1e6:.0f} MB, "
+          f"{counts['sales']} sales / {counts['sale_items']} sale_items")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+import os
+
+# --- إعدادات التطبيق العامة ---
+# يمكن تجاوز أي إعداد بمتغير بيئة بنفس الاسم مسبوقاً بـ PHARMA_ (مثال: PHARMA_DB_PROFILE=safe)
+
+# ملف قاعدة البيانات
+DB_NAME = os.environ.get("PHARMA_DB_NAME", "pharma_system.db")
+
+# ملف تعريف أداء SQLite المطبق عند كل اتصال (راجع database/db_profiles.py)
+DB_PROFILE = os.environ.get("PHARMA_DB_PROFILE", "performance")
+
+# قياس جمل SQL (الزمن، مكان الاستدعاء، السجل البطيء) - راجع database/sql_trace.py
+SQL_TRACE = os.environ.get("PHARMA_SQL_TRACE", "1") == "1"
+
+# الجمل الأبطأ من هذا الحد (ميلي ثانية) تُكتب في سجل الاستعلامات البطيئة مع خطة التنفيذ
+SLOW_QUERY_MS = float(os.environ.get("PHARMA_SLOW_QUERY_MS", "50"))
+
+# مجلد السجلات وملف إحصائيات SQL المحفوظ عند الخروج
+LOG_DIR = os.environ.get("PHARMA_LOG_DIR", "logs")
+SQL_STATS_FILE = os.path.join(LOG_DIR, "sql_stats.json")
+
+# عدد عمليات توليد فواتير PDF في الخلفية (راجع utils/invoice_queue.py)
+RENDER_WORKERS = int(os.environ.get("PHARMA_RENDER_WORKERS", "2"))
+
+# ما يحدث للفاتورة بعد توليدها في نقطة البيع: open (فتح)، print (طباعة مباشرة)، none (حفظ فقط)
+INVOICE_ACTION = os.environ.get("PHARMA_INVOICE_ACTION", "open")
+
+# بناء صفحات النافذة الرئيسية غير المفتوحة في الخلفية بعد هذه المهلة (ms) من ظهورها؛ قيمة سالبة = عند أول فتح فقط
+PAGE_WARMUP_MS = int(os.environ.get("PHARMA_PAGE_WARMUP_MS", "1500"))
+
+# وضع قياس الإقلاع: أزمنة الاستيراد وأول رسم لنافذتي الدخول والرئيسية في logs/startup_profile.json
+STARTUP_PROFILE = os.environ.get("PHARMA_STARTUP_PROFILE", "0") == "1"
+
+# استطلاع PRAGMA data_version لكشف كتابات الأجهزة/السكربتات الأخرى (ms)؛ 0 أو أقل = بدون مراقبة
+DB_WATCH_MS = int(os.environ.get("PHARMA_DB_WATCH_MS", "1000"))
@@ -0,0 +1,229 @@
+"""
+كشف التغييرات الخارجية (جهاز آخر أو سكربت يكتب في نفس ملف قاعدة البيانات):
+- change_log: عداد لكل جدول متابَع تزيده Triggers مع كل إدخال/تعديل/حذف (ترحيل 9).
+- ChangeWatcher: خيط خلفي باتصال دائم خاص به يقرأ PRAGMA data_version كل DB_WATCH_MS؛
+  الرقم يتغير فقط عند commit من اتصال آخر، وقراءته لا تلمس الملف. عند تغيره تُقرأ العدادات
+  (صفوف قليلة) وتُنشر أسماء الجداول التي تغيرت كحدث TablesChanged في utils/change_bus.py.
+
+اتصالات المجمّع اتصالات أخرى بالنسبة للمراقب، فتُستبعد كتابات التطبيق نفسه (التي تنشر أحداث الـ DAO):
+- local_change_log: نسخة مؤقتة (TEMP) من العدادات في كل اتصال من اتصالات المجمّع، تزيدها Triggers مؤقتة
+  بكتابات هذا الاتصال فقط (وتتراجع مع rollback).
+- DatabaseManager يسلّمها للمراقب عند إعادة الاتصال للمجمّع بعد commit (note_local)، والمراقب يطرحها من
+  زيادة change_log: الجدول يُنشر فقط إذا زاد عداده أكثر مما كتبه التطبيق نفسه.
+- المراقب يأخذ لقطة مما سُلّم قبل قراءة العدادات ويطرحها وحدها (كل ما فيها مثبت قبل القراءة).
+  إذا وُجدت بعد القراءة كتابة لم تُسلّم بعد (DatabaseManager.has_unnoted_writes) أو سُلّمت أثناءها،
+  فلا يُعرف هل تشملها القراءة: تؤجل الدورة إلى التالية بدلاً من نشرها كتغيير خارجي.
+
+عرض العدادات الحالية:
+    python -m database.change_log
+"""
+import sqlite3
+import threading
+
+from config import DB_WATCH_MS
+from utils.app_log import app_log
+from utils.change_bus import change_bus, TablesChanged
+
+# الجداول التي تهم الصفحات (أسطر الفواتير تتغير دائماً مع رأسها فلا تُتابع)
+WATCHED_TABLES = ("medicines", "batches", "sales", "purchase_invoices", "customers", "suppliers", "users")
+
+
+def _trigger(table, action):
+    return f"""CREATE TRIGGER IF NOT EXISTS {table}_change_log_{action.lower()} AFTER {action} ON {table} BEGIN
+        UPDATE change_log SET seq = seq + 1 WHERE table_name = '{table}';
+    END"""
+
+
+CHANGE_LOG_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS change_log (
+        table_name TEXT PRIMARY KEY,
+        seq INTEGER NOT NULL DEFAULT 0
+    ) WITHOUT ROWID""",
+    *(f"INSERT OR IGNORE INTO change_log (table_name) VALUES ('{table}')" for table in WATCHED_TABLES),
+    *(_trigger(table, action) for table in WATCHED_TABLES for action in ("INSERT", "UPDATE", "DELETE")),
+]
+
+
+def _local_trigger(table, action):
+    return f"""CREATE TEMP TRIGGER IF NOT EXISTS {table}_local_change_{action.lower()} AFTER {action} ON {table} BEGIN
+        UPDATE local_change_log SET seq = seq + 1 WHERE table_name = '{table}';
+    END"""
+
+
+LOCAL_COUNTER_SCHEMA = [
+    """CREATE TEMP TABLE IF NOT EXISTS local_change_log (
+        table_name TEXT PRIMARY KEY,
+        seq INTEGER NOT NULL DEFAULT 0
+    ) WITHOUT ROWID""",
+    *(f"INSERT OR IGNORE INTO temp.local_change_log (table_name) VALUES ('{table}')" for table in WATCHED_TABLES),
+    *(_local_trigger(table, action) for table in WATCHED_TABLES for action in ("INSERT", "UPDATE", "DELETE")),
+]
+
+
+def install_local_counter(conn):
+    """
+    عدادات كتابات هذا الاتصال (جدول وTriggers مؤقتة لا تُكتب في الملف).
+    يعيد False إذا لم تكن الجداول المتابَعة موجودة بعد (قاعدة جديدة قبل الترحيل).
+    """
+    try:
+        for statement in LOCAL_COUNTER_SCHEMA:
+            conn.execute(statement)
+        conn.commit()
+        return True
+    except sqlite3.OperationalError:
+        conn.rollback()
+        return False
+
+
+def take_local_counts(conn):
+    """{الجدول: عدد الصفوف} التي كتبها هذا الاتصال منذ آخر استدعاء (وتصفير العدادات)"""
+    try:
+        counts = dict(conn.execute("SELECT table_name, seq FROM temp.local_change_log WHERE seq > 0").fetchall())
+        if counts:
+            conn.execute("UPDATE temp.local_change_log SET seq = 0 WHERE seq > 0")
+            conn.commit()
+    except sqlite3.OperationalError:
+        # اتصال بلا عدادات مؤقتة: كتاباته تُعامل كتغييرات خارجية
+        return {}
+    return counts
+
+
+def create_change_log(conn):
+    """خطوة الترحيل 9: جدول العدادات + Triggers الجداول المتابَعة"""
+    for statement in CHANGE_LOG_SCHEMA:
+        conn.execute(statement)
+
+
+def read_sequences(conn):
+    """{الجدول: العداد} لكل الجداول المتابَعة"""
+    return dict(conn.execute("SELECT table_name, seq FROM change_log").fetchall())
+
+
+class ChangeWatcher:
+    """
+    مراقب واحد للتطبيق (change_watcher): start() بعد فتح النافذة الرئيسية، stop() عند الخروج.
+    interval_ms <= 0 يلغي المراقبة.
+    """
+
+    def __init__(self, interval_ms=DB_WATCH_MS):
+        self.interval_ms = interval_ms
+        self.stats = {"polls": 0, "detected": 0, "local_skipped": 0, "deferred": 0}
+        self._thread = None
+        self._stop = threading.Event()
+        # صفوف كتبها التطبيق نفسه ولم يطرحها المراقب بعد {الجدول: العدد}، وعدد مرات التسليم
+        self._local = {}
+        self._notes = 0
+        self._lock = threading.Lock()
+
+    def start(self):
+        if self.interval_ms <= 0 or (self._thread and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="change-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def note_local(self, conn):
+        """
+        تسليم كتابات اتصال من المجمّع بعد commit (يستدعيها DatabaseManager عند إعادة الاتصال).
+        تُحسب حتى قبل start() لأن start() تبدأ من الصفر.
+        """
+        counts = take_local_counts(conn)
+        if counts:
+            with self._lock:
+                for table, count in counts.items():
+                    self._local[table] = self._local.get(table, 0) + count
+                self._notes += 1
+
+    def _read_settled(self, conn, db):
+        """
+        (العدادات، لقطة كتابات التطبيق المثبتة قبل قراءتها) أو None إذا وُجدت كتابة من التطبيق
+        لا يُعرف هل تشملها القراءة (لم تُسلّم بعد، أو سُلّمت أثناء القراءة)
+        """
+        with self._lock:
+            own, notes = dict(self._local), self._notes
+        latest = read_sequences(conn)
+        if db.has_unnoted_writes() or self._notes != notes:
+            return None
+        return latest, own
+
+    def _consume(self, own):
+        """حذف ما طُرح من كتابات التطبيق (ما سُلّم بعد اللقطة يبقى للدورة التالية)"""
+        with self._lock:
+            for table, count in own.items():
+                left = self._local.get(table, 0) - count
+                if left > 0:
+                    self._local[table] = left
+                else:
+                    self._local.pop(table, None)
+
+    def _external(self, sequences, latest, own):
+        """الجداول التي زاد عدادها أكثر مما كتبه التطبيق نفسه حسب اللقطة own (وتُستهلك اللقطة)"""
+        self._consume(own)
+        return frozenset(table for table, seq in latest.items()
+                         if seq - sequences.get(table, 0) > own.get(table, 0))
+
+    def _run(self):
+        from database.db_manager import DatabaseManager
+
+        db = DatabaseManager()
+        # اتصال مستقل بدون قياس SQL_TRACE (استطلاع كل ثانية لا يُحسب مع جمل التطبيق)
+        try:
+            conn = sqlite3.connect(db.db_name, check_same_thread=False)
+        except sqlite3.Error as e:
+            app_log().warning("تعذر تشغيل مراقب التغييرات: %s", e)
+            return
+        try:
+            # نقطة البداية: ما سُلّم قبلها موجود فيها أصلاً
+            version = conn.execute("PRAGMA data_version").fetchone()[0]
+            settled = self._read_settled(conn, db)
+            while settled is None:
+                if self._stop.wait(self.interval_ms / 1000):
+                    return
+                version = conn.execute("PRAGMA data_version").fetchone()[0]
+                settled = self._read_settled(conn, db)
+            sequences, own = settled
+            self._consume(own)
+            while not self._stop.wait(self.interval_ms / 1000):
+                self.stats["polls"] += 1
+                try:
+                    current = conn.execute("PRAGMA data_version").fetchone()[0]
+                    if current == version:
+                        continue
+                    settled = self._read_settled(conn, db)
+                    if settled is None:
+                        # إعادة القراءة في الدورة التالية (version لم يُحدّث)
+                        self.stats["deferred"] += 1
+                        continue
+                    version = current
+                except sqlite3.Error as e:
+                    # قاعدة مقفلة مؤقتاً من كاتب آخر: المحاولة في الدورة التالية
+                    app_log().warning("مراقب التغييرات: %s", e)
+                    continue
+                latest, own = settled
+                changed = self._external(sequences, latest, own)
+                if not changed and latest != sequences:
+                    self.stats["local_skipped"] += 1
+                sequences = latest
+                if changed:
+                    self.stats["detected"] += 1
+                    change_bus.publish(TablesChanged(changed))
+        finally:
+            conn.close()
+
+
+change_watcher = ChangeWatcher()
+
+
+if __name__ == "__main__":
+    from database.db_manager import DatabaseManager
+
+    with DatabaseManager().connection() as conn:
+        if conn:
+            for table, seq in sorted(read_sequences(conn).items()):
+                print(f"{table:<20} {seq}")
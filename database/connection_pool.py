@@ -0,0 +1,149 @@
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+
+class ConnectionPool:
+    """
+    مجمّع اتصالات (Connection Pool) صغير لاتصالات SQLite طويلة العمر.
+    - كل خيط (Thread) يستعير اتصالاً واحداً فقط، والاستدعاءات المتداخلة في نفس الخيط تعيد نفس الاتصال.
+    - عند امتلاء المجمّع ينتظر الخيط حتى يُعاد اتصال (مع مهلة زمنية).
+    - يحتفظ بعدادات الإصابة/الإخفاق وزمن الانتظار لقياس الفائدة.
+    """
+
+    def __init__(self, factory, size=4, timeout=10.0):
+        self._factory = factory      # دالة تنشئ اتصالاً جديداً مُهيّأً (DatabaseManager._open_connection)
+        self._size = size
+        self._timeout = timeout
+        self._idle = []              # الاتصالات المتاحة حالياً
+        self._all = []               # كل الاتصالات التي أنشأها المجمّع
+        self._cond = threading.Condition()
+        self._local = threading.local()
+        self._stats = {
+            "hits": 0,               # استعارة اتصال موجود مسبقاً
+            "misses": 0,             # اضطررنا لفتح اتصال جديد
+            "reentrant": 0,          # استعارة متداخلة داخل نفس الخيط
+            "waits": 0,              # مرات الانتظار لامتلاء المجمّع
+            "wait_time": 0.0,        # مجموع زمن الانتظار (ثوانٍ)
+            "timeouts": 0,
+        }
+
+    def acquire(self):
+        """استعارة اتصال للخيط الحالي"""
+        depth = getattr(self._local, "depth", 0)
+        if depth:
+            # الخيط يملك اتصالاً بالفعل: نعيد نفس الاتصال (لا نحجز اتصالاً ثانياً)
+            self._local.depth = depth + 1
+            with self._cond:
+                self._stats["reentrant"] += 1
+            return self._local.conn
+
+        with self._cond:
+            waited = 0.0
+            while not self._idle and len(self._all) >= self._size:
+                start = time.perf_counter()
+                self._stats["waits"] += 1
+                notified = self._cond.wait(max(self._timeout - waited, 0))
+                elapsed = time.perf_counter() - start
+                waited += elapsed
+                self._stats["wait_time"] += elapsed
+                if not notified:
+                    self._stats["timeouts"] += 1
+                    raise sqlite3.OperationalError("انتهت مهلة انتظار اتصال من المجمّع")
+
+            if self._idle:
+                conn = self._idle.pop()
+                self._stats["hits"] += 1
+            else:
+                # نحجز المكان قبل فتح الاتصال حتى لا يتجاوز خيط آخر الحد الأقصى
+                self._all.append(None)
+                conn = None
+                self._stats["misses"] += 1
+
+        if conn is None:
+            try:
+                conn = self._factory()
+            except Exception:
+                with self._cond:
+                    self._all.remove(None)
+                    self._cond.notify()
+                raise
+            with self._cond:
+                self._all[self._all.index(None)] = conn
+
+        self._local.conn = conn
+        self._local.depth = 1
+        return conn
+
+    def release(self, conn):
+        """إعادة الاتصال للمجمّع"""
+        depth = getattr(self._local, "depth", 0)
+        if depth > 1:
+            self._local.depth = depth - 1
+            return
+
+        self._local.conn = None
+        self._local.depth = 0
+
+        # حماية: لا نعيد اتصالاً ما زالت فيه معاملة مفتوحة (مثلاً بعد استثناء غير معالج)
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            self._discard(conn)
+            return
+
+        with self._cond:
+            self._idle.append(conn)
+            self._cond.notify()
+
+    def _discard(self, conn):
+        """حذف اتصال تالف من المجمّع"""
+        with self._cond:
+            if conn in self._all:
+                self._all.remove(conn)
+            self._cond.notify()
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+    @contextmanager
+    def connection(self):
+        """واجهة with لاستعارة اتصال وإعادته تلقائياً"""
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def connections(self):
+        """كل الاتصالات المفتوحة حالياً (المعارة والخاملة)"""
+        with self._cond:
+            return [c for c in self._all if c is not None]
+
+    def stats(self):
+        """نسخة من العدادات مع حالة المجمّع الحالية"""
+        with self._cond:
+            data = dict(self._stats)
+            data["size"] = self._size
+            data["open"] = len([c for c in self._all if c is not None])
+            data["idle"] = len(self._idle)
+        total = data["hits"] + data["misses"]
+        data["hit_ratio"] = data["hits"] / total if total else 0.0
+        data["avg_wait_ms"] = (data["wait_time"] / data["waits"] * 1000) if data["waits"] else 0.0
+        return data
+
+    def close_all(self):
+        """إغلاق جميع الاتصالات الخاملة (عند إغلاق التطبيق)"""
+        with self._cond:
+            idle, self._idle = self._idle, []
+            for conn in idle:
+                if conn in self._all:
+                    self._all.remove(conn)
+        for conn in idle:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
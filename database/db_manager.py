@@ -1,168 +1,195 @@
 import sqlite3
-import hashlib
+from contextlib import contextmanager
+
+from config import DB_NAME, DB_PROFILE, SQL_TRACE
+from database.connection_pool import ConnectionPool
+from database import change_log
+from database import db_profiles
+from database import migrations
+from database import sql_trace
+from utils.app_log import app_log
+
+# خيوط العمل الخلفية التي قد تحجز اتصالاً في نفس اللحظة:
+# مجمّع خيوط QueryRunner المشترك، والصفحات ذات المنفذ التسلسلي الخاص (QueryRunner(serial=True): نقطة البيع)،
+# وخيط مراقب التغييرات (مشتركو TablesChanged يقرؤون في خيطه، راجع database/change_log.py)
+QUERY_WORKERS = 3
+SERIAL_RUNNERS = 1
+WATCHER_THREADS = 1
+
+# عدد الاتصالات الدائمة في المجمّع: كل الخيوط الخلفية + اتصال محجوز دائماً لخيط الواجهة
+POOL_SIZE = QUERY_WORKERS + SERIAL_RUNNERS + WATCHER_THREADS + 1
+
 
 class DatabaseManager:
     _instance = None  # نمط Singleton لمنع تكرار الاتصال والانهيار
 
-    def __new__(cls, db_name="pharma_system.db"):
+    def __new__(cls, db_name=DB_NAME):
         if cls._instance is None:
             cls._instance = super(DatabaseManager, cls).__new__(cls)
             cls._instance.db_name = db_name
             cls._instance.conn = None
+            # total_changes لكل اتصال عند آخر تسليم لكتاباته لمراقب التغييرات
+            cls._instance._noted_changes = {}
+            # التحقق من ملف تعريف الأداء المختار قبل فتح أي اتصال
+            cls._instance._load_profile(DB_PROFILE)
+            # مجمّع الاتصالات الدائمة بدلاً من فتح اتصال جديد لكل استعلام
+            cls._instance.pool = ConnectionPool(cls._instance._open_connection, size=POOL_SIZE)
+            if SQL_TRACE:
+                sql_trace.install_exit_dump()
             # الاستدعاء مرة واحدة فقط عند بداية تشغيل التطبيق
             cls._instance.create_tables()
         return cls._instance
 
+    def _open_connection(self):
+        """فتح اتصال جديد مُهيّأ (يستخدمه المجمّع ويرمي الاستثناء عند الفشل)"""
+        # check_same_thread=False: الاتصال قد يُستعار من خيوط مختلفة، والمجمّع يضمن أن خيطاً واحداً فقط يستخدمه في كل لحظة
+        # SQL_TRACE: كل جملة تمر عبر TracedCursor (الزمن، مكان الاستدعاء، السجل البطيء)
+        factory = sql_trace.TracedConnection if SQL_TRACE else sqlite3.Connection
+        conn = sqlite3.connect(self.db_name, check_same_thread=False, factory=factory)
+        # تفعيل دعم المفاتيح الأجنبية (Foreign Keys) لضمان ترابط البيانات
+        conn.execute("PRAGMA foreign_keys = ON")
+        # إعدادات الأداء (WAL، المزامنة، الذاكرة المؤقتة...)
+        db_profiles.apply_profile(conn, self.profile)
+        # عدادات كتابات هذا الاتصال حتى يميز مراقب التغييرات كتابات التطبيق نفسه عن الخارجية
+        change_log.install_local_counter(conn)
+        self._noted_changes[id(conn)] = conn.total_changes
+        return conn
+
+    def _load_profile(self, name):
+        """تحميل ملف تعريف الأداء والتحقق منه (مع الرجوع للوضع الآمن عند الخطأ)"""
+        self.profile_error = None
+        try:
+            self.profile = db_profiles.get_profile(name)
+            self.profile_name = name
+        except ValueError as e:
+            app_log().error("%s - سيتم استخدام الوضع الآمن (safe)", e)
+            self.profile_error = str(e)
+            self.profile_name = "safe"
+            self.profile = db_profiles.get_profile("safe")
+
     def connect(self):
-        """إنشاء اتصال بقاعدة البيانات"""
+        """إنشاء اتصال مستقل بقاعدة البيانات (خارج المجمّع، ويجب إغلاقه يدوياً)"""
         try:
-            self.conn = sqlite3.connect(self.db_name)
-            # تفعيل دعم المفاتيح الأجنبية (Foreign Keys) لضمان ترابط البيانات
-            self.conn.execute("PRAGMA foreign_keys = ON")
+            self.conn = self._open_connection()
             return self.conn
         except sqlite3.Error as e:
             print(f"Error connecting to database: {e}")
             return None
 
-    def create_tables(self):
-        """إنشاء الهيكلية الكاملة لقاعدة البيانات (شاملة نظام التشغيلات - Batches)"""
-
-        # قائمة الجداول كاملة ومرتبة حسب الاعتمادية
-        queries = [
-            # 1. جدول المستخدمين (الصيادلة والمدير)
-            """CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT UNIQUE NOT NULL,
-                password TEXT NOT NULL,
-                role TEXT DEFAULT 'pharmacist',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )""",
-
-            # 2. جدول الموردين
-            """CREATE TABLE IF NOT EXISTS suppliers (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                phone TEXT,
-                company_name TEXT,
-                balance REAL DEFAULT 0.0
-            )""",
-
-            # 3. جدول العملاء
-            """CREATE TABLE IF NOT EXISTS customers (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                phone TEXT,
-                email TEXT,
-                notes TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )""",
-
-            # 4. جدول الأدوية (البيانات الأساسية فقط)
-            """CREATE TABLE IF NOT EXISTS medicines (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                barcode TEXT UNIQUE,
-                name TEXT NOT NULL,
-                active_ingredient TEXT,       
-                description TEXT,
-                -- هذه الحقول ستبقى كقيم مرجعية أو افتراضية، لكن المخزون الفعلي في Batches
-                buy_price REAL NOT NULL,
-                sell_price REAL NOT NULL,
-                quantity INTEGER DEFAULT 0,
-                expiry_date DATE,
-                supplier_id INTEGER,
-                min_stock_alert INTEGER DEFAULT 10,
-                FOREIGN KEY(supplier_id) REFERENCES suppliers(id)
-            )""",
-
-            # 5. جدول التشغيلات (Batches) - (الجدول الجديد لنظام تعدد الأسعار والتواريخ)
-            """CREATE TABLE IF NOT EXISTS batches (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                medicine_id INTEGER NOT NULL,
-                batch_number TEXT,          -- رقم التشغيلة
-                expiry_date DATE NOT NULL,  -- تاريخ الانتهاء الخاص بهذه الدفعة
-                buy_price REAL NOT NULL,    -- سعر الشراء لهذه الدفعة
-                sell_price REAL NOT NULL,   -- سعر البيع لهذه الدفعة
-                quantity INTEGER NOT NULL,  -- الكمية المتبقية في هذه الدفعة
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY(medicine_id) REFERENCES medicines(id) ON DELETE CASCADE
-            )""",
-
-            # 6. جدول المبيعات (الرأس)
-            """CREATE TABLE IF NOT EXISTS sales (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER,
-                customer_id INTEGER,          
-                doctor_name TEXT,             
-                total_amount REAL,
-                sale_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY(user_id) REFERENCES users(id),
-                FOREIGN KEY(customer_id) REFERENCES customers(id)
-            )""",
-
-            # 7. جدول تفاصيل المبيعات (الأصناف) - (تم تحديثه ليرتبط بالتشغيلة)
-            """CREATE TABLE IF NOT EXISTS sale_items (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                sale_id INTEGER,
-                medicine_id INTEGER,
-                batch_id INTEGER,             -- هام: لتحديد من أي تشغيلة تم البيع
-                quantity INTEGER,
-                price_at_sale REAL,
-                total_item_price REAL,
-                FOREIGN KEY(sale_id) REFERENCES sales(id),
-                FOREIGN KEY(medicine_id) REFERENCES medicines(id),
-                FOREIGN KEY(batch_id) REFERENCES batches(id)
-            )""",
-
-            # 8. جدول فواتير الشراء (الرأس)
-            """CREATE TABLE IF NOT EXISTS purchase_invoices (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                supplier_id INTEGER,
-                invoice_number TEXT,
-                invoice_date DATE,
-                total_amount REAL,
-                notes TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY(supplier_id) REFERENCES suppliers(id)
-            )""",
-
-            # 9. جدول تفاصيل الشراء (الأصناف)
-            """CREATE TABLE IF NOT EXISTS purchase_items (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                purchase_id INTEGER,
-                medicine_id INTEGER,
-                quantity INTEGER,
-                unit_cost REAL,
-                total_cost REAL,
-                FOREIGN KEY(purchase_id) REFERENCES purchase_invoices(id),
-                FOREIGN KEY(medicine_id) REFERENCES medicines(id)
-            )"""
-        ]
-
+    @contextmanager
+    def connection(self):
+        """
+        استعارة اتصال دائم من المجمّع:
+            with self.db.connection() as conn:
+                if conn: ...
+        يعيد None إذا تعذر الاتصال (نفس سلوك connect) ويُعاد الاتصال للمجمّع تلقائياً.
+        """
         try:
-            conn = self.connect()
-            cursor = conn.cursor()
-
-            # تنفيذ إنشاء جميع الجداول
-            for query in queries:
-                cursor.execute(query)
+            conn = self._acquire()
+        except sqlite3.Error as e:
+            app_log().error("Error connecting to database: %s", e)
+            yield None
+            return
+        try:
+            yield conn
+        finally:
+            self._release(conn)
+
+    def _acquire(self):
+        conn = self.pool.acquire()
+        if SQL_TRACE:
+            conn.hold()
+        return conn
+
+    def _release(self, conn):
+        """
+        إعادة الاتصال للمجمّع بعد تسجيل قياس القراءات المعلقة عليه، وتسليم كتاباته المثبتة لمراقب التغييرات
+        (لا يُلمس بعد أن يستعيره خيط آخر). total_changes يُقرأ بلا SQL، فالاستعارات القارئة لا تكلف شيئاً.
+        """
+        if conn.total_changes != self._noted_changes.get(id(conn)):
+            # معاملة مفتوحة يتراجع عنها المجمّع، ومعها عداداتها المؤقتة
+            if not conn.in_transaction:
+                change_log.change_watcher.note_local(conn)
+            self._noted_changes[id(conn)] = conn.total_changes
+        if SQL_TRACE:
+            conn.unhold()
+        self.pool.release(conn)
+
+    def has_unnoted_writes(self):
+        """
+        هل في المجمّع اتصال كتب ولم يسلّم كتاباته لمراقب التغييرات بعد؟
+        (قد تكون مثبتة في الملف، فيؤجل المراقب الحكم عليها حتى لا يعدها خارجية)
+        """
+        return any(conn.total_changes != self._noted_changes.get(id(conn)) for conn in self.pool.connections())
+
+    def pool_stats(self):
+        """عدادات المجمّع (إصابة/إخفاق/زمن الانتظار)"""
+        return self.pool.stats()
+
+    def sql_report(self, n=20, sort="total"):
+        """أكثر جمل SQL استهلاكاً للوقت منذ بدء التشغيل (فارغ إذا كان SQL_TRACE معطلاً)"""
+        return sql_trace.stats.top(n, sort)
+
+    def get_diagnostics(self):
+        """تقرير تشخيصي: ملف تعريف الأداء (المطلوب مقابل الفعلي) وحالة المجمّع"""
+        report = {
+            "db_name": self.db_name,
+            "sqlite_version": sqlite3.sqlite_version,
+            "profile": self.profile_name,
+            "profile_error": self.profile_error,
+            "requested": dict(self.profile),
+            "effective": {},
+            "mismatches": {},
+            "pool": self.pool_stats(),
+        }
+        with self.connection() as conn:
+            if conn:
+                report["effective"] = db_profiles.read_effective(conn, self.profile)
+                report["mismatches"] = db_profiles.mismatches(self.profile, report["effective"])
+        return report
 
-            # إنشاء المستخدم المسؤول (Admin) افتراضياً إذا لم يكن موجوداً
-            cursor.execute("SELECT * FROM users WHERE username = 'admin'")
-            if not cursor.fetchone():
-                admin_pass = hashlib.sha256("123".encode()).hexdigest()
-                cursor.execute("INSERT INTO users (username, password, role) VALUES (?, ?, ?)",
-                               ('admin', admin_pass, 'admin'))
-                print("✅ تم إنشاء حساب المدير الافتراضي (admin/123)")
+    def close(self):
+        """إغلاق اتصالات المجمّع عند إنهاء التطبيق"""
+        self.pool.close_all()
 
-            conn.commit()
-            print("✅ تم بناء قاعدة البيانات وهيكلية الجداول الكاملة (شاملة Batches) بنجاح.")
+    def create_tables(self):
+        """
+        تجهيز الهيكلية عند بدء التشغيل:
+        المسار السريع يقرأ رقم الإصدار المخزن (وسطراً من sqlite_master لفهرس FTS5)، ولا يُنفذ أي DDL
+        إلا إذا كانت هناك ترحيلات ناقصة.
+        """
+        self.schema_upgraded = []
+        conn = None
+        try:
+            conn = self._acquire()
+
+            # التحقق من أن SQLite قبل إعدادات ملف التعريف فعلاً
+            effective = db_profiles.read_effective(conn, self.profile)
+            for key, (wanted, actual) in db_profiles.mismatches(self.profile, effective).items():
+                app_log().warning("الإعداد %s: المطلوب %s لكن الفعلي %s", key, wanted, actual)
+
+            # المسار السريع: الهيكلية محدثة، لا حاجة لأي DDL
+            # وإلا: تطبيق ترحيلات الهيكلية الناقصة (الجداول، الفهارس، المستخدم الافتراضي...)
+            if migrations.read_version(conn) < migrations.LATEST_VERSION:
+                self.schema_upgraded = migrations.migrate(conn)
+                for version, description, duration_ms in self.schema_upgraded:
+                    app_log().info("ترحيل %s: %s (%.1f ms)", version, description, duration_ms)
+                # قاعدة جديدة: الجداول المتابَعة لم تكن موجودة عند فتح هذا الاتصال
+                change_log.install_local_counter(conn)
+                print("✅ تم بناء قاعدة البيانات وهيكلية الجداول الكاملة (شاملة Batches) بنجاح.")
+
+            # فهرس FTS5 الذي تخطاه الترحيل 4 على نسخة SQLite بدون FTS5 (استعلام واحد على sqlite_master)
+            if migrations.ensure_medicines_fts(conn):
+                app_log().info("تم إنشاء فهرس البحث النصي للأدوية (FTS5)")
 
         except sqlite3.Error as e:
             print(f"❌ خطأ في تهيئة قاعدة البيانات: {e}")
         finally:
             if conn:
-                conn.close()
+                self._release(conn)
 
 # عند تشغيل الملف مباشرة للتجربة
 if __name__ == "__main__":
-    DatabaseManager()
\ No newline at end of file
+    db = DatabaseManager()
+    for key, value in db.get_diagnostics().items():
+        print(f"{key}: {value}")
\ No newline at end of file
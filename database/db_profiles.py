@@ -0,0 +1,79 @@
+# ملفات تعريف أداء SQLite (PRAGMA) التي تُطبق عند فتح كل اتصال
+# الترتيب مهم: busy_timeout أولاً حتى ينتظر تغيير journal_mode بدلاً من الفشل الفوري
+
+PROFILES = {
+    # الافتراضي: WAL يسمح للقراءة (التقارير) والكتابة (نقطة البيع) بالعمل معاً دون حجب
+    "performance": {
+        "busy_timeout": 5000,        # ميلي ثانية قبل رمي "database is locked"
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",     # آمن مع WAL (قد تضيع آخر معاملة فقط عند انقطاع الكهرباء)
+        "cache_size": -16000,        # سالب = بالكيلوبايت (≈16MB لكل اتصال)
+        "mmap_size": 268435456,      # 256MB قراءة عبر الذاكرة المعينة
+        "temp_store": "MEMORY",
+    },
+    # السلوك القديم: سجل التراجع (Rollback Journal) مع مزامنة كاملة
+    "safe": {
+        "busy_timeout": 5000,
+        "journal_mode": "DELETE",
+        "synchronous": "FULL",
+        "cache_size": -2000,
+        "mmap_size": 0,
+        "temp_store": "DEFAULT",
+    },
+}
+
+# القيم المسموحة لكل إعداد نصي
+_ALLOWED = {
+    "journal_mode": {"DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"},
+    "synchronous": {"OFF", "NORMAL", "FULL", "EXTRA"},
+    "temp_store": {"DEFAULT", "FILE", "MEMORY"},
+}
+
+# تحويل القيم الرقمية التي يعيدها SQLite عند القراءة إلى أسمائها
+_READBACK_NAMES = {
+    "synchronous": {0: "OFF", 1: "NORMAL", 2: "FULL", 3: "EXTRA"},
+    "temp_store": {0: "DEFAULT", 1: "FILE", 2: "MEMORY"},
+}
+
+
+def get_profile(name):
+    """جلب ملف التعريف بعد التحقق من صحته (يرمي ValueError عند الخطأ)"""
+    if name not in PROFILES:
+        raise ValueError(f"ملف تعريف قاعدة البيانات غير معروف: {name} (المتاح: {', '.join(PROFILES)})")
+
+    profile = PROFILES[name]
+    for key, value in profile.items():
+        if key in _ALLOWED:
+            if str(value).upper() not in _ALLOWED[key]:
+                raise ValueError(f"قيمة غير صالحة للإعداد {key}: {value}")
+        elif not isinstance(value, int):
+            raise ValueError(f"الإعداد {key} يجب أن يكون رقماً صحيحاً: {value}")
+        if key in ("busy_timeout", "mmap_size") and value < 0:
+            raise ValueError(f"الإعداد {key} لا يقبل قيمة سالبة: {value}")
+    return profile
+
+
+def apply_profile(conn, profile):
+    """تطبيق إعدادات PRAGMA على الاتصال"""
+    for key, value in profile.items():
+        conn.execute(f"PRAGMA {key} = {value}")
+
+
+def read_effective(conn, profile):
+    """قراءة القيم الفعلية من SQLite للمقارنة مع المطلوب (للتشخيص)"""
+    effective = {}
+    for key in profile:
+        value = conn.execute(f"PRAGMA {key}").fetchone()[0]
+        value = _READBACK_NAMES.get(key, {}).get(value, value)
+        effective[key] = value.upper() if isinstance(value, str) else value
+    return effective
+
+
+def mismatches(profile, effective):
+    """الإعدادات التي لم يقبلها SQLite (مثلاً WAL على قاعدة في الذاكرة أو mmap معطل في البناء)"""
+    diff = {}
+    for key, wanted in profile.items():
+        wanted_cmp = wanted.upper() if isinstance(wanted, str) else wanted
+        if effective.get(key) != wanted_cmp:
+            diff[key] = (wanted, effective.get(key))
+    return diff
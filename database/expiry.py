@@ -0,0 +1,103 @@
+"""
+تقويم الصلاحية (Expiry Calendar) للتشغيلات التي فيها مخزون (quantity > 0):
+صف واحد لكل تاريخ انتهاء (عدد التشغيلات، الكمية، القيمة بسعر الشراء) تحدّثه Triggers على جدول batches
+مع كل بيع أو إضافة أو تصفير، فتُحسب شرائح الصلاحية (منتهية / 30 / 60 / 90 يوماً) من بضعة آلاف صف
+بدلاً من مسح كل التشغيلات. القراءة عبر models/expiry_engine.py.
+
+إعادة البناء من جدول التشغيلات (عند الشك في التطابق أو بعد استيراد بيانات بدون Triggers):
+    python -m database.expiry --rebuild
+"""
+import sqlite3
+
+
+def _apply(row, sign):
+    """إضافة (sign='+') أو طرح (sign='-') مساهمة صف التشغيلة row (new/old) في يوم انتهائه"""
+    return f"""INSERT INTO expiry_calendar (day, batch_count, quantity, value)
+        SELECT substr({row}.expiry_date, 1, 10), {sign}1, {sign}{row}.quantity, {sign}{row}.quantity * {row}.buy_price
+        WHERE {row}.quantity > 0
+        ON CONFLICT(day) DO UPDATE SET batch_count = batch_count + excluded.batch_count,
+            quantity = quantity + excluded.quantity, value = value + excluded.value;"""
+
+
+EXPIRY_SCHEMA = [
+    # فهرس جزئي: التشغيلات الحية فقط مرتبة بتاريخ الانتهاء (والـ id ضمنياً) لعرض الأقرب انتهاءً أولاً
+    "CREATE INDEX IF NOT EXISTS idx_batches_live_expiry ON batches(expiry_date) WHERE quantity > 0",
+
+    """CREATE TABLE IF NOT EXISTS expiry_calendar (
+        day TEXT PRIMARY KEY,            -- YYYY-MM-DD
+        batch_count INTEGER NOT NULL DEFAULT 0,
+        quantity INTEGER NOT NULL DEFAULT 0,
+        value REAL NOT NULL DEFAULT 0
+    ) WITHOUT ROWID""",
+
+    f"""CREATE TRIGGER IF NOT EXISTS batches_expiry_ai AFTER INSERT ON batches BEGIN
+        {_apply("new", "+")}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS batches_expiry_ad AFTER DELETE ON batches BEGIN
+        {_apply("old", "-")}
+    END""",
+    # البيع يغير الكمية فقط: تحديث صف يوم واحد بالفرق (عدد التشغيلات يتغير إن نفدت أو عادت)
+    """CREATE TRIGGER IF NOT EXISTS batches_expiry_au_qty AFTER UPDATE OF quantity ON batches
+    WHEN new.expiry_date IS old.expiry_date AND new.buy_price IS old.buy_price
+         AND max(new.quantity, 0) != max(old.quantity, 0) BEGIN
+        INSERT INTO expiry_calendar (day, batch_count, quantity, value)
+        SELECT substr(new.expiry_date, 1, 10), (new.quantity > 0) - (old.quantity > 0),
+               max(new.quantity, 0) - max(old.quantity, 0), (max(new.quantity, 0) - max(old.quantity, 0)) * new.buy_price
+        WHERE 1
+        ON CONFLICT(day) DO UPDATE SET batch_count = batch_count + excluded.batch_count,
+            quantity = quantity + excluded.quantity, value = value + excluded.value;
+    END""",
+    # تعديل التاريخ أو السعر: طرح المساهمة القديمة وإضافة الجديدة
+    f"""CREATE TRIGGER IF NOT EXISTS batches_expiry_au_move AFTER UPDATE OF quantity, expiry_date, buy_price ON batches
+    WHEN new.expiry_date IS NOT old.expiry_date OR new.buy_price IS NOT old.buy_price BEGIN
+        {_apply("old", "-")}
+        {_apply("new", "+")}
+    END""",
+]
+
+# إعادة الحساب الكامل (مسح واحد للتشغيلات الحية عبر الفهرس الجزئي)
+REBUILD = [
+    "DELETE FROM expiry_calendar",
+    """INSERT INTO expiry_calendar (day, batch_count, quantity, value)
+       SELECT substr(expiry_date, 1, 10), COUNT(*), SUM(quantity), SUM(quantity * buy_price)
+       FROM batches WHERE quantity > 0
+       GROUP BY substr(expiry_date, 1, 10)""",
+]
+
+
+def rebuild_calendar(conn):
+    """إعادة بناء تقويم الصلاحية (بدون commit: المستدعي يحدد المعاملة)"""
+    for statement in REBUILD:
+        conn.execute(statement)
+
+
+def create_expiry_calendar(conn):
+    """خطوة الترحيل 8: الفهرس الجزئي + الجدول + Triggers + تعبئة المخزون الحالي"""
+    for statement in EXPIRY_SCHEMA:
+        conn.execute(statement)
+    rebuild_calendar(conn)
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+    from database.db_manager import DatabaseManager
+
+    parser = argparse.ArgumentParser(description="إعادة بناء تقويم الصلاحية من جدول التشغيلات")
+    parser.add_argument("--rebuild", action="store_true", required=True)
+    parser.parse_args()
+
+    db = DatabaseManager()
+    with db.connection() as conn:
+        if conn:
+            start = time.perf_counter()
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                rebuild_calendar(conn)
+                conn.commit()
+            except sqlite3.Error as e:
+                conn.rollback()
+                print(f"❌ فشل إعادة البناء: {e}")
+            else:
+                days = conn.execute("SELECT COUNT(*) FROM expiry_calendar").fetchone()[0]
+                print(f"✅ تمت إعادة بناء تقويم الصلاحية ({days} يوم) في {time.perf_counter() - start:.2f}s")
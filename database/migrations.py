@@ -0,0 +1,342 @@
+import hashlib
+import sqlite3
+import time
+from datetime import datetime
+
+from database import change_log, expiry, rollups
+from models.text_match import normalize_name, normalize_phone
+from utils.app_log import app_log
+
+# --- نظام ترحيل الهيكلية (Schema Migrations) ---
+# كل ترحيل له رقم إصدار ووصف وقائمة خطوات (نص SQL أو دالة تستقبل الاتصال).
+# تُطبق الترحيلات بالترتيب، كل منها داخل معاملة واحدة، ويُسجل رقمها في جدول schema_version.
+# ملاحظة: لا تعدل ترحيلاً سبق نشره؛ أضف ترحيلاً جديداً برقم أكبر.
+
+# 1. الهيكلية الأساسية (الجداول كاملة ومرتبة حسب الاعتمادية - شاملة نظام التشغيلات Batches)
+BASE_SCHEMA = [
+    # 1. جدول المستخدمين (الصيادلة والمدير)
+    """CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT UNIQUE NOT NULL,
+        password TEXT NOT NULL,
+        role TEXT DEFAULT 'pharmacist',
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )""",
+
+    # 2. جدول الموردين
+    """CREATE TABLE IF NOT EXISTS suppliers (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        phone TEXT,
+        company_name TEXT,
+        balance REAL DEFAULT 0.0
+    )""",
+
+    # 3. جدول العملاء
+    """CREATE TABLE IF NOT EXISTS customers (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        phone TEXT,
+        email TEXT,
+        notes TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )""",
+
+    # 4. جدول الأدوية (البيانات الأساسية فقط)
+    """CREATE TABLE IF NOT EXISTS medicines (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        barcode TEXT UNIQUE,
+        name TEXT NOT NULL,
+        active_ingredient TEXT,       
+        description TEXT,
+        -- هذه الحقول ستبقى كقيم مرجعية أو افتراضية، لكن المخزون الفعلي في Batches
+        buy_price REAL NOT NULL,
+        sell_price REAL NOT NULL,
+        quantity INTEGER DEFAULT 0,
+        expiry_date DATE,
+        supplier_id INTEGER,
+        min_stock_alert INTEGER DEFAULT 10,
+        FOREIGN KEY(supplier_id) REFERENCES suppliers(id)
+    )""",
+
+    # 5. جدول التشغيلات (Batches) - (الجدول الجديد لنظام تعدد الأسعار والتواريخ)
+    """CREATE TABLE IF NOT EXISTS batches (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        medicine_id INTEGER NOT NULL,
+        batch_number TEXT,          -- رقم التشغيلة
+        expiry_date DATE NOT NULL,  -- تاريخ الانتهاء الخاص بهذه الدفعة
+        buy_price REAL NOT NULL,    -- سعر الشراء لهذه الدفعة
+        sell_price REAL NOT NULL,   -- سعر البيع لهذه الدفعة
+        quantity INTEGER NOT NULL,  -- الكمية المتبقية في هذه الدفعة
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY(medicine_id) REFERENCES medicines(id) ON DELETE CASCADE
+    )""",
+
+    # 6. جدول المبيعات (الرأس)
+    """CREATE TABLE IF NOT EXISTS sales (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER,
+        customer_id INTEGER,          
+        doctor_name TEXT,             
+        total_amount REAL,
+        sale_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY(user_id) REFERENCES users(id),
+        FOREIGN KEY(customer_id) REFERENCES customers(id)
+    )""",
+
+    # 7. جدول تفاصيل المبيعات (الأصناف) - (تم تحديثه ليرتبط بالتشغيلة)
+    """CREATE TABLE IF NOT EXISTS sale_items (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        sale_id INTEGER,
+        medicine_id INTEGER,
+        batch_id INTEGER,             -- هام: لتحديد من أي تشغيلة تم البيع
+        quantity INTEGER,
+        price_at_sale REAL,
+        total_item_price REAL,
+        FOREIGN KEY(sale_id) REFERENCES sales(id),
+        FOREIGN KEY(medicine_id) REFERENCES medicines(id),
+        FOREIGN KEY(batch_id) REFERENCES batches(id)
+    )""",
+
+    # 8. جدول فواتير الشراء (الرأس)
+    """CREATE TABLE IF NOT EXISTS purchase_invoices (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        supplier_id INTEGER,
+        invoice_number TEXT,
+        invoice_date DATE,
+        total_amount REAL,
+        notes TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY(supplier_id) REFERENCES suppliers(id)
+    )""",
+
+    # 9. جدول تفاصيل الشراء (الأصناف)
+    """CREATE TABLE IF NOT EXISTS purchase_items (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        purchase_id INTEGER,
+        medicine_id INTEGER,
+        quantity INTEGER,
+        unit_cost REAL,
+        total_cost REAL,
+        FOREIGN KEY(purchase_id) REFERENCES purchase_invoices(id),
+        FOREIGN KEY(medicine_id) REFERENCES medicines(id)
+    )"""
+]
+
+# 2. فهارس المسارات الساخنة (التقارير، البيع، لوحة التحكم)
+HOT_PATH_INDEXES = [
+    # تفاصيل فاتورة البيع (ReportsDAO.get_sale_details)
+    "CREATE INDEX IF NOT EXISTS idx_sale_items_sale_id ON sale_items(sale_id)",
+    # تفاصيل فاتورة الشراء (ReportsDAO.get_purchase_details)
+    "CREATE INDEX IF NOT EXISTS idx_purchase_items_purchase_id ON purchase_items(purchase_id)",
+    # اختيار التشغيلات حسب تاريخ الانتهاء (SalesDAO.process_sale - FIFO)
+    "CREATE INDEX IF NOT EXISTS idx_batches_medicine_expiry ON batches(medicine_id, expiry_date)",
+    # مبيعات اليوم وترتيب سجل المبيعات (DashboardDAO / ReportsDAO.get_all_sales)
+    "CREATE INDEX IF NOT EXISTS idx_sales_sale_date ON sales(sale_date)",
+    # مبيعات عميل محدد
+    "CREATE INDEX IF NOT EXISTS idx_sales_customer_id ON sales(customer_id)",
+    # أدوية المورد (SuppliersDAO.delete_supplier / النواقص)
+    "CREATE INDEX IF NOT EXISTS idx_medicines_supplier_id ON medicines(supplier_id)",
+]
+
+
+
+# 3. المستخدم المسؤول الافتراضي (كان يُفحص عند كل تشغيل)
+def seed_admin(conn):
+    """إنشاء المستخدم المسؤول (Admin) افتراضياً إذا لم يكن موجوداً"""
+    if not conn.execute("SELECT 1 FROM users WHERE username = 'admin'").fetchone():
+        admin_pass = hashlib.sha256("123".encode()).hexdigest()
+        conn.execute("INSERT INTO users (username, password, role) VALUES (?, ?, ?)",
+                     ('admin', admin_pass, 'admin'))
+        print("✅ تم إنشاء حساب المدير الافتراضي (admin/123)")
+
+
+# 4. فهرس البحث النصي الكامل (FTS5) للأدوية، متزامن مع جدول medicines عبر Triggers
+MEDICINES_FTS = [
+    # جدول خارجي المحتوى (content=medicines): لا يكرر النصوص، فقط الفهرس
+    # prefix='2 3' يسرع البحث ببادئة قصيرة أثناء الكتابة
+    """CREATE VIRTUAL TABLE IF NOT EXISTS medicines_fts USING fts5(
+        name, active_ingredient, description,
+        content='medicines', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS medicines_fts_ai AFTER INSERT ON medicines BEGIN
+        INSERT INTO medicines_fts(rowid, name, active_ingredient, description)
+        VALUES (new.id, new.name, new.active_ingredient, new.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS medicines_fts_ad AFTER DELETE ON medicines BEGIN
+        INSERT INTO medicines_fts(medicines_fts, rowid, name, active_ingredient, description)
+        VALUES ('delete', old.id, old.name, old.active_ingredient, old.description);
+    END""",
+    # فقط عند تعديل الأعمدة النصية (وليس الكمية التي تتغير مع كل بيع)
+    """CREATE TRIGGER IF NOT EXISTS medicines_fts_au AFTER UPDATE OF name, active_ingredient, description ON medicines BEGIN
+        INSERT INTO medicines_fts(medicines_fts, rowid, name, active_ingredient, description)
+        VALUES ('delete', old.id, old.name, old.active_ingredient, old.description);
+        INSERT INTO medicines_fts(rowid, name, active_ingredient, description)
+        VALUES (new.id, new.name, new.active_ingredient, new.description);
+    END""",
+    # فهرسة الأدوية الموجودة مسبقاً
+    "INSERT INTO medicines_fts(medicines_fts) VALUES ('rebuild')",
+]
+
+
+def fts5_available(conn):
+    """هل نسخة SQLite المبنية تدعم FTS5؟"""
+    return any(row[0] == "ENABLE_FTS5" for row in conn.execute("PRAGMA compile_options"))
+
+
+def create_medicines_fts(conn):
+    """إنشاء فهرس البحث إن كان FTS5 مدعوماً (وإلا يبقى البحث بـ LIKE حتى يُنشئه ensure_medicines_fts)"""
+    if not fts5_available(conn):
+        app_log().warning("SQLite بدون FTS5: سيستخدم البحث عن الأدوية LIKE حتى تشغيل نسخة تدعمه")
+        return
+    for step in MEDICINES_FTS:
+        conn.execute(step)
+
+
+def ensure_medicines_fts(conn):
+    """
+    الترحيل 4 يُسجل حتى لو تُخطي الفهرس (الترحيلات التالية لا تعتمد عليه)، فيُفحص غيابه عند كل تشغيل
+    ويُنشأ في معاملة مستقلة إن أصبح FTS5 مدعوماً (بعد تحديث SQLite). يعيد True إن أُنشئ.
+    """
+    if read_version(conn) < 4:
+        return False
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'medicines_fts'").fetchone():
+        return False
+    if not fts5_available(conn):
+        return False
+    conn.execute("BEGIN")
+    try:
+        for step in MEDICINES_FTS:
+            conn.execute(step)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return True
+
+
+# 7. ترقيم صفحات سجل المشتريات (keyset على invoice_date, id)
+# الفهرس على عمود واحد يتضمن rowid ضمنياً، فيخدم ORDER BY invoice_date DESC, id DESC بدون فرز
+PURCHASE_PAGING_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_purchase_invoices_invoice_date ON purchase_invoices(invoice_date)",
+]
+
+
+# 10. اختيار العميل في نقطة البيع بالبادئة: الاسم الموحّد (normalize_name) والهاتف بفهرس لكل منهما
+# name_norm يُحسب في Python (CustomersDAO.add_customer) لأن التوحيد لا يمكن التعبير عنه في SQL
+def add_customer_lookup(conn):
+    """عمود name_norm + تعبئته للعملاء الحاليين + فهرسا البادئة"""
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(customers)")]
+    if "name_norm" not in columns:
+        conn.execute("ALTER TABLE customers ADD COLUMN name_norm TEXT")
+    rows = conn.execute("SELECT id, name FROM customers").fetchall()
+    conn.executemany("UPDATE customers SET name_norm = ? WHERE id = ?",
+                     ((normalize_name(name), customer_id) for customer_id, name in rows))
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_customers_name_norm ON customers(name_norm)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_customers_phone ON customers(phone)")
+
+
+# 12. الهاتف الموحّد (normalize_phone: أرقام لاتينية فقط) حتى يطابق بحث SQL فهرس الذاكرة:
+# "0912-345 678" و"٠٩١٢٣٤٥٦٧٨" كلاهما 0912345678؛ فهرس الهاتف الخام لم يعد يستخدمه أي استعلام
+def add_customer_phone_norm(conn):
+    """عمود phone_norm + تعبئته للعملاء الحاليين + فهرس البادئة عليه بدلاً من فهرس الهاتف الخام"""
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(customers)")]
+    if "phone_norm" not in columns:
+        conn.execute("ALTER TABLE customers ADD COLUMN phone_norm TEXT")
+    rows = conn.execute("SELECT id, phone FROM customers").fetchall()
+    conn.executemany("UPDATE customers SET phone_norm = ? WHERE id = ?",
+                     ((normalize_phone(phone) or None, customer_id) for customer_id, phone in rows))
+    conn.execute("DROP INDEX IF EXISTS idx_customers_phone")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_customers_phone_norm ON customers(phone_norm)")
+
+
+# 13. مفتاح ترقيم الصفحات مع التواريخ الفارغة: الهيكلية تسمح بـ NULL في sale_date/invoice_date،
+# وNULL في (التاريخ، id) < (?, ?) يُسقط الصف من كل الصفحات؛ COALESCE(..., '') يضعه في آخر السجل،
+# وفهرس التعبير نفسه يخدم ORDER BY والشرط بدون فرز (فهرسا التاريخ الأصليان يبقيان لنطاقات التواريخ)
+PAGING_KEY_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_sales_page_key ON sales(COALESCE(sale_date, ''))",
+    "CREATE INDEX IF NOT EXISTS idx_purchase_invoices_page_key ON purchase_invoices(COALESCE(invoice_date, ''))",
+]
+
+
+MIGRATIONS = [
+    (1, "الهيكلية الأساسية", BASE_SCHEMA),
+    (2, "فهارس المسارات الساخنة", HOT_PATH_INDEXES),
+    (3, "المستخدم المسؤول الافتراضي", [seed_admin]),
+    (4, "فهرس البحث النصي للأدوية (FTS5)", [create_medicines_fts]),
+    (5, "التجميع اليومي للمبيعات والمشتريات", [rollups.create_rollups]),
+    (6, "تكلفة البضاعة المباعة في التجميع اليومي", [rollups.add_cogs]),
+    (7, "فهرس ترقيم صفحات المشتريات", PURCHASE_PAGING_INDEXES),
+    (8, "تقويم الصلاحية والفهرس الجزئي للتشغيلات الحية", [expiry.create_expiry_calendar]),
+    (9, "عدادات التغيير لكل جدول (كشف الكتابات الخارجية)", [change_log.create_change_log]),
+    (10, "الاسم الموحّد وفهارس البادئة لاختيار العميل", [add_customer_lookup]),
+    (11, "نقل أسطر الفاتورة وتكلفتها مع تغيير يومها في التجميع اليومي", [rollups.add_day_move]),
+    (12, "الهاتف الموحّد وفهرسه لاختيار العميل", [add_customer_phone_norm]),
+    (13, "مفتاح ترقيم صفحات المبيعات والمشتريات مع التواريخ الفارغة", PAGING_KEY_INDEXES),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def ensure_version_table(conn):
+    """إنشاء جدول إصدارات الهيكلية إذا لم يكن موجوداً"""
+    conn.execute("""CREATE TABLE IF NOT EXISTS schema_version (
+        version INTEGER PRIMARY KEY,
+        description TEXT,
+        applied_at TIMESTAMP,
+        duration_ms REAL
+    )""")
+
+
+def read_version(conn):
+    """قراءة الإصدار المخزن فقط (بدون أي DDL) - المسار السريع عند بدء التشغيل"""
+    try:
+        row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+    except sqlite3.OperationalError:
+        # قاعدة جديدة أو قديمة لم يُنشأ فيها جدول الإصدارات بعد
+        return 0
+    return row[0] or 0
+
+
+def current_version(conn):
+    """رقم آخر ترحيل مطبق (0 لقاعدة جديدة أو قديمة بدون جدول إصدارات)"""
+    ensure_version_table(conn)
+    row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+    return row[0] or 0
+
+
+def migrate(conn, target=None):
+    """
+    تطبيق الترحيلات الناقصة بالترتيب حتى الإصدار target (أو الأحدث).
+    تعيد قائمة (الإصدار، الوصف، المدة بالميلي ثانية) لما تم تطبيقه.
+    """
+    target = LATEST_VERSION if target is None else target
+    version = current_version(conn)
+    applied = []
+
+    for number, description, steps in MIGRATIONS:
+        if number <= version or number > target:
+            continue
+
+        start = time.perf_counter()
+        conn.execute("BEGIN")
+        try:
+            for step in steps:
+                if callable(step):
+                    step(conn)
+                else:
+                    conn.execute(step)
+            duration_ms = (time.perf_counter() - start) * 1000
+            conn.execute("INSERT INTO schema_version (version, description, applied_at, duration_ms) VALUES (?, ?, ?, ?)",
+                         (number, description, datetime.now().strftime("%Y-%m-%d %H:%M:%S"), duration_ms))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        applied.append((number, description, duration_ms))
+
+    if applied:
+        # تحديث إحصائيات المخطط (Query Planner) بعد إضافة فهارس
+        conn.execute("PRAGMA optimize")
+    return applied
@@ -0,0 +1,212 @@
+"""
+جداول التجميع اليومي للمبيعات والمشتريات (Rollups):
+صف واحد لكل يوم (الإجمالي، عدد الفواتير، عدد الأسطر، تكلفة البضاعة المباعة) تحدّثه Triggers مع كل إدراج/تعديل/حذف،
+فتقرأ لوحة التحكم والملخص المالي أرقاماً جاهزة بدلاً من جمع كامل تاريخ الفواتير.
+
+إعادة البناء من الجداول الأصلية (عند الشك في التطابق أو بعد استيراد بيانات بدون Triggers):
+    python -m database.rollups --rebuild
+"""
+import sqlite3
+
+ROLLUP_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS daily_sales_rollup (
+        day TEXT PRIMARY KEY,            -- YYYY-MM-DD
+        total REAL NOT NULL DEFAULT 0,
+        sales_count INTEGER NOT NULL DEFAULT 0,
+        line_count INTEGER NOT NULL DEFAULT 0
+    ) WITHOUT ROWID""",
+    """CREATE TABLE IF NOT EXISTS daily_purchase_rollup (
+        day TEXT PRIMARY KEY,
+        total REAL NOT NULL DEFAULT 0,
+        invoice_count INTEGER NOT NULL DEFAULT 0,
+        line_count INTEGER NOT NULL DEFAULT 0
+    ) WITHOUT ROWID""",
+
+    # --- المبيعات: رأس الفاتورة ---
+    """CREATE TRIGGER IF NOT EXISTS sales_rollup_ai AFTER INSERT ON sales BEGIN
+        INSERT INTO daily_sales_rollup (day, total, sales_count) VALUES (substr(new.sale_date, 1, 10), new.total_amount, 1)
+        ON CONFLICT(day) DO UPDATE SET total = total + excluded.total, sales_count = sales_count + 1;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS sales_rollup_ad AFTER DELETE ON sales BEGIN
+        UPDATE daily_sales_rollup SET total = total - old.total_amount, sales_count = sales_count - 1
+        WHERE day = substr(old.sale_date, 1, 10);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS sales_rollup_au AFTER UPDATE OF total_amount, sale_date ON sales BEGIN
+        UPDATE daily_sales_rollup SET total = total - old.total_amount, sales_count = sales_count - 1
+        WHERE day = substr(old.sale_date, 1, 10);
+        INSERT INTO daily_sales_rollup (day, total, sales_count) VALUES (substr(new.sale_date, 1, 10), new.total_amount, 1)
+        ON CONFLICT(day) DO UPDATE SET total = total + excluded.total, sales_count = sales_count + 1;
+    END""",
+    # --- المبيعات: الأسطر (اليوم من رأس الفاتورة عبر المفتاح الأساسي) ---
+    """CREATE TRIGGER IF NOT EXISTS sale_items_rollup_ai AFTER INSERT ON sale_items BEGIN
+        UPDATE daily_sales_rollup SET line_count = line_count + 1
+        WHERE day = (SELECT substr(sale_date, 1, 10) FROM sales WHERE id = new.sale_id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS sale_items_rollup_ad AFTER DELETE ON sale_items BEGIN
+        UPDATE daily_sales_rollup SET line_count = line_count - 1
+        WHERE day = (SELECT substr(sale_date, 1, 10) FROM sales WHERE id = old.sale_id);
+    END""",
+
+    # --- المشتريات ---
+    """CREATE TRIGGER IF NOT EXISTS purchases_rollup_ai AFTER INSERT ON purchase_invoices BEGIN
+        INSERT INTO daily_purchase_rollup (day, total, invoice_count)
+        VALUES (substr(new.invoice_date, 1, 10), new.total_amount, 1)
+        ON CONFLICT(day) DO UPDATE SET total = total + excluded.total, invoice_count = invoice_count + 1;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS purchases_rollup_ad AFTER DELETE ON purchase_invoices BEGIN
+        UPDATE daily_purchase_rollup SET total = total - old.total_amount, invoice_count = invoice_count - 1
+        WHERE day = substr(old.invoice_date, 1, 10);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS purchases_rollup_au AFTER UPDATE OF total_amount, invoice_date ON purchase_invoices BEGIN
+        UPDATE daily_purchase_rollup SET total = total - old.total_amount, invoice_count = invoice_count - 1
+        WHERE day = substr(old.invoice_date, 1, 10);
+        INSERT INTO daily_purchase_rollup (day, total, invoice_count)
+        VALUES (substr(new.invoice_date, 1, 10), new.total_amount, 1)
+        ON CONFLICT(day) DO UPDATE SET total = total + excluded.total, invoice_count = invoice_count + 1;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS purchase_items_rollup_ai AFTER INSERT ON purchase_items BEGIN
+        UPDATE daily_purchase_rollup SET line_count = line_count + 1
+        WHERE day = (SELECT substr(invoice_date, 1, 10) FROM purchase_invoices WHERE id = new.purchase_id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS purchase_items_rollup_ad AFTER DELETE ON purchase_items BEGIN
+        UPDATE daily_purchase_rollup SET line_count = line_count - 1
+        WHERE day = (SELECT substr(invoice_date, 1, 10) FROM purchase_invoices WHERE id = old.purchase_id);
+    END""",
+]
+
+# تعبئة الترحيل 5 كما كانت عند إضافته (قبل عمود التكلفة)، حتى يبقى الترحيل قابلاً للتطبيق على قاعدة جديدة
+REBUILD_V5 = [
+    "DELETE FROM daily_sales_rollup",
+    """INSERT INTO daily_sales_rollup (day, total, sales_count, line_count)
+       SELECT substr(s.sale_date, 1, 10), SUM(s.total_amount), COUNT(*), SUM(IFNULL(l.lines, 0))
+       FROM sales s
+       LEFT JOIN (SELECT sale_id, COUNT(*) AS lines FROM sale_items GROUP BY sale_id) l ON l.sale_id = s.id
+       GROUP BY substr(s.sale_date, 1, 10)""",
+    "DELETE FROM daily_purchase_rollup",
+    """INSERT INTO daily_purchase_rollup (day, total, invoice_count, line_count)
+       SELECT substr(p.invoice_date, 1, 10), SUM(p.total_amount), COUNT(*), SUM(IFNULL(l.lines, 0))
+       FROM purchase_invoices p
+       LEFT JOIN (SELECT purchase_id, COUNT(*) AS lines FROM purchase_items GROUP BY purchase_id) l
+              ON l.purchase_id = p.id
+       GROUP BY substr(p.invoice_date, 1, 10)""",
+]
+
+
+# الترحيل 6: تكلفة البضاعة المباعة (COGS) = الكمية × سعر شراء التشغيلة المباعة منها
+COGS_SCHEMA = [
+    "ALTER TABLE daily_sales_rollup ADD COLUMN cogs REAL NOT NULL DEFAULT 0",
+    "DROP TRIGGER IF EXISTS sale_items_rollup_ai",
+    "DROP TRIGGER IF EXISTS sale_items_rollup_ad",
+    """CREATE TRIGGER sale_items_rollup_ai AFTER INSERT ON sale_items BEGIN
+        UPDATE daily_sales_rollup SET line_count = line_count + 1,
+               cogs = cogs + new.quantity * COALESCE((SELECT buy_price FROM batches WHERE id = new.batch_id),
+                                                     (SELECT buy_price FROM medicines WHERE id = new.medicine_id), 0)
+        WHERE day = (SELECT substr(sale_date, 1, 10) FROM sales WHERE id = new.sale_id);
+    END""",
+    """CREATE TRIGGER sale_items_rollup_ad AFTER DELETE ON sale_items BEGIN
+        UPDATE daily_sales_rollup SET line_count = line_count - 1,
+               cogs = cogs - old.quantity * COALESCE((SELECT buy_price FROM batches WHERE id = old.batch_id),
+                                                     (SELECT buy_price FROM medicines WHERE id = old.medicine_id), 0)
+        WHERE day = (SELECT substr(sale_date, 1, 10) FROM sales WHERE id = old.sale_id);
+    END""",
+]
+
+# الترحيل 11: تغيير يوم الفاتورة (sale_date / invoice_date) ينقل أسطرها وتكلفتها مع الإجمالي والعدد
+# (sales_rollup_au / purchases_rollup_au تنقلان الإجمالي والعدد فقط)
+_LINE_COGS = """si.quantity * COALESCE((SELECT buy_price FROM batches WHERE id = si.batch_id),
+                                     (SELECT buy_price FROM medicines WHERE id = si.medicine_id), 0)"""
+
+DAY_MOVE_SCHEMA = [
+    f"""CREATE TRIGGER IF NOT EXISTS sales_rollup_day_au AFTER UPDATE OF sale_date ON sales
+        WHEN substr(old.sale_date, 1, 10) IS NOT substr(new.sale_date, 1, 10) BEGIN
+        UPDATE daily_sales_rollup
+        SET line_count = line_count - (SELECT COUNT(*) FROM sale_items WHERE sale_id = old.id),
+            cogs = cogs - (SELECT IFNULL(SUM({_LINE_COGS}), 0) FROM sale_items si WHERE si.sale_id = old.id)
+        WHERE day = substr(old.sale_date, 1, 10);
+        INSERT INTO daily_sales_rollup (day, line_count, cogs)
+        VALUES (substr(new.sale_date, 1, 10),
+                (SELECT COUNT(*) FROM sale_items WHERE sale_id = new.id),
+                (SELECT IFNULL(SUM({_LINE_COGS}), 0) FROM sale_items si WHERE si.sale_id = new.id))
+        ON CONFLICT(day) DO UPDATE SET line_count = line_count + excluded.line_count, cogs = cogs + excluded.cogs;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS purchases_rollup_day_au AFTER UPDATE OF invoice_date ON purchase_invoices
+        WHEN substr(old.invoice_date, 1, 10) IS NOT substr(new.invoice_date, 1, 10) BEGIN
+        UPDATE daily_purchase_rollup
+        SET line_count = line_count - (SELECT COUNT(*) FROM purchase_items WHERE purchase_id = old.id)
+        WHERE day = substr(old.invoice_date, 1, 10);
+        INSERT INTO daily_purchase_rollup (day, line_count)
+        VALUES (substr(new.invoice_date, 1, 10), (SELECT COUNT(*) FROM purchase_items WHERE purchase_id = new.id))
+        ON CONFLICT(day) DO UPDATE SET line_count = line_count + excluded.line_count;
+    END""",
+]
+
+# إعادة الحساب الكامل من الجداول الأصلية (مسح واحد لكل جدول مع GROUP BY)
+REBUILD = [
+    "DELETE FROM daily_sales_rollup",
+    """INSERT INTO daily_sales_rollup (day, total, sales_count, line_count, cogs)
+       SELECT substr(s.sale_date, 1, 10), SUM(s.total_amount), COUNT(*), SUM(IFNULL(l.lines, 0)),
+              SUM(IFNULL(l.cogs, 0))
+       FROM sales s
+       LEFT JOIN (SELECT si.sale_id, COUNT(*) AS lines,
+                         SUM(si.quantity * COALESCE(b.buy_price, m.buy_price, 0)) AS cogs
+                  FROM sale_items si
+                  LEFT JOIN batches b ON b.id = si.batch_id
+                  LEFT JOIN medicines m ON m.id = si.medicine_id
+                  GROUP BY si.sale_id) l ON l.sale_id = s.id
+       GROUP BY substr(s.sale_date, 1, 10)""",
+    REBUILD_V5[2],
+    REBUILD_V5[3],
+]
+
+
+def rebuild_rollups(conn):
+    """إعادة بناء جداول التجميع (بدون commit: المستدعي يحدد المعاملة)"""
+    for statement in REBUILD:
+        conn.execute(statement)
+
+
+def create_rollups(conn):
+    """خطوة الترحيل 5: الجداول + Triggers + تعبئة التاريخ الموجود"""
+    for statement in ROLLUP_SCHEMA + REBUILD_V5:
+        conn.execute(statement)
+
+
+def add_cogs(conn):
+    """خطوة الترحيل 6: عمود التكلفة + Triggers الأسطر الجديدة + إعادة الحساب"""
+    for statement in COGS_SCHEMA:
+        conn.execute(statement)
+    rebuild_rollups(conn)
+
+
+def add_day_move(conn):
+    """
+    خطوة الترحيل 11: Triggers نقل الأسطر مع يوم الفاتورة. التطبيق لا يغير أيام الفواتير، فلا إعادة حساب هنا
+    (ثوانٍ على قاعدة كبيرة)؛ ما انحرف قبلها بتعديل خارجي يُصحح بـ --rebuild.
+    """
+    for statement in DAY_MOVE_SCHEMA:
+        conn.execute(statement)
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+    from database.db_manager import DatabaseManager
+
+    parser = argparse.ArgumentParser(description="إعادة بناء جداول التجميع اليومي من الفواتير")
+    parser.add_argument("--rebuild", action="store_true", required=True)
+    parser.parse_args()
+
+    db = DatabaseManager()
+    with db.connection() as conn:
+        if conn:
+            start = time.perf_counter()
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                rebuild_rollups(conn)
+                conn.commit()
+            except sqlite3.Error as e:
+                conn.rollback()
+                print(f"❌ فشل إعادة البناء: {e}")
+            else:
+                days = conn.execute("SELECT COUNT(*) FROM daily_sales_rollup").fetchone()[0]
+                print(f"✅ تمت إعادة بناء التجميع اليومي ({days} يوم مبيعات) في {time.perf_counter() - start:.2f}s")
@@ -0,0 +1,338 @@
+"""
+طبقة قياس استعلامات SQL على مستوى الاتصال:
+- كل جملة تُسجل بنصها الموحّد (بدون القيم)، ومكان استدعائها في models/، وزمنها، وعدد صفوفها.
+- الجمل الأبطأ من الحد تُكتب في سجل دوّار (logs/slow_queries.log) مع خطة التنفيذ (EXPLAIN QUERY PLAN).
+- تقرير تجميعي لأكثر الجمل استهلاكاً للوقت (نافذة التشخيص أو سطر الأوامر).
+
+التفعيل من config.py (SQL_TRACE) ويُطبق عبر DatabaseManager._open_connection.
+تقرير آخر تشغيل من سطر الأوامر:
+    python -m database.sql_trace --top 20 --sort total
+"""
+import atexit
+import json
+import logging
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+import weakref
+from logging.handlers import RotatingFileHandler
+
+from config import LOG_DIR, SLOW_QUERY_MS, SQL_STATS_FILE
+
+_THIS_FILE = os.path.abspath(__file__)
+_ROOT = os.path.dirname(os.path.dirname(_THIS_FILE))
+_SQLITE_DIR = os.path.dirname(os.path.abspath(sqlite3.__file__))
+
+# الجمل التي لها خطة تنفيذ (لا معنى لـ EXPLAIN على BEGIN/COMMIT/PRAGMA)
+_EXPLAINABLE = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH", "REPLACE")
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)+\s*\)", re.IGNORECASE)
+_SPACES = re.compile(r"\s+")
+
+_normalized_cache = {}
+
+
+def normalize(sql):
+    """توحيد نص الجملة: مسافات مفردة، القيم الحرفية ← ?، وقوائم IN بأي طول ← (?...)"""
+    text = _normalized_cache.get(sql)
+    if text is None:
+        text = _SPACES.sub(" ", sql).strip()
+        text = _STRING.sub("?", text)
+        text = _NUMBER.sub("?", text)
+        text = _IN_LIST.sub("IN (?...)", text)
+        if len(_normalized_cache) < 5000:
+            _normalized_cache[sql] = text
+    return text
+
+
+_sites = {}  # (code, line) -> النص الجاهز (relpath بطيء نسبياً)
+
+
+def call_site():
+    """أول إطار خارج هذه الطبقة (عادة سطر في models/*.py)"""
+    frame = sys._getframe(2)
+    while frame is not None:
+        code = frame.f_code
+        filename = code.co_filename
+        if filename != _THIS_FILE and not filename.startswith(_SQLITE_DIR) and "contextlib" not in filename:
+            key = (code, frame.f_lineno)
+            site = _sites.get(key)
+            if site is None:
+                site = _sites[key] = f"{os.path.relpath(filename, _ROOT)}:{frame.f_lineno} {code.co_name}"
+            return site
+        frame = frame.f_back
+    return "?"
+
+
+class SQLStats:
+    """تجميع القياسات حسب الجملة الموحّدة (آمن مع الخيوط)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data = {}
+        self.started = time.time()
+
+    def record(self, sql, site, duration, rows):
+        with self._lock:
+            entry = self._data.get(sql)
+            if entry is None:
+                entry = self._data[sql] = {"sql": sql, "calls": 0, "total_ms": 0.0, "max_ms": 0.0,
+                                           "rows": 0, "slow": 0, "sites": {}}
+            ms = duration * 1000
+            entry["calls"] += 1
+            entry["total_ms"] += ms
+            entry["rows"] += max(rows, 0)
+            if ms > entry["max_ms"]:
+                entry["max_ms"] = ms
+            if ms >= SLOW_QUERY_MS:
+                entry["slow"] += 1
+            entry["sites"][site] = entry["sites"].get(site, 0) + 1
+
+    def top(self, n=20, sort="total"):
+        """أكثر الجمل حسب: total (الزمن الكلي)، avg، max، calls، rows"""
+        key = {"total": "total_ms", "max": "max_ms", "calls": "calls", "rows": "rows"}.get(sort)
+        with self._lock:
+            entries = [dict(e, sites=dict(e["sites"])) for e in self._data.values()]
+        for e in entries:
+            e["avg_ms"] = e["total_ms"] / e["calls"]
+        entries.sort(key=lambda e: e[key] if key else e["avg_ms"], reverse=True)
+        return entries[:n]
+
+    def reset(self):
+        with self._lock:
+            self._data.clear()
+            self.started = time.time()
+
+    def dump(self, path=SQL_STATS_FILE):
+        """حفظ الإحصائيات عند الخروج حتى يقرأها سطر الأوامر لاحقاً"""
+        entries = self.top(n=None)
+        if not entries:
+            return
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"started": self.started, "ended": time.time(), "statements": entries}, f,
+                      ensure_ascii=False, indent=1)
+
+
+stats = SQLStats()
+_plans = {}  # الجملة الموحدة -> الخطة (تُحسب مرة واحدة)
+_slow_log = None
+
+
+def slow_log():
+    """سجل الاستعلامات البطيئة الدوّار (يُنشأ عند أول استعلام بطيء فقط)"""
+    global _slow_log
+    if _slow_log is None:
+        os.makedirs(LOG_DIR, exist_ok=True)
+        logger = logging.getLogger("pharma.slow_sql")
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        handler = RotatingFileHandler(os.path.join(LOG_DIR, "slow_queries.log"), maxBytes=1_000_000,
+                                      backupCount=5, encoding="utf-8")
+        handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+        logger.addHandler(handler)
+        _slow_log = logger
+    return _slow_log
+
+
+def _explain(conn, sql, params):
+    # مؤشر sqlite3 عادي لا TracedCursor: جملة EXPLAIN نفسها لا تُقاس ولا تُسجل
+    cursor = sqlite3.Cursor(conn)
+    try:
+        rows = cursor.execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()
+        return " | ".join(row[3] for row in rows)
+    except sqlite3.Error as e:
+        return f"(تعذر الحصول على الخطة: {e})"
+    finally:
+        cursor.close()
+
+
+def _report_slow(conn, sql, params, normalized, site, duration, rows):
+    """conn=None: الاتصال لم يعد ملكاً للمؤشر (أُعيد للمجمّع)، فتُكتب الجملة بدون حساب خطتها"""
+    if normalized not in _plans and conn is not None:
+        plan = None
+        if sql.lstrip()[:7].upper().startswith(_EXPLAINABLE):
+            plan = _explain(conn, sql, params)
+        _plans[normalized] = plan
+    slow_log().info("%.1f ms | rows=%d | %s | %s | plan: %s", duration * 1000, rows, site, normalized,
+                    _plans.get(normalized) or "-")
+
+
+class TracedCursor(sqlite3.Cursor):
+    """
+    مؤشر يقيس كل جملة: الزمن يشمل التنفيذ وجلب الصفوف حتى انتهائها
+    (أو حتى الجملة التالية / إعادة الاتصال للمجمّع / تحرير المؤشر إذا لم تُجلب كل الصفوف).
+    """
+    _pending = None  # (sql, params, normalized, site, elapsed, rows)
+
+    def execute(self, sql, params=()):
+        self._finish()
+        site = call_site()
+        start = time.perf_counter()
+        super().execute(sql, params)
+        self._pending = [sql, params, normalize(sql), site, time.perf_counter() - start, 0]
+        if self.description is None:
+            # جملة كتابة: لا صفوف للجلب
+            self._pending[5] = self.rowcount
+            self._finish()
+        else:
+            # جملة قراءة قد لا تُجلب كل صفوفها: تُنهى عند إعادة الاتصال للمجمّع (unhold)
+            self.connection.reading.add(self)
+        return self
+
+    def executemany(self, sql, seq_of_params):
+        self._finish()
+        site = call_site()
+        seq_of_params = list(seq_of_params)
+        start = time.perf_counter()
+        super().executemany(sql, seq_of_params)
+        self._pending = [sql, seq_of_params[0] if seq_of_params else (), normalize(sql), site,
+                         time.perf_counter() - start, self.rowcount]
+        self._finish()
+        return self
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        if self._pending:
+            self._pending[4] += time.perf_counter() - start
+            if row is None:
+                self._finish()
+            else:
+                self._pending[5] += 1
+        return row
+
+    def __next__(self):
+        start = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._finish()
+            raise
+        if self._pending:
+            self._pending[4] += time.perf_counter() - start
+            self._pending[5] += 1
+        return row
+
+    def fetchmany(self, size=None):
+        start = time.perf_counter()
+        rows = super().fetchmany(size if size is not None else self.arraysize)
+        if self._pending:
+            self._pending[4] += time.perf_counter() - start
+            self._pending[5] += len(rows)
+            if not rows:
+                self._finish()
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        if self._pending:
+            self._pending[4] += time.perf_counter() - start
+            self._pending[5] += len(rows)
+            self._finish()
+        return rows
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        # قد يُحرر المؤشر بعد إعادة اتصاله للمجمّع واستعارته من خيط آخر: EXPLAIN فقط إن كان الاتصال مع هذا الخيط
+        self._finish(explain=self.connection.held())
+
+    def _finish(self, explain=True):
+        pending, self._pending = self._pending, None
+        if pending is None:
+            return
+        sql, params, normalized, site, elapsed, rows = pending
+        stats.record(normalized, site, elapsed, rows)
+        if elapsed * 1000 >= SLOW_QUERY_MS:
+            _report_slow(self.connection if explain else None, sql, params, normalized, site, elapsed, rows)
+
+
+class TracedConnection(sqlite3.Connection):
+    """اتصال ينشئ مؤشرات TracedCursor (بما فيها الاختصارات conn.execute/executemany)"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.reading = weakref.WeakSet()  # مؤشرات قراءة لم يُسجل قياسها بعد
+        self._holder = threading.local()  # عمق الاستعارة في كل خيط
+
+    def hold(self):
+        """DatabaseManager يستدعيها عند استعارة الاتصال من المجمّع (تقبل التداخل في نفس الخيط)"""
+        self._holder.depth = getattr(self._holder, "depth", 0) + 1
+
+    def unhold(self):
+        """
+        قبل إعادة الاتصال للمجمّع: عند آخر استعارة متداخلة يُسجل قياس كل قراءة لم تُجلب صفوفها كاملة
+        ما دام الاتصال مع هذا الخيط (بعدها قد يستعيره خيط آخر).
+        """
+        self._holder.depth -= 1
+        if self._holder.depth:
+            return
+        cursors, self.reading = list(self.reading), weakref.WeakSet()
+        for cursor in cursors:
+            cursor._finish()
+
+    def held(self):
+        """هل الاتصال مستعار حالياً من الخيط المستدعي؟"""
+        return getattr(self._holder, "depth", 0) > 0
+
+    def cursor(self, factory=TracedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, params=()):
+        return self.cursor().execute(sql, params)
+
+    def executemany(self, sql, seq_of_params):
+        return self.cursor().executemany(sql, seq_of_params)
+
+
+def install_exit_dump():
+    """حفظ الإحصائيات في ملف عند إغلاق التطبيق (مرة واحدة)"""
+    if not getattr(install_exit_dump, "done", False):
+        atexit.register(stats.dump)
+        install_exit_dump.done = True
+
+
+def print_report(entries, header=""):
+    if header:
+        print(header)
+    print(f"{'calls':>8}{'total ms':>11}{'avg ms':>9}{'max ms':>9}{'rows':>9}{'slow':>6}  statement / top call site")
+    for e in entries:
+        site = max(e["sites"].items(), key=lambda kv: kv[1])[0] if e["sites"] else "?"
+        print(f"{e['calls']:>8}{e['total_ms']:>11.1f}{e['avg_ms']:>9.3f}{e['max_ms']:>9.1f}{e['rows']:>9}"
+              f"{e['slow']:>6}  {e['sql'][:100]}")
+        print(f"{'':>52}↳ {site}")
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="تقرير أكثر جمل SQL استهلاكاً للوقت (من آخر تشغيل للتطبيق)")
+    parser.add_argument("path", nargs="?", default=SQL_STATS_FILE)
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--sort", choices=["total", "avg", "max", "calls", "rows"], default="total")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.path):
+        print(f"لا يوجد ملف إحصائيات: {args.path} (شغّل التطبيق مع SQL_TRACE مفعّل أولاً)")
+        return
+    with open(args.path, encoding="utf-8") as f:
+        data = json.load(f)
+    entries = data["statements"]
+    for e in entries:
+        e["avg_ms"] = e["total_ms"] / e["calls"]
+    key = {"total": "total_ms", "avg": "avg_ms", "max": "max_ms", "calls": "calls", "rows": "rows"}[args.sort]
+    entries.sort(key=lambda e: e[key], reverse=True)
+    duration = data["ended"] - data["started"]
+    print_report(entries[:args.top], f"{len(entries)} statements over {duration:.0f}s, sorted by {args.sort}:\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,37 @@
+import importlib
 import sys
+import time
+
+# وضع قياس الإقلاع يبدأ قبل أي استيراد آخر حتى يشمل PyQt والصفحات (راجع utils/startup_profile.py)
+from config import PAGE_WARMUP_MS, STARTUP_PROFILE
+from utils import startup_profile
+if STARTUP_PROFILE:
+    startup_profile.enable()
+
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,
                              QHBoxLayout, QPushButton, QLabel, QStackedWidget, QFrame, QMessageBox)
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QTimer
 from PyQt5.QtGui import QFont, QIcon
 
-# --- استدعاء جميع الصفحات ---
+# --- نافذة الدخول فقط؛ وحدات الصفحات تُستورد عند بناء كل صفحة (page_class) ---
 from ui.login_window import LoginWindow
 from database.db_manager import DatabaseManager
-from ui.inventory_page import InventoryPage
-from ui.pos_page import POSPage
-from ui.reports_page import ReportsPage
-from ui.users_page import UsersPage
-from ui.home_page import HomePage
-from ui.suppliers_page import SuppliersPage
-from ui.customers_page import CustomersPage
-from ui.purchases_page import PurchasesPage
+from database.change_log import change_watcher
+from utils.invoice_queue import render_queue
+
+# ترتيب بناء الصفحات في الخلفية بعد ظهور النافذة: نقطة البيع أولاً لأنها الأكثر استخداماً
+WARMUP_ORDER = [5, 1, 4, 2, 3, 6, 7]
+# المهلة بين بناء صفحة والتي تليها، حتى تبقى الواجهة مستجيبة أثناء التحميء
+WARMUP_STEP_MS = 300
+
+
+def page_class(module, name):
+    """
+    كلاس الصفحة من وحدتها، تُستورد عند أول بناء للصفحة لا عند بدء التطبيق
+    (استيراد وحدات الصفحات وما تعتمد عليه من DAOs ونماذج كان جزءاً من زمن الإقلاع البارد)
+    """
+    return getattr(importlib.import_module(module), name)
+
 
 # --- النافذة الرئيسية ---
 class MainWindow(QMainWindow):
@@ -74,10 +91,10 @@ class MainWindow(QMainWindow):
                 border-left: 6px solid #3498DB; 
             }
         """)
-;/
+
         sidebar_layout = QVBoxLayout(self.sidebar_frame)
         sidebar_layout.setContentsMargins(0, 0, 0, 0)
-        sidebar_layout.setSpacing(10)gi
+        sidebar_layout.setSpacing(10)
 
         # عنوان أو لوجو في الأعلى
         title_label = QLabel("Pharmacy Management")
@@ -176,23 +193,54 @@ class MainWindow(QMainWindow):
         # 2. الصفحات (Stacked Widget)
         self.pages = QStackedWidget()
 
+        # الصفحات لا تُبنى كلها عند الدخول (كل صفحة تنشئ الـ DAO وتحمل بياناتها):
+        # كل صفحة تُبنى عند أول فتح لها، أو في الخلفية بعد ظهور النافذة (warm_next_page)
         # ملاحظة: نقوم بتمرير self.user_role لبعض الصفحات التي تحتاج لضبط صلاحيات داخلية لاحقاً
-        self.pages.addWidget(HomePage())       # 0
-        self.pages.addWidget(InventoryPage(self.user_role))  # 1
-        self.pages.addWidget(SuppliersPage())  # 2
-        self.pages.addWidget(PurchasesPage())  # 3
-        self.pages.addWidget(CustomersPage())  # 4
-        self.pages.addWidget(POSPage())        # 5
-        self.pages.addWidget(ReportsPage())    # 6
-        self.pages.addWidget(UsersPage())      # 7
+        self.page_factories = [
+            lambda: page_class("ui.home_page", "HomePage")(),                            # 0
+            lambda: page_class("ui.inventory_page", "InventoryPage")(self.user_role),    # 1
+            lambda: page_class("ui.suppliers_page", "SuppliersPage")(),                  # 2
+            lambda: page_class("ui.purchases_page", "PurchasesPage")(),                  # 3
+            lambda: page_class("ui.customers_page", "CustomersPage")(),                  # 4
+            lambda: page_class("ui.pos_page", "POSPage")(),                              # 5
+            lambda: page_class("ui.reports_page", "ReportsPage")(),                      # 6
+            lambda: page_class("ui.users_page", "UsersPage")(),                          # 7
+        ]
+        self.page_build_ms = {}  # رقم الصفحة -> زمن بنائها (ms)
+        for _ in self.page_factories:
+            self.pages.addWidget(QWidget())  # مكان مؤقت حتى تُبنى الصفحة
 
         content_layout.addWidget(self.pages)
         self.main_layout.addWidget(content_widget)
         self.btn_home.click()
 
+        if PAGE_WARMUP_MS >= 0:
+            QTimer.singleShot(PAGE_WARMUP_MS, self.warm_next_page)
+
+    def page(self, index):
+        """الصفحة رقم index، تُبنى (مع استيراد وحدتها) عند أول طلب لها ويُسجل زمن بنائها"""
+        if index not in self.page_build_ms:
+            start = time.perf_counter()
+            widget = self.page_factories[index]()
+            self.page_build_ms[index] = (time.perf_counter() - start) * 1000
+
+            placeholder = self.pages.widget(index)
+            self.pages.removeWidget(placeholder)
+            placeholder.deleteLater()
+            self.pages.insertWidget(index, widget)
+        return self.pages.widget(index)
+
+    def warm_next_page(self):
+        """بناء صفحة واحدة لم تُفتح بعد (من الصفحات المسموحة لدور المستخدم) ثم جدولة التالية"""
+        for index in WARMUP_ORDER:
+            if index not in self.page_build_ms and not self.nav_buttons[index].isHidden():
+                self.page(index)
+                QTimer.singleShot(WARMUP_STEP_MS, self.warm_next_page)
+                return
+
     def switch_page(self, index, button):
         """دالة للتبديل بين الصفحات"""
-        self.pages.setCurrentIndex(index)
+        self.pages.setCurrentWidget(self.page(index))
         self.page_title.setText(button.text().strip())
         for btn in self.nav_buttons:
             btn.setChecked(False)
@@ -221,20 +269,29 @@ class AppController:
 
     def show_login(self):
         self.login_window = LoginWindow(self.show_main)
+        startup_profile.watch_paint(self.login_window, "login_window")
         self.login_window.show()
 
     def show_main(self, user_role):
+        startup_profile.mark("login")
         self.login_window.close()
         self.main_window = MainWindow(user_role)
+        startup_profile.watch_paint(self.main_window, "main_window", since="login", final=True)
         self.main_window.show()
+        # كشف كتابات الأجهزة/السكربتات الأخرى (لوحة التحكم والتقارير)
+        change_watcher.start()
 
 
 if __name__ == "__main__":
+    startup_profile.mark("imports")
     app = QApplication(sys.argv)
     font = QFont("Times New Roman", 12)
     app.setFont(font)
     app.setLayoutDirection(Qt.RightToLeft)
 
+    app.aboutToQuit.connect(change_watcher.stop)
+    # الفواتير المعلقة تكتمل ثم تُغلق عمليات التوليد (لا تبقى عمليات يتيمة بعد الخروج)
+    app.aboutToQuit.connect(render_queue.shutdown)
     controller = AppController()
     controller.show_login()
 
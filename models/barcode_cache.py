@@ -0,0 +1,74 @@
+import threading
+
+from utils.change_bus import MEDICINE_EVENTS, TablesChanged, change_bus, medicine_changes
+
+
+class BarcodeCache:
+    """
+    ذاكرة مؤقتة داخل العملية: باركود -> صف الدواء (id, name, sell_price, quantity, barcode).
+    تُفرغ المداخل المتأثرة عند أي كتابة على الأدوية (إضافة/حذف/تصفير/شراء/بيع) عبر أحداث change_bus،
+    وتُفرغ كلها عند كتابة من جهاز أو سكربت آخر (TablesChanged لا يحمل أرقام الأدوية).
+    """
+
+    def __init__(self, max_size=50000):
+        self._rows = {}
+        self._by_id = {}          # medicine_id -> barcode (للإبطال حسب رقم الدواء)
+        self._lock = threading.Lock()
+        self._max_size = max_size
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, barcode):
+        with self._lock:
+            row = self._rows.get(barcode)
+            if row is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return row
+
+    def put(self, barcode, row):
+        with self._lock:
+            if len(self._rows) >= self._max_size:
+                # حد أقصى بسيط للذاكرة: نبدأ من جديد بدلاً من تتبع الأقدم
+                self._rows.clear()
+                self._by_id.clear()
+            self._rows[barcode] = row
+            self._by_id[row[0]] = barcode
+
+    def invalidate(self, medicine_ids):
+        """إبطال أدوية محددة بعد تعديل بياناتها أو كمياتها"""
+        with self._lock:
+            for med_id in medicine_ids:
+                barcode = self._by_id.pop(int(med_id), None)
+                if barcode is not None:
+                    self._rows.pop(barcode, None)
+
+    def clear(self):
+        with self._lock:
+            self._rows.clear()
+            self._by_id.clear()
+
+
+# نسخة واحدة مشتركة لكل الـ DAOs في العملية
+barcode_cache = BarcodeCache()
+
+
+def _on_medicines_changed(event):
+    # متزامن في خيط الكاتب: الإبطال يتم قبل أن تعود دالة الكتابة
+    changed, deleted = medicine_changes(event)
+    barcode_cache.invalidate([*changed, *deleted])
+
+
+# الجداول التي تحدد سعر الدواء وكميته في صفوف الذاكرة
+CACHED_TABLES = frozenset({"medicines", "batches"})
+
+
+def _on_tables_changed(event):
+    # في خيط مراقب التغييرات: كتابة خارجية لا نعرف أدويتها
+    if event.tables & CACHED_TABLES:
+        barcode_cache.clear()
+
+
+change_bus.subscribe(MEDICINE_EVENTS, _on_medicines_changed)
+change_bus.subscribe((TablesChanged,), _on_tables_changed)
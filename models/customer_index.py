@@ -0,0 +1,223 @@
+"""
+فهرس بادئات العملاء في الذاكرة لاختيار العميل في نقطة البيع (بدلاً من تحميل كل العملاء في قائمة منسدلة):
+- كلمات الأسماء الموحّدة (normalize_name) المختلفة في قائمة مرتبة، ولكل كلمة مصفوفة أرقام عملائها؛
+  البحث بالبادئة = bisect ثم قراءة الكلمات المتجاورة (مثل النزول في trie لكن بدون عقدة dict لكل حرف).
+  الكلمات تتكرر كثيراً بين العملاء (محمد، علي...) فتُخزن مرة واحدة، وأرقام العملاء 8 بايت لكل كلمة.
+- الهواتف (أرقام فقط) في قائمة مرتبة موازية لمصفوفة أرقام العملاء.
+- كل كلمة في النص يجب أن تكون بداية لكلمة في الاسم (بأي ترتيب)، مثل prefix_words_match؛
+  يبدأ البحث من أندر كلمة ويتوقف عند TOP_MATCHES نتيجة.
+- التحميل مرة واحدة في الخلفية (load)، ثم يبقى متزامناً مع كتابات CustomersDAO عبر أحداث change_bus،
+  ومع كتابات الأجهزة الأخرى عبر TablesChanged (إعادة تحميل كاملة؛ المراقب لا ينشر كتابات التطبيق نفسه).
+- قبل اكتمال التحميل تُخدم lookup بنفس المطابقة من SQLite (CustomersDAO.lookup_customers وعمودا name_norm/phone_norm).
+"""
+import sys
+import threading
+from array import array
+from bisect import bisect_left
+
+from models.customers_dao import CustomersDAO
+from models.text_match import normalize_name, normalize_phone
+from utils.change_bus import CustomersChanged, CustomersDeleted, TablesChanged, change_bus
+
+TOP_MATCHES = 20
+
+
+def _words(name_norm):
+    # sys.intern: نسخة واحدة من كل كلمة مهما تكرر الاسم
+    return tuple(sys.intern(word) for word in name_norm.split())
+
+
+def _prefix_range(keys, prefix):
+    """المفاتيح المرتبة التي تبدأ بـ prefix: (أول موضع، آخر موضع + 1)"""
+    start = bisect_left(keys, prefix)
+    return start, bisect_left(keys, prefix + "\U0010FFFF", start)
+
+
+class CustomerIndex:
+    def __init__(self):
+        self._dao = None         # يُنشأ عند أول استخدام (استيراد الوحدة لا يفتح قاعدة البيانات)
+        self._lock = threading.Lock()
+        self._words = []         # الكلمات المختلفة مرتبة
+        self._postings = {}      # الكلمة -> array أرقام العملاء
+        self._phone_keys = []    # أرقام الهواتف مرتبة
+        self._phone_ids = array("q")
+        self._customers = {}     # id -> (name, phone, كلمات الاسم)
+        self._loaded = False
+        self._loading = False
+        self._pending = set()    # عملاء تغيروا أثناء التحميل
+        self.stats = {"loads": 0, "lookups": 0, "sql_lookups": 0, "patched": 0}
+
+    @property
+    def dao(self):
+        if self._dao is None:
+            self._dao = CustomersDAO()
+        return self._dao
+
+    @property
+    def loaded(self):
+        return self._loaded
+
+    def load(self):
+        """تحميل كل العملاء وبناء الفهرس (في خيط خلفي)؛ يعيد عدد العملاء"""
+        with self._lock:
+            self._loading = True
+            self._pending.clear()
+        customers, postings, phones = {}, {}, []
+        # name_norm محسوب مسبقاً في الجدول (الترحيل 10 وadd_customer)؛ يُحسب هنا فقط إن كان فارغاً
+        for customer_id, name, phone, name_norm in self.dao.get_lookup_rows():
+            words = _words(name_norm or normalize_name(name))
+            customers[customer_id] = (name, phone, words)
+            for word in set(words):
+                postings.setdefault(word, array("q")).append(customer_id)
+            digits = normalize_phone(phone)
+            if digits:
+                # الهاتف المخزن أرقاماً فقط (الغالب) يُشارك نفس الكائن بدلاً من نسخة ثانية
+                phones.append((phone if digits == phone else digits, customer_id))
+        phones.sort()
+        with self._lock:
+            self._customers, self._postings = customers, postings
+            self._words = sorted(postings)
+            self._phone_keys = [digits for digits, _ in phones]
+            self._phone_ids = array("q", (customer_id for _, customer_id in phones))
+            self._loaded = True
+            self._loading = False
+            pending, self._pending = self._pending, set()
+            self.stats["loads"] += 1
+        if pending:
+            # كتابات حدثت بين قراءة الجدول واستبدال الفهرس
+            self.refresh_ids(pending)
+        return len(customers)
+
+    def lookup(self, text, limit=TOP_MATCHES):
+        """(id, name, phone) لأفضل العملاء المطابقين لبدايات كلمات الاسم أو لبداية الهاتف"""
+        tokens = normalize_name(text).split()
+        digits = normalize_phone(text)
+        if not tokens:
+            return []
+        if not self._loaded:
+            self.stats["sql_lookups"] += 1
+            return self.dao.lookup_customers(text, limit)
+
+        with self._lock:
+            self.stats["lookups"] += 1
+            ids = []
+            # نص من أرقام فقط: الهاتف أولاً
+            if digits and digits == "".join(tokens):
+                self._match_phone(digits, ids, limit)
+                self._match_names(tokens, ids, limit)
+            else:
+                self._match_names(tokens, ids, limit)
+                if digits:
+                    self._match_phone(digits, ids, limit)
+            return [(customer_id, *self._customers[customer_id][:2]) for customer_id in ids]
+
+    def _match_phone(self, digits, ids, limit):
+        start, end = _prefix_range(self._phone_keys, digits)
+        for position in range(start, end):
+            if len(ids) >= limit:
+                return
+            customer_id = self._phone_ids[position]
+            if customer_id not in ids:
+                ids.append(customer_id)
+
+    def _match_names(self, tokens, ids, limit):
+        # كلمات الفهرس المطابقة لكل كلمة في النص، والبدء بالكلمة ذات أقل عدد عملاء
+        candidates = []
+        for token in tokens:
+            start, end = _prefix_range(self._words, token)
+            words = self._words[start:end]
+            if not words:
+                return
+            candidates.append((sum(len(self._postings[word]) for word in words), token, words))
+        candidates.sort(key=lambda candidate: candidate[0])
+        others = [token for _, token, _ in candidates[1:]]
+        for word in candidates[0][2]:
+            for customer_id in self._postings[word]:
+                if len(ids) >= limit:
+                    return
+                if customer_id in ids:
+                    continue
+                name_words = self._customers[customer_id][2]
+                if all(any(name_word.startswith(token) for name_word in name_words) for token in others):
+                    ids.append(customer_id)
+
+    def get(self, customer_id):
+        """(name, phone) لعميل مفهرس أو None"""
+        with self._lock:
+            customer = self._customers.get(customer_id)
+            return customer[:2] if customer else None
+
+    def refresh_ids(self, ids):
+        """إعادة قراءة عملاء محددين من قاعدة البيانات (غير الموجود منهم يُحذف من الفهرس)"""
+        rows = self.dao.get_customers_by_ids(ids)
+        with self._lock:
+            if self._loading:
+                self._pending.update(ids)
+                return
+            if not self._loaded:
+                return  # التحميل الأول سيقرأ البيانات الحالية
+            for customer_id in ids:
+                self._remove(customer_id)
+            for row in rows:
+                self._add(row[0], row[1], row[2])
+            self.stats["patched"] += len(ids)
+
+    def remove_ids(self, ids):
+        with self._lock:
+            if self._loading:
+                self._pending.update(ids)
+                return
+            for customer_id in ids:
+                self._remove(customer_id)
+
+    def _add(self, customer_id, name, phone):
+        words = _words(normalize_name(name))
+        self._customers[customer_id] = (name, phone, words)
+        for word in set(words):
+            if word not in self._postings:
+                self._postings[word] = array("q")
+                self._words.insert(bisect_left(self._words, word), word)
+            self._postings[word].append(customer_id)
+        digits = normalize_phone(phone)
+        if digits:
+            position = bisect_left(self._phone_keys, digits)
+            self._phone_keys.insert(position, digits)
+            self._phone_ids.insert(position, customer_id)
+
+    def _remove(self, customer_id):
+        old = self._customers.pop(customer_id, None)
+        if old is None:
+            return
+        _, phone, words = old
+        for word in set(words):
+            ids = self._postings.get(word)
+            if ids is not None and customer_id in ids:
+                ids.remove(customer_id)
+                if not ids:
+                    del self._postings[word]
+                    del self._words[bisect_left(self._words, word)]
+        digits = normalize_phone(phone)
+        start, end = _prefix_range(self._phone_keys, digits) if digits else (0, 0)
+        for position in range(start, end):
+            if self._phone_keys[position] == digits and self._phone_ids[position] == customer_id:
+                del self._phone_keys[position]
+                del self._phone_ids[position]
+                break
+
+
+# نسخة واحدة مشتركة في العملية (تُحمّل عند فتح نقطة البيع)
+customer_index = CustomerIndex()
+
+
+def _on_customers_changed(event):
+    # متزامن في خيط الكاتب: الفهرس محدث قبل أن تصل الصفحات إشعارها
+    if isinstance(event, CustomersDeleted):
+        customer_index.remove_ids(event.ids)
+    elif isinstance(event, CustomersChanged):
+        customer_index.refresh_ids(event.ids)
+    elif "customers" in event.tables and customer_index.loaded:
+        # كتابة من جهاز أو سكربت آخر (كتابات التطبيق طُبقت أعلاه ولا تصل هنا): إعادة بناء كاملة في خيط المراقب
+        customer_index.load()
+
+
+change_bus.subscribe((CustomersChanged, CustomersDeleted, TablesChanged), _on_customers_changed)
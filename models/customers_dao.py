@@ -1,81 +1,123 @@
 from database.db_manager import DatabaseManager
+from models.text_match import like_filter, normalize_name, normalize_phone
+from utils.change_bus import CustomersChanged, CustomersDeleted, change_bus
 
 class CustomersDAO:
     def __init__(self):
         self.db = DatabaseManager()
-        self.create_table()
-
-    def create_table(self):
-        """إنشاء جدول العملاء إذا لم يكن موجوداً"""
-        conn = self.db.connect()
-        if conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS customers (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name TEXT NOT NULL,
-                    phone TEXT,
-                    email TEXT,
-                    notes TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-            conn.commit()
-            conn.close()
 
     def add_customer(self, name, phone, email, notes):
         """إضافة عميل جديد"""
-        conn = self.db.connect()
-        if conn:
-            cursor = conn.cursor()
-            try:
-                cursor.execute("INSERT INTO customers (name, phone, email, notes) VALUES (?, ?, ?, ?)",
-                               (name, phone, email, notes))
-                conn.commit()
-                return True, "تمت إضافة العميل بنجاح"
-            except Exception as e:
-                return False, f"خطأ: {e}"
-            finally:
-                conn.close()
+        with self.db.connection() as conn:
+            if conn:
+                cursor = conn.cursor()
+                try:
+                    cursor.execute("""INSERT INTO customers (name, phone, email, notes, name_norm, phone_norm)
+                                      VALUES (?, ?, ?, ?, ?, ?)""",
+                                   (name, phone, email, notes, normalize_name(name), normalize_phone(phone) or None))
+                    conn.commit()
+                    change_bus.publish(CustomersChanged((cursor.lastrowid,)))
+                    return True, "تمت إضافة العميل بنجاح"
+                except Exception as e:
+                    return False, f"خطأ: {e}"
         return False, "تعذر الاتصال بقاعدة البيانات"
 
     def get_all_customers(self):
         """جلب جميع العملاء"""
-        conn = self.db.connect()
-        if conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT id, name, phone, email, notes FROM customers ORDER BY id DESC")
-            data = cursor.fetchall()
-            conn.close()
-            return data
+        with self.db.connection() as conn:
+            if conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT id, name, phone, email, notes FROM customers ORDER BY id DESC")
+                return cursor.fetchall()
+        return []
+
+    def get_customers_by_ids(self, ids):
+        """صفوف عملاء محددين بنفس أعمدة get_all_customers (لتحديث الصفوف المتأثرة فقط)"""
+        ids = list(ids)
+        if not ids:
+            return []
+        with self.db.connection() as conn:
+            if conn:
+                cursor = conn.cursor()
+                cursor.execute(f"SELECT id, name, phone, email, notes FROM customers WHERE id IN ({', '.join('?' * len(ids))})",
+                               ids)
+                return cursor.fetchall()
+        return []
+
+    def get_lookup_rows(self):
+        """(id, name, phone, name_norm) لكل العملاء لبناء فهرس الاختيار في الذاكرة (models/customer_index.py)"""
+        with self.db.connection() as conn:
+            if conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT id, name, phone, name_norm FROM customers")
+                return cursor.fetchall()
+        return []
+
+    def lookup_customers(self, text, limit=20):
+        """
+        (id, name, phone) بنفس مطابقة models/customer_index.py (المسار الأساسي؛ هذه الدالة لما قبل اكتمال تحميله):
+        - بداية الهاتف الموحّد phone_norm بنطاق على idx_customers_phone_norm.
+        - كل كلمة في النص بداية لكلمة ما في name_norm بأي ترتيب (بداية الاسم أو بعد مسافة) أثناء المرور
+          على idx_customers_name_norm بترتيبه، فيتوقف عند limit نتيجة بدون فرز.
+        نص من أرقام فقط: الهاتف أولاً. الترتيب داخل كل جزء قد يختلف عن الفهرس، لا المجموعة.
+        """
+        tokens = normalize_name(text).split()
+        digits = normalize_phone(text)
+        if not tokens:
+            return []
+        words = " AND ".join(["(name_norm >= ? AND name_norm < ? OR instr(name_norm, ?) > 0)"] * len(tokens))
+        names = (f"""SELECT id, name, phone FROM customers
+                     WHERE {words} ORDER BY name_norm LIMIT ?""",
+                 [value for token in tokens for value in (token, token + "\U0010FFFF", " " + token)])
+        phones = ("""SELECT id, name, phone FROM customers
+                     WHERE phone_norm >= ? AND phone_norm < ? ORDER BY phone_norm LIMIT ?""",
+                  [digits, digits + "\U0010FFFF"])
+        if digits and digits == "".join(tokens):
+            queries = [phones, names]
+        else:
+            queries = [names, phones] if digits else [names]
+        with self.db.connection() as conn:
+            if conn:
+                cursor = conn.cursor()
+                rows, seen = [], set()
+                for sql, params in queries:
+                    if len(rows) >= limit:
+                        break
+                    for row in cursor.execute(sql, (*params, limit)).fetchall():
+                        if len(rows) < limit and row[0] not in seen:
+                            seen.add(row[0])
+                            rows.append(row)
+                return rows
         return []
 
     def delete_customer(self, customer_id):
         """حذف عميل"""
-        conn = self.db.connect()
-        if conn:
-            cursor = conn.cursor()
-            try:
-                cursor.execute("DELETE FROM customers WHERE id = ?", (customer_id,))
-                conn.commit()
-                return True, "تم الحذف بنجاح"
-            except Exception as e:
-                return False, f"خطأ: {e}"
-            finally:
-                conn.close()
+        with self.db.connection() as conn:
+            if conn:
+                cursor = conn.cursor()
+                try:
+                    cursor.execute("DELETE FROM customers WHERE id = ?", (customer_id,))
+                    conn.commit()
+                    change_bus.publish(CustomersDeleted((customer_id,)))
+                    return True, "تم الحذف بنجاح"
+                except Exception as e:
+                    return False, f"خطأ: {e}"
         return False, "فشل الاتصال"
 
     def search_customer(self, text):
         """البحث عن عميل بالاسم أو الهاتف"""
-        conn = self.db.connect()
-        if conn:
-            cursor = conn.cursor()
-            query = """SELECT id, name, phone, email, notes 
-                       FROM customers 
-                       WHERE name LIKE ? OR phone LIKE ?"""
-            search_term = f"%{text}%"
-            cursor.execute(query, (search_term, search_term))
-            data = cursor.fetchall()
-            conn.close()
-            return data
-        return []
\ No newline at end of file
+        with self.db.connection() as conn:
+            if conn:
+                cursor = conn.cursor()
+                query = """SELECT id, name, phone, email, notes 
+                           FROM customers 
+                           WHERE name LIKE ? OR phone LIKE ?
+                           ORDER BY id DESC"""
+                search_term = f"%{text}%"
+                cursor.execute(query, (search_term, search_term))
+                return cursor.fetchall()
+        return []
+
+    def refine_search(self, rows, text):
+        """تصفية نتيجة search_customer لنص سابق (بداية text) في الذاكرة بنفس شرط LIKE، أو None إن تعذر"""
+        return like_filter(rows, text, (1, 2))
@@ -15,38 +15,37 @@ class DashboardDAO:
             "expiring_soon": 0   # الميزة الجديدة (تنبيه الصلاحية)
         }
 
-        conn = self.db.connect()
-        if conn:
-            cursor = conn.cursor()
-            try:
-                # 1. عدد الأدوية الكلي
-                cursor.execute("SELECT COUNT(*) FROM medicines")
-                stats["total_medicines"] = cursor.fetchone()[0]
-
-                # 2. الأدوية التي وصلت للحد الأدنى (النواقص)
-                cursor.execute("SELECT COUNT(*) FROM medicines WHERE quantity <= min_stock_alert")
-                stats["low_stock"] = cursor.fetchone()[0]
-
-                # 3. مبيعات اليوم
-                today = datetime.now().strftime("%Y-%m-%d")
-                cursor.execute("SELECT SUM(total_amount) FROM sales WHERE date(sale_date) = ?", (today,))
-                result = cursor.fetchone()[0]
-                stats["today_sales"] = result if result else 0.0
-
-                # 4. عدد المستخدمين (كما في كودك الأصلي)
-                cursor.execute("SELECT COUNT(*) FROM users")
-                stats["users_count"] = cursor.fetchone()[0]
-
-                # 5. الميزة الجديدة: صلاحية قريبة (خلال 90 يوم من اليوم)
-                cursor.execute("""
-                    SELECT COUNT(*) FROM medicines 
-                    WHERE expiry_date BETWEEN ? AND date(?, '+90 days')
-                """, (today, today))
-                stats["expiring_soon"] = cursor.fetchone()[0]
-
-            except Exception as e:
-                print(f"Error fetching stats: {e}")
-            finally:
-                conn.close()
+        with self.db.connection() as conn:
+            if conn:
+                cursor = conn.cursor()
+                try:
+                    # 1. عدد الأدوية الكلي
+                    cursor.execute("SELECT COUNT(*) FROM medicines")
+                    stats["total_medicines"] = cursor.fetchone()[0]
+
+                    # 2. الأدوية التي وصلت للحد الأدنى (النواقص)
+                    cursor.execute("SELECT COUNT(*) FROM medicines WHERE quantity <= min_stock_alert")
+                    stats["low_stock"] = cursor.fetchone()[0]
+
+                    # 3. مبيعات اليوم: صف واحد من جدول التجميع اليومي (تحدّثه Triggers مع كل بيع)
+                    today = datetime.now().strftime("%Y-%m-%d")
+                    cursor.execute("SELECT total FROM daily_sales_rollup WHERE day = ?", (today,))
+                    result = cursor.fetchone()
+                    stats["today_sales"] = result[0] if result else 0.0
+
+                    # 4. عدد المستخدمين (كما في كودك الأصلي)
+                    cursor.execute("SELECT COUNT(*) FROM users")
+                    stats["users_count"] = cursor.fetchone()[0]
+
+                    # 5. صلاحية قريبة (خلال 90 يوم من اليوم): التشغيلات التي فيها مخزون،
+                    # من تقويم الصلاحية (صف لكل يوم تحدّثه Triggers) بدلاً من medicines.expiry_date
+                    cursor.execute("""
+                        SELECT IFNULL(SUM(batch_count), 0) FROM expiry_calendar 
+                        WHERE day BETWEEN ? AND date(?, '+90 days')
+                    """, (today, today))
+                    stats["expiring_soon"] = cursor.fetchone()[0]
+
+                except Exception as e:
+                    print(f"Error fetching stats: {e}")
 
         return stats
\ No newline at end of file
@@ -0,0 +1,92 @@
+from database.db_manager import DatabaseManager
+from datetime import date, timedelta
+
+# حجم الصفحة الافتراضي لقائمة التشغيلات الأقرب انتهاءً (ترقيم keyset)
+PAGE_SIZE = 500
+
+# شرائح الصلاحية: (المفتاح، العنوان، آخر يوم في الشريحة بعد اليوم)؛ كل شريحة تبدأ بعد سابقتها
+BUCKETS = [
+    ("expired", "منتهية الصلاحية", -1),
+    ("30", "خلال 30 يوماً", 30),
+    ("60", "من 31 إلى 60 يوماً", 60),
+    ("90", "من 61 إلى 90 يوماً", 90),
+]
+
+
+class ExpiryEngine:
+    """
+    محرك الصلاحية على مستوى التشغيلات (batches) التي فيها مخزون، وليس medicines.expiry_date:
+    - الشرائح والقيمة المعرضة للخسارة (الكمية × سعر شراء التشغيلة) تُقرأ من تقويم الصلاحية
+      (expiry_calendar، صف لكل يوم تحدّثه Triggers مع كل بيع/إضافة) لا من مسح التشغيلات.
+    - قائمة التشغيلات الأقرب انتهاءً بترقيم keyset عبر الفهرس الجزئي idx_batches_live_expiry.
+    """
+
+    def __init__(self):
+        self.db = DatabaseManager()
+
+    def buckets(self, today=None):
+        """
+        قائمة dict لكل شريحة بترتيب BUCKETS:
+        key، label، batches (عدد التشغيلات)، quantity، value (بسعر الشراء)
+        """
+        today = today or date.today()
+        limits = [(key, (today + timedelta(days=days)).isoformat()) for key, _, days in BUCKETS]
+        # الحدود نصوص ISO: CASE بالترتيب يضع كل يوم في أول شريحة يقع قبل نهايتها
+        case = " ".join(f"WHEN day <= '{limit}' THEN '{key}'" for key, limit in limits)
+        result = {key: {"key": key, "label": label, "batches": 0, "quantity": 0, "value": 0.0}
+                  for key, label, _ in BUCKETS}
+
+        with self.db.connection() as conn:
+            if conn:
+                cursor = conn.cursor()
+                cursor.execute(f"""
+                    SELECT CASE {case} END, SUM(batch_count), SUM(quantity), SUM(value)
+                    FROM expiry_calendar
+                    WHERE day <= ? AND batch_count > 0
+                    GROUP BY 1
+                """, (limits[-1][1],))
+                for key, batches, quantity, value in cursor.fetchall():
+                    result[key].update(batches=batches, quantity=quantity, value=value or 0.0)
+        return [result[key] for key, _, _ in BUCKETS]
+
+    def expiring_count(self, days=90, today=None):
+        """عدد التشغيلات (بمخزون) التي تنتهي من اليوم حتى days يوماً"""
+        today = today or date.today()
+        with self.db.connection() as conn:
+            if conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT IFNULL(SUM(batch_count), 0) FROM expiry_calendar WHERE day BETWEEN ? AND ?",
+                               (today.isoformat(), (today + timedelta(days=days)).isoformat()))
+                return cursor.fetchone()[0]
+        return 0
+
+    def upcoming(self, after=None, limit=PAGE_SIZE, start=None):
+        """
+        صفحة من التشغيلات بمخزون مرتبة بتاريخ الانتهاء (الأقرب أولاً) بترقيم keyset على (expiry_date, id):
+        after = (expiry_date, batch_id) لآخر صف في الصفحة السابقة، أو None للصفحة الأولى.
+        start: أول تاريخ (YYYY-MM-DD)؛ None تعني البدء بالمنتهية فعلاً.
+        الصفوف: (batch_id, اسم الدواء، رقم التشغيلة، تاريخ الانتهاء، الكمية، القيمة بسعر الشراء)
+        """
+        # quantity > 0 شرط الفهرس الجزئي: يجب أن يظهر في الاستعلام حتى يستخدمه المخطط
+        conditions = ["b.quantity > 0"]
+        params = []
+        if after:
+            conditions.append("(b.expiry_date, b.id) > (?, ?)")
+            params.extend(after)
+        elif start:
+            conditions.append("b.expiry_date >= ?")
+            params.append(start)
+
+        with self.db.connection() as conn:
+            if conn:
+                cursor = conn.cursor()
+                cursor.execute(f"""
+                    SELECT b.id, m.name, b.batch_number, b.expiry_date, b.quantity, b.quantity * b.buy_price
+                    FROM batches b
+                    JOIN medicines m ON m.id = b.medicine_id
+                    WHERE {" AND ".join(conditions)}
+                    ORDER BY b.expiry_date, b.id
+                    LIMIT ?
+                """, (*params, limit))
+                return cursor.fetchall()
+        return []
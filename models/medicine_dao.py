@@ -1,113 +1,189 @@
 from database.db_manager import DatabaseManager
+from utils.change_bus import MedicinesChanged, MedicinesDeleted, change_bus
+from models.text_match import WORD_SPLIT, fold, like_filter, prefix_words_match
 import sqlite3
 
 
 class MedicineDAO:
+    # الأعمدة التي تعرضها صفحة المخزون بنفس الترتيب
+    COLUMNS = "id, barcode, name, active_ingredient, buy_price, sell_price, quantity, expiry_date"
+    # نتائج البحث تحمل الوصف في آخر الصف (لا يُعرض) حتى تطبق refine_search نفس شرط FTS محلياً
+    SEARCH_COLUMNS = COLUMNS + ", description"
+    SEARCH_LIMIT = 500
+
     def __init__(self):
         self.db = DatabaseManager()
+        self._fts = None
 
     def add_medicine(self, barcode, name, active_ingredient, buy_price, sell_price, quantity, expiry, supplier_id=None):
         """
         إضافة دواء جديد:
         تقوم هذه الدالة بإنشاء سجل للدواء، وإنشاء 'تشغيلة افتتاحية' بالكمية والسعر المدخلين.
         """
-        conn = self.db.connect()
-        if conn:
-            cursor = conn.cursor()
-            try:
-                # 1. إدراج الدواء في الجدول الرئيسي (medicines)
-                query_med = """INSERT INTO medicines 
-                           (barcode, name, active_ingredient, buy_price, sell_price, quantity, expiry_date, supplier_id) 
-                           VALUES (?, ?, ?, ?, ?, ?, ?, ?)"""
-                cursor.execute(query_med,
-                               (barcode, name, active_ingredient, buy_price, sell_price, quantity, expiry, supplier_id))
-
-                # الحصول على معرف الدواء الجديد (Medicine ID)
-                medicine_id = cursor.lastrowid
-
-                # 2. إدراج بيانات الكمية والسعر في جدول التشغيلات (batches)
-                # نعتبر هذه الدفعة هي 'رصيد افتتاحي' (OPENING_STOCK)
-                query_batch = """INSERT INTO batches 
-                                 (medicine_id, batch_number, expiry_date, buy_price, sell_price, quantity) 
-                                 VALUES (?, ?, ?, ?, ?, ?)"""
-                cursor.execute(query_batch, (medicine_id, "OPENING_STOCK", expiry, buy_price, sell_price, quantity))
-
-                conn.commit()
-                return True, "تمت إضافة الدواء والتشغيلة الافتتاحية بنجاح"
-
-            except sqlite3.IntegrityError:
-                return False, "الباركود موجود مسبقاً! يرجى التحقق من البيانات."
-            except Exception as e:
-                conn.rollback()  # التراجع عن التغييرات في حال حدوث أي خطأ
-                return False, f"خطأ غير متوقع: {e}"
-            finally:
-                conn.close()
+        with self.db.connection() as conn:
+            if conn:
+                cursor = conn.cursor()
+                try:
+                    # 1. إدراج الدواء في الجدول الرئيسي (medicines)
+                    query_med = """INSERT INTO medicines 
+                               (barcode, name, active_ingredient, buy_price, sell_price, quantity, expiry_date, supplier_id) 
+                               VALUES (?, ?, ?, ?, ?, ?, ?, ?)"""
+                    cursor.execute(query_med,
+                                   (barcode, name, active_ingredient, buy_price, sell_price, quantity, expiry, supplier_id))
+
+                    # الحصول على معرف الدواء الجديد (Medicine ID)
+                    medicine_id = cursor.lastrowid
+
+                    # 2. إدراج بيانات الكمية والسعر في جدول التشغيلات (batches)
+                    # نعتبر هذه الدفعة هي 'رصيد افتتاحي' (OPENING_STOCK)
+                    query_batch = """INSERT INTO batches 
+                                     (medicine_id, batch_number, expiry_date, buy_price, sell_price, quantity) 
+                                     VALUES (?, ?, ?, ?, ?, ?)"""
+                    cursor.execute(query_batch, (medicine_id, "OPENING_STOCK", expiry, buy_price, sell_price, quantity))
+
+                    conn.commit()
+                    change_bus.publish(MedicinesChanged((medicine_id,)))
+                    return True, "تمت إضافة الدواء والتشغيلة الافتتاحية بنجاح"
+
+                except sqlite3.IntegrityError:
+                    conn.rollback()
+                    return False, "الباركود موجود مسبقاً! يرجى التحقق من البيانات."
+                except Exception as e:
+                    conn.rollback()  # التراجع عن التغييرات في حال حدوث أي خطأ
+                    return False, f"خطأ غير متوقع: {e}"
         return False, "تعذر الاتصال بقاعدة البيانات"
 
     def get_all_medicines(self):
         """جلب جميع الأدوية"""
-        conn = self.db.connect()
-        if conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                "SELECT id, barcode, name, active_ingredient, buy_price, sell_price, quantity, expiry_date FROM medicines ORDER BY id DESC")
-            data = cursor.fetchall()
-            conn.close()
-            return data
+        with self.db.connection() as conn:
+            if conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    "SELECT id, barcode, name, active_ingredient, buy_price, sell_price, quantity, expiry_date FROM medicines ORDER BY id DESC")
+                return cursor.fetchall()
+        return []
+
+    def get_medicines_by_ids(self, ids):
+        """صفوف أدوية محددة بأعمدة نتائج البحث (SEARCH_COLUMNS) لتحديث الصفوف المتأثرة بعد كتابة"""
+        ids = list(ids)
+        if not ids:
+            return []
+        with self.db.connection() as conn:
+            if conn:
+                cursor = conn.cursor()
+                cursor.execute(f"SELECT {self.SEARCH_COLUMNS} FROM medicines WHERE id IN ({', '.join('?' * len(ids))})",
+                               ids)
+                return cursor.fetchall()
         return []
 
     def delete_medicine(self, medicine_id):
         """حذف دواء (مع حماية وإرجاع كود خطأ خاص إذا كان مرتبطاً بمبيعات)"""
-        conn = self.db.connect()
-        if conn:
-            cursor = conn.cursor()
-            try:
-                # محاولة الحذف
-                cursor.execute("DELETE FROM medicines WHERE id = ?", (medicine_id,))
-                conn.commit()
-                return True, "تم حذف الدواء وسجلاته بنجاح"
-            except sqlite3.Error as e:
-                # التحقق مما إذا كان الخطأ بسبب ارتباط الدواء بمبيعات أو مشتريات سابقة
-                if "FOREIGN KEY" in str(e):
-                    # نرجع كود خاص لنتعامل معه في الواجهة
-                    return False, "FOREIGN_KEY_ERROR"
-                return False, f"خطأ في قاعدة البيانات: {e}"
-            finally:
-                conn.close()
+        with self.db.connection() as conn:
+            if conn:
+                cursor = conn.cursor()
+                try:
+                    # محاولة الحذف
+                    cursor.execute("DELETE FROM medicines WHERE id = ?", (medicine_id,))
+                    conn.commit()
+                    change_bus.publish(MedicinesDeleted((medicine_id,)))
+                    return True, "تم حذف الدواء وسجلاته بنجاح"
+                except sqlite3.Error as e:
+                    conn.rollback()
+                    # التحقق مما إذا كان الخطأ بسبب ارتباط الدواء بمبيعات أو مشتريات سابقة
+                    if "FOREIGN KEY" in str(e):
+                        # نرجع كود خاص لنتعامل معه في الواجهة
+                        return False, "FOREIGN_KEY_ERROR"
+                    return False, f"خطأ في قاعدة البيانات: {e}"
         return False, "فشل الاتصال"
 
     def clear_medicine_stock(self, medicine_id):
         """تصفير كمية الدواء في المخزون الرئيسي وفي جميع التشغيلات"""
-        conn = self.db.connect()
-        if conn:
-            cursor = conn.cursor()
-            try:
-                # 1. تصفير كل التشغيلات لهذا الدواء
-                cursor.execute("UPDATE batches SET quantity = 0 WHERE medicine_id = ?", (medicine_id,))
-
-                # 2. تصفير المخزون الكلي للدواء
-                cursor.execute("UPDATE medicines SET quantity = 0 WHERE id = ?", (medicine_id,))
-
-                conn.commit()
-                return True, "تم تصفير كمية الدواء بنجاح (أصبح خارج المخزون)"
-            except Exception as e:
-                conn.rollback()
-                return False, f"خطأ أثناء التصفير: {e}"
-            finally:
-                conn.close()
+        with self.db.connection() as conn:
+            if conn:
+                cursor = conn.cursor()
+                try:
+                    # 1. تصفير كل التشغيلات لهذا الدواء
+                    cursor.execute("UPDATE batches SET quantity = 0 WHERE medicine_id = ?", (medicine_id,))
+
+                    # 2. تصفير المخزون الكلي للدواء
+                    cursor.execute("UPDATE medicines SET quantity = 0 WHERE id = ?", (medicine_id,))
+
+                    conn.commit()
+                    change_bus.publish(MedicinesChanged((medicine_id,)))
+                    return True, "تم تصفير كمية الدواء بنجاح (أصبح خارج المخزون)"
+                except Exception as e:
+                    conn.rollback()
+                    return False, f"خطأ أثناء التصفير: {e}"
         return False, "فشل الاتصال"
 
-    def search_medicine(self, text):
-        """بحث ذكي يشمل الاسم، الباركود، والمادة الفعالة"""
-        conn = self.db.connect()
-        if conn:
-            cursor = conn.cursor()
-            query = """SELECT id, barcode, name, active_ingredient, buy_price, sell_price, quantity, expiry_date 
-                       FROM medicines 
-                       WHERE name LIKE ? OR barcode LIKE ? OR active_ingredient LIKE ?"""
-            search_term = f"%{text}%"
-            cursor.execute(query, (search_term, search_term, search_term))
-            data = cursor.fetchall()
-            conn.close()
-            return data
-        return []
\ No newline at end of file
+    def search_medicine(self, text, limit=SEARCH_LIMIT):
+        """
+        بحث ذكي يشمل الاسم، الباركود، والمادة الفعالة (والوصف).
+        - الباركود: مطابقة بالبادئة عبر الفهرس الفريد (تظهر أولاً).
+        - النصوص: فهرس FTS5 مع مطابقة بادئة لكل كلمة، والنتائج مرتبة حسب الصلة (bm25).
+        """
+        text = text.strip()
+        if not text:
+            return []
+
+        with self.db.connection() as conn:
+            if conn:
+                cursor = conn.cursor()
+                if not self._has_fts(cursor):
+                    return self._search_like(cursor, text)
+
+                # 1. الباركود (نطاق نصي بدلاً من LIKE حتى يُستخدم الفهرس)
+                cursor.execute(f"""SELECT {self.SEARCH_COLUMNS} FROM medicines
+                                   WHERE barcode >= ? AND barcode < ? ORDER BY barcode LIMIT ?""",
+                               (text, text + "\U0010FFFF", limit))
+                data = cursor.fetchall()
+
+                # 2. البحث النصي: كل كلمة تصبح "كلمة"* (بادئة) ويجب أن تتحقق جميعها
+                match = " ".join('"{}"*'.format(token.replace('"', '""')) for token in text.split())
+                try:
+                    cursor.execute(f"""SELECT {self.SEARCH_COLUMNS} FROM medicines
+                                       JOIN (SELECT rowid AS fts_id, rank FROM medicines_fts
+                                             WHERE medicines_fts MATCH ? ORDER BY rank LIMIT ?) f
+                                       ON medicines.id = f.fts_id ORDER BY f.rank""", (match, limit))
+                except sqlite3.OperationalError:
+                    # نص لا يقبله محلل FTS: نرجع للبحث التقليدي
+                    return self._search_like(cursor, text)
+
+                seen = {row[0] for row in data}
+                data.extend(row for row in cursor.fetchall() if row[0] not in seen)
+                return data[:limit]
+        return []
+
+    def _has_fts(self, cursor):
+        """هل تم إنشاء فهرس FTS5 (الترحيل 4)؟ يُفحص مرة واحدة لكل كائن"""
+        if self._fts is None:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'medicines_fts'")
+            self._fts = cursor.fetchone() is not None
+        return self._fts
+
+    def _search_like(self, cursor, text):
+        """البحث التقليدي (عند غياب FTS5)"""
+        query = f"""SELECT {self.SEARCH_COLUMNS}
+                   FROM medicines 
+                   WHERE name LIKE ? OR barcode LIKE ? OR active_ingredient LIKE ?"""
+        search_term = f"%{text}%"
+        cursor.execute(query, (search_term, search_term, search_term))
+        return cursor.fetchall()
+
+    def refine_search(self, rows, text):
+        """
+        تصفية نتيجة search_medicine لنص سابق (بداية text) في الذاكرة بنفس الشرط، بدون استعلام:
+        بادئة الباركود، أو كل كلمة بداية لكلمة في الاسم/المادة الفعالة/الوصف (FTS) أو جزء منها (LIKE).
+        يعيد None إن تعذرت المطابقة الدقيقة (صفوف بدون عمود الوصف، أو نص بعلامات ترقيم يحللها FTS بطريقته).
+        """
+        text = text.strip()
+        if not text or self._fts is None or (rows and len(rows[0]) < 9):
+            return None
+        if not self._fts:
+            return like_filter(rows, text, (2, 1, 3))
+
+        tokens = [fold(token) for token in text.split()]
+        if any(WORD_SPLIT.search(token) for token in tokens):
+            return None
+        return [row for row in rows
+                if (row[1] and row[1].startswith(text)) or prefix_words_match((row[2], row[3], row[8]), tokens)]
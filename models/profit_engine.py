@@ -0,0 +1,222 @@
+from database.db_manager import DatabaseManager
+from datetime import date
+import sqlite3
+
+from utils.app_log import app_log
+
+# julianday + 0.5 مقرباً = رقم اليوم الجولياني؛ بطرح هذا الثابت نحصل على date.toordinal() مباشرة
+JULIAN_TO_ORDINAL = 1721425
+
+# الأسطر تُجلب على دفعات حتى لا تتضاعف الذاكرة (قائمة tuples كاملة + المصفوفات) مع ملايين الأسطر
+FETCH_CHUNK = 200000
+
+# سطر البيع مع تكلفته الحقيقية: سعر شراء التشغيلة التي خُصم منها (أو سعر الدواء إن لم توجد تشغيلة)
+LINES_FROM = """
+    FROM sale_items si
+    JOIN sales s ON s.id = si.sale_id
+    LEFT JOIN batches b ON b.id = si.batch_id
+    LEFT JOIN medicines m ON m.id = si.medicine_id
+"""
+LINE_COST = "si.quantity * COALESCE(b.buy_price, m.buy_price, 0)"
+DAY_ORDINAL = f"CAST(julianday(s.sale_date) + 0.5 AS INTEGER) - {JULIAN_TO_ORDINAL}"
+
+# أبعاد التجميع: مفتاح GROUP BY في المسار الاحتياطي، وهو نفسه عمود المصفوفة في مسار NumPy
+# (القيم الفارغة ← 0 في المسارين: كاشير أو دواء أو مورد غير معروف، وفاتورة بلا تاريخ)
+GROUP_KEYS = {
+    "medicine": "IFNULL(si.medicine_id, 0)",
+    "day": f"IFNULL({DAY_ORDINAL}, 0)",
+    "cashier": "IFNULL(s.user_id, 0)",
+    "supplier": "IFNULL(m.supplier_id, 0)",
+}
+
+# مسار NumPy: أعمدة ضيقة من كل جدول بدون JOIN لكل سطر (الربط يتم بالفهرسة داخل المصفوفات)
+# الجلب (إنشاء كائنات Python) هو الجزء الأغلى، لذلك لا نجلب إلا الأعمدة الخام
+# المصفوفات الرقمية لا تقبل None، فكل عمود قابل للفراغ عليه IFNULL (SUM في SQL يتجاهل الفارغ = يجمع 0)
+ARRAY_QUERIES = {
+    "items": ("SELECT IFNULL(si.sale_id, 0), IFNULL(si.medicine_id, 0), IFNULL(si.batch_id, 0), "
+              "IFNULL(si.quantity, 0), IFNULL(si.total_item_price, 0) FROM sale_items si {join}",
+              [("sale", "i8"), ("medicine", "i8"), ("batch", "i8"), ("qty", "f8"), ("revenue", "f8")]),
+    "sales": (f"SELECT s.id, {GROUP_KEYS['day']}, {GROUP_KEYS['cashier']} FROM sales s {{where}}",
+              [("id", "i8"), ("day", "i8"), ("cashier", "i8")]),
+    "batches": ("SELECT id, IFNULL(buy_price, 0) FROM batches", [("id", "i8"), ("cost", "f8")]),
+    "medicines": ("SELECT id, IFNULL(buy_price, 0), IFNULL(supplier_id, 0) FROM medicines",
+                  [("id", "i8"), ("cost", "f8"), ("supplier", "i8")]),
+}
+
+NAME_QUERIES = {
+    "medicine": "SELECT id, name FROM medicines",
+    "cashier": "SELECT id, username FROM users",
+    "supplier": "SELECT id, name FROM suppliers",
+}
+
+
+class ProfitEngine:
+    """
+    محرك الربح الحقيقي: الإيراد - تكلفة البضاعة المباعة (COGS) من أسعار شراء التشغيلات.
+    يجلب أسطر البيع دفعة واحدة إلى مصفوفات NumPy ويجمّعها (bincount) حسب الدواء واليوم والكاشير والمورد.
+    NumPy يُستورد عند أول استخدام فقط؛ إن لم يكن مثبتاً يُستخدم GROUP BY في SQLite.
+    """
+
+    def __init__(self):
+        self.db = DatabaseManager()
+
+    def compute(self, start_date=None, end_date=None):
+        """
+        تحليل الربح للفترة [start_date, end_date] (نصوص YYYY-MM-DD، وكلاهما اختياري).
+        يعيد قاموساً:
+            totals: {revenue, cogs, profit, margin, lines, quantity}
+            by_medicine / by_day / by_cashier / by_supplier:
+                قائمة (المفتاح، الاسم، الكمية، الإيراد، التكلفة، الربح، الهامش %) مرتبة حسب الربح تنازلياً
+                (by_day مرتب حسب التاريخ)
+        """
+        where, params = self._where(start_date, end_date)
+        with self.db.connection() as conn:
+            if not conn:
+                return self._empty()
+            try:
+                np = self._numpy()
+                if np is None:
+                    groups = self._compute_sql(conn, where, params)
+                else:
+                    groups = self._compute_numpy(conn, np, where, params)
+                names = {kind: dict(conn.execute(query).fetchall()) for kind, query in NAME_QUERIES.items()}
+            except sqlite3.Error as e:
+                app_log().error("Error computing profit: %s", e)
+                return self._empty()
+
+        report = {"totals": groups.pop("totals")}
+        for kind, rows in groups.items():
+            labels = names.get(kind, {})
+            result = []
+            for key, qty, revenue, cogs in rows:
+                if kind == "day":
+                    label = date.fromordinal(key).isoformat() if key > 0 else "-"
+                else:
+                    label = labels.get(key, "-")
+                profit = revenue - cogs
+                result.append((key, label, qty, revenue, cogs, profit, self._margin(profit, revenue)))
+            if kind == "day":
+                result.sort(key=lambda row: row[0])
+            else:
+                result.sort(key=lambda row: row[5], reverse=True)
+            report[f"by_{kind}"] = result
+        return report
+
+    @staticmethod
+    def _numpy():
+        try:
+            import numpy
+            return numpy
+        except ImportError:
+            return None
+
+    @staticmethod
+    def _where(start_date, end_date):
+        # نطاق نصي على sale_date حتى يستخدم الفهرس idx_sales_sale_date
+        conditions, params = [], []
+        if start_date:
+            conditions.append("s.sale_date >= ?")
+            params.append(start_date)
+        if end_date:
+            conditions.append("s.sale_date < date(?, '+1 day')")
+            params.append(end_date)
+        return ("WHERE " + " AND ".join(conditions)) if conditions else "", params
+
+    @staticmethod
+    def _margin(profit, revenue):
+        return profit / revenue * 100 if revenue else 0.0
+
+    def _compute_numpy(self, conn, np, where, params):
+        """جلب الأعمدة إلى مصفوفات، ربطها بالفهرسة، ثم تجميع متجه (bincount) لكل بُعد"""
+        join = f"JOIN sales s ON s.id = si.sale_id {where}" if where else ""
+        items = self._fetch_array(conn, np, "items", params, join=join)
+        sales = self._fetch_array(conn, np, "sales", params, where=where)
+        batches = self._fetch_array(conn, np, "batches")
+        medicines = self._fetch_array(conn, np, "medicines")
+        if not where:
+            # أسطر فاتورة غير موجودة لا تُحسب (كما يسقطها JOIN sales في المسار الاحتياطي)
+            items = items[self._lookup(np, sales["id"], np.ones(len(sales), dtype=bool), False, items["sale"])]
+
+        # جداول بحث كثيفة: المعرّف هو الفهرس
+        day_of = self._lookup(np, sales["id"], sales["day"], 0, items["sale"])
+        cashier_of = self._lookup(np, sales["id"], sales["cashier"], 0, items["sale"])
+        batch_cost = self._lookup(np, batches["id"], batches["cost"], np.nan, items["batch"])
+        medicine_cost = self._lookup(np, medicines["id"], medicines["cost"], 0.0, items["medicine"])
+        supplier_of = self._lookup(np, medicines["id"], medicines["supplier"], 0, items["medicine"])
+        cogs = items["qty"] * np.where(np.isnan(batch_cost), medicine_cost, batch_cost)
+
+        columns = {"medicine": items["medicine"], "day": day_of, "cashier": cashier_of, "supplier": supplier_of}
+        groups = {
+            "totals": {
+                "revenue": float(items["revenue"].sum()),
+                "cogs": float(cogs.sum()),
+                "quantity": float(items["qty"].sum()),
+                "lines": int(len(items)),
+            }
+        }
+        for kind, keys in columns.items():
+            if not len(keys):
+                groups[kind] = []
+                continue
+            # المفاتيح كثيفة (معرفات/أرقام أيام) فنحولها إلى فهارس تبدأ من 0 ونجمع بـ bincount
+            base = int(keys.min())
+            index = keys - base
+            size = int(index.max()) + 1
+            qty = np.bincount(index, weights=items["qty"], minlength=size)
+            revenue = np.bincount(index, weights=items["revenue"], minlength=size)
+            cost = np.bincount(index, weights=cogs, minlength=size)
+            present = np.flatnonzero(np.bincount(index, minlength=size))
+            groups[kind] = list(zip((present + base).tolist(), qty[present].tolist(),
+                                    revenue[present].tolist(), cost[present].tolist()))
+        self._finish_totals(groups["totals"])
+        return groups
+
+    @staticmethod
+    def _fetch_array(conn, np, name, params=(), **parts):
+        """تنفيذ استعلام وتحويل نتيجته إلى مصفوفة منظمة على دفعات"""
+        query, dtype = ARRAY_QUERIES[name]
+        cursor = conn.execute(query.format(**parts), params)
+        chunks = []
+        while True:
+            rows = cursor.fetchmany(FETCH_CHUNK)
+            if not rows:
+                break
+            chunks.append(np.array(rows, dtype=dtype))
+        return np.concatenate(chunks) if chunks else np.zeros(0, dtype=dtype)
+
+    @staticmethod
+    def _lookup(np, ids, values, missing, wanted):
+        """values[ids == wanted] لكل عنصر في wanted عبر مصفوفة كثيفة (المعرّف غير الموجود ← missing)"""
+        size = int(max(ids.max() if len(ids) else 0, wanted.max() if len(wanted) else 0)) + 1
+        table = np.full(size, missing, dtype=values.dtype)
+        table[ids] = values
+        return table[wanted]
+
+    def _compute_sql(self, conn, where, params):
+        """نفس النتيجة بـ GROUP BY (أبطأ: مسح كامل لكل بُعد)؛ TOTAL تعيد 0.0 للقيم الفارغة كمسار NumPy"""
+        groups = {}
+        for kind, key in GROUP_KEYS.items():
+            rows = conn.execute(f"""SELECT {key}, TOTAL(si.quantity), TOTAL(si.total_item_price), TOTAL({LINE_COST}),
+                                           COUNT(*)
+                                    {LINES_FROM} {where} GROUP BY 1""", params).fetchall()
+            groups[kind] = rows
+        # الإجماليات من تجميع الأدوية (كل سطر ينتمي لدواء واحد)
+        groups["totals"] = {
+            "quantity": float(sum(row[1] for row in groups["medicine"])),
+            "revenue": float(sum(row[2] for row in groups["medicine"])),
+            "cogs": float(sum(row[3] for row in groups["medicine"])),
+            "lines": sum(row[4] for row in groups["medicine"]),
+        }
+        for kind in GROUP_KEYS:
+            groups[kind] = [row[:4] for row in groups[kind]]
+        self._finish_totals(groups["totals"])
+        return groups
+
+    def _finish_totals(self, totals):
+        totals["profit"] = totals["revenue"] - totals["cogs"]
+        totals["margin"] = self._margin(totals["profit"], totals["revenue"])
+
+    @staticmethod
+    def _empty():
+        totals = {"revenue": 0.0, "cogs": 0.0, "profit": 0.0, "margin": 0.0, "lines": 0, "quantity": 0.0}
+        return {"totals": totals, "by_medicine": [], "by_day": [], "by_cashier": [], "by_supplier": []}
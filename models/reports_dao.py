@@ -1,5 +1,16 @@
 from database.db_manager import DatabaseManager
 
+# حجم الصفحة الافتراضي لسجلات المبيعات والمشتريات (ترقيم keyset)
+PAGE_SIZE = 500
+
+
+def date_page_key(row):
+    """
+    مفتاح keyset لصف من get_sales_page / get_purchases_page: (التاريخ، id) والتاريخ الفارغ ''
+    كما في COALESCE(..., '') في الاستعلامين (يُقارن دائماً ويأتي في آخر السجل).
+    """
+    return (row[4] or "", row[0])
+
 
 class ReportsDAO:
     def __init__(self):
@@ -8,118 +19,183 @@ class ReportsDAO:
     # --- 1. قسم المبيعات ---
     def get_all_sales(self):
         """جلب كل الفواتير مع اسم البائع واسم العميل"""
-        conn = self.db.connect()
-        if conn:
-            cursor = conn.cursor()
-            # نستخدم LEFT JOIN مع العملاء لأن العميل قد يكون NULL (نقدي)
-            query = """
-                SELECT s.id, u.username, c.name, s.total_amount, s.sale_date 
-                FROM sales s 
-                JOIN users u ON s.user_id = u.id 
-                LEFT JOIN customers c ON s.customer_id = c.id
-                ORDER BY s.sale_date DESC
-            """
-            cursor.execute(query)
-            data = cursor.fetchall()
-            conn.close()
-            return data
+        with self.db.connection() as conn:
+            if conn:
+                cursor = conn.cursor()
+                # نستخدم LEFT JOIN مع العملاء لأن العميل قد يكون NULL (نقدي)
+                query = """
+                    SELECT s.id, u.username, c.name, s.total_amount, s.sale_date 
+                    FROM sales s 
+                    JOIN users u ON s.user_id = u.id 
+                    LEFT JOIN customers c ON s.customer_id = c.id
+                    ORDER BY s.sale_date DESC
+                """
+                cursor.execute(query)
+                return cursor.fetchall()
+        return []
+
+    def get_sales_page(self, after=None, limit=PAGE_SIZE):
+        """
+        صفحة من سجل المبيعات (الأحدث أولاً) بترقيم keyset على (COALESCE(sale_date, ''), id):
+        after = date_page_key لآخر صف في الصفحة السابقة، أو None للصفحة الأولى.
+        زمن كل صفحة ثابت مهما كبر التاريخ (بحث في الفهرس idx_sales_page_key بدلاً من OFFSET).
+        """
+        with self.db.connection() as conn:
+            if conn:
+                cursor = conn.cursor()
+                # الشرط البسيط على التعبير يبدأ البحث في فهرسه (شرط row value وحده يمسح الفهرس من أوله)
+                where = "WHERE COALESCE(s.sale_date, '') <= ? AND (COALESCE(s.sale_date, ''), s.id) < (?, ?)" if after else ""
+                query = f"""
+                    SELECT s.id, u.username, c.name, s.total_amount, s.sale_date 
+                    FROM sales s 
+                    JOIN users u ON s.user_id = u.id 
+                    LEFT JOIN customers c ON s.customer_id = c.id
+                    {where}
+                    ORDER BY COALESCE(s.sale_date, '') DESC, s.id DESC
+                    LIMIT ?
+                """
+                cursor.execute(query, (after[0], *after, limit) if after else (limit,))
+                return cursor.fetchall()
+        return []
+
+    def get_sales_for_export(self, start_date, end_date):
+        """
+        كل فواتير الفترة [start_date, end_date] مع أسطرها لإعادة الطباعة الجماعية، باستعلامين فقط
+        (الرؤوس ثم كل الأسطر) بدلاً من get_sale_details لكل فاتورة.
+        يعيد قائمة (sale_id, cashier, total, sale_date, items) حيث items = [(name, qty, price, total), ...]
+        """
+        with self.db.connection() as conn:
+            if conn:
+                # نطاق نصي على sale_date حتى يستخدم الفهرس idx_sales_sale_date
+                where = "WHERE s.sale_date >= ? AND s.sale_date < date(?, '+1 day')"
+                params = (start_date, end_date)
+                headers = conn.execute(f"""
+                    SELECT s.id, u.username, s.total_amount, s.sale_date
+                    FROM sales s
+                    LEFT JOIN users u ON s.user_id = u.id
+                    {where}
+                    ORDER BY s.sale_date, s.id
+                """, params).fetchall()
+                lines = {}
+                for sale_id, name, qty, price, total in conn.execute(f"""
+                    SELECT si.sale_id, m.name, si.quantity, si.price_at_sale, si.total_item_price
+                    FROM sales s
+                    JOIN sale_items si ON si.sale_id = s.id
+                    JOIN medicines m ON si.medicine_id = m.id
+                    {where}
+                    ORDER BY si.sale_id, si.id
+                """, params):
+                    lines.setdefault(sale_id, []).append((name, qty, price, total))
+                return [(sale_id, cashier, total, date, lines.get(sale_id, []))
+                        for sale_id, cashier, total, date in headers]
         return []
 
     def get_sale_details(self, sale_id):
         """جلب تفاصيل الأدوية داخل فاتورة بيع"""
-        conn = self.db.connect()
-        if conn:
-            cursor = conn.cursor()
-            query = """
-                SELECT m.name, si.quantity, si.price_at_sale, si.total_item_price
-                FROM sale_items si
-                JOIN medicines m ON si.medicine_id = m.id
-                WHERE si.sale_id = ?
-            """
-            cursor.execute(query, (sale_id,))
-            data = cursor.fetchall()
-            conn.close()
-            return data
+        with self.db.connection() as conn:
+            if conn:
+                cursor = conn.cursor()
+                query = """
+                    SELECT m.name, si.quantity, si.price_at_sale, si.total_item_price
+                    FROM sale_items si
+                    JOIN medicines m ON si.medicine_id = m.id
+                    WHERE si.sale_id = ?
+                """
+                cursor.execute(query, (sale_id,))
+                return cursor.fetchall()
         return []
 
     # --- 2. قسم المشتريات ---
     def get_all_purchases(self):
         """جلب سجل فواتير الشراء"""
-        conn = self.db.connect()
-        if conn:
-            cursor = conn.cursor()
-            query = """
-                SELECT p.id, s.name, p.invoice_number, p.total_amount, p.invoice_date
-                FROM purchase_invoices p
-                JOIN suppliers s ON p.supplier_id = s.id
-                ORDER BY p.invoice_date DESC
-            """
-            cursor.execute(query)
-            data = cursor.fetchall()
-            conn.close()
-            return data
+        with self.db.connection() as conn:
+            if conn:
+                cursor = conn.cursor()
+                query = """
+                    SELECT p.id, s.name, p.invoice_number, p.total_amount, p.invoice_date
+                    FROM purchase_invoices p
+                    JOIN suppliers s ON p.supplier_id = s.id
+                    ORDER BY p.invoice_date DESC
+                """
+                cursor.execute(query)
+                return cursor.fetchall()
+        return []
+
+    def get_purchases_page(self, after=None, limit=PAGE_SIZE):
+        """صفحة من سجل المشتريات (الأحدث أولاً) بترقيم keyset على (COALESCE(invoice_date, ''), id)"""
+        with self.db.connection() as conn:
+            if conn:
+                cursor = conn.cursor()
+                # الشرط البسيط على التعبير يبدأ البحث في فهرسه (شرط row value وحده يمسح الفهرس من أوله)
+                where = "WHERE COALESCE(p.invoice_date, '') <= ? AND (COALESCE(p.invoice_date, ''), p.id) < (?, ?)" if after else ""
+                query = f"""
+                    SELECT p.id, s.name, p.invoice_number, p.total_amount, p.invoice_date
+                    FROM purchase_invoices p
+                    JOIN suppliers s ON p.supplier_id = s.id
+                    {where}
+                    ORDER BY COALESCE(p.invoice_date, '') DESC, p.id DESC
+                    LIMIT ?
+                """
+                cursor.execute(query, (after[0], *after, limit) if after else (limit,))
+                return cursor.fetchall()
         return []
 
     def get_purchase_details(self, purchase_id):
         """جلب تفاصيل فاتورة الشراء"""
-        conn = self.db.connect()
-        if conn:
-            cursor = conn.cursor()
-            query = """
-                SELECT m.name, pi.quantity, pi.unit_cost, pi.total_cost
-                FROM purchase_items pi
-                JOIN medicines m ON pi.medicine_id = m.id
-                WHERE pi.purchase_id = ?
-            """
-            cursor.execute(query, (purchase_id,))
-            data = cursor.fetchall()
-            conn.close()
-            return data
+        with self.db.connection() as conn:
+            if conn:
+                cursor = conn.cursor()
+                query = """
+                    SELECT m.name, pi.quantity, pi.unit_cost, pi.total_cost
+                    FROM purchase_items pi
+                    JOIN medicines m ON pi.medicine_id = m.id
+                    WHERE pi.purchase_id = ?
+                """
+                cursor.execute(query, (purchase_id,))
+                return cursor.fetchall()
         return []
 
     # --- 3. قسم النواقص (Low Stock) ---
     def get_low_stock_items(self):
         """جلب الأدوية التي قلت كميتها عن الحد المسموح"""
-        conn = self.db.connect()
-        if conn:
-            cursor = conn.cursor()
-            # نجلب اسم المورد أيضاً لتسهيل الطلب
-            query = """
-                SELECT m.barcode, m.name, m.quantity, s.name 
-                FROM medicines m
-                LEFT JOIN suppliers s ON m.supplier_id = s.id
-                WHERE m.quantity <= m.min_stock_alert
-            """
-            cursor.execute(query)
-            data = cursor.fetchall()
-            conn.close()
-            return data
+        with self.db.connection() as conn:
+            if conn:
+                cursor = conn.cursor()
+                # نجلب اسم المورد أيضاً لتسهيل الطلب
+                query = """
+                    SELECT m.barcode, m.name, m.quantity, s.name 
+                    FROM medicines m
+                    LEFT JOIN suppliers s ON m.supplier_id = s.id
+                    WHERE m.quantity <= m.min_stock_alert
+                """
+                cursor.execute(query)
+                return cursor.fetchall()
         return []
 
     # --- 4. الملخص المالي ---
     def get_financial_summary(self):
-        """حساب إجمالي المبيعات والمشتريات والربح"""
-        conn = self.db.connect()
-        summary = {"sales": 0.0, "purchases": 0.0, "profit": 0.0}
-
-        if conn:
-            cursor = conn.cursor()
-            try:
-                # إجمالي المبيعات
-                cursor.execute("SELECT SUM(total_amount) FROM sales")
-                res_sales = cursor.fetchone()[0]
-                summary["sales"] = res_sales if res_sales else 0.0
-
-                # إجمالي المشتريات
-                cursor.execute("SELECT SUM(total_amount) FROM purchase_invoices")
-                res_purchases = cursor.fetchone()[0]
-                summary["purchases"] = res_purchases if res_purchases else 0.0
-
-                # صافي الدخل (حسب طلبك: مبيعات - مشتريات)
-                summary["profit"] = summary["sales"] - summary["purchases"]
-
-            except Exception as e:
-                print(f"Error calculating summary: {e}")
-            finally:
-                conn.close()
+        """حساب إجمالي المبيعات والمشتريات والربح الإجمالي (المبيعات - تكلفة البضاعة المباعة)"""
+        summary = {"sales": 0.0, "purchases": 0.0, "cogs": 0.0, "profit": 0.0}
+
+        with self.db.connection() as conn:
+            if conn:
+                cursor = conn.cursor()
+                try:
+                    # الإجماليات من جداول التجميع اليومي (صف لكل يوم بدلاً من كل الفواتير)
+                    # إجمالي المبيعات وتكلفتها الحقيقية (أسعار شراء التشغيلات المباعة)
+                    cursor.execute("SELECT SUM(total), SUM(cogs) FROM daily_sales_rollup")
+                    res_sales, res_cogs = cursor.fetchone()
+                    summary["sales"] = res_sales if res_sales else 0.0
+                    summary["cogs"] = res_cogs if res_cogs else 0.0
+
+                    # إجمالي المشتريات
+                    cursor.execute("SELECT SUM(total) FROM daily_purchase_rollup")
+                    res_purchases = cursor.fetchone()[0]
+                    summary["purchases"] = res_purchases if res_purchases else 0.0
+
+                    # الربح الإجمالي: المبيعات - تكلفة ما بيع فعلاً (المشتريات تضم مخزوناً لم يُبع بعد)
+                    summary["profit"] = summary["sales"] - summary["cogs"]
+
+                except Exception as e:
+                    print(f"Error calculating summary: {e}")
         return summary
\ No newline at end of file
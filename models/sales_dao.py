@@ -1,4 +1,6 @@
 from database.db_manager import DatabaseManager
+from models.barcode_cache import barcode_cache
+from utils.change_bus import SaleCommitted, change_bus
 from datetime import datetime
 
 
@@ -6,101 +8,142 @@ class SalesDAO:
     def __init__(self):
         self.db = DatabaseManager()
 
-    def get_medicine_by_barcode_or_name(self, text):
+    def get_medicine_by_barcode(self, barcode):
         """
-        البحث عن دواء لإضافته للسلة.
-        يعيد الكمية الإجمالية المتوفرة في كل التشغيلات.
+        المسار السريع لمسح الباركود في نقطة البيع: مطابقة تامة عبر الفهرس الفريد + ذاكرة مؤقتة.
+        يعيد (id, name, sell_price, quantity, barcode) أو None إذا لم يوجد أو نفدت الكمية.
         """
-        conn = self.db.connect()
-        if conn:
-            cursor = conn.cursor()
-            # البحث يعيد الكمية الإجمالية من جدول batches أو medicines (حسب التصميم، هنا نعتمد على medicines المحدث)
-            query = """SELECT id, name, sell_price, quantity, barcode 
-                       FROM medicines 
-                       WHERE (barcode = ? OR name LIKE ?) AND quantity > 0 LIMIT 1"""
-            cursor.execute(query, (text, f"%{text}%"))
-            data = cursor.fetchone()
-            conn.close()
-            return data
+        medicine = barcode_cache.get(barcode)
+        if medicine is None:
+            with self.db.connection() as conn:
+                if conn:
+                    cursor = conn.cursor()
+                    cursor.execute("SELECT id, name, sell_price, quantity, barcode FROM medicines WHERE barcode = ?",
+                                   (barcode,))
+                    medicine = cursor.fetchone()
+            if medicine is None:
+                return None
+            barcode_cache.put(barcode, medicine)
+        return medicine if medicine[3] > 0 else None
+
+    def get_medicines_by_ids(self, ids):
+        """أدوية سلة نقطة البيع بعد تغيرها (بنفس صيغة get_medicine_by_barcode، بدون شرط الكمية)"""
+        ids = list(ids)
+        if not ids:
+            return []
+        with self.db.connection() as conn:
+            if conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT id, name, sell_price, quantity, barcode FROM medicines "
+                               f"WHERE id IN ({', '.join('?' * len(ids))})", ids)
+                return cursor.fetchall()
+        return []
+
+    def search_medicine_by_name(self, text):
+        """
+        بحث صريح بالاسم (عندما لا يكون النص باركوداً):
+        يعيد أقرب دواء متوفر بنفس صيغة get_medicine_by_barcode (الأقصر اسماً أولاً ثم أبجدياً).
+        """
+        with self.db.connection() as conn:
+            if conn:
+                cursor = conn.cursor()
+                query = """SELECT id, name, sell_price, quantity, barcode 
+                           FROM medicines 
+                           WHERE name LIKE ? AND quantity > 0
+                           ORDER BY length(name), name LIMIT 1"""
+                cursor.execute(query, (f"%{text}%",))
+                return cursor.fetchone()
         return None
 
     def process_sale(self, user_id, cart_items, total_amount, customer_id=None, doctor_name=""):
         """
-        تنفيذ عملية البيع بنظام التشغيلات (FIFO):
-        1. إنشاء فاتورة.
-        2. لكل دواء: نجلب التشغيلات المرتبة حسب تاريخ الانتهاء.
-        3. نخصم الكمية من التشغيلات الأقدم فالأجدد.
-        4. نسجل تفاصيل البيع مع رقم التشغيلة (batch_id).
+        تنفيذ عملية البيع بنظام التشغيلات (FIFO/FEFO) بعمليات مجمّعة:
+        1. حجز قفل الكتابة فوراً (BEGIN IMMEDIATE) وإنشاء فاتورة.
+        2. جلب تشغيلات كل أدوية السلة باستعلام واحد مرتبة حسب تاريخ الانتهاء.
+        3. حساب التوزيع على التشغيلات في الذاكرة (الأقدم انتهاءً أولاً).
+        4. تطبيق النتيجة بـ executemany: تفاصيل البيع، خصم التشغيلات (بشرط يمنع البيع بالسالب)، خصم الأدوية.
         """
-        conn = self.db.connect()
-        if not conn:
-            return False, "فشل الاتصال بقاعدة البيانات"
-
-        try:
-            cursor = conn.cursor()
-            sale_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-            # 1. إنشاء سجل الفاتورة (Header)
-            query_sale = """INSERT INTO sales (user_id, customer_id, doctor_name, total_amount, sale_date) 
-                            VALUES (?, ?, ?, ?, ?)"""
-            cursor.execute(query_sale, (user_id, customer_id, doctor_name, total_amount, sale_date))
-            sale_id = cursor.lastrowid
-
-            # 2. معالجة الأصناف (Items)
-            for item in cart_items:
-                med_id = item['id']
-                qty_needed = item['qty']  # الكمية المطلوبة من الزبون
-                sell_price = item['price']
-
-                # جلب تشغيلات هذا الدواء مرتبة حسب الأقدم (FIFO) والتي بها كمية > 0
-                cursor.execute("""
-                    SELECT id, quantity FROM batches 
-                    WHERE medicine_id = ? AND quantity > 0 
-                    ORDER BY expiry_date ASC
-                """, (med_id,))
-
-                available_batches = cursor.fetchall()
-
-                qty_remaining_to_sell = qty_needed
-
-                # المرور على التشغيلات وسحب الكمية
-                for batch in available_batches:
-                    if qty_remaining_to_sell <= 0:
-                        break
-
-                    batch_id = batch[0]
-                    batch_qty = batch[1]
-
-                    # تحديد الكمية التي ستؤخذ من هذه التشغيلة
-                    take_qty = min(qty_remaining_to_sell, batch_qty)
-
-                    # حساب إجمالي السعر لهذا الجزء
-                    line_total = take_qty * sell_price
-
-                    # أ. تسجيل هذا الجزء في sale_items مع batch_id
-                    cursor.execute("""
-                        INSERT INTO sale_items (sale_id, medicine_id, batch_id, quantity, price_at_sale, total_item_price)
-                        VALUES (?, ?, ?, ?, ?, ?)
-                    """, (sale_id, med_id, batch_id, take_qty, sell_price, line_total))
-
-                    # ب. إنقاص الكمية من جدول التشغيلات (batches)
-                    cursor.execute("UPDATE batches SET quantity = quantity - ? WHERE id = ?", (take_qty, batch_id))
-
-                    # ج. إنقاص الكمية الإجمالية من جدول الأدوية (medicines) لتبقى الأرقام متطابقة
-                    cursor.execute("UPDATE medicines SET quantity = quantity - ? WHERE id = ?", (take_qty, med_id))
-
-                    qty_remaining_to_sell -= take_qty
-
-                # التحقق: هل تم تلبية كامل الكمية المطلوبة؟
-                if qty_remaining_to_sell > 0:
-                    raise Exception(f"الكمية المتوفرة في التشغيلات للدواء رقم {med_id} غير كافية!")
-
-            conn.commit()
-            # نعيد sale_id لنستخدمه في الطباعة
-            return True, sale_id
-
-        except Exception as e:
-            conn.rollback()
-            return False, f"خطأ أثناء البيع: {e}"
-        finally:
-            conn.close()
\ No newline at end of file
+        with self.db.connection() as conn:
+            if not conn:
+                return False, "فشل الاتصال بقاعدة البيانات"
+
+            try:
+                cursor = conn.cursor()
+                sale_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+                # قفل الكتابة من البداية: لا يمكن لعملية بيع أخرى تعديل التشغيلات بين القراءة والخصم
+                cursor.execute("BEGIN IMMEDIATE")
+
+                # 1. إنشاء سجل الفاتورة (Header)
+                query_sale = """INSERT INTO sales (user_id, customer_id, doctor_name, total_amount, sale_date) 
+                                VALUES (?, ?, ?, ?, ?)"""
+                cursor.execute(query_sale, (user_id, customer_id, doctor_name, total_amount, sale_date))
+                sale_id = cursor.lastrowid
+
+                # 2. جلب التشغيلات المتاحة لكل الأدوية دفعة واحدة
+                med_ids = list(dict.fromkeys(item['id'] for item in cart_items))
+                placeholders = ", ".join("?" * len(med_ids))
+                cursor.execute(f"""
+                    SELECT id, medicine_id, quantity FROM batches 
+                    WHERE medicine_id IN ({placeholders}) AND quantity > 0 
+                    ORDER BY medicine_id, expiry_date ASC, id ASC
+                """, med_ids)
+
+                available = {}  # medicine_id -> [[batch_id, qty], ...] بالترتيب
+                for batch_id, med_id, batch_qty in cursor.fetchall():
+                    available.setdefault(med_id, []).append([batch_id, batch_qty])
+
+                # 3. التوزيع في الذاكرة
+                sale_items = []       # (sale_id, medicine_id, batch_id, qty, price, line_total)
+                batch_updates = []    # (take_qty, batch_id, take_qty)
+                med_totals = {}       # medicine_id -> الكمية المخصومة
+
+                for item in cart_items:
+                    med_id = item['id']
+                    qty_remaining_to_sell = item['qty']  # الكمية المطلوبة من الزبون
+                    sell_price = item['price']
+
+                    for batch in available.get(med_id, []):
+                        if qty_remaining_to_sell <= 0:
+                            break
+                        if batch[1] <= 0:
+                            continue
+
+                        # تحديد الكمية التي ستؤخذ من هذه التشغيلة
+                        take_qty = min(qty_remaining_to_sell, batch[1])
+                        batch[1] -= take_qty  # سطر آخر لنفس الدواء يكمل من المتبقي
+
+                        sale_items.append((sale_id, med_id, batch[0], take_qty, sell_price, take_qty * sell_price))
+                        batch_updates.append((take_qty, batch[0], take_qty))
+                        med_totals[med_id] = med_totals.get(med_id, 0) + take_qty
+                        qty_remaining_to_sell -= take_qty
+
+                    # التحقق: هل تم تلبية كامل الكمية المطلوبة؟
+                    if qty_remaining_to_sell > 0:
+                        raise Exception(f"الكمية المتوفرة في التشغيلات للدواء رقم {med_id} غير كافية!")
+
+                # 4. التطبيق المجمّع
+                cursor.executemany("""
+                    INSERT INTO sale_items (sale_id, medicine_id, batch_id, quantity, price_at_sale, total_item_price)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                """, sale_items)
+
+                # خصم مشروط: لا يُنفذ إذا أصبحت كمية التشغيلة أقل من المطلوب (حماية من البيع الزائد)
+                cursor.executemany("UPDATE batches SET quantity = quantity - ? WHERE id = ? AND quantity >= ?",
+                                   batch_updates)
+                if cursor.rowcount != len(batch_updates):
+                    raise Exception("تغيرت كميات التشغيلات أثناء البيع، يرجى إعادة المحاولة")
+
+                # إنقاص الكمية الإجمالية من جدول الأدوية (medicines) لتبقى الأرقام متطابقة
+                cursor.executemany("UPDATE medicines SET quantity = quantity - ? WHERE id = ?",
+                                   [(qty, med_id) for med_id, qty in med_totals.items()])
+
+                conn.commit()
+                # الكميات تغيرت: ذاكرة الباركود والصفحات المفتوحة تحدّث الأدوية المباعة فقط
+                change_bus.publish(SaleCommitted(sale_id, tuple(med_ids), customer_id))
+                # نعيد sale_id لنستخدمه في الطباعة
+                return True, sale_id
+
+            except Exception as e:
+                conn.rollback()
+                return False, f"خطأ أثناء البيع: {e}"
\ No newline at end of file
@@ -1,4 +1,6 @@
 from database.db_manager import DatabaseManager
+from models.text_match import like_filter
+from utils.change_bus import SuppliersChanged, SuppliersDeleted, change_bus
 
 
 class SuppliersDAO:
@@ -7,62 +9,73 @@ class SuppliersDAO:
 
     def add_supplier(self, name, phone, company, balance=0.0):
         """إضافة مورد جديد"""
-        conn = self.db.connect()
-        if conn:
-            cursor = conn.cursor()
-            try:
-                cursor.execute("INSERT INTO suppliers (name, phone, company_name, balance) VALUES (?, ?, ?, ?)",
-                               (name, phone, company, balance))
-                conn.commit()
-                return True, "تمت إضافة المورد بنجاح"
-            except Exception as e:
-                return False, f"خطأ: {e}"
-            finally:
-                conn.close()
+        with self.db.connection() as conn:
+            if conn:
+                cursor = conn.cursor()
+                try:
+                    cursor.execute("INSERT INTO suppliers (name, phone, company_name, balance) VALUES (?, ?, ?, ?)",
+                                   (name, phone, company, balance))
+                    conn.commit()
+                    change_bus.publish(SuppliersChanged((cursor.lastrowid,)))
+                    return True, "تمت إضافة المورد بنجاح"
+                except Exception as e:
+                    return False, f"خطأ: {e}"
         return False, "تعذر الاتصال بقاعدة البيانات"
 
     def get_all_suppliers(self):
         """جلب جميع الموردين"""
-        conn = self.db.connect()
-        if conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT id, name, phone, company_name, balance FROM suppliers")
-            data = cursor.fetchall()
-            conn.close()
-            return data
+        with self.db.connection() as conn:
+            if conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT id, name, phone, company_name, balance FROM suppliers")
+                return cursor.fetchall()
+        return []
+
+    def get_suppliers_by_ids(self, ids):
+        """صفوف موردين محددين بنفس أعمدة get_all_suppliers (لتحديث الصفوف المتأثرة فقط)"""
+        ids = list(ids)
+        if not ids:
+            return []
+        with self.db.connection() as conn:
+            if conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT id, name, phone, company_name, balance FROM suppliers "
+                               f"WHERE id IN ({', '.join('?' * len(ids))})", ids)
+                return cursor.fetchall()
         return []
 
     def delete_supplier(self, supplier_id):
         """حذف مورد"""
-        conn = self.db.connect()
-        if conn:
-            cursor = conn.cursor()
-            try:
-                # التحقق أولاً هل للمورد أدوية مرتبطة به؟ (اختياري، لسلامة البيانات)
-                cursor.execute("SELECT COUNT(*) FROM medicines WHERE supplier_id = ?", (supplier_id,))
-                if cursor.fetchone()[0] > 0:
-                    return False, "لا يمكن حذف المورد لوجود أدوية مرتبطة به في المخزون."
+        with self.db.connection() as conn:
+            if conn:
+                cursor = conn.cursor()
+                try:
+                    # التحقق أولاً هل للمورد أدوية مرتبطة به؟ (اختياري، لسلامة البيانات)
+                    cursor.execute("SELECT COUNT(*) FROM medicines WHERE supplier_id = ?", (supplier_id,))
+                    if cursor.fetchone()[0] > 0:
+                        return False, "لا يمكن حذف المورد لوجود أدوية مرتبطة به في المخزون."
 
-                cursor.execute("DELETE FROM suppliers WHERE id = ?", (supplier_id,))
-                conn.commit()
-                return True, "تم الحذف بنجاح"
-            except Exception as e:
-                return False, f"خطأ: {e}"
-            finally:
-                conn.close()
+                    cursor.execute("DELETE FROM suppliers WHERE id = ?", (supplier_id,))
+                    conn.commit()
+                    change_bus.publish(SuppliersDeleted((supplier_id,)))
+                    return True, "تم الحذف بنجاح"
+                except Exception as e:
+                    return False, f"خطأ: {e}"
         return False, "فشل الاتصال"
 
     def search_supplier(self, text):
         """البحث عن مورد بالاسم أو الشركة"""
-        conn = self.db.connect()
-        if conn:
-            cursor = conn.cursor()
-            query = """SELECT id, name, phone, company_name, balance 
-                       FROM suppliers 
-                       WHERE name LIKE ? OR company_name LIKE ?"""
-            search_term = f"%{text}%"
-            cursor.execute(query, (search_term, search_term))
-            data = cursor.fetchall()
-            conn.close()
-            return data
-        return []
\ No newline at end of file
+        with self.db.connection() as conn:
+            if conn:
+                cursor = conn.cursor()
+                query = """SELECT id, name, phone, company_name, balance 
+                           FROM suppliers 
+                           WHERE name LIKE ? OR company_name LIKE ?"""
+                search_term = f"%{text}%"
+                cursor.execute(query, (search_term, search_term))
+                return cursor.fetchall()
+        return []
+
+    def refine_search(self, rows, text):
+        """تصفية نتيجة search_supplier لنص سابق (بداية text) في الذاكرة بنفس شرط LIKE، أو None إن تعذر"""
+        return like_filter(rows, text, (1, 3))
@@ -0,0 +1,50 @@
+"""
+مطابقة نصية في الذاكرة بنفس شروط SQL المستخدمة في البحث، لتصفية نتيجة بحث سابق محلياً
+(عند إضافة أحرف للنص) بدلاً من استعلام جديد. انظر refine_search في الـ DAOs وui/search_controller.py.
+"""
+import re
+import string
+import unicodedata
+
+# LIKE في SQLite لا يفرق بين الحروف الكبيرة والصغيرة في ASCII فقط
+_ASCII_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+# فواصل الكلمات في محلل unicode61: كل ما ليس حرفاً أو رقماً
+WORD_SPLIT = re.compile(r"[\W_]+")
+
+
+def like_filter(rows, text, columns):
+    """
+    الصفوف التي يحتوي أحد أعمدتها columns على text، مثل col LIKE '%text%' OR ...
+    يعيد None إن احتوى النص على % أو _ (لها معنى خاص في LIKE).
+    """
+    if "%" in text or "_" in text:
+        return None
+    needle = text.translate(_ASCII_LOWER)
+    return [row for row in rows
+            if any(row[column] and needle in str(row[column]).translate(_ASCII_LOWER) for column in columns)]
+
+
+def fold(text):
+    """تقريب unicode61 remove_diacritics: حروف صغيرة بدون علامات التشكيل"""
+    return "".join(char for char in unicodedata.normalize("NFKD", text.casefold()) if not unicodedata.combining(char))
+
+
+def prefix_words_match(values, tokens):
+    """هل كل كلمة في tokens (مطوية بـ fold) بداية لكلمة ما في values؟ (مثل MATCH '"tok"*' لكل كلمة)"""
+    words = WORD_SPLIT.split(fold(" ".join(value for value in values if value)))
+    return all(any(word.startswith(token) for word in words) for token in tokens)
+
+
+# توحيد الحروف التي يكتبها المستخدمون بأكثر من شكل (الهمزات تزيلها fold: أ/إ/آ ← ا)
+_ARABIC_VARIANTS = str.maketrans({"ى": "ي", "ة": "ه", "ـ": None})
+
+
+def normalize_name(text):
+    """مفتاح بحث الأسماء (customers.name_norm): fold + ى/ي، ة/ه، بدون تطويل ومسافات مكررة"""
+    return " ".join(fold(text or "").translate(_ARABIC_VARIANTS).split())
+
+
+def normalize_phone(text):
+    """أرقام الهاتف فقط بالأرقام اللاتينية (٠٩٣... ← 093...)، بدون مسافات أو شرطات"""
+    return "".join(str(unicodedata.digit(char)) for char in text or "" if char.isdigit())
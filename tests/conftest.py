@@ -0,0 +1,56 @@
+"""
+إعداد الاختبارات: قاعدة بيانات وسجلات في مجلد مؤقت (لا تُلمس pharma_system.db ولا logs/)،
+بدون قياس SQL ولا مراقب التغييرات. الإعدادات تُقرأ من config.py عند الاستيراد، فتُضبط هنا قبل أي وحدة.
+
+التشغيل من جذر المشروع:
+    python -m pytest -q
+"""
+import os
+import sqlite3
+import tempfile
+import time
+
+import pytest
+
+_TMP = tempfile.mkdtemp(prefix="pharma_tests_")
+os.environ.setdefault("PHARMA_DB_NAME", os.path.join(_TMP, "pharma_test.db"))
+os.environ.setdefault("PHARMA_LOG_DIR", os.path.join(_TMP, "logs"))
+os.environ.setdefault("PHARMA_SQL_TRACE", "0")
+os.environ.setdefault("PHARMA_DB_WATCH_MS", "0")
+
+
+@pytest.fixture
+def conn():
+    """قاعدة في الذاكرة بعد تطبيق كل الترحيلات"""
+    from database import migrations
+    conn = sqlite3.connect(":memory:")
+    migrations.migrate(conn)
+    yield conn
+    conn.close()
+
+
+def _wait_for_polls(count, timeout=5.0):
+    """انتظار count دورة إضافية من مراقب التغييرات"""
+    from database.change_log import change_watcher
+    target = change_watcher.stats["polls"] + count
+    deadline = time.monotonic() + timeout
+    while change_watcher.stats["polls"] < target:
+        assert time.monotonic() < deadline, "مراقب التغييرات لم يدر"
+        time.sleep(0.005)
+
+
+@pytest.fixture
+def wait_for_polls():
+    return _wait_for_polls
+
+
+@pytest.fixture
+def watcher():
+    """مراقب التغييرات يعمل كل 10ms طوال الاختبار"""
+    from database.change_log import change_watcher
+    change_watcher.interval_ms = 10
+    change_watcher.start()
+    _wait_for_polls(1)
+    yield change_watcher
+    change_watcher.stop()
+    change_watcher.interval_ms = 0
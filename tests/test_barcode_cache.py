@@ -0,0 +1,27 @@
+import sqlite3
+
+from database.db_manager import DatabaseManager
+from models.barcode_cache import barcode_cache
+from models.sales_dao import SalesDAO
+
+
+def external_write(sql, params=()):
+    """كتابة من جهاز أو سكربت آخر على نفس الملف"""
+    other = sqlite3.connect(DatabaseManager().db_name)
+    other.execute(sql, params)
+    other.commit()
+    other.close()
+
+
+def test_external_restock_and_price_change_reach_cached_item(watcher, wait_for_polls):
+    dao = SalesDAO()
+    external_write("INSERT INTO medicines (barcode, name, buy_price, sell_price, quantity) VALUES ('EXT-1', 'دواء خارجي', 1, 2, 0)")
+    wait_for_polls(3)
+    assert dao.get_medicine_by_barcode("EXT-1") is None
+    assert barcode_cache.get("EXT-1")[3] == 0
+
+    external_write("UPDATE medicines SET quantity = 5, sell_price = 3 WHERE barcode = 'EXT-1'")
+    wait_for_polls(5)
+
+    assert barcode_cache.get("EXT-1") is None
+    assert dao.get_medicine_by_barcode("EXT-1")[2:4] == (3, 5)
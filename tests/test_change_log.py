@@ -0,0 +1,91 @@
+import sqlite3
+
+import pytest
+
+from database import change_log, migrations
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    """ملف قاعدة بعد الترحيلات (المراقب يحتاج اتصالين بنفس الملف)"""
+    path = str(tmp_path / "watch.db")
+    conn = sqlite3.connect(path)
+    migrations.migrate(conn)
+    conn.close()
+    return path
+
+
+def app_connection(path):
+    """اتصال كاتصالات المجمّع: بعدادات كتاباته المؤقتة"""
+    conn = sqlite3.connect(path)
+    assert change_log.install_local_counter(conn)
+    return conn
+
+
+def add_customers(conn, count):
+    conn.executemany("INSERT INTO customers (name, phone) VALUES (?, ?)",
+                     [(f"عميل {i}", f"059{i:07d}") for i in range(count)])
+    conn.commit()
+
+
+def test_own_writes_are_not_reported(db_path):
+    app = app_connection(db_path)
+    watcher = change_log.ChangeWatcher(interval_ms=0)
+    before = change_log.read_sequences(app)
+
+    add_customers(app, 3)
+    watcher.note_local(app)
+
+    assert watcher._external(before, change_log.read_sequences(app), dict(watcher._local)) == frozenset()
+    assert watcher._local == {}
+
+
+def test_external_writes_are_reported_next_to_own_writes(db_path):
+    app = app_connection(db_path)
+    other = sqlite3.connect(db_path)
+    watcher = change_log.ChangeWatcher(interval_ms=0)
+    before = change_log.read_sequences(app)
+
+    add_customers(app, 2)
+    watcher.note_local(app)
+    add_customers(other, 1)
+    other.execute("INSERT INTO suppliers (name) VALUES ('مورد')")
+    other.commit()
+
+    changed = watcher._external(before, change_log.read_sequences(app), dict(watcher._local))
+    assert changed == {"customers", "suppliers"}
+
+
+def test_own_write_noted_after_the_read_does_not_hide_an_external_one(db_path):
+    app = app_connection(db_path)
+    other = sqlite3.connect(db_path)
+    watcher = change_log.ChangeWatcher(interval_ms=0)
+    before = change_log.read_sequences(app)
+
+    # لقطة ثم قراءة، وبينهما كتابة خارجية؛ كتابة التطبيق تُثبت وتُسلّم بعد القراءة
+    own = dict(watcher._local)
+    add_customers(other, 1)
+    latest = change_log.read_sequences(app)
+    add_customers(app, 1)
+    watcher.note_local(app)
+
+    assert watcher._external(before, latest, own) == {"customers"}
+    # كتابة التطبيق تُطرح في الدورة التالية
+    assert watcher._external(latest, change_log.read_sequences(app), dict(watcher._local)) == frozenset()
+    assert watcher._local == {}
+
+
+def test_rolled_back_writes_are_not_counted(db_path):
+    app = app_connection(db_path)
+    app.execute("INSERT INTO customers (name, phone) VALUES ('x', '1')")
+    app.rollback()
+
+    assert change_log.take_local_counts(app) == {}
+
+
+def test_counts_reset_after_take(db_path):
+    app = app_connection(db_path)
+    add_customers(app, 2)
+
+    assert change_log.take_local_counts(app) == {"customers": 2}
+    assert change_log.take_local_counts(app) == {}
@@ -0,0 +1,34 @@
+import sqlite3
+
+from database.db_manager import DatabaseManager
+from models.customer_index import customer_index
+from models.customers_dao import CustomersDAO
+
+
+def test_own_write_patches_index_without_reload(watcher, wait_for_polls):
+    dao = CustomersDAO()
+    customer_index.load()
+    stats = dict(customer_index.stats)
+
+    ok, _ = dao.add_customer("عميل المراقب", "0911000001", "", "")
+    assert ok
+    wait_for_polls(5)
+
+    assert customer_index.stats["loads"] == stats["loads"]
+    assert customer_index.stats["patched"] == stats["patched"] + 1
+    assert [row[1] for row in customer_index.lookup("المراقب")] == ["عميل المراقب"]
+
+
+def test_external_write_reloads_index(watcher, wait_for_polls):
+    customer_index.load()
+    loads = customer_index.stats["loads"]
+
+    other = sqlite3.connect(DatabaseManager().db_name)
+    other.execute("""INSERT INTO customers (name, phone, name_norm, phone_norm)
+                     VALUES ('عميل خارجي', '0911000002', 'عميل خارجي', '0911000002')""")
+    other.commit()
+    other.close()
+    wait_for_polls(5)
+
+    assert customer_index.stats["loads"] == loads + 1
+    assert [row[1] for row in customer_index.lookup("خارجي")] == ["عميل خارجي"]
@@ -0,0 +1,44 @@
+import pytest
+
+from models.customer_index import customer_index
+from models.customers_dao import CustomersDAO
+from models.text_match import normalize_phone
+
+CUSTOMERS = [
+    ("محمد أحمد الطيب", "0912-345 678"),
+    ("أحمد محمد علي", "٠٩١٢٣٤٥٠٠٠"),
+    ("فاطمة الزهراء", "+249 912 300 111"),
+    ("مكتبة النور", "0123"),
+    ("Ahmed Ali", "0999 111 222"),
+    ("هدى مصطفى", ""),
+    ("عميل 0912 قديم", None),
+]
+
+# أجزاء أسماء بأي ترتيب، أحرف تُكتب بأكثر من شكل، أرقام هاتف بفواصل أو بأرقام عربية
+TEXTS = ["محمد", "احمد", "أحمد محمد", "محمد احم", "الطيب مح", "فاطمه", "الزهر فاط", "ahmed", "ALI",
+         "0912", "٠٩١٢", "0912 345", "0912-34", "249", "0123", "012", "هدى 0912", "عميل 09", "غير موجود", "ز"]
+
+
+@pytest.fixture(scope="module")
+def dao():
+    dao = CustomersDAO()
+    for name, phone in CUSTOMERS:
+        assert dao.add_customer(name, phone, "", "")[0]
+    customer_index.load()
+    return dao
+
+
+@pytest.mark.parametrize("text", TEXTS)
+def test_sql_fallback_matches_index(dao, text):
+    assert set(dao.lookup_customers(text, limit=100)) == set(customer_index.lookup(text, limit=100))
+
+
+def test_digits_only_text_lists_phone_matches_first(dao):
+    rows = dao.lookup_customers("0912")
+    by_phone = [row for row in rows if normalize_phone(row[2]).startswith("0912")]
+    assert rows[:len(by_phone)] == by_phone
+    assert {row[1] for row in rows} >= {"محمد أحمد الطيب", "أحمد محمد علي", "عميل 0912 قديم"}
+
+
+def test_limit(dao):
+    assert len(dao.lookup_customers("م", limit=2)) == 2
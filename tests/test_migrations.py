@@ -0,0 +1,45 @@
+import sqlite3
+
+from database import migrations
+
+
+def has_fts(conn):
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'medicines_fts'").fetchone() is not None
+
+
+def test_fts_skipped_without_fts5_is_created_on_next_start(monkeypatch):
+    conn = sqlite3.connect(":memory:")
+    monkeypatch.setattr(migrations, "fts5_available", lambda conn: False)
+    migrations.migrate(conn)
+    conn.execute("INSERT INTO medicines (name, buy_price, sell_price) VALUES ('Panadol Extra', 1, 2)")
+    conn.commit()
+    assert migrations.read_version(conn) == migrations.LATEST_VERSION
+    assert not has_fts(conn)
+    assert not migrations.ensure_medicines_fts(conn)
+
+    # نفس القاعدة بعد تحديث SQLite إلى نسخة تدعم FTS5
+    monkeypatch.undo()
+    if not migrations.fts5_available(conn):
+        return
+    assert migrations.ensure_medicines_fts(conn)
+    assert conn.execute("SELECT rowid FROM medicines_fts WHERE medicines_fts MATCH 'pana*'").fetchall() == [(1,)]
+    assert not migrations.ensure_medicines_fts(conn)
+
+
+def test_ensure_fts_is_noop_on_migrated_database(conn):
+    assert has_fts(conn) == migrations.fts5_available(conn)
+    assert not migrations.ensure_medicines_fts(conn)
+
+
+def test_phone_norm_backfills_existing_customers():
+    conn = sqlite3.connect(":memory:")
+    migrations.migrate(conn, target=11)
+    conn.executemany("INSERT INTO customers (name, phone) VALUES (?, ?)",
+                     [("أ", "0912-345 678"), ("ب", "٠٩١٢٣٤٥٦٧٩"), ("ج", ""), ("د", None)])
+    conn.commit()
+    migrations.migrate(conn)
+
+    assert conn.execute("SELECT phone_norm FROM customers ORDER BY id").fetchall() == [
+        ("0912345678",), ("0912345679",), (None,), (None,)]
+    indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE tbl_name = 'customers'")}
+    assert "idx_customers_phone_norm" in indexes and "idx_customers_phone" not in indexes
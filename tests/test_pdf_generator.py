@@ -0,0 +1,36 @@
+import pytest
+
+pytest.importorskip("fpdf")
+
+from utils.pdf_generator import InvoiceTemplate
+
+
+def lines(count):
+    return [(f"Medicine {n}", n, 1.25, n * 1.25) for n in range(1, count + 1)]
+
+
+def render(template, items):
+    pdf = template.new_document()
+    pdf.set_compression(False)
+    template.draw(pdf, items, f"{sum(item[3] for item in items):.2f}", 7, "Admin", "2024-05-01 10:00:00")
+    return pdf, bytes(pdf.output())
+
+
+@pytest.fixture(scope="module")
+def template(tmp_path_factory):
+    return InvoiceTemplate(out_dir=str(tmp_path_factory.mktemp("invoices")))
+
+
+# نفس عدد صفحات المسار القديم (cell مع الانتقال التلقائي): من 20 سطراً ينتقل المجموع لصفحة ثانية
+@pytest.mark.parametrize("count, pages", [(5, 1), (19, 1), (20, 2), (40, 2), (100, 5)])
+def test_long_invoices_continue_on_new_pages(template, count, pages):
+    pdf, _ = render(template, lines(count))
+    assert pdf.page_no() == pages
+
+
+def test_every_line_is_drawn_inside_the_page(template):
+    pdf, data = render(template, lines(40))
+    for name, _, _, total in lines(40):
+        assert f"({name})".encode() in data
+        assert f"({total:.2f})".encode() in data
+    assert b"(GRAND TOTAL:)" in data
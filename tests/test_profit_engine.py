@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from models.profit_engine import ProfitEngine
+
+
+@pytest.fixture
+def imported(conn):
+    """بيانات مستوردة بدون Triggers: قيم فارغة في الكاشير والتاريخ والكمية والسعر، وسطر بلا فاتورة"""
+    for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'").fetchall():
+        conn.execute(f"DROP TRIGGER {name}")
+    conn.execute("INSERT INTO suppliers (id, name) VALUES (1, 'مورد')")
+    conn.execute("""INSERT INTO medicines (id, name, buy_price, sell_price, supplier_id)
+                    VALUES (1, 'A', 2.0, 3.0, 1), (2, 'B', 5.0, 8.0, NULL)""")
+    conn.execute("""INSERT INTO batches (id, medicine_id, expiry_date, buy_price, sell_price, quantity)
+                    VALUES (1, 1, '2030-01-01', 1.5, 3.0, 100)""")
+    conn.execute("""INSERT INTO sales (id, user_id, total_amount, sale_date) VALUES
+                    (1, 1, 20, '2024-05-01 10:00:00'), (2, NULL, 16, '2024-05-02 09:00:00'), (3, 1, 9, NULL)""")
+    conn.execute("""INSERT INTO sale_items (sale_id, medicine_id, batch_id, quantity, price_at_sale, total_item_price) VALUES
+                    (1, 1, 1, 4, 3, 12), (1, 2, NULL, 1, 8, 8),
+                    (2, 2, NULL, 2, 8, NULL), (2, 1, 1, NULL, 3, 3),
+                    (3, NULL, NULL, 3, 3, 9), (3, 1, 1, 1, 3, 3),
+                    (99, 1, 1, 5, 3, 15)""")
+    conn.commit()
+    return conn
+
+
+def both_paths(conn, start_date=None, end_date=None):
+    engine = ProfitEngine()
+    where, params = engine._where(start_date, end_date)
+    return engine._compute_numpy(conn, np, where, params), engine._compute_sql(conn, where, params)
+
+
+def by_key(rows):
+    return {key: pytest.approx(values) for key, *values in rows}
+
+
+@pytest.mark.parametrize("period", [(None, None), ("2024-05-01", "2024-05-01"), ("2024-05-02", None)])
+def test_numpy_and_sql_paths_agree(imported, period):
+    numpy_groups, sql_groups = both_paths(imported, *period)
+
+    assert numpy_groups.pop("totals") == pytest.approx(sql_groups.pop("totals"))
+    assert numpy_groups.keys() == sql_groups.keys()
+    for kind in sql_groups:
+        assert by_key(numpy_groups[kind]) == {key: list(values) for key, *values in sql_groups[kind]}, kind
+
+
+def test_unknown_keys_group_under_zero(imported):
+    numpy_groups, _ = both_paths(imported)
+
+    assert {row[0] for row in numpy_groups["cashier"]} == {0, 1}
+    assert 0 in {row[0] for row in numpy_groups["day"]}
+    assert numpy_groups["totals"]["lines"] == 6
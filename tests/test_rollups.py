@@ -0,0 +1,59 @@
+import sqlite3
+
+from database import rollups
+
+SALES = "SELECT day, ROUND(total, 6), sales_count, line_count, ROUND(cogs, 6) FROM daily_sales_rollup WHERE sales_count > 0"
+PURCHASES = "SELECT day, ROUND(total, 6), invoice_count, line_count FROM daily_purchase_rollup WHERE invoice_count > 0"
+
+
+def rebuilt(conn):
+    """نفس القاعدة بعد إعادة بناء التجميع من الجداول الأصلية"""
+    copy = sqlite3.connect(":memory:")
+    conn.backup(copy)
+    rollups.rebuild_rollups(copy)
+    return sorted(copy.execute(SALES)), sorted(copy.execute(PURCHASES))
+
+
+def current(conn):
+    return sorted(conn.execute(SALES)), sorted(conn.execute(PURCHASES))
+
+
+def seed(conn):
+    conn.execute("INSERT INTO medicines (id, name, buy_price, sell_price) VALUES (1, 'A', 2.0, 3.0), (2, 'B', 5.0, 8.0)")
+    conn.execute("""INSERT INTO batches (id, medicine_id, expiry_date, buy_price, sell_price, quantity)
+                    VALUES (1, 1, '2030-01-01', 1.5, 3.0, 100), (2, 2, '2030-01-01', 4.0, 8.0, 100)""")
+    for sale_id, date in ((1, "2024-05-01 09:00:00"), (2, "2024-05-01 18:00:00"), (3, "2024-05-02 10:00:00")):
+        conn.execute("INSERT INTO sales (id, user_id, total_amount, sale_date) VALUES (?, 1, ?, ?)",
+                     (sale_id, 10.0 * sale_id, date))
+        conn.executemany("""INSERT INTO sale_items (sale_id, medicine_id, batch_id, quantity, price_at_sale, total_item_price)
+                            VALUES (?, ?, ?, ?, 1, 1)""", [(sale_id, 1, 1, sale_id), (sale_id, 2, 2, 2)])
+    conn.execute("INSERT INTO purchase_invoices (id, supplier_id, invoice_date, total_amount) VALUES (1, NULL, '2024-05-01', 50)")
+    conn.executemany("INSERT INTO purchase_items (purchase_id, medicine_id, quantity, unit_cost, total_cost) VALUES (1, ?, 5, 5, 25)",
+                     [(1,), (2,)])
+    conn.commit()
+
+
+def test_rollups_match_raw_tables_after_inserts(conn):
+    seed(conn)
+    assert current(conn) == rebuilt(conn)
+
+
+def test_moving_sale_date_moves_lines_and_cogs(conn):
+    seed(conn)
+    conn.execute("UPDATE sales SET sale_date = '2024-05-03 12:00:00' WHERE id = 1")
+    conn.execute("UPDATE sales SET sale_date = '2024-05-02 08:00:00' WHERE id = 2")
+    conn.execute("UPDATE sales SET sale_date = '2024-05-02 23:00:00', total_amount = 35 WHERE id = 3")
+    conn.commit()
+    sales, _ = current(conn)
+    assert sales == rebuilt(conn)[0]
+    assert [row[0] for row in sales] == ["2024-05-02", "2024-05-03"]
+    # اليوم الذي خلا من الفواتير لا تبقى فيه أسطر أو تكلفة
+    assert conn.execute("SELECT line_count, ROUND(cogs, 6) FROM daily_sales_rollup WHERE day = '2024-05-01'").fetchone() == (0, 0)
+
+
+def test_moving_invoice_date_moves_purchase_lines(conn):
+    seed(conn)
+    conn.execute("UPDATE purchase_invoices SET invoice_date = '2024-06-01' WHERE id = 1")
+    conn.commit()
+    assert current(conn) == rebuilt(conn)
+    assert conn.execute("SELECT line_count FROM daily_purchase_rollup WHERE day = '2024-05-01'").fetchone() == (0,)
@@ -0,0 +1,27 @@
+import sqlite3
+
+import pytest
+
+from database import sql_trace
+
+
+@pytest.fixture
+def traced(monkeypatch):
+    """اتصال مقاس وكل جملة فيه بطيئة (حتى تُحسب خطتها)"""
+    monkeypatch.setattr(sql_trace, "SLOW_QUERY_MS", 0)
+    monkeypatch.setattr(sql_trace, "_plans", {})
+    sql_trace.stats.reset()
+    conn = sqlite3.connect(":memory:", factory=sql_trace.TracedConnection)
+    conn.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)")
+    yield conn
+    conn.close()
+    sql_trace.stats.reset()
+
+
+def test_explain_of_slow_statement_is_not_traced(traced):
+    traced.execute("SELECT name FROM items WHERE id = ?", (1,)).fetchall()
+
+    statements = [entry["sql"] for entry in sql_trace.stats.top(n=None)]
+    assert "SELECT name FROM items WHERE id = ?" in statements
+    assert not [sql for sql in statements if sql.startswith("EXPLAIN")]
+    assert "SEARCH items" in sql_trace._plans["SELECT name FROM items WHERE id = ?"]
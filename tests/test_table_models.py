@@ -0,0 +1,36 @@
+from datetime import date
+
+from ui import table_models
+from ui.table_models import EXPIRED_COLOR, EXPIRING_COLOR, expiry_background
+
+
+class FakeDate(date):
+    current = date(2026, 1, 1)
+
+    @classmethod
+    def today(cls):
+        return cls.current
+
+
+class Rows:
+    """نموذج يكفي لدالة اللون: value(row, column)"""
+
+    def __init__(self, values):
+        self.values = values
+
+    def value(self, row, _column):
+        return self.values[row]
+
+
+def test_expiry_colors_follow_the_current_day(monkeypatch):
+    monkeypatch.setattr(table_models, "date", FakeDate)
+    background = expiry_background(0, warn_days=30)
+    model = Rows(["2026-01-01", "2026-01-20", "2026-03-01", "-"])
+
+    assert [background(model, row, 0) for row in range(4)] == [EXPIRING_COLOR, EXPIRING_COLOR, None, None]
+
+    # نفس الدالة بعد منتصف الليل (الجدول لم يُعد بناؤه)
+    monkeypatch.setattr(FakeDate, "current", date(2026, 1, 2))
+    assert background(model, 0, 0) == EXPIRED_COLOR
+    monkeypatch.setattr(FakeDate, "current", date(2026, 2, 1))
+    assert [background(model, row, 0) for row in range(3)] == [EXPIRED_COLOR, EXPIRED_COLOR, EXPIRING_COLOR]
@@ -0,0 +1,23 @@
+from PyQt5.QtCore import QObject, Qt, pyqtSignal
+
+from utils.change_bus import change_bus
+
+
+class ChangeListener(QObject):
+    """
+    اشتراك صفحة في أحداث change_bus مع نقلها لخيط الواجهة:
+        self.changes = ChangeListener(self, (MedicinesChanged, SaleCommitted), self.on_change)
+    الحدث قد يُنشر من خيط خلفي (إتمام البيع)، فيصل handler دائماً عبر طابور أحداث Qt
+    (بعد انتهاء دالة الكتابة، لا في منتصفها). الاشتراك يُلغى تلقائياً عند حذف الصفحة.
+    """
+    _received = pyqtSignal(object)
+
+    def __init__(self, parent, event_types, handler):
+        super().__init__(parent)
+        self._received.connect(handler, Qt.QueuedConnection)
+        forward = self._forward
+        change_bus.subscribe(event_types, forward)
+        self.destroyed.connect(lambda: change_bus.unsubscribe(forward))
+
+    def _forward(self, event):
+        self._received.emit(event)
@@ -1,8 +1,13 @@
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QPushButton,
-                             QTableWidget, QTableWidgetItem, QHeaderView, QLineEdit,
+                             QTableView, QAbstractItemView, QHeaderView, QLineEdit,
                              QMessageBox, QDialog, QFormLayout, QTextEdit, QDialogButtonBox, QLabel)
 from PyQt5.QtCore import Qt
 from models.customers_dao import CustomersDAO
+from ui.table_models import ColumnarTableModel
+from ui.query_runner import QueryRunner
+from ui.search_controller import SearchController
+from ui.change_listener import ChangeListener
+from utils.change_bus import CustomersChanged, CustomersDeleted
 
 
 # --- نافذة إضافة عميل ---
@@ -82,7 +87,12 @@ class CustomersPage(QWidget):
     def __init__(self):
         super().__init__()
         self.dao = CustomersDAO()
+        self.runner = QueryRunner(self)
         self.init_ui()
+        self.search = SearchController(self.search_input, self.runner, self.dao.search_customer,
+                                       self.dao.get_all_customers, self.fill_table, refine=self.dao.refine_search,
+                                       fetch_rows=self.dao.get_customers_by_ids, on_patch=self.model.upsert_rows)
+        self.changes = ChangeListener(self, (CustomersChanged, CustomersDeleted), self.on_change)
         self.load_data()
 
     def init_ui(self):
@@ -102,7 +112,6 @@ class CustomersPage(QWidget):
         self.search_input.setPlaceholderText("🔍 بحث باسم العميل أو الهاتف...")
         self.search_input.setFixedHeight(50)
         self.search_input.setStyleSheet("font-size: 18px; padding: 0 10px; border-radius: 5px; border: 1px solid #ccc;")
-        self.search_input.textChanged.connect(self.search_data)
         top_bar.addWidget(self.search_input)
 
         self.btn_add = QPushButton("➕ إضافة عميل")
@@ -132,51 +141,44 @@ class CustomersPage(QWidget):
         layout.addLayout(top_bar)
 
         # الجدول
-        self.table = QTableWidget()
-        self.table.setColumnCount(5)
-        self.table.setHorizontalHeaderLabels(["ID", "الاسم", "الهاتف", "الإيميل", "ملاحظات"])
+        self.model = ColumnarTableModel(["ID", "الاسم", "الهاتف", "الإيميل", "ملاحظات"])
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.setSelectionMode(QAbstractItemView.SingleSelection)
         self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
         self.table.setLayoutDirection(Qt.RightToLeft)
         self.table.setStyleSheet(
-            "QTableWidget { font-size: 16px; } QHeaderView::section { font-size: 16px; font-weight: bold; }")
+            "QTableView { font-size: 16px; } QHeaderView::section { font-size: 16px; font-weight: bold; }")
 
         layout.addWidget(self.table)
         self.setLayout(layout)
 
     def load_data(self):
-        customers = self.dao.get_all_customers()
-        self.fill_table(customers)
+        # إعادة تحميل نص البحث الحالي (أو الكل) بالكامل (زر التحديث)
+        self.search.refresh()
 
-    def search_data(self):
-        text = self.search_input.text()
-        if text:
-            customers = self.dao.search_customer(text)
+    def on_change(self, event):
+        # العملاء المضافون أو المحذوفون (من هذه الصفحة أو غيرها) تُحدّث صفوفهم فقط
+        if isinstance(event, CustomersDeleted):
+            self.search.apply_changes(deleted_ids=event.ids)
         else:
-            customers = self.dao.get_all_customers()
-        self.fill_table(customers)
+            self.search.apply_changes(event.ids)
 
     def fill_table(self, data):
-        self.table.setRowCount(0)
-        for row_idx, row_data in enumerate(data):
-            self.table.insertRow(row_idx)
-            for col_idx, col_data in enumerate(row_data):
-                item = QTableWidgetItem(str(col_data))
-                item.setTextAlignment(Qt.AlignCenter)
-                self.table.setItem(row_idx, col_idx, item)
+        self.model.set_rows(data)
 
     def open_add_dialog(self):
-        dialog = AddCustomerDialog(self)
-        if dialog.exec_():
-            self.load_data()
+        AddCustomerDialog(self).exec_()
 
     def delete_selected(self):
-        selected_row = self.table.currentRow()
+        selected_row = self.table.currentIndex().row()
         if selected_row < 0:
             QMessageBox.warning(self, "تنبيه", "الرجاء تحديد عميل لحذفه")
             return
 
-        customer_id = self.table.item(selected_row, 0).text()
-        name = self.table.item(selected_row, 1).text()
+        customer_id = self.model.value(selected_row, 0)
+        name = self.model.value(selected_row, 1)
 
         confirm = QMessageBox.question(self, "تأكيد الحذف", f"هل أنت متأكد من حذف العميل {name}؟",
                                        QMessageBox.Yes | QMessageBox.No)
@@ -184,7 +186,6 @@ class CustomersPage(QWidget):
         if confirm == QMessageBox.Yes:
             success, msg = self.dao.delete_customer(customer_id)
             if success:
-                self.load_data()
                 QMessageBox.information(self, "تم", msg)
             else:
                 QMessageBox.critical(self, "خطأ", msg)
\ No newline at end of file
@@ -0,0 +1,132 @@
+from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QTableWidget, QTableWidgetItem, QHeaderView,
+                             QLabel, QPushButton, QHBoxLayout)
+from PyQt5.QtCore import Qt
+from PyQt5.QtGui import QColor
+from database.db_manager import DatabaseManager
+from database import sql_trace
+from utils.invoice_queue import render_queue
+
+# عدد الجمل المعروضة في جدول SQL
+SQL_TOP_N = 25
+
+
+class DiagnosticsDialog(QDialog):
+    """نافذة تشخيص قاعدة البيانات: ملف تعريف الأداء (المطلوب/الفعلي)، عدادات مجمّع الاتصالات، وأبطأ جمل SQL"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("تشخيص قاعدة البيانات")
+        self.resize(900, 750)
+        self.setStyleSheet("font-family: 'Times New Roman'; font-size: 15px;")
+
+        self.db = DatabaseManager()
+        self.setup_ui()
+        self.load_data()
+
+    def setup_ui(self):
+        layout = QVBoxLayout()
+
+        self.lbl_profile = QLabel()
+        self.lbl_profile.setStyleSheet("font-size: 18px; font-weight: bold; color: #2C3E50;")
+        layout.addWidget(self.lbl_profile)
+
+        # جدول إعدادات PRAGMA
+        self.pragma_table = QTableWidget()
+        self.pragma_table.setColumnCount(3)
+        self.pragma_table.setHorizontalHeaderLabels(["الإعداد", "المطلوب", "الفعلي"])
+        self.pragma_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.pragma_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        layout.addWidget(self.pragma_table)
+
+        # جدول عدادات مجمّع الاتصالات
+        layout.addWidget(QLabel("مجمّع الاتصالات:"))
+        self.pool_table = QTableWidget()
+        self.pool_table.setColumnCount(2)
+        self.pool_table.setHorizontalHeaderLabels(["العداد", "القيمة"])
+        self.pool_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.pool_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        layout.addWidget(self.pool_table)
+
+        # عدادات طابور توليد الفواتير (العمق، المنجز، زمن التوليد)
+        layout.addWidget(QLabel("طابور طباعة الفواتير:"))
+        self.render_table = QTableWidget()
+        self.render_table.setColumnCount(2)
+        self.render_table.setHorizontalHeaderLabels(["العداد", "القيمة"])
+        self.render_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.render_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        layout.addWidget(self.render_table)
+
+        # أكثر جمل SQL استهلاكاً للوقت (من طبقة القياس sql_trace)
+        layout.addWidget(QLabel("أكثر جمل SQL استهلاكاً للوقت منذ بدء التشغيل:"))
+        self.sql_table = QTableWidget()
+        self.sql_table.setColumnCount(7)
+        self.sql_table.setHorizontalHeaderLabels(["الجملة", "مكان الاستدعاء", "المرات", "الإجمالي ms",
+                                                  "المتوسط ms", "الأقصى ms", "الصفوف"])
+        self.sql_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.sql_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        self.sql_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        layout.addWidget(self.sql_table)
+
+        btn_layout = QHBoxLayout()
+        btn_reset_sql = QPushButton("🧹 تصفير إحصائيات SQL")
+        btn_reset_sql.clicked.connect(self.reset_sql_stats)
+        btn_layout.addWidget(btn_reset_sql)
+        btn_refresh = QPushButton("🔄 تحديث")
+        btn_refresh.clicked.connect(self.load_data)
+        btn_close = QPushButton("إغلاق")
+        btn_close.clicked.connect(self.accept)
+        btn_layout.addWidget(btn_refresh)
+        btn_layout.addWidget(btn_close)
+        layout.addLayout(btn_layout)
+
+        self.setLayout(layout)
+
+    def load_data(self):
+        report = self.db.get_diagnostics()
+
+        text = f"ملف التعريف: {report['profile']}  |  SQLite {report['sqlite_version']}  |  {report['db_name']}"
+        if report["profile_error"]:
+            text += f"\n⚠️ {report['profile_error']}"
+        self.lbl_profile.setText(text)
+
+        self.pragma_table.setRowCount(0)
+        for row, (key, wanted) in enumerate(report["requested"].items()):
+            self.pragma_table.insertRow(row)
+            actual = report["effective"].get(key, "-")
+            items = [QTableWidgetItem(key), QTableWidgetItem(str(wanted)), QTableWidgetItem(str(actual))]
+            for col, item in enumerate(items):
+                item.setTextAlignment(Qt.AlignCenter)
+                # تلوين الإعدادات التي لم يقبلها SQLite
+                if key in report["mismatches"]:
+                    item.setBackground(QColor("#FFCDD2"))
+                self.pragma_table.setItem(row, col, item)
+
+        self.fill_counters(self.pool_table, report["pool"])
+        self.fill_counters(self.render_table, render_queue.stats())
+
+        self.sql_table.setRowCount(0)
+        for row, entry in enumerate(self.db.sql_report(SQL_TOP_N)):
+            self.sql_table.insertRow(row)
+            site = max(entry["sites"].items(), key=lambda kv: kv[1])[0]
+            values = [entry["sql"], site, entry["calls"], f"{entry['total_ms']:.1f}", f"{entry['avg_ms']:.3f}",
+                      f"{entry['max_ms']:.1f}", entry["rows"]]
+            for col, value in enumerate(values):
+                item = QTableWidgetItem(str(value))
+                item.setToolTip(entry["sql"] if col == 0 else str(value))
+                # الجمل التي تجاوزت حد البطء مرة واحدة على الأقل
+                if entry["slow"]:
+                    item.setBackground(QColor("#FFE0B2"))
+                self.sql_table.setItem(row, col, item)
+
+    def fill_counters(self, table, counters):
+        table.setRowCount(0)
+        for row, (key, value) in enumerate(counters.items()):
+            table.insertRow(row)
+            if isinstance(value, float):
+                value = f"{value:.4f}"
+            table.setItem(row, 0, QTableWidgetItem(key))
+            table.setItem(row, 1, QTableWidgetItem(str(value)))
+
+    def reset_sql_stats(self):
+        sql_trace.stats.reset()
+        self.load_data()
@@ -1,14 +1,34 @@
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QFrame, QPushButton, QGridLayout)
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QTimer
 from PyQt5.QtGui import QFont, QColor
 from models.dashboard_dao import DashboardDAO
+from ui.query_runner import QueryRunner
+from ui.change_listener import ChangeListener
+from utils.change_bus import MEDICINE_EVENTS, TablesChanged, UsersChanged, UsersDeleted
+
+# مهلة تجميع الأحداث قبل إعادة حساب الإحصائيات (عدة مبيعات متتالية = استعلام واحد)
+STATS_REFRESH_MS = 500
+
+# الجداول التي تُحسب منها البطاقات (كتابة خارجية فيها تعيد الإحصائيات)
+STATS_TABLES = frozenset({"medicines", "batches", "sales", "users"})
 
 
 class HomePage(QWidget):
     def __init__(self):
         super().__init__()
         self.dao = DashboardDAO()
+        self.runner = QueryRunner(self)
         self.init_ui()
+        self.runner.loading.connect(self.set_loading)
+
+        # البطاقات إجماليات (من جداول التجميع): تُعاد مرة واحدة بعد دفعة أحداث بدلاً من زر التحديث
+        self.stats_timer = QTimer(self)
+        self.stats_timer.setSingleShot(True)
+        self.stats_timer.setInterval(STATS_REFRESH_MS)
+        self.stats_timer.timeout.connect(self.load_stats)
+        # أحداث الـ DAO داخل التطبيق + TablesChanged من مراقب قاعدة البيانات (أجهزة أو سكربتات أخرى فقط)
+        self.changes = ChangeListener(self, MEDICINE_EVENTS + (UsersChanged, UsersDeleted, TablesChanged),
+                                      self.on_change)
         self.load_stats()
 
     def init_ui(self):
@@ -104,9 +124,19 @@ class HomePage(QWidget):
         return card
 
     def load_stats(self):
-        """جلب البيانات وتحديث البطاقات"""
-        stats = self.dao.get_statistics()
+        """جلب البيانات في الخلفية ثم تحديث البطاقات"""
+        self.runner.submit("stats", self.dao.get_statistics, on_result=self.show_stats)
+
+    def on_change(self, event):
+        if isinstance(event, TablesChanged) and not event.tables & STATS_TABLES:
+            return
+        self.stats_timer.start()
+
+    def set_loading(self, loading):
+        self.btn_refresh.setEnabled(not loading)
+        self.btn_refresh.setText("⏳ جاري التحميل..." if loading else "🔄 تحديث الإحصائيات")
 
+    def show_stats(self, stats):
         # تحديث النصوص داخل البطاقات
         self.card_meds.findChild(QLabel, "value_label").setText(str(stats['total_medicines']))
         self.card_alerts.findChild(QLabel, "value_label").setText(str(stats['low_stock']))
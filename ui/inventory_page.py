@@ -1,10 +1,13 @@
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QPushButton,
-                             QTableWidget, QTableWidgetItem, QHeaderView, QLineEdit, QMessageBox, QLabel)
+                             QTableView, QAbstractItemView, QHeaderView, QLineEdit, QMessageBox, QLabel)
 from PyQt5.QtCore import Qt
-from PyQt5.QtGui import QColor
 from models.medicine_dao import MedicineDAO
 from ui.add_medicine_dialog import AddMedicineDialog
-from datetime import datetime, timedelta
+from ui.table_models import ColumnarTableModel, expiry_background
+from ui.query_runner import QueryRunner
+from ui.search_controller import SearchController
+from ui.change_listener import ChangeListener
+from utils.change_bus import MEDICINE_EVENTS, medicine_changes
 
 
 class InventoryPage(QWidget):
@@ -12,7 +15,16 @@ class InventoryPage(QWidget):
         super().__init__()
         self.user_role = user_role
         self.dao = MedicineDAO()
+        self.runner = QueryRunner(self)
         self.init_ui()
+        self.runner.loading.connect(self.loading_label.setVisible)
+        # البحث أثناء الكتابة: تأخير + إلغاء + تصفية محلية للنتائج + ذاكرة لآخر النصوص
+        self.search = SearchController(self.search_input, self.runner, self.dao.search_medicine,
+                                       self.dao.get_all_medicines, self.fill_table,
+                                       refine=self.dao.refine_search, limit=MedicineDAO.SEARCH_LIMIT,
+                                       fetch_rows=self.dao.get_medicines_by_ids, on_patch=self.model.upsert_rows)
+        # أي كتابة على الأدوية (إضافة، حذف، تصفير، بيع، شراء) تحدّث صفوفها فقط في الجدول
+        self.changes = ChangeListener(self, MEDICINE_EVENTS, self.on_change)
         self.load_data()
 
     def init_ui(self):
@@ -29,7 +41,13 @@ class InventoryPage(QWidget):
         legend = QLabel("🔴 منتهي الصلاحية   🟠 وشيك الانتهاء (أقل من 3 شهور)")
         legend.setStyleSheet("font-size: 14px; font-weight: bold; color: #555; font-family: 'Times New Roman';")
 
+        # حالة التحميل أثناء انتظار الاستعلام في الخلفية
+        self.loading_label = QLabel("⏳ جاري التحميل...")
+        self.loading_label.setStyleSheet("font-size: 14px; color: #7F8C8D; font-family: 'Times New Roman';")
+        self.loading_label.hide()
+
         header_layout.addWidget(title)
+        header_layout.addWidget(self.loading_label)
         header_layout.addStretch()
         header_layout.addWidget(legend)
 
@@ -44,7 +62,6 @@ class InventoryPage(QWidget):
         self.search_input.setFixedHeight(50)
         self.search_input.setStyleSheet(
             "font-size: 18px; padding: 0 10px; border: 1px solid #ccc; border-radius: 5px; font-family: 'Times New Roman';")
-        self.search_input.textChanged.connect(self.search_data)
         top_bar.addWidget(self.search_input)
 
         self.btn_add = QPushButton("➕ إضافة دواء")
@@ -81,84 +98,54 @@ class InventoryPage(QWidget):
         layout.addLayout(top_bar)
 
         # جدول البيانات
-        self.table = QTableWidget()
-        self.table.setColumnCount(8)
-        self.table.setHorizontalHeaderLabels(
+        # جدول البيانات: نموذج أعمدة؛ لون الصلاحية يُحسب للصفوف الظاهرة فقط
+        self.model = ColumnarTableModel(
             ["ID", "الباركود", "اسم الدواء", "المادة الفعالة", "شراء", "بيع", "الكمية", "انتهاء الصلاحية"])
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.setSelectionMode(QAbstractItemView.SingleSelection)
 
         header = self.table.horizontalHeader()
         header.setSectionResizeMode(QHeaderView.Stretch)
 
         self.table.setLayoutDirection(Qt.RightToLeft)
         self.table.setStyleSheet(
-            "QTableWidget { font-size: 16px; font-family: 'Times New Roman'; } QHeaderView::section { font-size: 16px; font-weight: bold; font-family: 'Times New Roman'; }")
+            "QTableView { font-size: 16px; font-family: 'Times New Roman'; } QHeaderView::section { font-size: 16px; font-weight: bold; font-family: 'Times New Roman'; }")
 
         # منع التعديل اليدوي المباشر في الجدول (لأن الحفظ يتطلب إجراء خاص)
-        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
 
         layout.addWidget(self.table)
         self.setLayout(layout)
 
     def load_data(self):
-        medicines = self.dao.get_all_medicines()
-        self.fill_table(medicines)
+        # إعادة تحميل نص البحث الحالي (أو كل الأدوية) بالكامل (زر التحديث)
+        self.search.refresh()
 
-    def search_data(self):
-        text = self.search_input.text()
-        if text:
-            medicines = self.dao.search_medicine(text)
-        else:
-            medicines = self.dao.get_all_medicines()
-        self.fill_table(medicines)
+    def on_change(self, event):
+        self.search.apply_changes(*medicine_changes(event))
 
     def fill_table(self, data):
-        self.table.setRowCount(0)
-
-        today = datetime.now().date()
-        warning_date = today + timedelta(days=90)
-
-        for row_idx, row_data in enumerate(data):
-            self.table.insertRow(row_idx)
-
-            expiry_str = row_data[7]
-            bg_color = None
-
-            try:
-                if expiry_str:
-                    expiry_date = datetime.strptime(expiry_str, "%Y-%m-%d").date()
-                    if expiry_date < today:
-                        bg_color = QColor("#FFCDD2")
-                    elif expiry_date <= warning_date:
-                        bg_color = QColor("#FFE0B2")
-            except Exception:
-                pass
-
-            for col_idx, col_data in enumerate(row_data):
-                item = QTableWidgetItem(str(col_data))
-                item.setTextAlignment(Qt.AlignCenter)
-
-                if bg_color:
-                    item.setBackground(bg_color)
-
-                self.table.setItem(row_idx, col_idx, item)
+        # العمود 7 = تاريخ الصلاحية (أحمر: منتهي، برتقالي: خلال 90 يوماً)
+        self.model.set_rows(data, background=expiry_background(7, warn_days=90))
 
     def open_add_dialog(self):
-        dialog = AddMedicineDialog(self)
-        if dialog.exec_():
-            self.load_data()
+        # الدواء الجديد يظهر عبر on_change
+        AddMedicineDialog(self).exec_()
 
     def delete_selected(self):
         if self.user_role != 'admin':
             QMessageBox.warning(self, "تنبيه", "ليس لديك صلاحية الحذف!")
             return
 
-        selected_row = self.table.currentRow()
+        selected_row = self.table.currentIndex().row()
         if selected_row < 0:
             QMessageBox.warning(self, "تنبيه", "الرجاء تحديد دواء لحذفه")
             return
 
-        drug_id = self.table.item(selected_row, 0).text()
-        drug_name = self.table.item(selected_row, 2).text()
+        drug_id = self.model.value(selected_row, 0)
+        drug_name = self.model.value(selected_row, 2)
 
         confirm = QMessageBox.question(self, "تأكيد الحذف", f"هل أنت متأكد من حذف {drug_name}؟",
                                        QMessageBox.Yes | QMessageBox.No)
@@ -167,7 +154,6 @@ class InventoryPage(QWidget):
             success, msg = self.dao.delete_medicine(drug_id)
 
             if success:
-                self.load_data()
                 QMessageBox.information(self, "تم", msg)
             else:
                 # إذا كان الخطأ بسبب ارتباط الدواء بمبيعات سابقة
@@ -180,7 +166,6 @@ class InventoryPage(QWidget):
                         # استدعاء دالة التصفير الجديدة
                         ok, txt = self.dao.clear_medicine_stock(drug_id)
                         if ok:
-                            self.load_data()
                             QMessageBox.information(self, "تم", txt)
                         else:
                             QMessageBox.critical(self, "خطأ", txt)
@@ -196,16 +196,16 @@ class LoginWindow(QWidget):
 
         hashed_input = hashlib.sha256(password.encode()).hexdigest()
 
-        conn = self.db.connect()
-        if conn:
+        with self.db.connection() as conn:
+            if not conn:
+                return
             cursor = conn.cursor()
             cursor.execute("SELECT * FROM users WHERE username = ? AND password = ?", (username, hashed_input))
             user = cursor.fetchone()
-            conn.close()
-
-            if user:
-                user_role = user[3]
-                print(f"Login Successful as {user_role}")
-                self.switch_to_main(user_role)
-            else:
-                QMessageBox.critical(self, "خطأ", "اسم المستخدم أو كلمة المرور غير صحيحة")
\ No newline at end of file
+
+        if user:
+            user_role = user[3]
+            print(f"Login Successful as {user_role}")
+            self.switch_to_main(user_role)
+        else:
+            QMessageBox.critical(self, "خطأ", "اسم المستخدم أو كلمة المرور غير صحيحة")
\ No newline at end of file
@@ -1,22 +1,36 @@
-import os
+from datetime import datetime
 
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLineEdit,
                              QPushButton, QTableWidget, QTableWidgetItem,
-                             QHeaderView, QLabel, QMessageBox, QFrame, QComboBox)
-from PyQt5.QtCore import Qt
-from PyQt5.QtGui import QFont
+                             QHeaderView, QLabel, QMessageBox, QFrame, QCompleter)
+from PyQt5.QtCore import Qt, QModelIndex
+from PyQt5.QtGui import QFont, QStandardItem, QStandardItemModel
 from models.sales_dao import SalesDAO
-from models.customers_dao import CustomersDAO  # ✅ استدعاء كلاس العملاء
+from models.customer_index import customer_index
+from ui.query_runner import QueryRunner
+from ui.change_listener import ChangeListener
+from utils.change_bus import CustomersChanged, CustomersDeleted, MedicinesChanged, MedicinesDeleted, medicine_changes
+from utils.invoice_queue import render_queue
+from config import INVOICE_ACTION
 
 
 class POSPage(QWidget):
     def __init__(self):
         super().__init__()
         self.dao = SalesDAO()
-        self.customers_dao = CustomersDAO()  # ✅ تهيئة كائن العملاء
+        self.customer_id = None  # العميل المختار من الإكمال التلقائي (None = عميل نقدي)
         self.cart = []  # قائمة لتخزين الأدوية المضافة للفاتورة الحالية
+        # خيط خلفي واحد: المسح وإتمام البيع يُنفذان بترتيب إرسالهما، وحقل الباركود لا يتجمد أبداً
+        self.runner = QueryRunner(self, serial=True)
+        # إتمام بيع ينتظر انتهاء المسح المعلق (يبدأ عند فراغ الطابور بدون انتظار في خيط الواجهة)
+        self.checkout_queued = False
+        self.runner.loading.connect(self.on_runner_loading)
         self.init_ui()
-        self.load_customers()  # ✅ تحميل قائمة العملاء عند التشغيل
+        self.load_customers()
+        # العميل المختار إن حُذف أو تغير اسمه، ودواء في السلة حُذف أو تغيرت بياناته/كميته يُحدّث سطره
+        self.customer_changes = ChangeListener(self, (CustomersChanged, CustomersDeleted), self.on_customers_change)
+        self.medicine_changes = ChangeListener(self, (MedicinesChanged, MedicinesDeleted), self.on_medicines_change)
+        render_queue.warm_up()
 
     def init_ui(self):
         layout = QHBoxLayout()  # تقسيم الشاشة لعمودين (يمين ويسار)
@@ -72,12 +86,19 @@ class POSPage(QWidget):
         lbl_cust.setFont(QFont("Times New Roman", 14, QFont.Bold))
         left_layout.addWidget(lbl_cust)
 
-        self.customer_combo = QComboBox()
-        self.customer_combo.setStyleSheet("""
-            QComboBox { background-color: white; color: black; padding: 10px; border-radius: 5px; font-family: 'Times New Roman'; font-size: 14px; }
-            QComboBox::drop-down { border: 0px; }
-        """)
-        left_layout.addWidget(self.customer_combo)
+        # حقل بإكمال تلقائي من فهرس العملاء (أفضل المطابقات فقط) بدلاً من قائمة منسدلة بكل العملاء
+        self.customer_input = QLineEdit()
+        self.customer_input.setPlaceholderText("عميل نقدي (Walk-in) - اكتب اسم العميل أو هاتفه")
+        self.customer_input.setStyleSheet(
+            "background-color: white; color: black; padding: 10px; border-radius: 5px; font-family: 'Times New Roman'; font-size: 14px;")
+        self.customer_matches = QStandardItemModel(self)
+        self.customer_completer = QCompleter(self.customer_matches, self)
+        # المطابقات محسوبة مسبقاً من الفهرس (بادئة أي كلمة أو الهاتف): لا تصفية إضافية من QCompleter
+        self.customer_completer.setCompletionMode(QCompleter.UnfilteredPopupCompletion)
+        self.customer_completer.activated[QModelIndex].connect(self.choose_customer)
+        self.customer_input.setCompleter(self.customer_completer)
+        self.customer_input.textEdited.connect(self.suggest_customers)
+        left_layout.addWidget(self.customer_input)
 
         # 2. اسم الطبيب (جديد)
         lbl_doc = QLabel("🩺 الطبيب المعالج:")
@@ -130,24 +151,82 @@ class POSPage(QWidget):
         self.setLayout(layout)
 
     def load_customers(self):
-        """تحميل العملاء في القائمة المنسدلة"""
-        self.customer_combo.clear()
-        self.customer_combo.addItem("عميل نقدي (Walk-in)", None)
-
-        # جلب العملاء من قاعدة البيانات
-        customers = self.customers_dao.get_all_customers()
-        for cust in customers:
-            # cust = (id, name, phone, email, notes)
-            display_text = f"{cust[1]} - {cust[2]}"  # الاسم - الهاتف
-            self.customer_combo.addItem(display_text, cust[0])  # تخزين ID كبيانات مخفية
+        """بناء فهرس العملاء في الخلفية (مرة واحدة للتطبيق؛ حتى اكتماله يُبحث بفهارس SQLite)"""
+        if not customer_index.loaded:
+            self.runner.submit("customers", customer_index.load)
+
+    @staticmethod
+    def customer_text(name, phone):
+        return f"{name} - {phone}"  # الاسم - الهاتف
+
+    def suggest_customers(self, text):
+        """كتابة في حقل العميل: إلغاء الاختيار السابق وعرض أفضل المطابقات"""
+        self.customer_id = None
+        self.customer_matches.clear()
+        for customer_id, name, phone in customer_index.lookup(text):
+            item = QStandardItem(self.customer_text(name, phone))
+            item.setData(customer_id, Qt.UserRole)
+            self.customer_matches.appendRow(item)
+        if self.customer_matches.rowCount():
+            self.customer_completer.complete()
+
+    def choose_customer(self, index):
+        self.customer_id = index.data(Qt.UserRole)
+        self.customer_input.setText(index.data())
+
+    def on_customers_change(self, event):
+        # الفهرس حُدّث في خيط الكاتب قبل وصول الحدث؛ يبقى تحديث العميل المختار فقط
+        if self.customer_id is None or self.customer_id not in event.ids:
+            return
+        customer = None if isinstance(event, CustomersDeleted) else customer_index.get(self.customer_id)
+        if customer is None:
+            self.customer_id = None
+            self.customer_input.clear()
+        else:
+            self.customer_input.setText(self.customer_text(*customer))
+
+    def on_medicines_change(self, event):
+        if not self.btn_checkout.isEnabled():
+            return  # بيع قيد التنفيذ: السلة ستُفرغ، والتحقق من الكميات يتم داخل process_sale
+        changed, deleted = medicine_changes(event)
+        if deleted:
+            self.cart = [item for item in self.cart if item['id'] not in deleted]
+            self.update_table()
+        in_cart = [med_id for med_id in changed if any(item['id'] == med_id for item in self.cart)]
+        if in_cart:
+            self.runner.submit(None, self.dao.get_medicines_by_ids, in_cart, on_result=self.patch_cart)
+
+    def patch_cart(self, medicines):
+        """تحديث اسم وسعر أدوية السلة، وتقليص الكمية لما هو متوفر (الدواء الذي نفد يُزال)"""
+        if not self.btn_checkout.isEnabled():
+            return  # نتيجة وصلت بعد بدء البيع: السلة المرسلة لا تتغير، والتحقق داخل process_sale
+        current = {med[0]: med for med in medicines}
+        for item in self.cart:
+            med = current.get(item['id'])
+            if med:
+                item['name'], item['price'] = med[1], med[2]
+                item['qty'] = min(item['qty'], med[3])
+        self.cart = [item for item in self.cart if item['qty'] > 0]
+        self.update_table()
 
     def add_to_cart(self):
         text = self.search_input.text().strip()
         if not text:
             return
 
-        medicine = self.dao.get_medicine_by_barcode_or_name(text)
+        # الحقل يُفرغ فوراً حتى يبدأ المسح التالي مباشرة؛ كل مسح طلب مستقل (لا يلغي ما قبله)
+        self.search_input.clear()
+        self.runner.submit(None, self.find_medicine, text,
+                           on_result=lambda medicine: self.add_medicine(text, medicine))
 
+    def find_medicine(self, text):
+        """يعمل في الخيط الخلفي: 1. مسح الباركود (مطابقة تامة وسريعة)، 2. وإلا بحث صريح بالاسم"""
+        medicine = self.dao.get_medicine_by_barcode(text)
+        if medicine is None:
+            medicine = self.dao.search_medicine_by_name(text)
+        return medicine
+
+    def add_medicine(self, text, medicine):
         if medicine:
             med_id, name, price, stock, barcode = medicine
 
@@ -157,7 +236,6 @@ class POSPage(QWidget):
                     if item['qty'] < stock:
                         item['qty'] += 1
                         self.update_table()
-                        self.search_input.clear()
                     else:
                         QMessageBox.warning(self, "تنبيه", "الكمية المطلوبة غير متوفرة في المخزون!")
                     return
@@ -171,8 +249,10 @@ class POSPage(QWidget):
                 'total': price
             })
             self.update_table()
-            self.search_input.clear()
         else:
+            # إعادة النص للتصحيح إن لم يبدأ الكاشير مسحاً جديداً
+            if not self.search_input.text():
+                self.search_input.setText(text)
             QMessageBox.warning(self, "خطأ", "دواء غير موجود أو الكمية نفدت!")
 
     def update_table(self):
@@ -203,10 +283,24 @@ class POSPage(QWidget):
         self.cart = []
         self.update_table()
         # إعادة تعيين الحقول
-        self.customer_combo.setCurrentIndex(0)
+        self.customer_id = None
+        self.customer_input.clear()
         self.doctor_input.clear()
 
+    def on_runner_loading(self, loading):
+        if not loading and self.checkout_queued:
+            self.checkout_queued = False
+            self.set_checkout_busy(False)
+            self.checkout()
+
     def checkout(self):  # أو process_sale
+        if self.runner.is_loading():
+            # مسح معلق (أجزاء من الملي ثانية): البيع يبدأ عند اكتمال السلة (on_runner_loading)،
+            # والأزرار مقفلة حتى ذلك فلا يتكرر الضغط
+            self.checkout_queued = True
+            self.set_checkout_busy(True)
+            return
+
         if not self.cart:
             QMessageBox.warning(self, "تنبيه", "السلة فارغة!")
             return
@@ -214,41 +308,43 @@ class POSPage(QWidget):
         total_amount = float(self.total_label.text().replace(',', ''))
 
         # جلب البيانات
-        customer_idx = self.customer_combo.currentIndex()
-        customer_id = self.customer_combo.itemData(customer_idx)
+        customer_id = self.customer_id
+        if customer_id is None and self.customer_input.text().strip():
+            QMessageBox.warning(self, "تنبيه", "اختر العميل من القائمة المقترحة، أو امسح الحقل للبيع النقدي")
+            self.customer_input.setFocus()
+            return
         doctor_name = self.doctor_input.text()
 
-        # تنفيذ البيع
-        # ملاحظة: النتيجة الآن هي (success, result) حيث result إما رقم الفاتورة أو رسالة خطأ
-        success, result = self.dao.process_sale(1, self.cart, total_amount, customer_id, doctor_name)
+        # تنفيذ البيع في الخلفية؛ السلة والحقول مقفلة حتى تصل النتيجة
+        # ملاحظة: النتيجة هي (success, result) حيث result إما رقم الفاتورة أو رسالة خطأ
+        # items: نسخة السلة المرسلة للبيع، وهي نفسها التي تُطبع في الفاتورة
+        self.set_checkout_busy(True)
+        items = [dict(item) for item in self.cart]
+        self.runner.submit("checkout", self.dao.process_sale, 1, items, total_amount, customer_id, doctor_name,
+                           on_result=lambda outcome: self.finish_checkout(outcome, items, total_amount),
+                           on_error=lambda message: self.finish_checkout((False, message), items, total_amount))
+
+    def set_checkout_busy(self, busy):
+        for widget in (self.search_input, self.btn_remove, self.btn_clear, self.btn_checkout, self.customer_input):
+            widget.setEnabled(not busy)
+        self.btn_checkout.setText("⏳ جاري الحفظ..." if busy else "💰 إتمام البيع")
+
+    def finish_checkout(self, outcome, items, total_amount):
+        self.set_checkout_busy(False)
+        self.search_input.setFocus()
+        success, result = outcome
 
         if success:
             sale_id = result  # في حالة النجاح، المتغير الثاني هو رقم الفاتورة
 
-            # 1. إظهار رسالة نجاح
-            QMessageBox.information(self, "نجاح", f"تم حفظ الفاتورة رقم {sale_id} بنجاح")
-
-            # 2. طباعة الفاتورة تلقائياً
-            try:
-                # تجهيز البيانات للطباعة
-                from utils.pdf_generator import create_invoice_pdf
-                # نحتاج تمرير التاريخ واسم الكاشير (يمكنك تحسينها لاحقاً)
-                import datetime
-                current_date = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            # 1. طباعة الفاتورة في الخلفية (الأسطر التي حُفظت فعلاً)، والفتح/الطباعة عند انتهاء التوليد
+            # نحتاج تمرير التاريخ واسم الكاشير (يمكنك تحسينها لاحقاً)
+            current_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            render_queue.submit(items, total_amount, sale_id, "Admin", current_date, action=INVOICE_ACTION)
 
-                pdf_path = create_invoice_pdf(self.cart, total_amount, sale_id, "Admin", current_date)
-
-                if pdf_path:
-                    # فتح الملف
-                    if os.name == 'nt':
-                        os.startfile(pdf_path)
-                    else:
-                        os.system(f"xdg-open '{pdf_path}'")
-            except Exception as e:
-                print(f"Printing Error: {e}")
-
-            # 3. تنظيف السلة
+            # 2. تنظيف السلة (العميل التالي) ثم إظهار رسالة النجاح بينما يتم التوليد
             self.clear_cart()
+            QMessageBox.information(self, "نجاح", f"تم حفظ الفاتورة رقم {sale_id} بنجاح")
         else:
             msg = result  # في حالة الفشل، المتغير الثاني هو رسالة الخطأ
             QMessageBox.critical(self, "فشل", msg)
\ No newline at end of file
@@ -5,6 +5,8 @@ from PyQt5.QtCore import Qt, QDate
 from models.purchases_dao import PurchasesDAO
 from models.suppliers_dao import SuppliersDAO
 from models.medicine_dao import MedicineDAO
+from ui.change_listener import ChangeListener
+from utils.change_bus import SuppliersChanged, SuppliersDeleted
 
 
 class PurchasesPage(QWidget):
@@ -17,6 +19,8 @@ class PurchasesPage(QWidget):
         self.cart = []  # سلة الشراء
         self.init_ui()
         self.load_suppliers()
+        # مورد مضاف أو محذوف من صفحة الموردين يظهر/يختفي في القائمة بدون إعادة تحميلها
+        self.changes = ChangeListener(self, (SuppliersChanged, SuppliersDeleted), self.on_suppliers_change)
 
     def init_ui(self):
         layout = QVBoxLayout()
@@ -120,6 +124,20 @@ class PurchasesPage(QWidget):
             # sup = (id, name, ...)
             self.supplier_combo.addItem(sup[1], sup[0])  # Text=Name, Data=ID
 
+    def on_suppliers_change(self, event):
+        if isinstance(event, SuppliersDeleted):
+            for supplier_id in event.ids:
+                index = self.supplier_combo.findData(supplier_id)
+                if index >= 0:
+                    self.supplier_combo.removeItem(index)
+            return
+        for sup in self.supplier_dao.get_suppliers_by_ids(event.ids):
+            index = self.supplier_combo.findData(sup[0])
+            if index >= 0:
+                self.supplier_combo.setItemText(index, sup[1])
+            else:
+                self.supplier_combo.addItem(sup[1], sup[0])
+
     def add_item_to_cart(self):
         text = self.search_input.text()
         if not text: return
@@ -0,0 +1,158 @@
+"""
+تنفيذ استدعاءات الـ DAO في خيوط خلفية حتى لا تتجمد الواجهة أثناء استعلامات SQLite.
+
+- كل طلب له مفتاح (مثل "medicines")؛ الطلب الجديد بنفس المفتاح يلغي القديم:
+  إن لم يبدأ بعد يُسحب من الطابور، وإن كان يعمل تُهمل نتيجته عند وصولها.
+- النتيجة تصل عبر إشارة Qt فتُنفذ دالة on_result في خيط الواجهة دائماً (آمن لتعديل الـ Widgets).
+- الإشارة loading(bool) تتغير عند بدء أول طلب معلّق وعند انتهاء آخر طلب (لعرض حالة التحميل).
+
+أمان SQLite: الدالة المنفذة في الخلفية تستعير اتصالها الخاص من المجمّع (DatabaseManager.connection)
+كأي استدعاء DAO، والمجمّع يضمن أن الاتصال الواحد لا يستخدمه خيطان في نفس اللحظة.
+لذلك يجب ألا تلمس الدالة أي Widget، وألا تتشارك مؤشراً أو اتصالاً مع خيط الواجهة.
+"""
+import itertools
+
+from PyQt5.QtCore import QCoreApplication, QObject, QRunnable, QThreadPool, pyqtSignal
+
+from database.db_manager import QUERY_WORKERS
+from utils.app_log import app_log
+
+# حجم المجمّع يشمل هذه الخيوط والمنفذات التسلسلية (SERIAL_RUNNERS)، ويبقى بعدها اتصال
+# متاح دائماً لاستدعاءات خيط الواجهة المباشرة (راجع POOL_SIZE في database/db_manager.py)
+WORKER_THREADS = QUERY_WORKERS
+
+_shared_pool = None
+_tickets = itertools.count(1)
+
+
+def shared_pool():
+    """مجمّع الخيوط المشترك بين الصفحات (يُنشأ عند أول استخدام)"""
+    global _shared_pool
+    if _shared_pool is None:
+        _shared_pool = QThreadPool()
+        _shared_pool.setMaxThreadCount(WORKER_THREADS)
+    return _shared_pool
+
+
+class _Signals(QObject):
+    # QRunnable ليس QObject، فالإشارات في كائن مرافق يعيش في خيط الواجهة
+    finished = pyqtSignal(int, object)
+    failed = pyqtSignal(int, str)
+
+
+class _Task(QRunnable):
+    def __init__(self, ticket, fn, args, kwargs, signals):
+        super().__init__()
+        self.setAutoDelete(False)  # نحتفظ بالمرجع حتى نستطيع سحبه من الطابور (tryTake)
+        self.ticket = ticket
+        self._fn = fn
+        self._args = args
+        self._kwargs = kwargs
+        self._signals = signals
+
+    def run(self):
+        try:
+            result = self._fn(*self._args, **self._kwargs)
+        except Exception as e:
+            app_log().exception("خطأ في طلب خلفي %s", getattr(self._fn, "__qualname__", self._fn))
+            self._signals.failed.emit(self.ticket, str(e))
+        else:
+            self._signals.finished.emit(self.ticket, result)
+
+
+class QueryRunner(QObject):
+    """
+    منفذ طلبات لصفحة واحدة:
+        self.runner = QueryRunner(self)
+        self.runner.loading.connect(self.loading_label.setVisible)
+        self.runner.submit("medicines", self.dao.get_all_medicines, on_result=self.fill_table)
+    serial=True: خيط واحد خاص بالصفحة فتُنفذ الطلبات بترتيب إرسالها (مسح الباركود ثم إتمام البيع).
+    كل صفحة جديدة بمنفذ تسلسلي تحتاج زيادة SERIAL_RUNNERS في database/db_manager.py (حجم مجمّع الاتصالات).
+    """
+    loading = pyqtSignal(bool)
+
+    def __init__(self, parent=None, serial=False):
+        super().__init__(parent)
+        if serial:
+            self._pool = QThreadPool(self)
+            self._pool.setMaxThreadCount(1)
+        else:
+            self._pool = shared_pool()
+        self._signals = _Signals(self)
+        self._signals.finished.connect(self._on_finished)
+        self._signals.failed.connect(self._on_failed)
+        self._latest = {}    # المفتاح -> آخر تذكرة (الأقدم منها نتائجها مهملة)
+        self._pending = {}   # التذكرة -> (المفتاح، المهمة، on_result، on_error)
+
+    def submit(self, key, fn, *args, on_result=None, on_error=None, **kwargs):
+        """
+        تنفيذ fn(*args, **kwargs) في الخلفية. key=None يعني طلباً مستقلاً لا يلغي غيره ولا يُلغى.
+        يعيد رقم التذكرة.
+        """
+        if key is not None:
+            self.cancel(key)
+        ticket = next(_tickets)
+        task = _Task(ticket, fn, args, kwargs, self._signals)
+        if key is not None:
+            self._latest[key] = ticket
+        was_idle = not self._pending
+        self._pending[ticket] = (key, task, on_result, on_error)
+        if was_idle:
+            self.loading.emit(True)
+        self._pool.start(task)
+        return ticket
+
+    def cancel(self, key):
+        """إلغاء الطلب الحالي لهذا المفتاح (سحبه من الطابور إن لم يبدأ، وإلا إهمال نتيجته)"""
+        ticket = self._latest.pop(key, None)
+        if ticket is None or ticket not in self._pending:
+            return
+        _, task, _, _ = self._pending[ticket]
+        if self._pool.tryTake(task):
+            self._drop(ticket)
+        # إن كان يعمل: يبقى في _pending حتى تصل نتيجته ثم تُهمل
+
+    def is_loading(self, key=None):
+        if key is None:
+            return bool(self._pending)
+        return key in self._latest
+
+    # loading(False) بعد on_result/on_error حتى يرى من ينتظر فراغ الطابور نتيجة آخر طلب
+    # (إتمام البيع في نقطة البيع يبدأ بعد إضافة آخر مسح للسلة)
+    def _on_finished(self, ticket, result):
+        pending = ticket in self._pending
+        entry = self._take(ticket)
+        if entry and entry[2]:
+            entry[2](result)
+        if pending and not self._pending:
+            self.loading.emit(False)
+
+    def _on_failed(self, ticket, message):
+        pending = ticket in self._pending
+        entry = self._take(ticket)
+        if entry and entry[3]:
+            entry[3](message)
+        if pending and not self._pending:
+            self.loading.emit(False)
+
+    def _take(self, ticket):
+        """إزالة التذكرة وإعادة بياناتها إن كانت ما زالت الأحدث لمفتاحها (وإلا None)"""
+        entry = self._pending.get(ticket)
+        if entry is None:
+            return None
+        key = entry[0]
+        current = key is None or self._latest.get(key) == ticket
+        if current and key is not None:
+            del self._latest[key]
+        del self._pending[ticket]
+        return entry if current else None
+
+    def _drop(self, ticket):
+        self._pending.pop(ticket, None)
+        if not self._pending:
+            self.loading.emit(False)
+
+    def wait(self, msecs=-1):
+        """انتظار انتهاء كل الطلبات ثم تسليم نتائجها (للاختبار والقياس وسكربتات سطر الأوامر)"""
+        self._pool.waitForDone(msecs)
+        QCoreApplication.processEvents()
@@ -1,19 +1,80 @@
-from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QTableWidget, QTableWidgetItem,
+from PyQt5.QtWidgets import (QWidget, QVBoxLayout,
                              QPushButton, QHeaderView, QMessageBox, QHBoxLayout, QLabel,
-                             QTabWidget, QFrame)
-from PyQt5.QtCore import Qt
+                             QTabWidget, QFrame, QDateEdit, QComboBox, QTableView, QAbstractItemView,
+                             QCheckBox, QProgressDialog)
+from PyQt5.QtCore import Qt, QDate, pyqtSignal
 from PyQt5.QtGui import QFont, QColor
-from models.reports_dao import ReportsDAO
-from utils.pdf_generator import create_invoice_pdf
+from models.reports_dao import ReportsDAO, date_page_key
+from models.profit_engine import ProfitEngine
+from models.expiry_engine import ExpiryEngine
+from ui.table_models import PagedTableModel, ColumnarTableModel
+from ui.query_runner import QueryRunner
+from ui.change_listener import ChangeListener
+from utils.change_bus import (TablesChanged, SaleCommitted, PurchaseReceived, MedicinesChanged, MedicinesDeleted,
+                              SuppliersChanged, SuppliersDeleted)
+from utils.invoice_queue import render_queue
+from utils.invoice_export import export_dir, export_invoices
 import os
 import csv
 
+# أبعاد تحليل الأرباح (المفتاح في نتيجة ProfitEngine، والعنوان المعروض)
+PROFIT_DIMENSIONS = [("medicine", "حسب الدواء"), ("day", "حسب اليوم"),
+                     ("cashier", "حسب الكاشير"), ("supplier", "حسب المورد")]
+
+# أقصى عدد صفوف معروضة في جدول الأرباح (الأعلى ربحاً أولاً)
+PROFIT_ROWS_LIMIT = 1000
+LOSS_COLOR = QColor("red")
+
+# أجزاء الصفحة التي تتأثر بتغير كل جدول
+REFRESH_SECTIONS = {
+    "sales": ("summary", "sales", "profit"),
+    "purchase_invoices": ("summary", "purchases"),
+    "medicines": ("shortages", "expiry"),
+    "batches": ("expiry", "profit"),
+    "suppliers": ("shortages",),
+}
+
+# الجداول التي يغيرها كل حدث من أحداث الـ DAO داخل التطبيق
+# (الكتابات الخارجية تصل كـ TablesChanged من مراقب التغييرات database/change_log.py، وهو يستبعد كتابات التطبيق)
+EVENT_TABLES = {
+    SaleCommitted: ("sales", "batches", "medicines"),
+    PurchaseReceived: ("purchase_invoices", "batches", "medicines"),
+    MedicinesChanged: ("medicines", "batches"),
+    MedicinesDeleted: ("medicines", "batches"),
+    SuppliersChanged: ("suppliers",),
+    SuppliersDeleted: ("suppliers",),
+}
+
 
 class ReportsPage(QWidget):
+    # تقدم التصدير الجماعي (يُرسل من الخيط الخلفي ويصل في خيط الواجهة): المنجز، الإجمالي، الثواني
+    export_progress = pyqtSignal(int, int, float)
+
     def __init__(self):
         super().__init__()
         self.dao = ReportsDAO()
+        self.profit_engine = ProfitEngine()
+        self.expiry_engine = ExpiryEngine()
+        self.profit_report = None
+        self.runner = QueryRunner(self)
+        self.reprints = set()  # فواتير أرسلتها هذه الصفحة لطابور الطباعة (لإظهار نتيجتها هنا فقط)
+        render_queue.rendered.connect(self.on_invoice_rendered)
+        render_queue.failed.connect(self.on_invoice_failed)
         self.init_ui()
+        self.runner.loading.connect(self.loading_label.setVisible)
+        # كل جزء: (تبويبه، دالة تحديثه)؛ الأجزاء المتأثرة بكتابة تُحدّث عند ظهور تبويبها فقط
+        self.sections = {
+            "summary": (self.tab_sales, self.update_financial_summary),
+            "sales": (self.tab_sales, self.sales_model.refresh_head),
+            "purchases": (self.tab_purchases, self.purchases_model.refresh_head),
+            "shortages": (self.tab_shortages, self.load_shortages),
+            "expiry": (self.tab_expiry, self.load_expiry),
+            "profit": (self.tab_profit, self.mark_profit_outdated),
+        }
+        self.stale = set()
+        self.profit_outdated = False
+        self.tabs.currentChanged.connect(self.refresh_stale)
+        self.changes = ChangeListener(self, (TablesChanged,) + tuple(EVENT_TABLES), self.on_tables_changed)
         self.load_all_data()
 
     def init_ui(self):
@@ -27,6 +88,13 @@ class ReportsPage(QWidget):
             "font-size: 26px; font-weight: bold; color: #2C3E50; font-family: 'Times New Roman'; margin-bottom: 10px;")
         layout.addWidget(title)
 
+        # حالة التحميل أثناء انتظار الاستعلامات في الخلفية
+        self.loading_label = QLabel("⏳ جاري التحميل...")
+        self.loading_label.setAlignment(Qt.AlignCenter)
+        self.loading_label.setStyleSheet("font-size: 14px; color: #7F8C8D; font-family: 'Times New Roman';")
+        self.loading_label.hide()
+        layout.addWidget(self.loading_label)
+
         # نظام التبويب (Tabs)
         self.tabs = QTabWidget()
         self.tabs.setStyleSheet("""
@@ -39,14 +107,20 @@ class ReportsPage(QWidget):
         self.tab_sales = QWidget()
         self.tab_purchases = QWidget()
         self.tab_shortages = QWidget()
+        self.tab_profit = QWidget()
+        self.tab_expiry = QWidget()
 
         self.create_sales_tab()
         self.create_purchases_tab()
         self.create_shortages_tab()
+        self.create_profit_tab()
+        self.create_expiry_tab()
 
         self.tabs.addTab(self.tab_sales, "💰 المبيعات والأرباح")
         self.tabs.addTab(self.tab_purchases, "📥 سجل المشتريات")
         self.tabs.addTab(self.tab_shortages, "⚠️ النواقص (طلبات الشراء)")
+        self.tabs.addTab(self.tab_profit, "📊 تحليل الأرباح")
+        self.tabs.addTab(self.tab_expiry, "⏳ الصلاحية")
 
         layout.addWidget(self.tabs)
         self.setLayout(layout)
@@ -61,19 +135,28 @@ class ReportsPage(QWidget):
         summary_layout = QHBoxLayout()
         self.lbl_total_sales = QLabel("إجمالي المبيعات: 0.00")
         self.lbl_total_purchases = QLabel("إجمالي المصروفات: 0.00")
-        self.lbl_net_profit = QLabel("صافي الدخل: 0.00")
+        self.lbl_cogs = QLabel("تكلفة البضاعة المباعة: 0.00")
+        self.lbl_net_profit = QLabel("الربح الإجمالي: 0.00")
 
-        for lbl in [self.lbl_total_sales, self.lbl_total_purchases, self.lbl_net_profit]:
+        for lbl in [self.lbl_total_sales, self.lbl_total_purchases, self.lbl_cogs, self.lbl_net_profit]:
             lbl.setStyleSheet(
                 "font-size: 18px; font-weight: bold; font-family: 'Times New Roman'; padding: 10px; border: 1px solid #ccc; background-color: white; border-radius: 5px;")
             summary_layout.addWidget(lbl)
 
         layout.addLayout(summary_layout)
 
-        # جدول المبيعات
-        self.sales_table = QTableWidget()
-        self.sales_table.setColumnCount(5)
-        self.sales_table.setHorizontalHeaderLabels(["رقم الفاتورة", "البائع", "العميل", "الإجمالي", "التاريخ"])
+        # جدول المبيعات: نموذج كسول يجلب الصفحات عند التمرير بدلاً من تحميل كل التاريخ
+        self.sales_model = PagedTableModel(
+            ["رقم الفاتورة", "البائع", "العميل", "الإجمالي", "التاريخ"],
+            self.dao.get_sales_page,
+            key_of=date_page_key,  # (sale_date, id)
+            formatters={2: lambda name: name if name else "نقدي", 3: lambda total: f"{total:.2f}"},
+            runner=self.runner,
+        )
+        self.sales_table = QTableView()
+        self.sales_table.setModel(self.sales_model)
+        self.sales_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.sales_table.setSelectionMode(QAbstractItemView.SingleSelection)
         self.sales_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
         self.sales_table.setLayoutDirection(Qt.RightToLeft)
         self.sales_table.setStyleSheet("font-family: 'Times New Roman'; font-size: 14px;")
@@ -94,6 +177,26 @@ class ReportsPage(QWidget):
         btn_layout.addWidget(btn_print)
         layout.addLayout(btn_layout)
 
+        # إعادة طباعة جماعية لفواتير فترة (للتدقيق)
+        export_layout = QHBoxLayout()
+        self.export_from = QDateEdit(QDate.currentDate().addDays(-30))
+        self.export_to = QDateEdit(QDate.currentDate())
+        for date_edit in [self.export_from, self.export_to]:
+            date_edit.setCalendarPopup(True)
+            date_edit.setDisplayFormat("yyyy-MM-dd")
+        self.export_single = QCheckBox("ملف واحد")
+        self.btn_export = QPushButton("📚 تصدير فواتير الفترة")
+        self.btn_export.clicked.connect(self.export_invoices)
+        self.btn_export.setStyleSheet("font-size: 16px; font-family: 'Times New Roman'; padding: 8px;")
+
+        export_layout.addWidget(QLabel("تصدير الفواتير من:"))
+        export_layout.addWidget(self.export_from)
+        export_layout.addWidget(QLabel("إلى:"))
+        export_layout.addWidget(self.export_to)
+        export_layout.addWidget(self.export_single)
+        export_layout.addWidget(self.btn_export)
+        layout.addLayout(export_layout)
+
         self.tab_sales.setLayout(layout)
 
     # ------------------------------------------------------------------------
@@ -102,9 +205,16 @@ class ReportsPage(QWidget):
     def create_purchases_tab(self):
         layout = QVBoxLayout()
 
-        self.purchases_table = QTableWidget()
-        self.purchases_table.setColumnCount(5)
-        self.purchases_table.setHorizontalHeaderLabels(["ID", "المورد", "رقم الفاتورة", "المبلغ", "التاريخ"])
+        self.purchases_model = PagedTableModel(
+            ["ID", "المورد", "رقم الفاتورة", "المبلغ", "التاريخ"],
+            self.dao.get_purchases_page,
+            key_of=date_page_key,  # (invoice_date, id)
+            runner=self.runner,
+        )
+        self.purchases_table = QTableView()
+        self.purchases_table.setModel(self.purchases_model)
+        self.purchases_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.purchases_table.setSelectionMode(QAbstractItemView.SingleSelection)
         self.purchases_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
         self.purchases_table.setLayoutDirection(Qt.RightToLeft)
         self.purchases_table.setStyleSheet("font-family: 'Times New Roman'; font-size: 14px;")
@@ -128,9 +238,13 @@ class ReportsPage(QWidget):
         lbl.setStyleSheet("color: #E74C3C; font-weight: bold; font-size: 16px; font-family: 'Times New Roman';")
         layout.addWidget(lbl)
 
-        self.shortage_table = QTableWidget()
-        self.shortage_table.setColumnCount(4)
-        self.shortage_table.setHorizontalHeaderLabels(["الباركود", "اسم الدواء", "الكمية الحالية", "المورد المقترح"])
+        self.shortage_model = ColumnarTableModel(
+            ["الباركود", "اسم الدواء", "الكمية الحالية", "المورد المقترح"],
+            formatters={3: lambda name: name if name else "غير محدد"},
+        )
+        self.shortage_table = QTableView()
+        self.shortage_table.setModel(self.shortage_model)
+        self.shortage_table.setSelectionBehavior(QAbstractItemView.SelectRows)
         self.shortage_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
         self.shortage_table.setLayoutDirection(Qt.RightToLeft)
         self.shortage_table.setStyleSheet("font-family: 'Times New Roman'; font-size: 14px;")
@@ -144,84 +258,212 @@ class ReportsPage(QWidget):
         layout.addWidget(btn_export)
         self.tab_shortages.setLayout(layout)
 
+    # ------------------------------------------------------------------------
+    # 4. تصميم تبويب تحليل الأرباح (الإيراد - تكلفة التشغيلات المباعة)
+    # ------------------------------------------------------------------------
+    def create_profit_tab(self):
+        layout = QVBoxLayout()
+
+        filter_layout = QHBoxLayout()
+        self.profit_from = QDateEdit(QDate.currentDate().addDays(-30))
+        self.profit_to = QDateEdit(QDate.currentDate())
+        for date_edit in [self.profit_from, self.profit_to]:
+            date_edit.setCalendarPopup(True)
+            date_edit.setDisplayFormat("yyyy-MM-dd")
+
+        self.profit_dimension = QComboBox()
+        for key, label in PROFIT_DIMENSIONS:
+            self.profit_dimension.addItem(label, key)
+        self.profit_dimension.currentIndexChanged.connect(self.show_profit_breakdown)
+
+        self.btn_compute = btn_compute = QPushButton("📊 حساب الأرباح")
+        btn_compute.clicked.connect(self.load_profit)
+        btn_compute.setStyleSheet(
+            "background-color: #2980B9; color: white; font-weight: bold; font-size: 16px; font-family: 'Times New Roman'; padding: 8px;")
+
+        filter_layout.addWidget(QLabel("من:"))
+        filter_layout.addWidget(self.profit_from)
+        filter_layout.addWidget(QLabel("إلى:"))
+        filter_layout.addWidget(self.profit_to)
+        filter_layout.addWidget(self.profit_dimension)
+        filter_layout.addWidget(btn_compute)
+        layout.addLayout(filter_layout)
+
+        self.lbl_profit_totals = QLabel("اختر الفترة ثم اضغط حساب الأرباح")
+        self.lbl_profit_totals.setStyleSheet("font-size: 16px; font-weight: bold; font-family: 'Times New Roman'; padding: 6px;")
+        layout.addWidget(self.lbl_profit_totals)
+
+        # الصفوف كما يعيدها ProfitEngine: (المفتاح، الاسم، الكمية، الإيراد، التكلفة، الربح، الهامش)؛ المفتاح مخفي
+        self.profit_model = ColumnarTableModel(
+            ["", "البند", "الكمية", "الإيراد", "التكلفة", "الربح", "الهامش %"],
+            formatters={2: lambda v: f"{v:,.0f}", 3: lambda v: f"{v:,.2f}", 4: lambda v: f"{v:,.2f}",
+                        5: lambda v: f"{v:,.2f}", 6: lambda v: f"{v:.1f}"},
+        )
+        self.profit_table = QTableView()
+        self.profit_table.setModel(self.profit_model)
+        self.profit_table.setColumnHidden(0, True)
+        self.profit_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.profit_table.setLayoutDirection(Qt.RightToLeft)
+        self.profit_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.profit_table.setStyleSheet("font-family: 'Times New Roman'; font-size: 14px;")
+        layout.addWidget(self.profit_table)
+
+        self.tab_profit.setLayout(layout)
+
+    # ------------------------------------------------------------------------
+    # 5. تصميم تبويب الصلاحية (التشغيلات التي فيها مخزون)
+    # ------------------------------------------------------------------------
+    def create_expiry_tab(self):
+        layout = QVBoxLayout()
+
+        # شرائح الصلاحية والقيمة المعرضة للخسارة (بسعر الشراء) من تقويم الصلاحية
+        buckets_layout = QHBoxLayout()
+        self.expiry_labels = {}
+        for key, color in [("expired", "#E74C3C"), ("30", "#E67E22"), ("60", "#F39C12"), ("90", "#F1C40F")]:
+            lbl = QLabel()
+            lbl.setAlignment(Qt.AlignCenter)
+            lbl.setStyleSheet(
+                f"font-size: 16px; font-weight: bold; font-family: 'Times New Roman'; padding: 10px; border: 2px solid {color}; background-color: white; border-radius: 5px;")
+            self.expiry_labels[key] = lbl
+            buckets_layout.addWidget(lbl)
+        layout.addLayout(buckets_layout)
+
+        # التشغيلات الأقرب انتهاءً أولاً (المنتهية في البداية)، تُجلب صفحة بصفحة عند التمرير
+        self.expiry_model = PagedTableModel(
+            ["ID", "اسم الدواء", "رقم التشغيلة", "تاريخ الانتهاء", "الكمية", "القيمة (شراء)"],
+            self.expiry_engine.upcoming,
+            key_of=lambda row: (row[3], row[0]),  # (expiry_date, id)
+            formatters={2: lambda number: number or "-", 5: lambda value: f"{value:,.2f}"},
+            runner=self.runner,
+        )
+        self.expiry_table = QTableView()
+        self.expiry_table.setModel(self.expiry_model)
+        self.expiry_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.expiry_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.expiry_table.setLayoutDirection(Qt.RightToLeft)
+        self.expiry_table.setStyleSheet("font-family: 'Times New Roman'; font-size: 14px;")
+        layout.addWidget(self.expiry_table)
+
+        self.tab_expiry.setLayout(layout)
+
     # ------------------------------------------------------------------------
     # الدوال المنطقية (Loading Data)
     # ------------------------------------------------------------------------
     def load_all_data(self):
+        self.stale.clear()
         self.load_sales()
         self.load_purchases()
         self.load_shortages()
+        self.load_expiry()
         self.update_financial_summary()
 
+    def on_tables_changed(self, event):
+        tables = event.tables if isinstance(event, TablesChanged) else EVENT_TABLES[type(event)]
+        self.stale.update(section for table in tables for section in REFRESH_SECTIONS.get(table, ()))
+        self.refresh_stale()
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.refresh_stale()
+
+    def refresh_stale(self):
+        """تحديث الأجزاء المتأثرة في التبويب الظاهر فقط (الباقي عند فتح تبويبه)"""
+        if not self.stale or not self.isVisible():
+            return
+        current = self.tabs.currentWidget()
+        for section in [section for section in self.stale if self.sections[section][0] is current]:
+            self.stale.discard(section)
+            self.sections[section][1]()
+
     def update_financial_summary(self):
-        summary = self.dao.get_financial_summary()
+        self.runner.submit("summary", self.dao.get_financial_summary, on_result=self.show_financial_summary)
+
+    def show_financial_summary(self, summary):
         self.lbl_total_sales.setText(f"إجمالي المبيعات: {summary['sales']:,.2f}")
         self.lbl_total_purchases.setText(f"إجمالي المصروفات: {summary['purchases']:,.2f}")
 
+        self.lbl_cogs.setText(f"تكلفة البضاعة المباعة: {summary['cogs']:,.2f}")
+
         profit = summary['profit']
         color = "green" if profit >= 0 else "red"
-        self.lbl_net_profit.setText(f"صافي الدخل: {profit:,.2f}")
+        self.lbl_net_profit.setText(f"الربح الإجمالي: {profit:,.2f}")
         self.lbl_net_profit.setStyleSheet(
             f"color: {color}; font-size: 18px; font-weight: bold; font-family: 'Times New Roman'; padding: 10px; border: 1px solid #ccc; background-color: white; border-radius: 5px;")
 
     def load_sales(self):
-        sales = self.dao.get_all_sales()
-        self.sales_table.setRowCount(0)
-        for row, data in enumerate(sales):
-            self.sales_table.insertRow(row)
-            # data: id, username, cust_name, total, date
-            cust_name = data[2] if data[2] else "نقدي"
-            self.sales_table.setItem(row, 0, QTableWidgetItem(str(data[0])))
-            self.sales_table.setItem(row, 1, QTableWidgetItem(str(data[1])))
-            self.sales_table.setItem(row, 2, QTableWidgetItem(str(cust_name)))
-            self.sales_table.setItem(row, 3, QTableWidgetItem(f"{data[3]:.2f}"))
-            self.sales_table.setItem(row, 4, QTableWidgetItem(str(data[4])))
+        # الصفحة الأولى فقط؛ الباقي يُجلب عند التمرير
+        self.sales_model.reload()
 
     def load_purchases(self):
-        purchases = self.dao.get_all_purchases()
-        self.purchases_table.setRowCount(0)
-        for row, data in enumerate(purchases):
-            self.purchases_table.insertRow(row)
-            for col, val in enumerate(data):
-                self.purchases_table.setItem(row, col, QTableWidgetItem(str(val)))
+        self.purchases_model.reload()
 
     def load_shortages(self):
-        items = self.dao.get_low_stock_items()
-        self.shortage_table.setRowCount(0)
-        for row, data in enumerate(items):
-            self.shortage_table.insertRow(row)
-            # barcode, name, qty, supplier
-            self.shortage_table.setItem(row, 0, QTableWidgetItem(str(data[0])))
-            self.shortage_table.setItem(row, 1, QTableWidgetItem(str(data[1])))
-            self.shortage_table.setItem(row, 2, QTableWidgetItem(str(data[2])))
-
-            sup_name = data[3] if data[3] else "غير محدد"
-            self.shortage_table.setItem(row, 3, QTableWidgetItem(sup_name))
+        # barcode, name, qty, supplier
+        self.runner.submit("shortages", self.dao.get_low_stock_items, on_result=self.shortage_model.set_rows)
+
+    def load_expiry(self):
+        self.runner.submit("expiry", self.expiry_engine.buckets, on_result=self.show_expiry_buckets)
+        self.expiry_model.reload()
+
+    def show_expiry_buckets(self, buckets):
+        for bucket in buckets:
+            self.expiry_labels[bucket["key"]].setText(
+                f"{bucket['label']}\n{bucket['batches']:,} تشغيلة | {bucket['quantity']:,} وحدة | {bucket['value']:,.2f}")
+
+    def load_profit(self):
+        """حساب الأرباح للفترة المختارة في الخلفية (يدوياً فقط: قد يشمل ملايين الأسطر)"""
+        self.btn_compute.setEnabled(False)
+        self.lbl_profit_totals.setText("⏳ جاري حساب الأرباح...")
+        self.runner.submit("profit", self.profit_engine.compute,
+                           self.profit_from.date().toString("yyyy-MM-dd"), self.profit_to.date().toString("yyyy-MM-dd"),
+                           on_result=self.show_profit, on_error=self.show_profit_error)
+
+    def mark_profit_outdated(self):
+        # حساب الأرباح يدوي (قد يشمل ملايين الأسطر): تنبيه فقط بأن النتيجة المعروضة قديمة
+        if self.profit_report and not self.profit_outdated:
+            self.profit_outdated = True
+            self.lbl_profit_totals.setText(
+                self.lbl_profit_totals.text() + "  |  ⚠️ تغيرت البيانات بعد الحساب، أعد حساب الأرباح")
+
+    def show_profit_error(self, message):
+        self.btn_compute.setEnabled(True)
+        self.lbl_profit_totals.setText(f"تعذر حساب الأرباح: {message}")
+
+    def show_profit(self, report):
+        self.btn_compute.setEnabled(True)
+        self.profit_report = report
+        self.profit_outdated = False
+        totals = report["totals"]
+        self.lbl_profit_totals.setText(
+            f"الإيراد: {totals['revenue']:,.2f}  |  التكلفة: {totals['cogs']:,.2f}  |  "
+            f"الربح: {totals['profit']:,.2f}  |  الهامش: {totals['margin']:.1f}%  |  الأسطر: {totals['lines']:,}")
+        self.show_profit_breakdown()
+
+    def show_profit_breakdown(self):
+        """عرض التجميع المختار من آخر نتيجة (بدون إعادة الحساب عند تغيير البُعد)"""
+        if not self.profit_report:
+            return
+        rows = self.profit_report[f"by_{self.profit_dimension.currentData()}"][:PROFIT_ROWS_LIMIT]
+        self.profit_model.set_rows(rows, foreground=self._loss_color)
+
+    @staticmethod
+    def _loss_color(model, row, column):
+        # خلية الربح بالأحمر عند الخسارة
+        return LOSS_COLOR if column == 5 and model.value(row, 5) < 0 else None
 
     # ------------------------------------------------------------------------
     # الوظائف (Printing / Details)
     # ------------------------------------------------------------------------
     def reprint_sales_invoice(self):
         """إعادة طباعة فاتورة البيع المحددة"""
-        selected = self.sales_table.currentRow()
+        selected = self.sales_table.currentIndex().row()
         if selected < 0:
             QMessageBox.warning(self, "تنبيه", "حدد فاتورة لطباعتها")
             return
 
-        # 1. جلب البيانات الأساسية من الجدول
-        sale_id = self.sales_table.item(selected, 0).text()
-        cashier = self.sales_table.item(selected, 1).text()
-
-        # تنظيف المبلغ من أي نصوص إضافية وتحويله لرقم
-        total_text = self.sales_table.item(selected, 3).text()
-        try:
-            # قد يكون النص يحتوي على "الإجمالي: " أو فواصل
-            clean_total = total_text.replace("الإجمالي:", "").replace(",", "").strip()
-            total = float(clean_total)
-        except:
-            total = 0.0
-
-        date = self.sales_table.item(selected, 4).text()
+        # 1. جلب البيانات الأساسية من صف النموذج (القيم الخام، بدون تحليل النص المعروض)
+        sale_id, cashier, _, total, date = self.sales_model.row_data(selected)
+        total = total or 0.0
 
         # 2. جلب تفاصيل الأدوية من قاعدة البيانات
         items = self.dao.get_sale_details(sale_id)
@@ -230,31 +472,81 @@ class ReportsPage(QWidget):
             QMessageBox.warning(self, "تنبيه", "لا توجد تفاصيل لهذه الفاتورة!")
             return
 
-        try:
-            # 3. استدعاء دالة التوليد
-            pdf_path = create_invoice_pdf(items, total, sale_id, cashier, date)
-
-            if pdf_path:
-                QMessageBox.information(self, "تم", f"تم حفظ الفاتورة في:\n{pdf_path}")
-                # محاولة فتح الملف تلقائياً
-                if os.name == 'nt':  # Windows
-                    os.startfile(pdf_path)
-                else:
-                    # Linux/Mac
-                    os.system(f"xdg-open '{pdf_path}'")
-            else:
-                QMessageBox.critical(self, "خطأ", "فشل في إنشاء ملف PDF")
-
-        except Exception as e:
-            QMessageBox.critical(self, "خطأ", f"حدث خطأ أثناء الطباعة: {e}")
+        # 3. التوليد في طابور الخلفية؛ الفتح والرسالة عند وصول الإشارة
+        self.reprints.add(sale_id)
+        render_queue.submit(items, total, sale_id, cashier, date, action="open")
+
+    def export_invoices(self):
+        """تصدير كل فواتير الفترة إلى ملفات PDF في الخلفية مع نافذة تقدم قابلة للإلغاء"""
+        start = self.export_from.date().toString("yyyy-MM-dd")
+        end = self.export_to.date().toString("yyyy-MM-dd")
+        self.export_cancelled = False
+        self.btn_export.setEnabled(False)
+
+        self.export_dialog = QProgressDialog("جاري جلب الفواتير...", "إلغاء", 0, 0, self)
+        self.export_dialog.setWindowTitle("تصدير الفواتير")
+        self.export_dialog.setMinimumDuration(0)
+        self.export_dialog.canceled.connect(self.cancel_export)
+        self.export_progress.connect(self.show_export_progress)
+        self.export_dialog.show()
+
+        self.runner.submit("export", self.run_export, start, end, self.export_single.isChecked(),
+                           on_result=self.finish_export,
+                           on_error=lambda message: self.finish_export({"error": message}))
+
+    def run_export(self, start, end, single):
+        # يعمل في الخيط الخلفي: استعلامان للفترة كلها ثم التوليد في عمليات منفصلة
+        invoices = self.dao.get_sales_for_export(start, end)
+        return export_invoices(invoices, export_dir(start, end), single=single,
+                               progress=self.export_progress.emit, should_cancel=lambda: self.export_cancelled)
+
+    def cancel_export(self):
+        self.export_cancelled = True
+
+    def show_export_progress(self, done, total, elapsed):
+        self.export_dialog.setMaximum(total)
+        self.export_dialog.setValue(done)
+        rate = done / elapsed if elapsed else 0
+        self.export_dialog.setLabelText(f"{done:,} / {total:,} فاتورة ({rate:,.0f} فاتورة/ثانية)")
+
+    def finish_export(self, result):
+        self.export_progress.disconnect(self.show_export_progress)
+        self.export_dialog.canceled.disconnect(self.cancel_export)
+        self.export_dialog.close()
+        self.btn_export.setEnabled(True)
+        if "error" in result:
+            QMessageBox.critical(self, "خطأ", f"فشل التصدير: {result['error']}")
+            return
+        if not result["files"] and not result["failed"]:
+            QMessageBox.information(self, "تنبيه", "لا توجد فواتير في هذه الفترة")
+            return
+        text = (f"تم تصدير {result['invoices']:,} فاتورة في {len(result['files'])} ملف خلال {result['seconds']:.1f} ثانية "
+                f"({result['per_second']:,.0f} فاتورة/ثانية)")
+        if result["files"]:
+            text += f"\n\nالمجلد:\n{os.path.dirname(result['files'][0])}"
+        if result["cancelled"]:
+            text += "\n\n⚠️ تم الإلغاء قبل اكتمال كل الملفات"
+        for path, error in result["failed"]:
+            text += f"\n❌ {os.path.basename(path)}: {error}"
+        QMessageBox.information(self, "تصدير الفواتير", text)
+
+    def on_invoice_rendered(self, invoice_id, pdf_path, render_ms):
+        if invoice_id in self.reprints:
+            self.reprints.discard(invoice_id)
+            QMessageBox.information(self, "تم", f"تم حفظ الفاتورة في:\n{pdf_path}")
+
+    def on_invoice_failed(self, invoice_id, message):
+        if invoice_id in self.reprints:
+            self.reprints.discard(invoice_id)
+            QMessageBox.critical(self, "خطأ", f"حدث خطأ أثناء الطباعة: {message}")
 
     def show_purchase_details(self):
-        selected = self.purchases_table.currentRow()
+        selected = self.purchases_table.currentIndex().row()
         if selected < 0:
             QMessageBox.warning(self, "تنبيه", "حدد فاتورة شراء لعرض تفاصيلها")
             return
 
-        pur_id = self.purchases_table.item(selected, 0).text()
+        pur_id = self.purchases_model.row_data(selected)[0]
         details = self.dao.get_purchase_details(pur_id)
 
         # عرض سريع في رسالة (يمكن تطويرها لنافذة منفصلة)
@@ -272,11 +564,8 @@ class ReportsPage(QWidget):
                 f.write("=== طلب شراء مواد ناقصة (Purchase Order) ===\n")
                 f.write(f"التاريخ: {os.path.basename(os.getcwd())}\n\n")  # أو استخدام datetime
 
-                rows = self.shortage_table.rowCount()
-                for i in range(rows):
-                    name = self.shortage_table.item(i, 1).text()
-                    qty = self.shortage_table.item(i, 2).text()
-                    sup = self.shortage_table.item(i, 3).text()
+                for _, name, qty, sup in self.shortage_model.rows():
+                    sup = sup if sup else "غير محدد"
                     f.write(f"- مطلوب: {name} | الكمية الحالية: {qty} | المورد: {sup}\n")
 
             QMessageBox.information(self, "تم", f"تم حفظ طلب الشراء في ملف:\n{filename}")
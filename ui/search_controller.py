@@ -0,0 +1,171 @@
+"""
+البحث أثناء الكتابة المشترك بين صفحات القوائم (المخزون، العملاء، الموردين):
+
+- تأخير (debounce): الاستعلام يُرسل بعد توقف الكتابة DEBOUNCE_MS، لا مع كل حرف.
+- الإلغاء: كل استعلام جديد يلغي السابق (QueryRunner بنفس المفتاح)، فلا تظهر نتيجة نص قديم.
+- التنقية المحلية: إذا أُضيفت أحرف لنص نتيجته كاملة (غير مقطوعة بحد الـ DAO) تُصفّى تلك النتيجة
+  في الذاكرة بدالة refine_search الخاصة بالـ DAO (نفس شرط SQL) وتظهر فوراً بدون استعلام.
+- ذاكرة LRU صغيرة لآخر النصوص (حذف حرف أو الرجوع لنص سابق يعرض نتيجته فوراً).
+- بعد كتابة (حدث من utils/change_bus.py): apply_changes تجلب الصفوف المتأثرة فقط وتحدّثها في الجدول
+  إن كانت تطابق النص الحالي، بدلاً من إعادة الاستعلام كاملاً.
+
+الذاكرة تُفرغ عند refresh() وعند apply_changes لأن البيانات تغيرت.
+"""
+from collections import OrderedDict
+
+from PyQt5.QtCore import QObject, QTimer
+
+DEBOUNCE_MS = 200
+CACHE_SIZE = 16
+
+# أكبر نتيجة تُحفظ في الذاكرة أو تُصفّى محلياً في خيط الواجهة (قائمة المخزون الكاملة لا تُنسخ)
+MAX_LOCAL_ROWS = 5000
+
+
+class SearchController(QObject):
+    """
+    ربط حقل بحث بجدول صفحة:
+        self.search = SearchController(self.search_input, self.runner, self.dao.search_medicine,
+                                       self.dao.get_all_medicines, self.fill_table,
+                                       refine=self.dao.refine_search, limit=MedicineDAO.SEARCH_LIMIT)
+    search(text): بحث الـ DAO، load_all(): كل الصفوف عند فراغ الحقل، on_result(rows): تعبئة الجدول.
+    refine(rows, text): تصفية محلية بنفس شرط search أو None إن تعذرت.
+    limit: حد صفوف search (نتيجة بهذا الطول قد تكون مقطوعة فلا تُصفّى محلياً)؛ None = بدون حد.
+    fetch_rows(ids): صفوف سجلات محددة، on_patch(rows, removed_ids): تحديث جزئي للجدول
+    (مثل ColumnarTableModel.upsert_rows)؛ بدونهما تعيد apply_changes الاستعلام كاملاً.
+    """
+
+    def __init__(self, line_edit, runner, search, load_all, on_result, refine=None, limit=None,
+                 fetch_rows=None, on_patch=None,
+                 key="search", debounce_ms=DEBOUNCE_MS, cache_size=CACHE_SIZE):
+        super().__init__(line_edit)
+        self._line_edit = line_edit
+        self._runner = runner
+        self._search = search
+        self._load_all = load_all
+        self._on_result = on_result
+        self._refine = refine
+        self._limit = limit
+        self._key = key
+        self._fetch_rows = fetch_rows
+        self._on_patch = on_patch
+        self._pending_ids = set()    # سجلات تغيرت وينتظر جلبها
+        self._cache_size = cache_size
+        self._cache = OrderedDict()  # النص -> (الصفوف، كاملة؟)
+        self._shown = None           # النص المعروض حالياً
+        self.stats = {"queries": 0, "cache_hits": 0, "refined": 0, "patched": 0}
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(debounce_ms)
+        self._timer.timeout.connect(self._query)
+        line_edit.textChanged.connect(self._on_text_changed)
+
+    def refresh(self):
+        """إفراغ الذاكرة وإعادة تحميل النص الحالي فوراً (بعد تغير البيانات)"""
+        self._cache.clear()
+        self._shown = None
+        self._timer.stop()
+        self._query()
+
+    def apply_changes(self, changed_ids=(), deleted_ids=()):
+        """تحديث الصفوف المتأثرة بكتابة فقط: المحذوفة تُزال فوراً، والمعدلة/الجديدة تُجلب ثم تُصفّى بالنص الحالي"""
+        self._cache.clear()
+        if self._fetch_rows is None or self._on_patch is None or self._runner.is_loading(self._key):
+            # لا تحديث جزئي، أو نتيجة قيد الوصول قد تكون قرأت البيانات قبل الكتابة: استعلام جديد
+            self.refresh()
+            return
+        if deleted_ids:
+            self._on_patch([], deleted_ids)
+        if changed_ids:
+            # طلب واحد يجمع كل المعلق (طلب أحدث بنفس المفتاح يلغي الأقدم دون فقد أرقام)
+            self._pending_ids.update(changed_ids)
+            ids = tuple(self._pending_ids)
+            self._runner.submit(f"{self._key}-changes", self._fetch_rows, ids,
+                                on_result=lambda rows: self._on_changed_rows(ids, rows))
+
+    def _on_changed_rows(self, ids, rows):
+        self._pending_ids.difference_update(ids)
+        text = self._shown
+        if text is None or self._runner.is_loading(self._key):
+            return  # الاستعلام الجاري سيحمل البيانات الجديدة
+        if text:
+            matching = self._refine(rows, text) if self._refine else None
+            if matching is None:
+                self.refresh()
+                return
+        else:
+            matching = rows
+        found = {row[0] for row in matching}
+        # سجل لم يعد يطابق النص (أو حُذف بعد التعديل) يُزال من الجدول
+        self._on_patch(matching, [record_id for record_id in ids if record_id not in found])
+        self.stats["patched"] += len(ids)
+
+    def _on_text_changed(self, text):
+        if text == self._shown:
+            self._timer.stop()
+            self._runner.cancel(self._key)
+            return
+
+        rows = self._local(text)
+        if rows is not None:
+            # نتيجة جاهزة: لا انتظار، وأي استعلام أقدم ما زال يعمل تُهمل نتيجته
+            self._timer.stop()
+            self._runner.cancel(self._key)
+            self._show(text, rows, complete=True)
+            return
+        self._timer.start()
+
+    def _local(self, text):
+        """النتيجة من الذاكرة، أو بتصفية أطول نتيجة كاملة لنص هو بداية text، أو None"""
+        hit = self._cache.get(text)
+        if hit is not None:
+            self._cache.move_to_end(text)
+            self.stats["cache_hits"] += 1
+            return hit[0]
+        if self._refine is None or not text.strip():
+            return None
+
+        base = None
+        for cached_text, (rows, complete) in self._cache.items():
+            if complete and text.startswith(cached_text) and (base is None or len(cached_text) > len(base[0])):
+                base = (cached_text, rows)
+        if base is None:
+            return None
+        rows = self._refine(base[1], text)
+        if rows is not None:
+            self.stats["refined"] += 1
+        return rows
+
+    def _query(self):
+        text = self._line_edit.text()
+        self.stats["queries"] += 1
+        if text:
+            self._runner.submit(self._key, self._search, text, on_result=lambda rows: self._on_rows(text, rows))
+        else:
+            self._runner.submit(self._key, self._load_all, on_result=lambda rows: self._on_rows(text, rows))
+
+    def _on_rows(self, text, rows):
+        complete = self._limit is None or not text or len(rows) < self._limit
+        current = self._line_edit.text()
+        if text == current:
+            self._show(text, rows, complete)
+            return
+        # الكتابة استمرت أثناء الاستعلام: نحفظ النتيجة، وإن كانت تكفي للنص الحالي تُصفّى وتظهر فوراً
+        self._remember(text, rows, complete)
+        rows = self._local(current)
+        if rows is not None:
+            self._timer.stop()
+            self._show(current, rows, complete=True)
+
+    def _remember(self, text, rows, complete):
+        if len(rows) <= MAX_LOCAL_ROWS:
+            self._cache[text] = (rows, complete)
+            self._cache.move_to_end(text)
+            while len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+
+    def _show(self, text, rows, complete):
+        self._shown = text
+        self._remember(text, rows, complete)
+        self._on_result(rows)
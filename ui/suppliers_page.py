@@ -1,9 +1,14 @@
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QPushButton,
-                             QTableWidget, QTableWidgetItem, QHeaderView, QLineEdit,
+                             QTableView, QAbstractItemView, QHeaderView, QLineEdit,
                              QMessageBox, QDialog, QFormLayout, QDoubleSpinBox, QDialogButtonBox, QLabel, QSizePolicy)
 from PyQt5.QtCore import Qt
 from PyQt5.QtGui import QFont
 from models.suppliers_dao import SuppliersDAO
+from ui.table_models import ColumnarTableModel
+from ui.query_runner import QueryRunner
+from ui.search_controller import SearchController
+from ui.change_listener import ChangeListener
+from utils.change_bus import PurchaseReceived, SuppliersChanged, SuppliersDeleted
 
 
 # --- نافذة إضافة مورد ---
@@ -86,7 +91,13 @@ class SuppliersPage(QWidget):
     def __init__(self):
         super().__init__()
         self.dao = SuppliersDAO()
+        self.runner = QueryRunner(self)
         self.init_ui()
+        self.search = SearchController(self.search_input, self.runner, self.dao.search_supplier,
+                                       self.dao.get_all_suppliers, self.fill_table, refine=self.dao.refine_search,
+                                       fetch_rows=self.dao.get_suppliers_by_ids, on_patch=self.model.upsert_rows)
+        # فاتورة الشراء تغير رصيد موردها
+        self.changes = ChangeListener(self, (SuppliersChanged, SuppliersDeleted, PurchaseReceived), self.on_change)
         self.load_data()
 
     def init_ui(self):
@@ -107,7 +118,6 @@ class SuppliersPage(QWidget):
         self.search_input.setPlaceholderText("🔍 بحث باسم المورد أو الشركة...")
         self.search_input.setFixedHeight(50)
         self.search_input.setStyleSheet("font-size: 18px; padding: 0 10px; border-radius: 5px; border: 1px solid #ccc;")
-        self.search_input.textChanged.connect(self.search_data)
         top_bar.addWidget(self.search_input)
 
         self.btn_add = QPushButton("➕ إضافة مورد")
@@ -137,52 +147,46 @@ class SuppliersPage(QWidget):
         layout.addLayout(top_bar)
 
         # الجدول
-        self.table = QTableWidget()
-        self.table.setColumnCount(5)
-        self.table.setHorizontalHeaderLabels(["ID", "الاسم", "الهاتف", "الشركة", "الرصيد"])
+        self.model = ColumnarTableModel(["ID", "الاسم", "الهاتف", "الشركة", "الرصيد"])
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.setSelectionMode(QAbstractItemView.SingleSelection)
         self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
         self.table.setLayoutDirection(Qt.RightToLeft)
         # تكبير خط الجدول
         self.table.setStyleSheet(
-            "QTableWidget { font-size: 16px; } QHeaderView::section { font-size: 16px; font-weight: bold; }")
+            "QTableView { font-size: 16px; } QHeaderView::section { font-size: 16px; font-weight: bold; }")
 
         layout.addWidget(self.table)
         self.setLayout(layout)
 
     def load_data(self):
-        suppliers = self.dao.get_all_suppliers()
-        self.fill_table(suppliers)
-
-    def search_data(self):
-        text = self.search_input.text()
-        if text:
-            suppliers = self.dao.search_supplier(text)
+        # إعادة تحميل نص البحث الحالي (أو الكل) بالكامل (زر التحديث)
+        self.search.refresh()
+
+    def on_change(self, event):
+        if isinstance(event, SuppliersDeleted):
+            self.search.apply_changes(deleted_ids=event.ids)
+        elif isinstance(event, PurchaseReceived):
+            self.search.apply_changes((event.supplier_id,))
         else:
-            suppliers = self.dao.get_all_suppliers()
-        self.fill_table(suppliers)
+            self.search.apply_changes(event.ids)
 
     def fill_table(self, data):
-        self.table.setRowCount(0)
-        for row_idx, row_data in enumerate(data):
-            self.table.insertRow(row_idx)
-            for col_idx, col_data in enumerate(row_data):
-                item = QTableWidgetItem(str(col_data))
-                item.setTextAlignment(Qt.AlignCenter)
-                self.table.setItem(row_idx, col_idx, item)
+        self.model.set_rows(data)
 
     def open_add_dialog(self):
-        dialog = AddSupplierDialog(self)
-        if dialog.exec_():
-            self.load_data()
+        AddSupplierDialog(self).exec_()
 
     def delete_selected(self):
-        selected_row = self.table.currentRow()
+        selected_row = self.table.currentIndex().row()
         if selected_row < 0:
             QMessageBox.warning(self, "تنبيه", "الرجاء تحديد مورد لحذفه")
             return
 
-        supplier_id = self.table.item(selected_row, 0).text()
-        name = self.table.item(selected_row, 1).text()
+        supplier_id = self.model.value(selected_row, 0)
+        name = self.model.value(selected_row, 1)
 
         confirm = QMessageBox.question(self, "تأكيد الحذف", f"هل أنت متأكد من حذف المورد {name}؟",
                                        QMessageBox.Yes | QMessageBox.No)
@@ -190,7 +194,6 @@ class SuppliersPage(QWidget):
         if confirm == QMessageBox.Yes:
             success, msg = self.dao.delete_supplier(supplier_id)
             if success:
-                self.load_data()
                 QMessageBox.information(self, "تم", msg)
             else:
                 QMessageBox.critical(self, "خطأ", msg)
\ No newline at end of file
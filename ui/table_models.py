@@ -0,0 +1,315 @@
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex
+from PyQt5.QtGui import QColor
+from array import array
+from datetime import date, timedelta
+from itertools import takewhile
+
+# ألوان الصلاحية (نفس ألوان صفحة المخزون الأصلية)
+EXPIRED_COLOR = QColor("#FFCDD2")
+EXPIRING_COLOR = QColor("#FFE0B2")
+
+
+class PagedTableModel(QAbstractTableModel):
+    """
+    نموذج جدول كسول لسجلات ضخمة (المبيعات/المشتريات):
+    - يجلب الصفحة الأولى فقط عند الفتح، ثم صفحة جديدة كلما اقترب التمرير من النهاية (canFetchMore/fetchMore).
+    - الصفوف تبقى tuples كما تعيدها الـ DAO؛ لا يُنشأ أي QTableWidgetItem.
+    fetch_page(after, limit): دالة الـ DAO (مثل ReportsDAO.get_sales_page)
+    key_of(row): مفتاح keyset لآخر صف، يُمرر كـ after للصفحة التالية
+    formatters: دالة تنسيق اختيارية لكل عمود (القيمة ← النص المعروض)
+    runner: QueryRunner اختياري لجلب الصفحات في الخلفية (وإلا يتم الجلب مباشرة في خيط الواجهة)
+    """
+
+    def __init__(self, headers, fetch_page, key_of, formatters=None, page_size=500, runner=None, parent=None):
+        super().__init__(parent)
+        self._headers = headers
+        self._fetch_page = fetch_page
+        self._key_of = key_of
+        self._formatters = formatters or {}
+        self._page_size = page_size
+        self._runner = runner
+        self._request_key = f"page-{id(self)}"
+        self._rows = []
+        self._exhausted = False
+        self._fetching = False
+
+    # --- واجهة النموذج ---
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._headers)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self._headers[section]
+        return super().headerData(section, orientation, role)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.DisplayRole:
+            value = self._rows[index.row()][index.column()]
+            formatter = self._formatters.get(index.column())
+            return formatter(value) if formatter else ("" if value is None else str(value))
+        if role == Qt.TextAlignmentRole:
+            return Qt.AlignCenter
+        return None
+
+    # --- الجلب الكسول ---
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self._exhausted and not self._fetching
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self._exhausted or self._fetching:
+            return
+        after = self._key_of(self._rows[-1]) if self._rows else None
+        if self._runner is None:
+            self._append(self._fetch_page(after, self._page_size))
+            return
+        # صفحة واحدة معلقة في كل لحظة؛ reload يلغيها بطلب جديد بنفس المفتاح
+        self._fetching = True
+        self._runner.submit(self._request_key, self._fetch_page, after, self._page_size, on_result=self._append)
+
+    def _append(self, page):
+        self._fetching = False
+        if len(page) < self._page_size:
+            self._exhausted = True
+        if page:
+            self.beginInsertRows(QModelIndex(), len(self._rows), len(self._rows) + len(page) - 1)
+            self._rows.extend(page)
+            self.endInsertRows()
+
+    def reload(self):
+        """إعادة التحميل من البداية (بعد بيع/شراء جديد)"""
+        self.beginResetModel()
+        self._rows = []
+        self._exhausted = False
+        self._fetching = False
+        self.endResetModel()
+        self.fetchMore()
+
+    def refresh_head(self):
+        """
+        إضافة الصفوف الأحدث من أول صف معروض في بداية الجدول (للنماذج المرتبة من الأحدث مثل المبيعات)،
+        بصفحة أولى واحدة وبدون فقد موضع التمرير أو الصفحات المحملة؛ فجوة أكبر من صفحة = reload.
+        """
+        if not self._rows:
+            self.reload()
+            return
+        if self._runner is None:
+            self._prepend(self._fetch_page(None, self._page_size))
+            return
+        self._runner.submit(f"{self._request_key}-head", self._fetch_page, None, self._page_size,
+                            on_result=self._prepend)
+
+    def _prepend(self, page):
+        if not self._rows:
+            return  # reload جارٍ وسيجلب الصفحة الأولى
+        top = self._key_of(self._rows[0])
+        new = list(takewhile(lambda row: self._key_of(row) > top, page))
+        if len(new) == self._page_size:
+            self.reload()
+            return
+        if new:
+            self.beginInsertRows(QModelIndex(), 0, len(new) - 1)
+            self._rows[:0] = new
+            self.endInsertRows()
+
+    def row_data(self, row):
+        """الصف الخام (tuple) كما أعادته الـ DAO"""
+        return self._rows[row]
+
+
+def _pack(values):
+    """
+    عمود متجانس من الأرقام يُخزن كمصفوفة array (8 بايت للقيمة بدلاً من كائن Python + مؤشر)،
+    وأي عمود آخر (نصوص، قيم فارغة، أنواع مختلطة) يبقى tuple.
+    """
+    kinds = set(map(type, values))
+    if kinds == {int}:
+        try:
+            return array("q", values)
+        except OverflowError:
+            return values
+    if kinds == {float}:
+        return array("d", values)
+    return values
+
+
+def expiry_background(column, warn_days=90):
+    """
+    دالة لون الخلفية حسب تاريخ الصلاحية في العمود column:
+    منتهي ← أحمر فاتح، خلال warn_days يوماً ← برتقالي.
+    التواريخ ISO (YYYY-MM-DD) فتُقارن كنصوص مباشرة بدون strptime؛ الحدود تُحسب مرة لكل يوم
+    (نافذة مفتوحة بعد منتصف الليل تلوّن حسب اليوم الجديد).
+    """
+    today = today_iso = warn_iso = None
+
+    def background(model, row, _column):
+        nonlocal today, today_iso, warn_iso
+        value = model.value(row, column)
+        if not isinstance(value, str) or len(value) < 10 or value[4] != "-":
+            return None
+        current = date.today()
+        if current != today:
+            today = current
+            today_iso = today.isoformat()
+            warn_iso = (today + timedelta(days=warn_days)).isoformat()
+        value = value[:10]
+        if value < today_iso:
+            return EXPIRED_COLOR
+        if value <= warn_iso:
+            return EXPIRING_COLOR
+        return None
+
+    return background
+
+
+class ColumnarTableModel(QAbstractTableModel):
+    """
+    نموذج جدول لقوائم الصفحات (المخزون، العملاء، الموردين، المستخدمين، النواقص...):
+    - نتيجة الـ DAO تُخزن أعمدةً مضغوطة (array للأرقام، tuple لغيرها) بدل عنصر QTableWidgetItem لكل خلية.
+    - النص والألوان تُحسب داخل data() للصفوف الظاهرة فقط (عند الرسم)، لا عند التعبئة.
+    formatters: دالة تنسيق اختيارية لكل عمود (القيمة ← النص المعروض)
+    background / foreground في set_rows: دالة (model, row, column) ← QColor أو None
+    """
+
+    def __init__(self, headers, formatters=None, parent=None):
+        super().__init__(parent)
+        self._headers = headers
+        self._formatters = formatters or {}
+        self._columns = [() for _ in headers]
+        self._count = 0
+        self._background = None
+        self._foreground = None
+        self._key_index = None  # قيمة العمود 0 -> رقم الصف (تُبنى عند أول تحديث جزئي)
+
+    def set_rows(self, rows, background=None, foreground=None):
+        """استبدال كل البيانات بنتيجة DAO جديدة (قائمة tuples)"""
+        self.beginResetModel()
+        rows = list(rows)
+        self._count = len(rows)
+        if rows:
+            self._columns = [_pack(column) for column in zip(*rows)]
+        else:
+            self._columns = [() for _ in self._headers]
+        self._background = background
+        self._foreground = foreground
+        self._key_index = None
+        self.endResetModel()
+
+    def upsert_rows(self, rows, removed=()):
+        """
+        تحديث جزئي بعد كتابة (بدلاً من set_rows للجدول كله)، بالمفتاح في العمود 0:
+        الصفوف الموجودة تُحدّث في مكانها، الجديدة تُضاف في الأعلى (القوائم مرتبة بالأحدث أولاً)،
+        ومفاتيح removed تُحذف. الأعمدة الزائدة في rows عن أعمدة النموذج تُهمل.
+        """
+        if not self._count:
+            rows = [tuple(row) for row in rows]
+            if rows:
+                self.set_rows(rows, self._background, self._foreground)
+            return
+
+        width = len(self._columns)
+        index = self._index()
+        positions = sorted({index[key] for key in removed if key in index}, reverse=True)
+        for row in positions:
+            self.beginRemoveRows(QModelIndex(), row, row)
+            for column in range(width):
+                del self._mutable(column)[row]
+            self._count -= 1
+            self.endRemoveRows()
+        if positions:
+            self._key_index = None
+            index = self._index()
+
+        new = []
+        for values in rows:
+            row = index.get(values[0])
+            if row is None:
+                new.append(values)
+                continue
+            for column in range(width):
+                self._set(column, row, values[column])
+            self.dataChanged.emit(self.index(row, 0), self.index(row, self.columnCount() - 1))
+
+        if new:
+            self.beginInsertRows(QModelIndex(), 0, len(new) - 1)
+            for column in range(width):
+                self._prepend(column, [values[column] for values in new])
+            self._count += len(new)
+            self._key_index = None
+            self.endInsertRows()
+
+    def _index(self):
+        if self._key_index is None:
+            self._key_index = {key: row for row, key in enumerate(self._columns[0])}
+        return self._key_index
+
+    def _fits(self, column, new_values):
+        # العمود المضغوط (array) يبقى كذلك ما دامت القيم الجديدة من نفس النوع
+        values = self._columns[column]
+        kind = int if values.typecode == "q" else float
+        return all(type(value) is kind for value in new_values)
+
+    def _set(self, column, row, value):
+        values = self._columns[column]
+        if isinstance(values, array) and self._fits(column, (value,)):
+            values[row] = value
+        else:
+            self._mutable(column, force_list=True)[row] = value
+
+    def _prepend(self, column, new_values):
+        values = self._columns[column]
+        if isinstance(values, array) and self._fits(column, new_values):
+            values[0:0] = array(values.typecode, new_values)
+        else:
+            self._mutable(column, force_list=True)[0:0] = new_values
+
+    def _mutable(self, column, force_list=False):
+        """العمود قابلاً للتعديل: tuple يتحول إلى list، وarray يبقى إلا عند force_list"""
+        values = self._columns[column]
+        if isinstance(values, tuple) or (force_list and isinstance(values, array)):
+            values = self._columns[column] = list(values)
+        return values
+
+    # --- واجهة النموذج ---
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._count
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._headers)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self._headers[section]
+        return super().headerData(section, orientation, role)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.DisplayRole:
+            value = self._columns[index.column()][index.row()]
+            formatter = self._formatters.get(index.column())
+            return formatter(value) if formatter else ("" if value is None else str(value))
+        if role == Qt.TextAlignmentRole:
+            return Qt.AlignCenter
+        if role == Qt.BackgroundRole and self._background:
+            return self._background(self, index.row(), index.column())
+        if role == Qt.ForegroundRole and self._foreground:
+            return self._foreground(self, index.row(), index.column())
+        return None
+
+    # --- الوصول للقيم الخام ---
+    def value(self, row, column):
+        return self._columns[column][row]
+
+    def row_data(self, row):
+        """الصف الخام (tuple) كما أعادته الـ DAO"""
+        return tuple(column[row] for column in self._columns)
+
+    def rows(self):
+        """كل الصفوف (للتصدير)"""
+        for row in range(self._count):
+            yield self.row_data(row)
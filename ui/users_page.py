@@ -1,9 +1,13 @@
-from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QTableWidget,
-                             QTableWidgetItem, QPushButton, QHeaderView, QLabel,
+from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QTableView,
+                             QAbstractItemView, QPushButton, QHeaderView, QLabel,
                              QMessageBox, QDialog, QFormLayout, QLineEdit, QComboBox, QDialogButtonBox)
 from PyQt5.QtCore import Qt
 from PyQt5.QtGui import QFont
 from models.users_dao import UsersDAO
+from ui.diagnostics_dialog import DiagnosticsDialog
+from ui.table_models import ColumnarTableModel
+from ui.change_listener import ChangeListener
+from utils.change_bus import UsersChanged, UsersDeleted
 
 
 # --- نافذة إضافة مستخدم جديد ---
@@ -83,6 +87,7 @@ class UsersPage(QWidget):
         super().__init__()
         self.dao = UsersDAO()
         self.init_ui()
+        self.changes = ChangeListener(self, (UsersChanged, UsersDeleted), self.on_change)
         self.load_data()
 
     def init_ui(self):
@@ -119,48 +124,58 @@ class UsersPage(QWidget):
         self.btn_delete.setStyleSheet(
             "background-color: #E74C3C; color: white; padding: 0 20px; font-weight: bold; font-family: 'Times New Roman'; font-size: 16px; border-radius: 5px;")
 
+        self.btn_diagnostics = QPushButton("🩺 تشخيص قاعدة البيانات")
+        self.btn_diagnostics.clicked.connect(self.open_diagnostics)
+        self.btn_diagnostics.setCursor(Qt.PointingHandCursor)
+        self.btn_diagnostics.setFixedHeight(45)
+        self.btn_diagnostics.setStyleSheet("font-family: 'Times New Roman'; font-size: 16px;")
+
         btn_layout.addWidget(self.btn_add)
         btn_layout.addWidget(self.btn_refresh)
         btn_layout.addWidget(self.btn_delete)
+        btn_layout.addWidget(self.btn_diagnostics)
         layout.addLayout(btn_layout)
 
         # الجدول
-        self.table = QTableWidget()
-        self.table.setColumnCount(4)
-        self.table.setHorizontalHeaderLabels(["ID", "اسم المستخدم", "الصلاحية (Role)", "تاريخ الإنشاء"])
+        self.model = ColumnarTableModel(["ID", "اسم المستخدم", "الصلاحية (Role)", "تاريخ الإنشاء"])
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.setSelectionMode(QAbstractItemView.SingleSelection)
         self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
         self.table.setLayoutDirection(Qt.RightToLeft)
         # تنسيق الجدول
         self.table.setStyleSheet(
-            "QTableWidget { font-family: 'Times New Roman'; font-size: 16px; } QHeaderView::section { font-family: 'Times New Roman'; font-size: 16px; font-weight: bold; }")
+            "QTableView { font-family: 'Times New Roman'; font-size: 16px; } QHeaderView::section { font-family: 'Times New Roman'; font-size: 16px; font-weight: bold; }")
         layout.addWidget(self.table)
 
         self.setLayout(layout)
 
     def load_data(self):
-        users = self.dao.get_all_users()
-        self.table.setRowCount(0)
-        for row_idx, row_data in enumerate(users):
-            self.table.insertRow(row_idx)
-            # row_data = (id, username, role, created_at)
-            for col_idx, col_data in enumerate(row_data):
-                item = QTableWidgetItem(str(col_data))
-                item.setTextAlignment(Qt.AlignCenter)
-                self.table.setItem(row_idx, col_idx, item)
+        # row_data = (id, username, role, created_at)
+        self.model.set_rows(self.dao.get_all_users())
+
+    def on_change(self, event):
+        # المستخدم المضاف أو المحذوف فقط، بدون إعادة تحميل القائمة
+        if isinstance(event, UsersDeleted):
+            self.model.upsert_rows([], removed=event.ids)
+        else:
+            self.model.upsert_rows(self.dao.get_users_by_ids(event.ids))
 
     def open_add_dialog(self):
-        dialog = AddUserDialog(self)
-        if dialog.exec_():
-            self.load_data()
+        AddUserDialog(self).exec_()
+
+    def open_diagnostics(self):
+        DiagnosticsDialog(self).exec_()
 
     def delete_user(self):
-        selected_row = self.table.currentRow()
+        selected_row = self.table.currentIndex().row()
         if selected_row < 0:
             QMessageBox.warning(self, "تنبيه", "الرجاء تحديد مستخدم لحذفه")
             return
 
-        user_id = self.table.item(selected_row, 0).text()
-        username = self.table.item(selected_row, 1).text()
+        user_id = self.model.value(selected_row, 0)
+        username = self.model.value(selected_row, 1)
 
         # حماية إضافية في الواجهة
         if username == 'admin':
@@ -175,6 +190,5 @@ class UsersPage(QWidget):
             success, msg = self.dao.delete_user(user_id)
             if success:
                 QMessageBox.information(self, "تم", msg)
-                self.load_data()
             else:
                 QMessageBox.critical(self, "خطأ", msg)
\ No newline at end of file
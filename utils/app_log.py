@@ -0,0 +1,36 @@
+"""
+سجل التطبيق الدوّار (logs/app.log) لرسائل التشخيص أثناء التشغيل بدلاً من print في الطرفية:
+أزمنة الترحيلات، تحذيرات إعدادات SQLite، أخطاء الخيوط الخلفية ومشتركي change_bus، ملخص قياس الإقلاع.
+أوامر سطر الأوامر (python -m database.rollups ...) تبقى تطبع مخرجاتها.
+
+الاستخدام:
+    from utils.app_log import app_log
+    app_log().warning("...")
+"""
+import logging
+import os
+import threading
+from logging.handlers import RotatingFileHandler
+
+from config import LOG_DIR
+
+_log = None
+_lock = threading.Lock()
+
+
+def app_log():
+    """السجل المشترك (يُنشأ الملف عند أول رسالة فقط، مثل sql_trace.slow_log)"""
+    global _log
+    if _log is None:
+        with _lock:
+            if _log is None:
+                os.makedirs(LOG_DIR, exist_ok=True)
+                logger = logging.getLogger("pharma.app")
+                logger.setLevel(logging.INFO)
+                logger.propagate = False
+                handler = RotatingFileHandler(os.path.join(LOG_DIR, "app.log"), maxBytes=1_000_000,
+                                              backupCount=5, encoding="utf-8")
+                handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(threadName)s %(message)s"))
+                logger.addHandler(handler)
+                _log = logger
+    return _log
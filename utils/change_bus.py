@@ -0,0 +1,77 @@
+"""
+ناقل إشعارات التغيير داخل العملية:
+- دوال الكتابة في الـ DAOs تنشر حدثاً نوعياً بعد نجاح الـ commit مع أرقام السجلات المتأثرة.
+- المشتركون (ذاكرة الباركود، صفحات الواجهة عبر ui/change_listener.py) يحدّثون الصفوف المتأثرة فقط
+  بدلاً من إعادة تحميل الجدول كاملاً.
+
+النشر متزامن في خيط الكاتب (قد يكون خيطاً خلفياً من QueryRunner)؛ المشترك الذي يلمس الواجهة
+يجب أن ينقل الحدث لخيط الواجهة (ChangeListener يفعل ذلك). الوحدة لا تعتمد على PyQt.
+
+الاستخدام:
+    from utils.change_bus import change_bus, MedicinesChanged
+    change_bus.subscribe((MedicinesChanged,), handler)
+    change_bus.publish(MedicinesChanged((medicine_id,)))
+"""
+import threading
+from collections import namedtuple
+
+from utils.app_log import app_log
+
+# --- الأحداث (ids: أرقام السجلات المتأثرة) ---
+MedicinesChanged = namedtuple("MedicinesChanged", "ids")        # إضافة دواء أو تعديل بياناته/كميته
+MedicinesDeleted = namedtuple("MedicinesDeleted", "ids")
+SaleCommitted = namedtuple("SaleCommitted", "sale_id medicine_ids customer_id")
+PurchaseReceived = namedtuple("PurchaseReceived", "purchase_id medicine_ids supplier_id")
+CustomersChanged = namedtuple("CustomersChanged", "ids")
+CustomersDeleted = namedtuple("CustomersDeleted", "ids")
+SuppliersChanged = namedtuple("SuppliersChanged", "ids")
+SuppliersDeleted = namedtuple("SuppliersDeleted", "ids")
+UsersChanged = namedtuple("UsersChanged", "ids")
+UsersDeleted = namedtuple("UsersDeleted", "ids")
+# من database/change_log.py: أسماء الجداول التي تغيرت في قاعدة البيانات (كتابات خارج التطبيق فقط)
+TablesChanged = namedtuple("TablesChanged", "tables")
+
+# كل ما يغير بيانات الأدوية أو كمياتها
+MEDICINE_EVENTS = (MedicinesChanged, MedicinesDeleted, SaleCommitted, PurchaseReceived)
+
+
+def medicine_changes(event):
+    """(الأدوية المعدلة، الأدوية المحذوفة) من أي حدث في MEDICINE_EVENTS"""
+    if isinstance(event, MedicinesDeleted):
+        return (), event.ids
+    if isinstance(event, MedicinesChanged):
+        return event.ids, ()
+    return event.medicine_ids, ()
+
+
+class ChangeBus:
+    def __init__(self):
+        self._handlers = {}  # نوع الحدث -> [دوال]
+        self._lock = threading.Lock()
+        self.published = 0
+
+    def subscribe(self, event_types, handler):
+        with self._lock:
+            for event_type in event_types:
+                self._handlers.setdefault(event_type, []).append(handler)
+
+    def unsubscribe(self, handler):
+        with self._lock:
+            for handlers in self._handlers.values():
+                while handler in handlers:
+                    handlers.remove(handler)
+
+    def publish(self, event):
+        """إبلاغ كل المشتركين في نوع الحدث؛ خطأ مشترك لا يفشل عملية الكتابة التي تمت فعلاً"""
+        with self._lock:
+            handlers = list(self._handlers.get(type(event), ()))
+            self.published += 1
+        for handler in handlers:
+            try:
+                handler(event)
+            except Exception:
+                app_log().exception("خطأ في معالج حدث %s", type(event).__name__)
+
+
+# نسخة واحدة مشتركة لكل الـ DAOs والصفحات في العملية
+change_bus = ChangeBus()
@@ -0,0 +1,120 @@
+"""
+إعادة طباعة جماعية لفواتير فترة زمنية (للتدقيق):
+- جلب كل الرؤوس والأسطر باستعلامين (ReportsDAO.get_sales_for_export) بدلاً من استعلام لكل فاتورة.
+- التقسيم إلى ملفات (shards) من SHARD_SIZE فاتورة، تُولَّد بالتوازي في عمليات منفصلة،
+  أو ملف واحد متعدد الصفحات (single) يُولَّد في عملية واحدة (لا يمكن دمج ملفات PDF بدون مكتبة إضافية).
+- التقدم والإنتاجية (فاتورة/ثانية) عبر دالة progress، والإلغاء عبر should_cancel.
+
+من سطر الأوامر:
+    python -m utils.invoice_export --from 2024-01-01 --to 2024-03-31
+    python -m utils.invoice_export --from 2024-01-01 --to 2024-01-31 --single
+"""
+import os
+import time
+
+from config import RENDER_WORKERS
+from utils.pdf_generator import render_invoice_batch
+
+# عدد الفواتير في كل ملف عند التقسيم
+SHARD_SIZE = 500
+
+EXPORT_DIR = "invoices"
+
+
+def export_dir(start_date, end_date):
+    return os.path.join(EXPORT_DIR, f"export_{start_date}_{end_date}")
+
+
+def plan_shards(invoices, out_dir, shard_size=SHARD_SIZE, single=False):
+    """[(اسم الملف، فواتيره)] مرتبة زمنياً؛ اسم الملف يحمل مدى أرقام الفواتير"""
+    if not invoices:
+        return []
+    if single:
+        return [(os.path.join(out_dir, "invoices_all.pdf"), invoices)]
+    shards = []
+    for start in range(0, len(invoices), shard_size):
+        chunk = invoices[start:start + shard_size]
+        name = f"invoices_{start // shard_size + 1:04d}_{chunk[0][0]}-{chunk[-1][0]}.pdf"
+        shards.append((os.path.join(out_dir, name), chunk))
+    return shards
+
+
+def export_invoices(invoices, out_dir, shard_size=SHARD_SIZE, single=False, workers=RENDER_WORKERS,
+                    progress=None, should_cancel=None):
+    """
+    توليد ملفات PDF للفواتير (من get_sales_for_export) في out_dir.
+    progress(done, total, elapsed_seconds) بعد كل ملف؛ should_cancel() ← True يوقف الملفات التي لم تبدأ.
+    يعيد قاموساً: files، invoices، failed [(الملف، الخطأ)]، seconds، per_second، cancelled
+    """
+    shards = plan_shards(invoices, out_dir, shard_size, single)
+    total = len(invoices)
+    result = {"files": [], "invoices": 0, "failed": [], "seconds": 0.0, "per_second": 0.0, "cancelled": False}
+    if not shards:
+        return result
+
+    import multiprocessing
+    from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+    start = time.perf_counter()
+    processed = 0  # فواتير انتهت ملفاتها (ناجحة أو فاشلة) لحساب التقدم
+    workers = max(1, min(workers, len(shards)))
+    # spawn وليس fork: قد يُستدعى من خيط خلفي في تطبيق Qt
+    with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        pending = {pool.submit(render_invoice_batch, chunk, path): (path, len(chunk)) for path, chunk in shards}
+        while pending:
+            done, _ = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+            for future in done:
+                path, count = pending.pop(future)
+                processed += count
+                try:
+                    file_path, rendered, _ = future.result()
+                    result["files"].append(file_path)
+                    result["invoices"] += rendered
+                except Exception as e:
+                    # مثلاً نص لا يدعمه خط helvetica: يفشل هذا الملف فقط ويستمر الباقي
+                    result["failed"].append((path, str(e)))
+                if progress:
+                    progress(processed, total, time.perf_counter() - start)
+            if should_cancel and should_cancel() and not result["cancelled"]:
+                result["cancelled"] = True
+                for future in list(pending):
+                    if future.cancel():
+                        pending.pop(future)
+
+    result["files"].sort()
+    result["seconds"] = time.perf_counter() - start
+    result["per_second"] = result["invoices"] / result["seconds"] if result["seconds"] else 0.0
+    return result
+
+
+def main():
+    import argparse
+    from models.reports_dao import ReportsDAO
+
+    parser = argparse.ArgumentParser(description="إعادة طباعة فواتير فترة زمنية إلى ملفات PDF")
+    parser.add_argument("--from", dest="start", required=True, help="YYYY-MM-DD")
+    parser.add_argument("--to", dest="end", required=True, help="YYYY-MM-DD")
+    parser.add_argument("--single", action="store_true", help="ملف واحد متعدد الصفحات بدلاً من التقسيم")
+    parser.add_argument("--shard-size", type=int, default=SHARD_SIZE)
+    parser.add_argument("--workers", type=int, default=RENDER_WORKERS)
+    parser.add_argument("--out", help="مجلد الإخراج (الافتراضي invoices/export_<from>_<to>)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    invoices = ReportsDAO().get_sales_for_export(args.start, args.end)
+    lines = sum(len(invoice[4]) for invoice in invoices)
+    print(f"{len(invoices):,} invoices / {lines:,} lines fetched in {time.perf_counter() - start:.2f}s")
+
+    def show(done, total, elapsed):
+        print(f"\r{done:,}/{total:,} ({done / elapsed if elapsed else 0:,.0f} invoices/s)", end="", flush=True)
+
+    result = export_invoices(invoices, args.out or export_dir(args.start, args.end), args.shard_size,
+                             args.single, args.workers, progress=show)
+    print(f"\n{result['invoices']:,} invoices in {len(result['files'])} file(s), {result['seconds']:.2f}s "
+          f"({result['per_second']:,.0f} invoices/s)")
+    for path, error in result["failed"]:
+        print(f"❌ {path}: {error}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+طابور توليد فواتير PDF في الخلفية:
+- التوليد (FPDF) يتم في عمليات منفصلة (ProcessPoolExecutor) فلا يحجز الـ GIL ولا يؤخر خيط الواجهة،
+  وإتمام البيع يعود فور حفظ الفاتورة في قاعدة البيانات.
+- الانتهاء يُبلّغ بإشارة Qt (rendered / failed) تصل في خيط الواجهة، مع فتح الملف أو طباعته اختيارياً.
+- عدادات: عمق الطابور، المنجز، الفاشل، وزمن التوليد والانتظار (تظهر في نافذة التشخيص).
+
+الاستخدام:
+    from utils.invoice_queue import render_queue
+    render_queue.submit(items, total, sale_id, cashier, date, action="open")
+"""
+import os
+import subprocess
+import sys
+import threading
+import time
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from config import RENDER_WORKERS
+from utils.app_log import app_log
+from utils.pdf_generator import render_invoice, warm_up
+
+# ما يمكن فعله بالملف بعد توليده
+ACTIONS = ("open", "print", "none")
+
+
+def open_invoice(path, action="open"):
+    """فتح الملف أو إرساله للطابعة بتطبيق النظام (بدون shell: المسار لا يُفسَّر كأمر)"""
+    if action == "none" or not path:
+        return
+    try:
+        if os.name == "nt":
+            os.startfile(path, "print" if action == "print" else "open")
+        elif action == "print":
+            subprocess.Popen(["lp", path])
+        else:
+            subprocess.Popen(["open" if sys.platform == "darwin" else "xdg-open", path])
+    except OSError as e:
+        app_log().warning("تعذر %s الفاتورة: %s", "طباعة" if action == "print" else "فتح", e)
+
+
+class InvoiceRenderQueue(QObject):
+    """طابور واحد مشترك للتطبيق (render_queue)؛ العمليات تُنشأ عند أول فاتورة فقط"""
+    rendered = pyqtSignal(object, str, float)  # رقم الفاتورة، المسار، زمن التوليد ms
+    failed = pyqtSignal(object, str)           # رقم الفاتورة، رسالة الخطأ
+    # إشارة داخلية: النتيجة تصل في خيط المنفذ، وهذه الإشارة تنقلها لخيط الواجهة
+    _done = pyqtSignal(object, object, float, str, float, str)
+
+    def __init__(self, workers=RENDER_WORKERS):
+        super().__init__()
+        self._workers = max(workers, 1)
+        self._executor = None
+        self._lock = threading.Lock()
+        self._done.connect(self._on_done)
+        self._stats = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "render_ms_total": 0.0,   # زمن التوليد داخل العملية
+            "render_ms_max": 0.0,
+            "wait_ms_total": 0.0,     # من الإرسال حتى وصول النتيجة (انتظار + توليد + نقل)
+        }
+
+    def _pool(self):
+        """المنفذ الحالي (يُنشأ عند أول استخدام)؛ _executor يُقرأ ويُستبدل تحت _lock فقط"""
+        with self._lock:
+            if self._executor is None:
+                # تُستورد عند أول فاتورة (أو warm_up) لا عند بدء التطبيق
+                import multiprocessing
+                from concurrent.futures import ProcessPoolExecutor
+                # spawn وليس fork: العملية الأم فيها خيوط Qt وSQLite، ونسخها بـ fork غير آمن
+                self._executor = ProcessPoolExecutor(self._workers, mp_context=multiprocessing.get_context("spawn"))
+            return self._executor
+
+    def warm_up(self):
+        """تشغيل العمليات مسبقاً (عند فتح نقطة البيع) حتى لا تدفع أول فاتورة زمن الإقلاع"""
+        with self._lock:
+            started = self._executor is not None
+        if not started:
+            pool = self._pool()
+            for _ in range(self._workers):
+                pool.submit(warm_up)
+
+    def submit(self, items, total_amount, invoice_id=None, cashier_name="Admin", date=None, action="none"):
+        """
+        إرسال فاتورة للتوليد والعودة فوراً.
+        items: أسطر بصيغة (الاسم، الكمية، السعر، الإجمالي) أو قواميس سلة نقطة البيع
+        action: open / print / none بعد انتهاء التوليد
+        """
+        if action not in ACTIONS:
+            raise ValueError(f"إجراء غير معروف للفاتورة: {action} (المتاح: {', '.join(ACTIONS)})")
+        # نسخة قابلة للنقل بين العمليات (pickle) ومنفصلة عن السلة التي ستُفرغ
+        items = [dict(item) if isinstance(item, dict) else tuple(item) for item in items]
+        with self._lock:
+            self._stats["submitted"] += 1
+        submitted_at = time.perf_counter()
+        try:
+            pool = self._pool()
+            future = pool.submit(render_invoice, items, total_amount, invoice_id, cashier_name, date)
+        except Exception as e:
+            self._done.emit(invoice_id, None, 0.0, str(e), submitted_at, action)
+            return
+        future.add_done_callback(lambda f: self._collect(f, pool, invoice_id, submitted_at, action))
+
+    def _collect(self, future, pool, invoice_id, submitted_at, action):
+        # يعمل في خيط المنفذ الداخلي: لا نلمس أي Widget هنا
+        from concurrent.futures.process import BrokenProcessPool
+        try:
+            path, render_ms = future.result()
+            error = "" if path else "فشل في إنشاء ملف PDF"
+        except BrokenProcessPool as e:
+            # عملية توليد انهارت: المنفذ كله أصبح غير صالح، فالفاتورة التالية تنشئ منفذاً جديداً
+            # (إن لم يكن قد استُبدل بالفعل بسبب فاتورة أخرى من نفس المنفذ)
+            with self._lock:
+                if self._executor is pool:
+                    self._executor = None
+            pool.shutdown(wait=False)
+            path, render_ms, error = None, 0.0, str(e)
+        except Exception as e:
+            path, render_ms, error = None, 0.0, str(e)
+        self._done.emit(invoice_id, path, render_ms, error, submitted_at, action)
+
+    def _on_done(self, invoice_id, path, render_ms, error, submitted_at, action):
+        wait_ms = (time.perf_counter() - submitted_at) * 1000
+        with self._lock:
+            self._stats["wait_ms_total"] += wait_ms
+            if error:
+                self._stats["failed"] += 1
+            else:
+                self._stats["completed"] += 1
+                self._stats["render_ms_total"] += render_ms
+                self._stats["render_ms_max"] = max(self._stats["render_ms_max"], render_ms)
+        if error:
+            app_log().error("تعذر توليد الفاتورة %s: %s", invoice_id, error)
+            self.failed.emit(invoice_id, error)
+            return
+        open_invoice(path, action)
+        self.rendered.emit(invoice_id, path, render_ms)
+
+    def stats(self):
+        """نسخة من العدادات مع عمق الطابور والمتوسطات"""
+        with self._lock:
+            data = dict(self._stats)
+        data["workers"] = self._workers
+        data["depth"] = data["submitted"] - data["completed"] - data["failed"]
+        finished = data["completed"] + data["failed"]
+        data["render_ms_avg"] = data["render_ms_total"] / data["completed"] if data["completed"] else 0.0
+        data["wait_ms_avg"] = data["wait_ms_total"] / finished if finished else 0.0
+        return data
+
+    def shutdown(self, wait=True):
+        """إيقاف العمليات (عند إغلاق التطبيق)؛ الفواتير المعلقة تكتمل أولاً إذا wait=True"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+
+# نسخة واحدة مشتركة لكل الصفحات
+render_queue = InvoiceRenderQueue()
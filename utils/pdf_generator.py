@@ -1,103 +1,252 @@
-from fpdf import FPDF
 import os
+import time
 from datetime import datetime
 
 
-def create_invoice_pdf(items, total_amount, invoice_id=None, cashier_name="Admin", date=None):
+# تخطيط الفاتورة (مم): عرض الأعمدة وعناوينها
+COLUMN_WIDTHS = (80, 30, 40, 40)
+COLUMN_HEADERS = ("Item Name", "Qty", "Price", "Total")
+ROW_HEIGHT = 10
+MAX_CELL_CHARS = 30
+
+
+class InvoiceTemplate:
     """
-    توليد ملف PDF للفاتورة.
-    يمكن استخدامها لنقطة البيع (بدون ID في البداية) أو للتقارير (مع ID وتاريخ محدد).
+    قالب فاتورة مُعدّ مرة واحدة لكل عملية ثم يُختم ببيانات كل فاتورة:
+    - مواضع الأعمدة والنصوص الثابتة (العنوان، ترويسة الجدول، التذييل) وعروضها محسوبة مسبقاً.
+    - الرسم بـ text/rect/line مباشرة بدلاً من cell (التي تمر بمحرك تقسيم الأسطر لكل خلية)،
+      بنفس المواضع التي كانت تنتجها cell.
+    - عروض النصوص المتكررة (أسماء الأدوية والأسعار) في ذاكرة مؤقتة، ومجلد الإخراج يُنشأ مرة واحدة.
+    - to_bytes يعيد الملف في الذاكرة بدون كتابة على القرص.
     """
 
-    # التأكد من وجود مجلد الفواتير
-    if not os.path.exists("invoices"):
-        os.makedirs("invoices")
+    def __init__(self, out_dir="invoices"):
+        self.out_dir = out_dir
+        self._dir_ready = False
+        self._widths = {}
+
+        # fpdf (ومعه numpy وfontTools) يُستورد هنا عند إعداد القالب في عملية التوليد، لا عند استيراد
+        # هذه الوحدة: الواجهة تستوردها فقط لتمرير دوال التوليد للعمليات الخلفية (~450ms من زمن الإقلاع)
+        from fpdf import FPDF
+        self._fpdf = FPDF
+
+        # كل القياسات من مستند مؤقت بنفس الإعدادات الافتراضية
+        pdf = FPDF()
+        self.left = pdf.l_margin
+        self.page_width = pdf.w - pdf.l_margin - pdf.r_margin
+        self.c_margin = pdf.c_margin
+        self.footer_y = pdf.h - 30
+        # حد الصفحة الذي كانت cell تنتقل عنده لصفحة جديدة (page_break_trigger)
+        self.page_bottom = pdf.h - pdf.b_margin
+        self.column_x = []
+        x = self.left
+        for width in COLUMN_WIDTHS:
+            self.column_x.append(x)
+            x += width
+        self.table_right = x
+
+        # النصوص الثابتة: (النص، الخط، المقاس، x، y خط الأساس) مع y نسبي حيث يلزم
+        self.title = self._centered(pdf, "PHARMACY INVOICE", "B", 20, self.left, self.page_width, 15)
+        self.headers = [self._centered(pdf, header, "B", 12, x, width, ROW_HEIGHT)
+                        for header, x, width in zip(COLUMN_HEADERS, self.column_x, COLUMN_WIDTHS)]
+        pdf.set_font("helvetica", "B", 14)
+        self.total_label = ("GRAND TOTAL:", self.left + 150 - self.c_margin - pdf.get_string_width("GRAND TOTAL:"),
+                            self._baseline(pdf, ROW_HEIGHT))
+        self.footer = self._centered(pdf, "Thank you for dealing with Pharma Pro System.", "I", 10,
+                                     self.left, self.page_width, ROW_HEIGHT)
+
+    def _baseline(self, pdf, height):
+        # نفس حساب cell: منتصف الخلية + 0.3 من مقاس الخط
+        return 0.5 * height + 0.3 * pdf.font_size
+
+    def _centered(self, pdf, text, style, size, x, width, height):
+        pdf.set_font("helvetica", style, size)
+        return (text, x + (width - pdf.get_string_width(text)) / 2, self._baseline(pdf, height))
+
+    def _width(self, pdf, font, text):
+        key = (font, text)
+        width = self._widths.get(key)
+        if width is None:
+            if len(self._widths) > 20000:
+                self._widths.clear()
+            width = self._widths[key] = pdf.get_string_width(text)
+        return width
+
+    def new_document(self):
+        return self._fpdf()
+
+    def draw(self, pdf, items, total_str, invoice_id, cashier_name, date):
+        """رسم فاتورة واحدة بدءاً من صفحة جديدة (مشتركة بين الفاتورة المفردة والتصدير الجماعي)"""
+        pdf.add_page()
+        left = self.left
+        y = pdf.t_margin
+
+        # 1. العنوان (Header)
+        text, x, dy = self.title
+        pdf.set_font("helvetica", "B", 20)
+        pdf.text(x, y + dy, text)
+        y += 15
+
+        pdf.set_font("helvetica", "", 12)
+        dy = self._baseline(pdf, 8)
+        for line in (f"Invoice #: {invoice_id}", f"Date: {date}", f"Cashier: {cashier_name}"):
+            pdf.text(left + self.c_margin, y + dy, line)
+            y += 8
+
+        y += 10  # مسافة فارغة
+
+        # 2. ترويسة الجدول (خلفية رمادية)
+        y = self._table_header(pdf, y)
+
+        # 3. بيانات الجدول: الشبكة خطوط أفقية ورأسية بدلاً من إطار لكل خلية
+        # text/line لا تنتقل لصفحة جديدة تلقائياً مثل cell: السطر الذي يتجاوز الحد يبدأ صفحة بترويسة الجدول،
+        # وشبكة كل صفحة تُرسم لأسطرها
+        dy = self._baseline(pdf, ROW_HEIGHT)
+        table_top = y
+        for item in items:
+            if y + ROW_HEIGHT > self.page_bottom:
+                self._grid(pdf, table_top, y)
+                pdf.add_page()
+                y = table_top = self._table_header(pdf, pdf.t_margin)
+            for text, x, width in zip(self._item_cells(item), self.column_x, COLUMN_WIDTHS):
+                pdf.text(x + (width - self._width(pdf, 11, text)) / 2, y + dy, text)
+            y += ROW_HEIGHT
+        self._grid(pdf, table_top, y)
+
+        # 4. المجموع النهائي
+        y += 5
+        if y + ROW_HEIGHT > self.page_bottom:
+            pdf.add_page()
+            y = pdf.t_margin
+        pdf.set_font("helvetica", "B", 14)
+        text, x, dy = self.total_label
+        pdf.text(x, y + dy, text)
+        total_x = left + 150
+        pdf.rect(total_x, y, 40, ROW_HEIGHT)
+        pdf.text(total_x + (40 - pdf.get_string_width(total_str)) / 2, y + dy, total_str)
+
+        # 5. التذييل (Footer)
+        pdf.set_font("helvetica", "I", 10)
+        text, x, dy = self.footer
+        pdf.text(x, self.footer_y + dy, text)
+
+    def _table_header(self, pdf, y):
+        """ترويسة الجدول عند y، ويعيد y أول سطر بعدها (بخط الأسطر)"""
+        pdf.set_font("helvetica", "B", 12)
+        pdf.set_fill_color(220, 220, 220)
+        for x, width in zip(self.column_x, COLUMN_WIDTHS):
+            pdf.rect(x, y, width, ROW_HEIGHT, style="DF")
+        for text, x, dy in self.headers:
+            pdf.text(x, y + dy, text)
+        pdf.set_font("helvetica", "", 11)
+        return y + ROW_HEIGHT
+
+    def _grid(self, pdf, top, bottom):
+        """شبكة الأسطر المرسومة في الصفحة الحالية بين top وbottom"""
+        if bottom <= top:
+            return
+        for row in range(round((bottom - top) / ROW_HEIGHT) + 1):
+            line_y = top + row * ROW_HEIGHT
+            pdf.line(self.left, line_y, self.table_right, line_y)
+        for x in self.column_x + [self.table_right]:
+            pdf.line(x, top, x, bottom)
+
+    @staticmethod
+    def _item_cells(item):
+        # التعامل مع اختلاف هيكلية البيانات بين POS (قاموس) و Reports (قائمة)
+        if isinstance(item, dict):
+            # قادمة من POSPage (سلة نقطة البيع تستخدم qty)
+            cells = (str(item['name']), str(item['quantity'] if 'quantity' in item else item['qty']),
+                     f"{item['price']:.2f}", f"{item['total']:.2f}")
+        else:
+            # قادمة من ReportsPage: Name, Qty, Price, Total
+            cells = (str(item[0]), str(item[1]), f"{item[2]:.2f}", f"{item[3]:.2f}")
+        # قص النصوص الطويلة جداً
+        return [text if len(text) <= MAX_CELL_CHARS else text[:MAX_CELL_CHARS - 3] + "..." for text in cells]
+
+    def to_bytes(self, items, total_amount, invoice_id=None, cashier_name="Admin", date=None):
+        """الفاتورة كملف PDF في الذاكرة (bytearray)"""
+        pdf = self.new_document()
+        self.draw(pdf, items, *_invoice_fields(total_amount, invoice_id, cashier_name, date))
+        return pdf.output()
+
+    def save(self, items, total_amount, invoice_id=None, cashier_name="Admin", date=None):
+        """كتابة الفاتورة في out_dir/invoice_<id>.pdf وإعادة مسارها الكامل"""
+        total_str, invoice_id, cashier_name, date = _invoice_fields(total_amount, invoice_id, cashier_name, date)
+        if not self._dir_ready:
+            os.makedirs(self.out_dir, exist_ok=True)
+            self._dir_ready = True
+        file_name = os.path.join(self.out_dir, f"invoice_{invoice_id}.pdf")
+        pdf = self.new_document()
+        self.draw(pdf, items, total_str, invoice_id, cashier_name, date)
+        pdf.output(file_name)
+        return os.path.abspath(file_name)
+
 
-    # إعداد البيانات الافتراضية إذا لم ترسل
+def _invoice_fields(total_amount, invoice_id, cashier_name, date):
+    """القيم الافتراضية وتنسيق الإجمالي ← (total_str, invoice_id, cashier_name, date)"""
     if invoice_id is None:
         invoice_id = datetime.now().strftime("%Y%m%d%H%M%S")  # رقم مؤقت بناء على الوقت
-
     if date is None:
         date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
     # تحويل total_amount إلى نص إذا كان رقماً
     if isinstance(total_amount, (float, int)):
         total_str = f"{total_amount:.2f}"
     else:
         total_str = str(total_amount).replace("الإجمالي: ", "").strip()
+    return total_str, invoice_id, cashier_name, date
 
-    file_name = f"invoices/invoice_{invoice_id}.pdf"
 
-    # إعداد ملف PDF
-    pdf = FPDF()
-    pdf.add_page()
+_template = None
 
-    # 1. العنوان (Header)
-    pdf.set_font("helvetica", "B", 20)
-    pdf.cell(0, 15, "PHARMACY INVOICE", align="C", new_x="LMARGIN", new_y="NEXT")
 
-    pdf.set_font("helvetica", "", 12)
-    pdf.cell(0, 8, f"Invoice #: {invoice_id}", new_x="LMARGIN", new_y="NEXT")
-    pdf.cell(0, 8, f"Date: {date}", new_x="LMARGIN", new_y="NEXT")
-    pdf.cell(0, 8, f"Cashier: {cashier_name}", new_x="LMARGIN", new_y="NEXT")
+def invoice_template():
+    """القالب المشترك لهذه العملية (يُعد عند أول فاتورة)"""
+    global _template
+    if _template is None:
+        _template = InvoiceTemplate()
+    return _template
 
-    pdf.ln(10)  # مسافة فارغة
 
-    # 2. ترويسة الجدول
-    col_widths = [80, 30, 40, 40]  # عرض الأعمدة
+def create_invoice_pdf(items, total_amount, invoice_id=None, cashier_name="Admin", date=None):
+    """
+    توليد ملف PDF للفاتورة.
+    يمكن استخدامها لنقطة البيع (بدون ID في البداية) أو للتقارير (مع ID وتاريخ محدد).
+    """
+    try:
+        return invoice_template().save(items, total_amount, invoice_id, cashier_name, date)
+    except Exception as e:
+        print(f"PDF Error: {e}")
+        return None
 
-    pdf.set_font("helvetica", "B", 12)
-    pdf.set_fill_color(220, 220, 220)  # لون رمادي للخلفية
 
-    headers = ["Item Name", "Qty", "Price", "Total"]
-    for i, header in enumerate(headers):
-        pdf.cell(col_widths[i], 10, header, border=1, align="C", fill=True)
-    pdf.ln()
+def warm_up():
+    """تُستدعى في عملية التوليد عند فتح نقطة البيع: استيراد FPDF وإعداد القالب قبل أول فاتورة"""
+    invoice_template()
+    return os.getpid()
 
-    # 3. بيانات الجدول
-    pdf.set_font("helvetica", "", 11)
 
-    for item in items:
-        # التعامل مع اختلاف هيكلية البيانات بين POS (قاموس) و Reports (قائمة)
-        if isinstance(item, dict):
-            # قادمة من POSPage
-            name = str(item['name'])
-            qty = str(item['quantity'])
-            price = f"{item['price']:.2f}"
-            total_item = f"{item['total']:.2f}"
-        else:
-            # قادمة من ReportsPage (tuple/list)
-            # الترتيب المتوقع من الاستعلام: Name, Qty, Price, Total
-            name = str(item[0])
-            qty = str(item[1])
-            price = f"{item[2]:.2f}"
-            total_item = f"{item[3]:.2f}"
-
-        data = [name, qty, price, total_item]
-
-        for i, datum in enumerate(data):
-            # قص النصوص الطويلة جداً
-            cell_text = str(datum)
-            if len(cell_text) > 30:
-                cell_text = cell_text[:27] + "..."
-            pdf.cell(col_widths[i], 10, cell_text, border=1, align="C")
-        pdf.ln()
-
-    # 4. المجموع النهائي
-    pdf.ln(5)
-    pdf.set_font("helvetica", "B", 14)
-    pdf.cell(150, 10, "GRAND TOTAL:", align="R")
-    pdf.cell(40, 10, total_str, border=1, align="C")
-
-    # 5. التذييل (Footer)
-    pdf.set_y(-30)
-    pdf.set_font("helvetica", "I", 10)
-    pdf.cell(0, 10, "Thank you for dealing with Pharma Pro System.", align="C")
-
-    # حفظ الملف
-    try:
-        pdf.output(file_name)
-        return os.path.abspath(file_name)
-    except Exception as e:
-        print(f"PDF Error: {e}")
-        return None
\ No newline at end of file
+def render_invoice(items, total_amount, invoice_id=None, cashier_name="Admin", date=None):
+    """
+    نقطة الدخول في عملية التوليد الخلفية (utils/invoice_queue.py):
+    نفس create_invoice_pdf مع زمن التوليد بالميلي ثانية ← (المسار أو None، الزمن)
+    """
+    start = time.perf_counter()
+    path = create_invoice_pdf(items, total_amount, invoice_id, cashier_name, date)
+    return path, (time.perf_counter() - start) * 1000
+
+
+def render_invoice_batch(invoices, file_name):
+    """
+    نقطة الدخول في عمليات التصدير الجماعي (utils/invoice_export.py):
+    عدة فواتير (sale_id, cashier, total, date, items) في ملف PDF واحد، فاتورة في كل صفحة.
+    يعيد (المسار، عدد الفواتير، الزمن ms)
+    """
+    start = time.perf_counter()
+    os.makedirs(os.path.dirname(file_name) or ".", exist_ok=True)
+    template = invoice_template()
+    pdf = template.new_document()
+    for invoice_id, cashier_name, total_amount, date, items in invoices:
+        template.draw(pdf, items, f"{total_amount or 0:.2f}", invoice_id, cashier_name or "-", date)
+    pdf.output(file_name)
+    return os.path.abspath(file_name), len(invoices), (time.perf_counter() - start) * 1000
@@ -0,0 +1,159 @@
+"""
+وضع قياس الإقلاع (PHARMA_STARTUP_PROFILE=1 python main.py):
+- زمن استيراد كل وحدة (الذاتي والتراكمي مع وحداتها الفرعية) منذ بداية main.py، بتغليف مُحمِّلات الاستيراد.
+- مراحل الإقلاع (mark) وأول رسم (first paint) لنافذة تسجيل الدخول والنافذة الرئيسية.
+- بعد أول رسم للنافذة الرئيسية يُكتب التقرير في logs/startup_profile.json وملخصه (أبطأ الاستيرادات) في logs/app.log.
+
+لا تستورد هذه الوحدة PyQt في أعلاها: enable() تُستدعى قبل استيراده حتى يظهر زمنه في القياس.
+"""
+import json
+import os
+import sys
+import threading
+import time
+
+from config import LOG_DIR
+
+STARTUP_PROFILE_FILE = os.path.join(LOG_DIR, "startup_profile.json")
+
+# وحدات ثقيلة لا يجب أن تُستورد قبل ظهور النافذة الرئيسية (تُستورد عند أول استخدام)
+HEAVY_MODULES = ("fpdf", "fontTools", "numpy", "PIL", "multiprocessing")
+
+_origin = None
+_imports = {}         # الوحدة -> [الزمن الذاتي، التراكمي] بالثواني
+_marks = {}           # المرحلة -> ms منذ enable()
+_local = threading.local()
+_finder = None
+
+
+class _TimedLoader:
+    """يغلف مُحمِّل الوحدة ليقيس create_module وexec_module؛ أي خاصية أخرى تُمرر للمُحمِّل الأصلي"""
+
+    def __init__(self, loader, name):
+        self._loader = loader
+        self._name = name
+
+    def __getattr__(self, attr):
+        return getattr(self._loader, attr)
+
+    def create_module(self, spec):
+        return _timed(self._name, self._loader.create_module, spec)
+
+    def exec_module(self, module):
+        return _timed(self._name, self._loader.exec_module, module)
+
+
+def _timed(name, fn, arg):
+    # زمن الوحدات الفرعية يُطرح من الزمن الذاتي للوحدة الأم (مكدس لكل خيط)
+    stack = _local.__dict__.setdefault("stack", [])
+    stack.append(0.0)
+    start = time.perf_counter()
+    try:
+        return fn(arg)
+    finally:
+        elapsed = time.perf_counter() - start
+        children = stack.pop()
+        if stack:
+            stack[-1] += elapsed
+        entry = _imports.setdefault(name, [0.0, 0.0])
+        entry[0] += elapsed - children
+        entry[1] += elapsed
+
+
+class _ImportTimer:
+    """أول عنصر في sys.meta_path: يسأل بقية الباحثين عن الوحدة ويغلف مُحمِّلها"""
+
+    def find_spec(self, name, path, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(name, path, target)
+            if spec is not None:
+                if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+                    spec.loader = _TimedLoader(spec.loader, name)
+                return spec
+        return None
+
+
+def enabled():
+    return _origin is not None
+
+
+def enable():
+    """بدء القياس (أول سطر في main.py قبل استيراد PyQt والصفحات)"""
+    global _origin, _finder
+    if _origin is None:
+        _origin = time.perf_counter()
+        _finder = _ImportTimer()
+        sys.meta_path.insert(0, _finder)
+
+
+def elapsed_ms():
+    return (time.perf_counter() - _origin) * 1000 if _origin is not None else 0.0
+
+
+def mark(name):
+    """تسجيل مرحلة بزمنها منذ enable() (لا تفعل شيئاً إن لم يكن القياس مفعلاً)"""
+    if _origin is not None:
+        _marks[name] = elapsed_ms()
+
+
+def _log():
+    # يُستورد عند أول رسالة: هذه الوحدة تُستورد قبل أي وحدة أخرى في main.py
+    from utils.app_log import app_log
+    return app_log()
+
+
+def watch_paint(widget, name, since=None, final=False):
+    """
+    تسجيل أول رسم لـ widget كمرحلة name (ومدته منذ المرحلة since إن وُجدت).
+    final: إيقاف قياس الاستيراد وكتابة التقرير بعد هذا الرسم.
+    """
+    if _origin is None:
+        return
+    from PyQt5.QtCore import QEvent, QObject
+
+    class PaintWatcher(QObject):
+        def eventFilter(self, obj, event):
+            if event.type() == QEvent.Paint:
+                obj.removeEventFilter(self)
+                mark(name)
+                if since in _marks:
+                    _marks[f"{name}_since_{since}"] = _marks[name] - _marks[since]
+                _log().info("أول رسم %s: %.0f ms", name, _marks[name])
+                if final:
+                    finish()
+            return False
+
+    widget.installEventFilter(PaintWatcher(widget))
+
+
+def report(top=25):
+    """المراحل، أبطأ الاستيرادات (تراكمياً)، إجمالي زمن الاستيراد والوحدات الثقيلة المحملة"""
+    slowest = sorted(_imports.items(), key=lambda item: item[1][1], reverse=True)[:top]
+    return {
+        "marks_ms": {name: round(ms, 1) for name, ms in _marks.items()},
+        "import_ms_total": round(sum(own for own, _ in _imports.values()) * 1000, 1),
+        "modules_imported": len(_imports),
+        "slowest_imports": [{"module": module, "self_ms": round(own * 1000, 2), "cumulative_ms": round(cum * 1000, 2)}
+                            for module, (own, cum) in slowest],
+        "heavy_modules_loaded": [module for module in HEAVY_MODULES if module in sys.modules],
+    }
+
+
+def finish(path=STARTUP_PROFILE_FILE, top=10):
+    """إيقاف قياس الاستيراد، حفظ التقرير وكتابة ملخصه في سجل التطبيق"""
+    if _finder in sys.meta_path:
+        sys.meta_path.remove(_finder)
+    data = report()
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+    log = _log()
+    log.info("الاستيراد: %.0f ms لـ %d وحدة، أبطأها:\n%s", data["import_ms_total"], data["modules_imported"],
+             "\n".join(f"   {entry['cumulative_ms']:>8.1f} ms  {entry['module']}" for entry in data["slowest_imports"][:top]))
+    if data["heavy_modules_loaded"]:
+        log.warning("وحدات ثقيلة مستوردة قبل الحاجة إليها: %s", ", ".join(data["heavy_modules_loaded"]))
+    log.info("تقرير الإقلاع الكامل: %s", path)
+    return data